@@ -202,7 +202,15 @@ namespace Unity.AI.MLAgents
                     m_FirstMessageReceived = true;
                     reset = m_Communicator.ReadAndClearResetCommand();
                 }
-                if (!reset)
+                var remoteProcessor = processor as RemotePolicyProcessor;
+                if (!reset && remoteProcessor != null && remoteProcessor.RepeatActions())
+                {
+                    // Python asked to simulate this tick with the actions of its last step,
+                    // it receives the data of the tick at the end of the step
+                    policy.SetActionReady();
+                    policy.ResetDecisionsAndTerminationCounters();
+                }
+                else if (!reset)
                 {
                     m_Communicator.WriteSideChannelData(SideChannelManager.GetSideChannelMessage());
                     processor.Process();
@@ -255,6 +263,7 @@ namespace Unity.AI.MLAgents
                 ECSWorld.EntityManager.CompleteAllJobs();
             }
             ResetAllPolicies();
+            m_Communicator?.ResetActionRepeats();
             OnEnvironmentReset?.Invoke();
         }
 
@@ -65,6 +65,25 @@ namespace Unity.AI.MLAgents
             return 3;
         }
 
+        /// <summary>
+        /// Returns the size of the last dimension of a shape, the number of channels
+        /// of an observation. 1 if the shape has no dimension.
+        /// </summary>
+        public static int GetChannels(this int3 tensorShape)
+        {
+            switch (tensorShape.GetDimensions())
+            {
+                case 0:
+                    return 1;
+                case 1:
+                    return tensorShape.x;
+                case 2:
+                    return tensorShape.y;
+                default:
+                    return tensorShape.z;
+            }
+        }
+
         private static void AssertIsShape(this int3 shape)
         {
             if (shape.x == 0 && (shape.y != 0 || shape.y != 0))
@@ -44,6 +44,11 @@ namespace Unity.AI.MLAgents
         {
             int inputSize = UnsafeUtility.SizeOf<T>() / sizeof(float);
 #if ENABLE_UNITY_COLLECTIONS_CHECKS
+            if (m_Policy.ObservationDtypes[sensorNumber] == ObservationDtype.Uint8)
+            {
+                throw new MLAgentsException(
+                    $"Cannot set observation {sensorNumber} with floats, its values are of type {m_Policy.ObservationDtypes[sensorNumber]}");
+            }
             int3 s = m_Policy.SensorShapes[sensorNumber];
             int expectedInputSize = s.x * math.max(1, s.y) * math.max(1, s.z);
             if (inputSize != expectedInputSize)
@@ -70,7 +75,11 @@ namespace Unity.AI.MLAgents
             int3 s = m_Policy.SensorShapes[sensorNumber];
             int maxValue = s.x;
 #if ENABLE_UNITY_COLLECTIONS_CHECKS
-
+            if (m_Policy.ObservationDtypes[sensorNumber] == ObservationDtype.Uint8)
+            {
+                throw new MLAgentsException(
+                    $"Cannot set observation {sensorNumber} with floats, its values are of type {m_Policy.ObservationDtypes[sensorNumber]}");
+            }
             if (s.y != 0 || s.z != 0)
             {
                 throw new MLAgentsException(
@@ -102,6 +111,11 @@ namespace Unity.AI.MLAgents
         {
             int inputSize = obs.Length;
 #if ENABLE_UNITY_COLLECTIONS_CHECKS
+            if (m_Policy.ObservationDtypes[sensorNumber] == ObservationDtype.Uint8)
+            {
+                throw new MLAgentsException(
+                    $"Cannot set observation {sensorNumber} with floats, its values are of type {m_Policy.ObservationDtypes[sensorNumber]}");
+            }
             int3 s = m_Policy.SensorShapes[sensorNumber];
             int expectedInputSize = s.x * math.max(1, s.y) * math.max(1, s.z);
             if (inputSize != expectedInputSize)
@@ -115,5 +129,35 @@ namespace Unity.AI.MLAgents
             m_Policy.TerminationObs.Slice(start, inputSize).CopyFrom(obs);
             return this;
         }
+
+        /// <summary>
+        /// Sets the last observation the Agent perceives before ending the episode.
+        /// The observation must have been created with <see cref="ObservationDtype.Uint8"/>.
+        /// </summary>
+        /// <param name="sensorNumber"> The index of the observation as provided when creating the associated Policy </param>
+        /// <param name="obs"> A NativeSlice of bytes containing the observation data </param>
+        /// <returns> The EpisodeTermination struct </returns>
+        public EpisodeTermination SetObservationFromSlice(int sensorNumber, [ReadOnly] NativeSlice<byte> obs)
+        {
+            int inputSize = obs.Length;
+#if ENABLE_UNITY_COLLECTIONS_CHECKS
+            if (m_Policy.ObservationDtypes[sensorNumber] != ObservationDtype.Uint8)
+            {
+                throw new MLAgentsException(
+                    $"Cannot set observation {sensorNumber} with bytes, its values are of type {m_Policy.ObservationDtypes[sensorNumber]}");
+            }
+            int3 s = m_Policy.SensorShapes[sensorNumber];
+            int expectedInputSize = s.x * math.max(1, s.y) * math.max(1, s.z);
+            if (inputSize != expectedInputSize)
+            {
+                throw new MLAgentsException(
+                    $"Cannot set observation {sensorNumber} due to incompatible size of the input. Expected size : {expectedInputSize}, received size : { inputSize}");
+            }
+#endif
+            int start = m_Policy.ObservationOffsets[sensorNumber];
+            start += inputSize * m_Index;
+            m_Policy.TerminationByteObs.Slice(start, inputSize).CopyFrom(obs);
+            return this;
+        }
     }
 }
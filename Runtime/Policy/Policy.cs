@@ -8,6 +8,61 @@ using Unity.Collections.LowLevel.Unsafe;
 
 namespace Unity.AI.MLAgents
 {
+    /// <summary>
+    /// The type of the values of an observation.
+    /// Must match ObservationDtype in rl_data_offsets.py.
+    /// </summary>
+    public enum ObservationDtype : int
+    {
+        /// <summary>
+        /// The observation contains floats.
+        /// </summary>
+        Float32 = 0,
+        /// <summary>
+        /// The observation contains bytes, for example the pixels of a camera.
+        /// Trainers receive the values divided by 255.
+        /// </summary>
+        Uint8 = 1,
+        /// <summary>
+        /// The observation contains floats sent to Python as half precision floats.
+        /// </summary>
+        Float16 = 2,
+        /// <summary>
+        /// The observation contains floats sent to Python as signed bytes, quantized with
+        /// the <see cref="ObservationQuantization"/> of the observation.
+        /// </summary>
+        Int8 = 3,
+        /// <summary>
+        /// The observation contains floats sent to Python as 16 bits integers, quantized
+        /// with the <see cref="ObservationQuantization"/> of the observation.
+        /// </summary>
+        Int16 = 4,
+    }
+
+    /// <summary>
+    /// The parameters of an <see cref="ObservationDtype.Int8"/> or <see cref="ObservationDtype.Int16"/>
+    /// observation. The value v of channel c (the last dimension of the observation) is sent as
+    /// round((v - Offset[c]) / Scale[c]), clamped to the range of the integer type.
+    /// Must match ObservationQuantization in rl_data_offsets.py.
+    /// </summary>
+    public struct ObservationQuantization
+    {
+        /// <summary>
+        /// The scale of each channel.
+        /// </summary>
+        public float[] Scale;
+        /// <summary>
+        /// The offset of each channel.
+        /// </summary>
+        public float[] Offset;
+
+        public ObservationQuantization(float[] scale, float[] offset)
+        {
+            Scale = scale;
+            Offset = offset;
+        }
+    }
+
     /// <summary>
     /// Policy is a data container on which the user requests decisions.
     /// </summary>
@@ -25,16 +80,28 @@ namespace Unity.AI.MLAgents
         [ReadOnly] internal NativeArray<int3> SensorShapes;
         [ReadOnly] internal int ContinuousActionSize;
         [ReadOnly] internal NativeArray<int> DiscreteActionBranches;
+        [ReadOnly] internal NativeArray<ObservationDtype> ObservationDtypes;
+
+        // The scales then the offsets of the channels of each Int8 or Int16 observation,
+        // in the order of the observations
+        [ReadOnly] internal NativeArray<float> QuantizationParameters;
+        // The index of the quantization parameters of each observation in
+        // QuantizationParameters, -1 if the observation is not quantized
+        [ReadOnly] internal NativeArray<int> QuantizationOffsets;
 
+        // The offset of each observation in DecisionObs and TerminationObs, or in
+        // DecisionByteObs and TerminationByteObs for the Uint8 observations
         [ReadOnly] internal NativeArray<int> ObservationOffsets;
 
         [NativeDisableParallelForRestriction][WriteOnly] internal NativeArray<float> DecisionObs;
+        [NativeDisableParallelForRestriction][WriteOnly] internal NativeArray<byte> DecisionByteObs;
         [NativeDisableParallelForRestriction][WriteOnly] internal NativeArray<float> DecisionRewards;
         [NativeDisableParallelForRestriction] internal NativeArray<int> DecisionAgentIds;
         [NativeDisableParallelForRestriction] internal NativeArray<bool> DecisionActionMasks;
         [NativeDisableParallelForRestriction] internal NativeArray<Entity> DecisionAgentEntityIds;
 
         [NativeDisableParallelForRestriction][WriteOnly] internal NativeArray<float> TerminationObs;
+        [NativeDisableParallelForRestriction][WriteOnly] internal NativeArray<byte> TerminationByteObs;
         [NativeDisableParallelForRestriction][WriteOnly] internal NativeArray<float> TerminationRewards;
         [NativeDisableParallelForRestriction] internal NativeArray<int> TerminationAgentIds;
         [NativeDisableParallelForRestriction] internal NativeArray<Entity> TerminationAgentEntityIds;
@@ -62,12 +129,27 @@ namespace Unity.AI.MLAgents
         /// <param name="continuousActionSize"> The number of continuous actions the Policy is expected to generate for each decision. </param>
         /// <param name="discreteActionBranches"> An array of int specifying the number of possible int values each discrete
         /// action branch has. (Must be of the same length as actionSize </param>
+        /// <param name="obsDtypes"> An array of ObservationDtype specifying the type of the values of each
+        /// observation. All the observations contain floats if null. </param>
+        /// <param name="obsQuantization"> An array with the ObservationQuantization of each observation,
+        /// only read for the Int8 and Int16 observations. Can be null if there is none. </param>
         public Policy(
             int maximumNumberAgents,
             int3[] obsShapes,
             int continuousActionSize = 0,
-            int[] discreteActionBranches = null)
+            int[] discreteActionBranches = null,
+            ObservationDtype[] obsDtypes = null,
+            ObservationQuantization[] obsQuantization = null)
         {
+            if (obsDtypes == null)
+            {
+                obsDtypes = new ObservationDtype[obsShapes.Length];
+            }
+            if (obsDtypes.Length != obsShapes.Length)
+            {
+                throw new MLAgentsException(
+                    $"Expected one ObservationDtype per observation, received {obsDtypes.Length} for {obsShapes.Length} observations");
+            }
             SensorShapes = new NativeArray<int3>(obsShapes, Allocator.Persistent);
             ContinuousActionSize = continuousActionSize;
 
@@ -77,16 +159,62 @@ namespace Unity.AI.MLAgents
             }
             DiscreteActionBranches = new NativeArray<int>(discreteActionBranches, Allocator.Persistent);
 
+            ObservationDtypes = new NativeArray<ObservationDtype>(obsDtypes, Allocator.Persistent);
+
+            QuantizationOffsets = new NativeArray<int>(obsShapes.Length, Allocator.Persistent);
+            int quantizationSize = 0;
+            for (int i = 0; i < obsShapes.Length; i++)
+            {
+                QuantizationOffsets[i] = -1;
+                if (obsDtypes[i] != ObservationDtype.Int8 && obsDtypes[i] != ObservationDtype.Int16)
+                {
+                    continue;
+                }
+                int channels = obsShapes[i].GetChannels();
+                if (obsQuantization == null || i >= obsQuantization.Length
+                    || obsQuantization[i].Scale?.Length != channels || obsQuantization[i].Offset?.Length != channels)
+                {
+                    throw new MLAgentsException(
+                        $"Observation {i} of type {obsDtypes[i]} requires a scale and an offset for each of its {channels} channels");
+                }
+                QuantizationOffsets[i] = quantizationSize;
+                quantizationSize += 2 * channels;
+            }
+            QuantizationParameters = new NativeArray<float>(quantizationSize, Allocator.Persistent);
+            for (int i = 0; i < obsShapes.Length; i++)
+            {
+                int start = QuantizationOffsets[i];
+                if (start >= 0)
+                {
+                    int channels = obsQuantization[i].Scale.Length;
+                    for (int c = 0; c < channels; c++)
+                    {
+                        QuantizationParameters[start + c] = obsQuantization[i].Scale[c];
+                        QuantizationParameters[start + channels + c] = obsQuantization[i].Offset[c];
+                    }
+                }
+            }
+
             ObservationOffsets = new NativeArray<int>(SensorShapes.Length, Allocator.Persistent);
             int currentOffset = 0;
+            int currentByteOffset = 0;
             for (int i = 0; i < SensorShapes.Length; i++)
             {
-                ObservationOffsets[i] = currentOffset;
                 int3 s = SensorShapes[i];
-                currentOffset += s.GetTotalTensorSize() * maximumNumberAgents;
+                if (obsDtypes[i] == ObservationDtype.Uint8)
+                {
+                    ObservationOffsets[i] = currentByteOffset;
+                    currentByteOffset += s.GetTotalTensorSize() * maximumNumberAgents;
+                }
+                else
+                {
+                    ObservationOffsets[i] = currentOffset;
+                    currentOffset += s.GetTotalTensorSize() * maximumNumberAgents;
+                }
             }
 
             DecisionObs = new NativeArray<float>(currentOffset, Allocator.Persistent, NativeArrayOptions.ClearMemory);
+            DecisionByteObs = new NativeArray<byte>(currentByteOffset, Allocator.Persistent, NativeArrayOptions.ClearMemory);
             DecisionRewards = new NativeArray<float>(maximumNumberAgents, Allocator.Persistent, NativeArrayOptions.ClearMemory);
             DecisionAgentEntityIds = new NativeArray<Entity>(maximumNumberAgents, Allocator.Persistent, NativeArrayOptions.UninitializedMemory);
             DecisionAgentIds = new NativeArray<int>(maximumNumberAgents, Allocator.Persistent, NativeArrayOptions.UninitializedMemory);
@@ -96,6 +224,7 @@ namespace Unity.AI.MLAgents
             DecisionCounter = new Counter(Allocator.Persistent);
 
             TerminationObs = new NativeArray<float>(currentOffset, Allocator.Persistent, NativeArrayOptions.ClearMemory);
+            TerminationByteObs = new NativeArray<byte>(currentByteOffset, Allocator.Persistent, NativeArrayOptions.ClearMemory);
             TerminationRewards = new NativeArray<float>(maximumNumberAgents, Allocator.Persistent, NativeArrayOptions.ClearMemory);
             TerminationAgentIds = new NativeArray<int>(maximumNumberAgents, Allocator.Persistent, NativeArrayOptions.UninitializedMemory);
             TerminationAgentEntityIds = new NativeArray<Entity>(maximumNumberAgents, Allocator.Persistent, NativeArrayOptions.UninitializedMemory);
@@ -113,6 +242,29 @@ namespace Unity.AI.MLAgents
 #endif
         }
 
+        /// <summary>
+        /// The ObservationQuantization of each observation, as given to the constructor.
+        /// </summary>
+        internal ObservationQuantization[] GetObservationQuantization()
+        {
+            var result = new ObservationQuantization[SensorShapes.Length];
+            for (int i = 0; i < SensorShapes.Length; i++)
+            {
+                int start = QuantizationOffsets[i];
+                if (start >= 0)
+                {
+                    int channels = SensorShapes[i].GetChannels();
+                    result[i] = new ObservationQuantization(new float[channels], new float[channels]);
+                    for (int c = 0; c < channels; c++)
+                    {
+                        result[i].Scale[c] = QuantizationParameters[start + c];
+                        result[i].Offset[c] = QuantizationParameters[start + channels + c];
+                    }
+                }
+            }
+            return result;
+        }
+
         internal void ResetActionsCounter()
         {
             ActionCounter.Count = 0;
@@ -145,9 +297,13 @@ namespace Unity.AI.MLAgents
 #endif
             SensorShapes.Dispose();
             DiscreteActionBranches.Dispose();
+            ObservationDtypes.Dispose();
+            QuantizationParameters.Dispose();
+            QuantizationOffsets.Dispose();
             ObservationOffsets.Dispose();
 
             DecisionObs.Dispose();
+            DecisionByteObs.Dispose();
             DecisionRewards.Dispose();
             DecisionAgentEntityIds.Dispose();
             DecisionAgentIds.Dispose();
@@ -155,6 +311,7 @@ namespace Unity.AI.MLAgents
             DecisionCounter.Dispose();
 
             TerminationObs.Dispose();
+            TerminationByteObs.Dispose();
             TerminationRewards.Dispose();
             TerminationAgentIds.Dispose();
             TerminationAgentEntityIds.Dispose();
@@ -128,19 +128,29 @@ namespace Unity.AI.MLAgents
         {
             var input = new System.Collections.Generic.Dictionary<string, Tensor>();
 
-            var sensorOffset = 0;
             for (int sensorIndex = 0; sensorIndex < m_Policy.SensorShapes.Length; sensorIndex++)
             {
                 var shape = m_Policy.SensorShapes[sensorIndex];
-                fixed(void* arrPtr = obsArrays[sensorIndex])
+                var sensorOffset = m_Policy.ObservationOffsets[sensorIndex];
+                if (m_Policy.ObservationDtypes[sensorIndex] == ObservationDtype.Uint8)
                 {
-                    UnsafeUtility.MemCpy(
-                        (byte*)arrPtr,
-                        (byte*)m_Policy.DecisionObs.GetUnsafePtr() + 4 * sensorOffset,
-                        shape.GetTotalTensorSize() * 4 * m_Policy.DecisionCounter.Count
-                    );
+                    var obsArray = obsArrays[sensorIndex];
+                    for (int i = 0; i < shape.GetTotalTensorSize() * m_Policy.DecisionCounter.Count; i++)
+                    {
+                        obsArray[i] = m_Policy.DecisionByteObs[sensorOffset + i] / 255.0f;
+                    }
+                }
+                else
+                {
+                    fixed(void* arrPtr = obsArrays[sensorIndex])
+                    {
+                        UnsafeUtility.MemCpy(
+                            (byte*)arrPtr,
+                            (byte*)m_Policy.DecisionObs.GetUnsafePtr() + 4 * sensorOffset,
+                            shape.GetTotalTensorSize() * 4 * m_Policy.DecisionCounter.Count
+                        );
+                    }
                 }
-                sensorOffset += m_Policy.DecisionAgentIds.Length * shape.GetTotalTensorSize();
 
                 if (shape.GetDimensions() == 1)
                 {
@@ -30,6 +30,15 @@ namespace Unity.AI.MLAgents
             m_Communicator.LoadPolicy(m_PolicyId, m_Policy);
         }
 
+        /// <summary>
+        /// Simulates a tick without Python if Python asked to repeat the actions of the
+        /// last step. Returns false if the Policy must be processed.
+        /// </summary>
+        internal bool RepeatActions()
+        {
+            return m_Communicator.RepeatActions(m_PolicyId, m_Policy);
+        }
+
         public void Dispose()
         {
         }
@@ -0,0 +1,213 @@
+using System;
+using System.Collections.Generic;
+using Unity.Entities;
+
+namespace Unity.AI.MLAgents
+{
+    /// <summary>
+    /// Simulates the ticks of a step of a Policy for which Python asked to repeat the
+    /// same actions (<see cref="HeaderFeatures.ActionRepeat"/>). During the repeated
+    /// ticks, the Agents that request a decision receive the actions Python decided for
+    /// their Entity at the start of the step, and the data of the ticks is accumulated
+    /// until it is sent to Python at the end of the step:
+    ///  - The rewards of an Agent are summed until its next decision or termination.
+    ///  - The terminations of all the ticks are reported. An Agent terminates at most
+    ///  once per step, an episode that starts and ends during the repeated ticks was
+    ///  played without a decision of Python and is not reported.
+    /// The step ends before the requested number of ticks if an Agent without actions
+    /// requests a decision, or if the terminations of the next tick may exceed the
+    /// maximum number of Agents.
+    /// </summary>
+    internal class ActionRepeat : IDisposable
+    {
+        // Holds the accumulated terminations and the actions of the step
+        private Policy m_Buffer;
+        // The index of the actions of each Entity in m_Buffer
+        private Dictionary<Entity, int> m_ActionIndices = new Dictionary<Entity, int>();
+        // The Agents that terminated during the step
+        private HashSet<int> m_TerminatedAgents = new HashSet<int>();
+        // The rewards of the Agents since their last decision or termination
+        private Dictionary<int, float> m_PendingRewards = new Dictionary<int, float>();
+        private int m_RemainingTicks;
+
+        public ActionRepeat(Policy policy)
+        {
+            m_Buffer = new Policy(
+                policy.DecisionAgentIds.Length,
+                policy.SensorShapes.ToArray(),
+                policy.ContinuousActionSize,
+                policy.DiscreteActionBranches.ToArray(),
+                policy.ObservationDtypes.ToArray(),
+                policy.GetObservationQuantization());
+        }
+
+        /// <summary>
+        /// Starts a step of ticks ticks with the actions Python just loaded in the Policy.
+        /// </summary>
+        public void Start(Policy policy, int ticks)
+        {
+            m_RemainingTicks = ticks - 1;
+            m_ActionIndices.Clear();
+            if (m_RemainingTicks == 0)
+            {
+                return;
+            }
+            int count = policy.DecisionCounter.Count;
+            for (int i = 0; i < count; i++)
+            {
+                m_ActionIndices[policy.DecisionAgentEntityIds[i]] = i;
+            }
+            int continuousSize = count * policy.ContinuousActionSize;
+            int discreteSize = count * policy.DiscreteActionBranches.Length;
+            m_Buffer.ContinuousActuators.Slice(0, continuousSize).CopyFrom(policy.ContinuousActuators.Slice(0, continuousSize));
+            m_Buffer.DiscreteActuators.Slice(0, discreteSize).CopyFrom(policy.DiscreteActuators.Slice(0, discreteSize));
+        }
+
+        /// <summary>
+        /// If the step is not over, accumulates the data of the tick, gives its actions to
+        /// the Agents that requested a decision and returns true. Returns false if the data
+        /// must be sent to Python.
+        /// </summary>
+        public bool TryRepeat(Policy policy)
+        {
+            if (m_RemainingTicks == 0)
+            {
+                return false;
+            }
+            int decisionCount = policy.DecisionCounter.Count;
+            for (int i = 0; i < decisionCount; i++)
+            {
+                if (!m_ActionIndices.ContainsKey(policy.DecisionAgentEntityIds[i]))
+                {
+                    m_RemainingTicks = 0;
+                    return false;
+                }
+            }
+            AccumulateTerminations(policy);
+
+            int continuousSize = policy.ContinuousActionSize;
+            int discreteSize = policy.DiscreteActionBranches.Length;
+            for (int i = 0; i < decisionCount; i++)
+            {
+                int agentId = policy.DecisionAgentIds[i];
+                float reward;
+                m_PendingRewards.TryGetValue(agentId, out reward);
+                m_PendingRewards[agentId] = reward + policy.DecisionRewards[i];
+
+                int index = m_ActionIndices[policy.DecisionAgentEntityIds[i]];
+                policy.ContinuousActuators.Slice(i * continuousSize, continuousSize).CopyFrom(
+                    m_Buffer.ContinuousActuators.Slice(index * continuousSize, continuousSize));
+                policy.DiscreteActuators.Slice(i * discreteSize, discreteSize).CopyFrom(
+                    m_Buffer.DiscreteActuators.Slice(index * discreteSize, discreteSize));
+            }
+
+            m_RemainingTicks--;
+            if (m_Buffer.TerminationCounter.Count + decisionCount > m_Buffer.TerminationAgentIds.Length)
+            {
+                m_RemainingTicks = 0;
+            }
+            return true;
+        }
+
+        /// <summary>
+        /// Adds the data accumulated during the step to the data of its last tick,
+        /// before it is sent to Python.
+        /// </summary>
+        public void Flush(Policy policy)
+        {
+            m_RemainingTicks = 0;
+            if (m_Buffer.TerminationCounter.Count == 0 && m_PendingRewards.Count == 0)
+            {
+                return;
+            }
+            AccumulateTerminations(policy);
+            for (int i = 0; i < policy.DecisionCounter.Count; i++)
+            {
+                int agentId = policy.DecisionAgentIds[i];
+                float reward;
+                if (m_PendingRewards.TryGetValue(agentId, out reward))
+                {
+                    policy.DecisionRewards[i] += reward;
+                    m_PendingRewards.Remove(agentId);
+                }
+            }
+            int terminationCount = m_Buffer.TerminationCounter.Count;
+            for (int i = 0; i < terminationCount; i++)
+            {
+                CopyTermination(m_Buffer, i, policy, i);
+            }
+            policy.TerminationCounter.Count = terminationCount;
+            m_Buffer.TerminationCounter.Count = 0;
+            m_TerminatedAgents.Clear();
+        }
+
+        /// <summary>
+        /// Forgets the data of the step, when the environment is reset.
+        /// </summary>
+        public void Reset()
+        {
+            m_RemainingTicks = 0;
+            m_ActionIndices.Clear();
+            m_TerminatedAgents.Clear();
+            m_PendingRewards.Clear();
+            m_Buffer.TerminationCounter.Count = 0;
+        }
+
+        /// <summary>
+        /// Moves the terminations of the tick to the buffer, adding the rewards the
+        /// Agents received since their last decision.
+        /// </summary>
+        private void AccumulateTerminations(Policy policy)
+        {
+            for (int i = 0; i < policy.TerminationCounter.Count; i++)
+            {
+                int agentId = policy.TerminationAgentIds[i];
+                float reward;
+                m_PendingRewards.TryGetValue(agentId, out reward);
+                m_PendingRewards.Remove(agentId);
+                if (!m_TerminatedAgents.Add(agentId))
+                {
+                    // The Agent already terminated during this step
+                    continue;
+                }
+                int index = m_Buffer.TerminationCounter.Increment() - 1;
+                if (index >= m_Buffer.TerminationAgentIds.Length)
+                {
+                    throw new MLAgentsException(
+                        $"Number of termination notifications during the repeated ticks exceeds the set maximum of {m_Buffer.TerminationAgentIds.Length}");
+                }
+                CopyTermination(policy, i, m_Buffer, index);
+                m_Buffer.TerminationRewards[index] += reward;
+            }
+            policy.TerminationCounter.Count = 0;
+        }
+
+        private static void CopyTermination(Policy source, int sourceIndex, Policy destination, int destinationIndex)
+        {
+            for (int i = 0; i < source.SensorShapes.Length; i++)
+            {
+                int size = source.SensorShapes[i].GetTotalTensorSize();
+                int start = source.ObservationOffsets[i];
+                if (source.ObservationDtypes[i] == ObservationDtype.Uint8)
+                {
+                    destination.TerminationByteObs.Slice(start + destinationIndex * size, size).CopyFrom(
+                        source.TerminationByteObs.Slice(start + sourceIndex * size, size));
+                }
+                else
+                {
+                    destination.TerminationObs.Slice(start + destinationIndex * size, size).CopyFrom(
+                        source.TerminationObs.Slice(start + sourceIndex * size, size));
+                }
+            }
+            destination.TerminationRewards[destinationIndex] = source.TerminationRewards[sourceIndex];
+            destination.TerminationAgentIds[destinationIndex] = source.TerminationAgentIds[sourceIndex];
+            destination.TerminationAgentEntityIds[destinationIndex] = source.TerminationAgentEntityIds[sourceIndex];
+            destination.TerminationStatus[destinationIndex] = source.TerminationStatus[sourceIndex];
+        }
+
+        public void Dispose()
+        {
+            m_Buffer.Dispose();
+        }
+    }
+}
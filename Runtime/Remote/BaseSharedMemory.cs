@@ -13,6 +13,7 @@ namespace Unity.AI.MLAgents
         private MemoryMappedViewAccessor m_Accessor;
         private IntPtr m_AccessorPointer;
         private string m_FilePath;
+        private long m_Length;
 
         /// <summary>
         /// A bare bone shared memory wrapper that opens or create a new shared
@@ -43,7 +44,47 @@ namespace Unity.AI.MLAgents
                     fs.Write(new byte[size], 0, size);
                 }
             }
+            Map();
+        }
+
+        /// <summary>
+        /// The size of the mapped file in bytes.
+        /// </summary>
+        public long Length
+        {
+            get { return m_Length; }
+        }
+
+        /// <summary>
+        /// Grows the file to size bytes without moving its content and maps it again.
+        /// </summary>
+        /// <param name="size"> The new size of the file in bytes</param>
+        public void Resize(long size)
+        {
+            Close();
+            using (var fs = new FileStream(m_FilePath, FileMode.Open, FileAccess.ReadWrite, FileShare.ReadWrite))
+            {
+                if (fs.Length < size)
+                {
+                    fs.SetLength(size);
+                }
+            }
+            Map();
+        }
+
+        /// <summary>
+        /// Maps the file again after it was grown by Python.
+        /// </summary>
+        public void Remap()
+        {
+            Close();
+            Map();
+        }
+
+        private void Map()
+        {
             long length = new System.IO.FileInfo(m_FilePath).Length;
+            m_Length = length;
             var mmf = MemoryMappedFile.CreateFromFile(
                 File.Open(m_FilePath, FileMode.Open, FileAccess.ReadWrite, FileShare.ReadWrite),
                 null,
@@ -164,6 +205,16 @@ namespace Unity.AI.MLAgents
             return m_Accessor.ReadInt32(offset);
         }
 
+        /// <summary>
+        /// Returns the unsigned short present at the specified offset.
+        /// </summary>
+        /// <param name="offset"> Where to read the value.</param>
+        /// <returns></returns>
+        public ushort GetUShort(int offset)
+        {
+            return m_Accessor.ReadUInt16(offset);
+        }
+
         /// <summary>
         /// Returns the float present at the specified offset.
         /// </summary>
@@ -256,6 +307,42 @@ namespace Unity.AI.MLAgents
             return offset + 4;
         }
 
+        /// <summary>
+        /// Sets the unsigned short at the specified offset in the shared memory.
+        /// </summary>
+        /// <param name="offset"> The position at which to write the value</param>
+        /// <param name="value"> The value to be written</param>
+        /// <returns> The offset right after the written value.</returns>
+        public int SetUShort(int offset, ushort value)
+        {
+            m_Accessor.Write(offset, value);
+            return offset + 2;
+        }
+
+        /// <summary>
+        /// Sets the short at the specified offset in the shared memory.
+        /// </summary>
+        /// <param name="offset"> The position at which to write the value</param>
+        /// <param name="value"> The value to be written</param>
+        /// <returns> The offset right after the written value.</returns>
+        public int SetShort(int offset, short value)
+        {
+            m_Accessor.Write(offset, value);
+            return offset + 2;
+        }
+
+        /// <summary>
+        /// Sets the signed byte at the specified offset in the shared memory.
+        /// </summary>
+        /// <param name="offset"> The position at which to write the value</param>
+        /// <param name="value"> The value to be written</param>
+        /// <returns> The offset right after the written value.</returns>
+        public int SetSByte(int offset, sbyte value)
+        {
+            m_Accessor.Write(offset, value);
+            return offset + 1;
+        }
+
         /// <summary>
         /// Sets the boolean at the specified offset in the shared memory.
         /// </summary>
@@ -303,6 +390,39 @@ namespace Unity.AI.MLAgents
             return offset + length;
         }
 
+        /// <summary>
+        /// Copies a part of the values present in a NativeArray to the shared memory file.
+        /// </summary>
+        /// <param name="offset"> The position at which to write the value</param>
+        /// <param name="array"> The NativeArray containing the data to write</param>
+        /// <param name="start"> The index of the first element of the array to write</param>
+        /// <param name="length"> The number of bytes to write</param>
+        /// <typeparam name="T"> The type of the NativeArray. Must be a struct.</typeparam>
+        /// <returns> The offset right after the written value.</returns>
+        public int SetArray<T>(int offset, NativeArray<T> array, int start, int length) where T : struct
+        {
+            IntPtr dst = IntPtr.Add(m_AccessorPointer, offset);
+            IntPtr src = IntPtr.Add(new IntPtr(array.GetUnsafePtr()), start * UnsafeUtility.SizeOf<T>());
+            Buffer.MemoryCopy(src.ToPointer(), dst.ToPointer(), length, length);
+            return offset + length;
+        }
+
+        /// <summary>
+        /// Compares a part of the values present in a NativeArray with the shared memory file.
+        /// </summary>
+        /// <param name="offset"> The position of the values to compare</param>
+        /// <param name="array"> The NativeArray containing the data to compare</param>
+        /// <param name="start"> The index of the first element of the array to compare</param>
+        /// <param name="length"> The number of bytes to compare</param>
+        /// <typeparam name="T"> The type of the NativeArray. Must be a struct.</typeparam>
+        /// <returns> True if the bytes are equal.</returns>
+        public bool ArrayEquals<T>(int offset, NativeArray<T> array, int start, int length) where T : struct
+        {
+            IntPtr dst = IntPtr.Add(m_AccessorPointer, offset);
+            IntPtr src = IntPtr.Add(new IntPtr(array.GetUnsafePtr()), start * UnsafeUtility.SizeOf<T>());
+            return UnsafeUtility.MemCmp(src.ToPointer(), dst.ToPointer(), length) == 0;
+        }
+
         /// <summary>
         /// Sets the byte array at the specified offset in the shared memory.
         /// </summary>
@@ -315,6 +435,20 @@ namespace Unity.AI.MLAgents
             return offset + value.Length;
         }
 
+        /// <summary>
+        /// Sets a part of a byte array at the specified offset in the shared memory.
+        /// </summary>
+        /// <param name="offset"> The position at which to write the value</param>
+        /// <param name="value"> The array containing the bytes to write</param>
+        /// <param name="start"> The index of the first byte of the array to write</param>
+        /// <param name="length"> The number of bytes to write</param>
+        /// <returns> The offset right after the written value.</returns>
+        public int SetBytes(int offset, byte[] value, int start, int length)
+        {
+            m_Accessor.WriteArray(offset, value, start, length);
+            return offset + length;
+        }
+
         /// <summary>
         /// Closes the shared memory reader and writter. This will not delete the file but
         /// remove access to it.
@@ -0,0 +1,78 @@
+using System.Collections.Generic;
+using Unity.Mathematics;
+
+namespace Unity.AI.MLAgents
+{
+    /// <summary>
+    /// The final size of a behavior declared by Python after the header
+    /// (<see cref="HeaderFeatures.CapacityHints"/>), so that the section of the
+    /// behavior in the RL data has room for all its Agents from the start.
+    /// Must match CapacityHint in capacity_hints.py.
+    /// </summary>
+    internal struct CapacityHint
+    {
+        // The maximum number of Agents requesting a decision in a single step
+        public int MaxAgents;
+        // The shapes of the observations, null if any shape matches the hint
+        public int3[] ObservationShapes;
+
+        /// <summary>
+        /// True if the hint applies to the policy. The hint is ignored if its
+        /// observation shapes do not match the ones of the policy.
+        /// </summary>
+        public bool Matches(Policy policy)
+        {
+            if (ObservationShapes == null)
+            {
+                return true;
+            }
+            if (ObservationShapes.Length != policy.SensorShapes.Length)
+            {
+                return false;
+            }
+            for (int i = 0; i < ObservationShapes.Length; i++)
+            {
+                if (!ObservationShapes[i].Equals(policy.SensorShapes[i]))
+                {
+                    return false;
+                }
+            }
+            return true;
+        }
+
+        /// <summary>
+        /// Reads the capacity hints Python wrote at offset, indexed by behavior name.
+        ///  - int : number of hints
+        ///  for each hint :
+        ///  - string : behavior name
+        ///  - int : maximum number of Agents
+        ///  - int : number of observations, 0 if the shapes are not hinted
+        ///  for each observation :
+        ///    - 3 int : shape
+        /// </summary>
+        public static Dictionary<string, CapacityHint> Read(BaseSharedMemory sharedMemory, int offset)
+        {
+            var hints = new Dictionary<string, CapacityHint>();
+            int nHints = sharedMemory.GetInt(ref offset);
+            for (int i = 0; i < nHints; i++)
+            {
+                string name = sharedMemory.GetString(ref offset);
+                var hint = new CapacityHint { MaxAgents = sharedMemory.GetInt(ref offset) };
+                int nObs = sharedMemory.GetInt(ref offset);
+                if (nObs > 0)
+                {
+                    hint.ObservationShapes = new int3[nObs];
+                    for (int j = 0; j < nObs; j++)
+                    {
+                        int x = sharedMemory.GetInt(ref offset);
+                        int y = sharedMemory.GetInt(ref offset);
+                        int z = sharedMemory.GetInt(ref offset);
+                        hint.ObservationShapes[j] = new int3(x, y, z);
+                    }
+                }
+                hints[name] = hint;
+            }
+            return hints;
+        }
+    }
+}
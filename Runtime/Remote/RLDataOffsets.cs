@@ -11,6 +11,10 @@ namespace Unity.AI.MLAgents
         // Maximum N Agents
         public int MaxAgents;
 
+        // Change counters of the decision observations and of the action mask,
+        // only present with HeaderFeatures.SectionCounters
+        public int SectionCountersOffset;
+
         // Decision Steps
         public int DecisionNumberAgentsOffset;
         public int DecisionObsOffset;
@@ -32,23 +36,84 @@ namespace Unity.AI.MLAgents
         // End of file
         public int EndOfDataOffset;
 
-        public static RLDataOffsets FromSharedMemory(BaseSharedMemory sharedMemory, int offset, out string name)
+        /// <summary>
+        /// Returns the offsets of the same section moved by delta bytes. Used to
+        /// address the copies of a section in the other RL data banks.
+        /// </summary>
+        public RLDataOffsets Shifted(int delta)
+        {
+            var result = this;
+            result.SectionCountersOffset += delta;
+            result.DecisionNumberAgentsOffset += delta;
+            result.DecisionObsOffset += delta;
+            result.DecisionRewardsOffset += delta;
+            result.DecisionAgentIdOffset += delta;
+            result.DecisionActionMasksOffset += delta;
+            result.TerminationNumberAgentsOffset += delta;
+            result.TerminationObsOffset += delta;
+            result.TerminationRewardsOffset += delta;
+            result.TerminationAgentIdOffset += delta;
+            result.TerminationStatusOffset += delta;
+            result.ContinuousActionOffset += delta;
+            result.DiscreteActionOffset += delta;
+            result.EndOfDataOffset += delta;
+            return result;
+        }
+
+        /// <summary>
+        /// The number of bytes of a value of an observation in the shared memory. Without
+        /// <see cref="HeaderFeatures.ObservationDtypes"/>, all the observations are sent as floats.
+        /// </summary>
+        public static int ObservationItemSize(ObservationDtype dtype, HeaderFeatures features)
+        {
+            if ((features & HeaderFeatures.ObservationDtypes) == 0)
+            {
+                return 4;
+            }
+            switch (dtype)
+            {
+                case ObservationDtype.Float32:
+                    return 4;
+                case ObservationDtype.Uint8:
+                case ObservationDtype.Int8:
+                    return 1;
+                case ObservationDtype.Float16:
+                case ObservationDtype.Int16:
+                    return 2;
+                default:
+                    throw new MLAgentsException($"Unsupported observation type {dtype}");
+            }
+        }
+
+        public static RLDataOffsets FromSharedMemory(BaseSharedMemory sharedMemory, int offset, HeaderFeatures features, out string name)
         {
             var startOffset = offset;
             name = sharedMemory.GetString(ref offset);
             int maxAgents = sharedMemory.GetInt(ref offset);
 
             int NObs = sharedMemory.GetInt(ref offset);
-            int totalObsLength = 0; // The number of floats contained in an Agent's observations
+            int totalObsBytes = 0; // The number of bytes contained in an Agent's observations
+            int quantizationBytes = 0; // The number of bytes of the quantization parameters
             for (int i = 0; i < NObs; i++)
             {
-                int prod = 1; // For observation i, what is the number of floats in this obs
-                prod *= math.max(1,  sharedMemory.GetInt(ref offset));
-                prod *= math.max(1,  sharedMemory.GetInt(ref offset));
-                prod *= math.max(1,  sharedMemory.GetInt(ref offset));
-                totalObsLength += prod;
+                var shape = new int3(
+                    sharedMemory.GetInt(ref offset),
+                    sharedMemory.GetInt(ref offset),
+                    sharedMemory.GetInt(ref offset));
                 offset += 16; // 4bytes * (3dim prop + 1 type)
+                var dtype = ObservationDtype.Float32;
+                if ((features & HeaderFeatures.ObservationDtypes) != 0)
+                {
+                    dtype = (ObservationDtype)sharedMemory.GetInt(ref offset);
+                }
+                if (dtype == ObservationDtype.Int8 || dtype == ObservationDtype.Int16)
+                {
+                    quantizationBytes += 8 * shape.GetChannels(); // 4bytes * (scale + offset)
+                }
+                int prod = math.max(1, shape.x) * math.max(1, shape.y) * math.max(1, shape.z);
+                totalObsBytes += prod * ObservationItemSize(dtype, features);
             }
+            offset += quantizationBytes;
             int continuousActionSize = sharedMemory.GetInt(ref offset);
             int numDiscreteBranches = sharedMemory.GetInt(ref offset);
             int numDiscreteActions = 0;
@@ -65,29 +130,43 @@ namespace Unity.AI.MLAgents
                 numDiscreteBranches,
                 numDiscreteActions,
                 NObs,
-                totalObsLength,
+                totalObsBytes,
+                quantizationBytes,
+                features,
                 startOffset);
         }
 
-        public static RLDataOffsets FromPolicy(Policy policy, string name, int offset)
+        /// <summary>
+        /// The offsets of the section of a policy. The section has room for maxAgents
+        /// Agents, the maximum number of Agents of the policy if maxAgents is 0.
+        /// </summary>
+        public static RLDataOffsets FromPolicy(Policy policy, string name, int offset, HeaderFeatures features, int maxAgents = 0)
         {
-            int totalFloatObsPerAgent = 0;
-            foreach (int3 shape in policy.SensorShapes)
+            int totalObsBytesPerAgent = 0;
+            for (int i = 0; i < policy.SensorShapes.Length; i++)
             {
-                totalFloatObsPerAgent += shape.GetTotalTensorSize();
+                int itemSize = ObservationItemSize(policy.ObservationDtypes[i], features);
+                totalObsBytesPerAgent += itemSize * policy.SensorShapes[i].GetTotalTensorSize();
             }
             int numDiscreteActions = numDiscreteActions = policy.DiscreteActionBranches.Sum();;
             int numDiscreteBranches = policy.DiscreteActionBranches.Length;
             int numContinuousActions = policy.ContinuousActionSize;
+            int quantizationBytes = 0;
+            if ((features & HeaderFeatures.ObservationDtypes) != 0)
+            {
+                quantizationBytes = 4 * policy.QuantizationParameters.Length;
+            }
 
             return ComputeOffsets(
                 name,
-                policy.DecisionAgentIds.Length,
+                maxAgents > 0 ? maxAgents : policy.DecisionAgentIds.Length,
                 numContinuousActions,
                 numDiscreteBranches,
                 numDiscreteActions,
                 policy.SensorShapes.Length,
-                totalFloatObsPerAgent,
+                totalObsBytesPerAgent,
+                quantizationBytes,
+                features,
                 offset
             );
         }
@@ -99,7 +178,9 @@ namespace Unity.AI.MLAgents
             int numDiscreteBranches,
             int numDiscreteActions,
             int nbObs,
-            int totalFloatObsPerAgent,
+            int totalObsBytesPerAgent,
+            int quantizationBytes,
+            HeaderFeatures features,
             int offset)
         {
             var dataOffsets = new RLDataOffsets();
@@ -109,15 +190,27 @@ namespace Unity.AI.MLAgents
             offset += 4; // Max Agent
             offset += 4; //Num Obs
             offset += nbObs * 28; // 4 * (3 + 3 + 1); // 4 bytes, 3 shapes, 3 dim prop, 1 type
+            if ((features & HeaderFeatures.ObservationDtypes) != 0)
+            {
+                offset += nbObs * 4; // 4 bytes, 1 dtype
+                offset += quantizationBytes; // Scale and offset of the quantized channels
+            }
             offset += 4; // Continuous action size
             offset += 4; // Discrete action size
             offset += 4 * numDiscreteBranches; // Each branch size
 
+            // Change counters
+            dataOffsets.SectionCountersOffset = offset;
+            if ((features & HeaderFeatures.SectionCounters) != 0)
+            {
+                offset += 4 * (nbObs + 1);
+            }
+
             // Decision Steps Offsets
             dataOffsets.DecisionNumberAgentsOffset = offset;
             offset += 4;
             dataOffsets.DecisionObsOffset = offset;
-            offset += 4 * maxAgents * totalFloatObsPerAgent;
+            offset += maxAgents * totalObsBytesPerAgent;
             dataOffsets.DecisionRewardsOffset = offset;
             offset += 4 * maxAgents;
             dataOffsets.DecisionAgentIdOffset = offset;
@@ -129,7 +222,7 @@ namespace Unity.AI.MLAgents
             dataOffsets.TerminationNumberAgentsOffset = offset;
             offset += 4;
             dataOffsets.TerminationObsOffset = offset;
-            offset += 4 * maxAgents * totalFloatObsPerAgent;
+            offset += maxAgents * totalObsBytesPerAgent;
             dataOffsets.TerminationRewardsOffset = offset;
             offset += 4 * maxAgents;
             dataOffsets.TerminationStatusOffset = offset;
@@ -1,4 +1,5 @@
 using System.Collections.Generic;
+using Unity.Collections;
 using Unity.Mathematics;
 
 
@@ -6,23 +7,52 @@ namespace Unity.AI.MLAgents
 {
     /// <summary>
     /// Only C# can add new data, but both C# and python can edit it
+    /// File organization:
+    ///  - side channel section : int size of the data followed by the data
+    ///  - rlDataBanks RL data sections of rlDataBufferSize bytes each. All the
+    ///  banks contain the same policy sections, the offsets are the ones of the
+    ///  first bank.
     /// </summary>
     internal class SharedMemoryBody : BaseSharedMemory
     {
+        /// <summary>
+        /// The decision data of a policy this file last received, used to find the
+        /// data that did not change.
+        /// </summary>
+        private class SectionCounters
+        {
+            // The bank the policy was last written to
+            public int Bank;
+            public int DecisionCount;
+            // The step at which each decision observation and the action mask last changed
+            public int[] Counters;
+        }
+
         private Dictionary<string, RLDataOffsets> m_OffsetDict = new Dictionary<string, RLDataOffsets>();
+        private Dictionary<string, SectionCounters> m_SectionCounters = new Dictionary<string, SectionCounters>();
         private int m_SideChannelBufferSize;
         private int m_RlDataBufferSize;
+        private int m_RlDataBanks;
+        private HeaderFeatures m_Features;
         private int m_CurrentEndOffset;
         public SharedMemoryBody(
             string fileName,
             bool createFile,
             SharedMemoryBody copyFrom,
             int sideChannelBufferSize,
-            int rlDataBufferSize) : base(fileName, createFile, sideChannelBufferSize + rlDataBufferSize)
+            int rlDataBufferSize,
+            int rlDataBanks = 1,
+            HeaderFeatures features = HeaderFeatures.None) : base(fileName, createFile, sideChannelBufferSize + rlDataBanks * rlDataBufferSize)
         {
+            m_Features = features;
             m_SideChannelBufferSize = sideChannelBufferSize;
             m_RlDataBufferSize = rlDataBufferSize;
+            m_RlDataBanks = rlDataBanks;
             m_CurrentEndOffset = m_SideChannelBufferSize;
+            if (copyFrom != null)
+            {
+                KeepSectionCounters(copyFrom);
+            }
             if (createFile && copyFrom != null)
             {
                 SideChannelData = copyFrom.SideChannelData;
@@ -45,62 +75,289 @@ namespace Unity.AI.MLAgents
                 {
                     return;
                 }
-                var dataOffset = RLDataOffsets.FromSharedMemory(this, offset, out name);
+                var dataOffset = RLDataOffsets.FromSharedMemory(this, offset, m_Features, out name);
                 m_OffsetDict[name] = dataOffset;
                 offset = dataOffset.EndOfDataOffset;
                 m_CurrentEndOffset = offset;
             }
         }
 
+        /// <summary>
+        /// Reuses the state of the change counters of the file this one replaces, which
+        /// must contain the same RL data. Otherwise, all the data of the next step is
+        /// considered changed.
+        /// </summary>
+        public void KeepSectionCounters(SharedMemoryBody previous)
+        {
+            m_SectionCounters = previous.m_SectionCounters;
+        }
+
         public bool ContainsPolicy(string name)
         {
             return m_OffsetDict.ContainsKey(name);
         }
 
-        public void WritePolicy(string name, Policy policy)
+        /// <summary>
+        /// The offsets of the section of a policy in an RL data bank.
+        /// </summary>
+        private RLDataOffsets GetOffsets(string name, int bank)
+        {
+            return m_OffsetDict[name].Shifted(bank * m_RlDataBufferSize);
+        }
+
+        /// <summary>
+        /// Sets the number of decisions and terminations of all the policies of a
+        /// bank to 0, so the policies that are not written to it report no Agent.
+        /// </summary>
+        public void ClearBank(int bank)
         {
             if (!CanEdit)
             {
                 return;
             }
-            if (!m_OffsetDict.ContainsKey(name))
+            foreach (var name in m_OffsetDict.Keys)
             {
-                throw new MLAgentsException("Unknown Policy tried to communicate");
+                var dataOffsets = GetOffsets(name, bank);
+                SetInt(dataOffsets.DecisionNumberAgentsOffset, 0);
+                SetInt(dataOffsets.TerminationNumberAgentsOffset, 0);
             }
-            var dataOffsets = m_OffsetDict[name];
-            int totalFloatObsPerAgent = 0;
-            foreach (int3 shape in policy.SensorShapes)
+        }
+
+        /// <summary>
+        /// Writes the data of a policy to a bank. With <see cref="HeaderFeatures.SectionCounters"/>,
+        /// step is the value of the change counters of the decision data that changed.
+        /// </summary>
+        public void WritePolicy(string name, Policy policy, int bank = 0, int step = 0)
+        {
+            if (!CanEdit)
             {
-                totalFloatObsPerAgent += shape.GetTotalTensorSize();
+                return;
             }
+            if (!m_OffsetDict.ContainsKey(name))
+            {
+                throw new MLAgentsException("Unknown Policy tried to communicate");
+            }
+            var dataOffsets = GetOffsets(name, bank);
 
             // Decision data
             var decisionCount = policy.DecisionCounter.Count;
             SetInt(dataOffsets.DecisionNumberAgentsOffset, decisionCount);
-            SetArray(dataOffsets.DecisionObsOffset, policy.DecisionObs, 4 * decisionCount * totalFloatObsPerAgent);
+            if ((m_Features & HeaderFeatures.SectionCounters) != 0)
+            {
+                WriteChangedDecisionData(name, policy, dataOffsets, bank, step);
+            }
+            else
+            {
+                int offset = dataOffsets.DecisionObsOffset;
+                for (int i = 0; i < policy.SensorShapes.Length; i++)
+                {
+                    offset = WriteObservation(offset, policy, i, dataOffsets.MaxAgents, policy.DecisionObs, policy.DecisionByteObs, decisionCount);
+                }
+                SetArray(dataOffsets.DecisionActionMasksOffset, policy.DecisionActionMasks, decisionCount * policy.DiscreteActionBranches.Sum());
+            }
             SetArray(dataOffsets.DecisionRewardsOffset, policy.DecisionRewards, 4 * decisionCount);
             SetArray(dataOffsets.DecisionAgentIdOffset, policy.DecisionAgentIds, 4 * decisionCount);
-            SetArray(dataOffsets.DecisionActionMasksOffset, policy.DecisionActionMasks, decisionCount * policy.DiscreteActionBranches.Sum());
 
             //Termination data
             var terminationCount = policy.TerminationCounter.Count;
             SetInt(dataOffsets.TerminationNumberAgentsOffset, terminationCount);
-            SetArray(dataOffsets.TerminationObsOffset, policy.TerminationObs, 4 * terminationCount * totalFloatObsPerAgent);
+            int terminationOffset = dataOffsets.TerminationObsOffset;
+            for (int i = 0; i < policy.SensorShapes.Length; i++)
+            {
+                terminationOffset = WriteObservation(terminationOffset, policy, i, dataOffsets.MaxAgents, policy.TerminationObs, policy.TerminationByteObs, terminationCount);
+            }
             SetArray(dataOffsets.TerminationRewardsOffset, policy.TerminationRewards, 4 * terminationCount);
             SetArray(dataOffsets.TerminationAgentIdOffset, policy.TerminationAgentIds, 4 * terminationCount);
             SetArray(dataOffsets.TerminationStatusOffset, policy.TerminationStatus, terminationCount);
         }
 
-        public void WritePolicySpecs(string name, Policy policy)
+        /// <summary>
+        /// Writes the decision observations and the action mask that changed since
+        /// the policy was last written to this file, and the change counters of the
+        /// section. The data is compared with the copy in the bank the policy was
+        /// last written to. All the data changed if the number of Agents changed.
+        /// </summary>
+        private void WriteChangedDecisionData(string name, Policy policy, RLDataOffsets dataOffsets, int bank, int step)
+        {
+            int count = policy.DecisionCounter.Count;
+            int nObs = policy.SensorShapes.Length;
+            SectionCounters previous;
+            if (!m_SectionCounters.TryGetValue(name, out previous))
+            {
+                previous = new SectionCounters { Bank = bank, DecisionCount = -1, Counters = new int[nObs + 1] };
+                m_SectionCounters[name] = previous;
+            }
+            bool sameCount = previous.DecisionCount == count;
+            bool sameBank = previous.Bank == bank;
+            var previousOffsets = GetOffsets(name, previous.Bank);
+
+            int offset = dataOffsets.DecisionObsOffset;
+            int previousOffset = previousOffsets.DecisionObsOffset;
+            for (int i = 0; i < nObs; i++)
+            {
+                bool changed = !sameCount || !ObservationEquals(previousOffset, policy, i, policy.DecisionObs, policy.DecisionByteObs, count);
+                if (changed)
+                {
+                    previous.Counters[i] = step;
+                }
+                if (changed || !sameBank)
+                {
+                    WriteObservation(offset, policy, i, dataOffsets.MaxAgents, policy.DecisionObs, policy.DecisionByteObs, count);
+                }
+                int sectionSize = ObservationSectionSize(policy, i, dataOffsets.MaxAgents);
+                offset += sectionSize;
+                previousOffset += sectionSize;
+            }
+
+            int maskLength = count * policy.DiscreteActionBranches.Sum();
+            bool maskChanged = !sameCount || !ArrayEquals(previousOffsets.DecisionActionMasksOffset, policy.DecisionActionMasks, 0, maskLength);
+            if (maskChanged)
+            {
+                previous.Counters[nObs] = step;
+            }
+            if (maskChanged || !sameBank)
+            {
+                SetArray(dataOffsets.DecisionActionMasksOffset, policy.DecisionActionMasks, maskLength);
+            }
+
+            for (int i = 0; i <= nObs; i++)
+            {
+                SetInt(dataOffsets.SectionCountersOffset + 4 * i, previous.Counters[i]);
+            }
+            previous.Bank = bank;
+            previous.DecisionCount = count;
+        }
+
+        /// <summary>
+        /// The number of bytes of an observation in a policy section, which has room
+        /// for maxAgents Agents.
+        /// </summary>
+        private int ObservationSectionSize(Policy policy, int index, int maxAgents)
+        {
+            int itemSize = RLDataOffsets.ObservationItemSize(policy.ObservationDtypes[index], m_Features);
+            return itemSize * maxAgents * policy.SensorShapes[index].GetTotalTensorSize();
+        }
+
+        /// <summary>
+        /// Writes an observation of count Agents and returns the offset of the next
+        /// observation. If Python did not accept <see cref="HeaderFeatures.ObservationDtypes"/>,
+        /// the Uint8 observations are sent as floats in [0, 1] and the other observations
+        /// as floats. Otherwise the Float16, Int8 and Int16 observations are converted
+        /// from the floats of the policy.
+        /// </summary>
+        private int WriteObservation(int offset, Policy policy, int index, int maxAgents, NativeArray<float> obs, NativeArray<byte> byteObs, int count)
+        {
+            var dtype = policy.ObservationDtypes[index];
+            int obsSize = policy.SensorShapes[index].GetTotalTensorSize();
+            int itemSize = RLDataOffsets.ObservationItemSize(dtype, m_Features);
+            int start = policy.ObservationOffsets[index];
+            if (dtype == ObservationDtype.Uint8)
+            {
+                if (itemSize == 1)
+                {
+                    SetArray(offset, byteObs, start, count * obsSize);
+                }
+                else
+                {
+                    for (int j = 0; j < count * obsSize; j++)
+                    {
+                        SetFloat(offset + 4 * j, byteObs[start + j] / 255f);
+                    }
+                }
+            }
+            else if (itemSize == 4)
+            {
+                SetArray(offset, obs, start, 4 * count * obsSize);
+            }
+            else if (dtype == ObservationDtype.Float16)
+            {
+                for (int j = 0; j < count * obsSize; j++)
+                {
+                    SetUShort(offset + 2 * j, (ushort)math.f32tof16(obs[start + j]));
+                }
+            }
+            else
+            {
+                WriteQuantizedObservation(offset, policy, index, obs, count);
+            }
+            return offset + ObservationSectionSize(policy, index, maxAgents);
+        }
+
+        /// <summary>
+        /// Writes an Int8 or Int16 observation of count Agents, each value is quantized
+        /// with the scale and the offset of its channel.
+        /// </summary>
+        private void WriteQuantizedObservation(int offset, Policy policy, int index, NativeArray<float> obs, int count)
+        {
+            var dtype = policy.ObservationDtypes[index];
+            int obsSize = policy.SensorShapes[index].GetTotalTensorSize();
+            int channels = policy.SensorShapes[index].GetChannels();
+            int start = policy.ObservationOffsets[index];
+            int scales = policy.QuantizationOffsets[index];
+            int offsets = scales + channels;
+            for (int j = 0; j < count * obsSize; j++)
+            {
+                int channel = j % channels;
+                float value = math.round(
+                    (obs[start + j] - policy.QuantizationParameters[offsets + channel]) / policy.QuantizationParameters[scales + channel]);
+                if (dtype == ObservationDtype.Int8)
+                {
+                    SetSByte(offset + j, (sbyte)math.clamp(value, sbyte.MinValue, sbyte.MaxValue));
+                }
+                else
+                {
+                    SetShort(offset + 2 * j, (short)math.clamp(value, short.MinValue, short.MaxValue));
+                }
+            }
+        }
+
+        /// <summary>
+        /// True if the observation of count Agents at offset is the one of the policy.
+        /// Always false for the observations converted when they are written.
+        /// </summary>
+        private bool ObservationEquals(int offset, Policy policy, int index, NativeArray<float> obs, NativeArray<byte> byteObs, int count)
+        {
+            var dtype = policy.ObservationDtypes[index];
+            int obsSize = policy.SensorShapes[index].GetTotalTensorSize();
+            int itemSize = RLDataOffsets.ObservationItemSize(dtype, m_Features);
+            int start = policy.ObservationOffsets[index];
+            if (dtype == ObservationDtype.Uint8)
+            {
+                return itemSize == 1 && ArrayEquals(offset, byteObs, start, count * obsSize);
+            }
+            if (itemSize == 4)
+            {
+                return ArrayEquals(offset, obs, start, 4 * count * obsSize);
+            }
+            return false;
+        }
+
+        /// <summary>
+        /// Writes the specs of a new policy at the end of the RL data of every bank.
+        /// The section of the policy has room for maxAgents Agents, the maximum
+        /// number of Agents of the policy if maxAgents is 0.
+        /// </summary>
+        public void WritePolicySpecs(string name, Policy policy, int maxAgents = 0)
+        {
+            var dataOffsets = RLDataOffsets.FromPolicy(policy, name, m_CurrentEndOffset, m_Features, maxAgents);
+            m_OffsetDict[name] = dataOffsets;
+            int endOffset = WriteSpecs(name, policy, dataOffsets.MaxAgents, m_CurrentEndOffset);
+            for (int bank = 1; bank < m_RlDataBanks; bank++)
+            {
+                WriteSpecs(name, policy, dataOffsets.MaxAgents, m_CurrentEndOffset + bank * m_RlDataBufferSize);
+            }
+            m_CurrentEndOffset = endOffset;
+        }
+
+        private int WriteSpecs(string name, Policy policy, int maxAgents, int offset)
         {
-            m_OffsetDict[name] = RLDataOffsets.FromPolicy(policy, name, m_CurrentEndOffset);
-            var offset = m_CurrentEndOffset;
             offset = SetString(offset, name); // Name
-            offset = SetInt(offset, policy.DecisionAgentIds.Length); // Max Agents
+            offset = SetInt(offset, maxAgents); // Max Agents
 
             offset = SetInt(offset, policy.SensorShapes.Length);
-            foreach (int3 shape in policy.SensorShapes)
+            for (int i = 0; i < policy.SensorShapes.Length; i++)
             {
+                int3 shape = policy.SensorShapes[i];
                 offset = SetInt(offset, shape.x);
                 offset = SetInt(offset, shape.y);
                 offset = SetInt(offset, shape.z);
@@ -108,6 +365,15 @@ namespace Unity.AI.MLAgents
                 offset = SetInt(offset, 0);
                 offset = SetInt(offset, 0);
                 offset = SetInt(offset, 0);
+                if ((m_Features & HeaderFeatures.ObservationDtypes) != 0)
+                {
+                    offset = SetInt(offset, (int)policy.ObservationDtypes[i]);
+                }
+            }
+            if ((m_Features & HeaderFeatures.ObservationDtypes) != 0)
+            {
+                // The scales then the offsets of the channels of each quantized observation
+                offset = SetArray(offset, policy.QuantizationParameters, 4 * policy.QuantizationParameters.Length);
             }
 
             offset = SetInt(offset, policy.ContinuousActionSize);
@@ -116,11 +382,15 @@ namespace Unity.AI.MLAgents
             {
                 offset = SetInt(offset, branchSize);
             }
-
-            m_CurrentEndOffset = offset;
+            return offset;
         }
 
-        public void ReadPolicy(string name, Policy policy)
+        /// <summary>
+        /// Reads the actions of a policy from a bank. If clearCounts, the numbers of
+        /// decisions and terminations of the policy are set to 0 so it reports no
+        /// Agent until it is written again.
+        /// </summary>
+        public void ReadPolicy(string name, Policy policy, int bank = 0, bool clearCounts = true)
         {
             if (!CanEdit)
             {
@@ -130,9 +400,12 @@ namespace Unity.AI.MLAgents
             {
                 throw new MLAgentsException("Policy not registered");
             }
-            var dataOffsets = m_OffsetDict[name];
-            SetInt(dataOffsets.DecisionNumberAgentsOffset, 0);
-            SetInt(dataOffsets.TerminationNumberAgentsOffset, 0);
+            var dataOffsets = GetOffsets(name, bank);
+            if (clearCounts)
+            {
+                SetInt(dataOffsets.DecisionNumberAgentsOffset, 0);
+                SetInt(dataOffsets.TerminationNumberAgentsOffset, 0);
+            }
             GetArray(dataOffsets.ContinuousActionOffset, policy.ContinuousActuators, 4 * policy.DecisionCounter.Count * policy.ContinuousActionSize);
             GetArray(dataOffsets.DiscreteActionOffset, policy.DiscreteActuators, 4 * policy.DecisionCounter.Count * policy.DiscreteActionBranches.Length);
         }
@@ -141,7 +414,9 @@ namespace Unity.AI.MLAgents
         {
             get
             {
-                if (!CanEdit)
+                // Without a side channel section, the RL data starts at the beginning of
+                // the file, see HeaderFeatures.SideChannelFile
+                if (!CanEdit || m_SideChannelBufferSize < 4)
                 {
                     return null;
                 }
@@ -160,6 +435,11 @@ namespace Unity.AI.MLAgents
             }
         }
 
+        /// <summary>
+        /// The RL data of all the banks. When set, the data of each bank of the
+        /// value, which can be smaller than the banks of this file, is copied at
+        /// the start of the corresponding bank.
+        /// </summary>
         public byte[] RlData
         {
             get
@@ -172,7 +452,7 @@ namespace Unity.AI.MLAgents
                 {
                     return null;
                 }
-                return GetBytes(m_SideChannelBufferSize, m_RlDataBufferSize);
+                return GetBytes(m_SideChannelBufferSize, m_RlDataBanks * m_RlDataBufferSize);
             }
             set
             {
@@ -180,7 +460,11 @@ namespace Unity.AI.MLAgents
                 {
                     return;
                 }
-                SetBytes(m_SideChannelBufferSize, value);
+                int bankSize = value.Length / m_RlDataBanks;
+                for (int bank = 0; bank < m_RlDataBanks; bank++)
+                {
+                    SetBytes(m_SideChannelBufferSize + bank * m_RlDataBufferSize, value, bank * bankSize, bankSize);
+                }
                 RefreshOffsets();
             }
         }
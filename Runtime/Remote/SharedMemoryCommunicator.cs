@@ -1,4 +1,5 @@
 using System;
+using System.Collections.Generic;
 #if UNITY_EDITOR
 using UnityEditor;
 #endif
@@ -11,11 +12,35 @@ namespace Unity.AI.MLAgents
     {
         private const float k_TimeOutInSeconds = 15000;
 
+        // The HeaderFeatures this runtime implements
+        private const HeaderFeatures k_SupportedFeatures = HeaderFeatures.WakeFifo
+            | HeaderFeatures.RLDataBanks
+            | HeaderFeatures.SideChannelFile
+            | HeaderFeatures.CapacityHints
+            | HeaderFeatures.ObservationDtypes
+            | HeaderFeatures.SectionCounters
+            | HeaderFeatures.ActionRepeat;
 
         private string m_BaseFileName;
         private int m_CurrentFileNumber = 1;
         private SharedMemoryHeader m_SharedMemoryHeader;
         private SharedMemoryBody m_ShareMemoryBody;
+        private HeaderFeatures m_Features;
+        private int m_RLDataBanks = 1;
+        // The bank holding the data of the last step, where Python writes the actions
+        private int m_RLDataBank;
+        // The number of policy updates sent to Python, the value of the change
+        // counters of the data written during the last one
+        private int m_StepCount;
+        // The state of the steps of the policies for which Python asked to repeat actions
+        private Dictionary<string, ActionRepeat> m_ActionRepeats = new Dictionary<string, ActionRepeat>();
+        // The named pipes waking Python and Unity up, null if Unity polls the header
+        private WakeChannel m_WakeChannel;
+        // The file holding the side channel data, null if it is in the body
+        private SharedMemorySideChannel m_SideChannel;
+        private int m_SideChannelGeneration;
+        // The capacity hints of the behaviors, empty if Python did not send any
+        private Dictionary<string, CapacityHint> m_CapacityHints = new Dictionary<string, CapacityHint>();
 
         public bool Active;
 
@@ -34,12 +59,38 @@ namespace Unity.AI.MLAgents
                 Active = false;
                 return;
             }
+            m_Features = m_SharedMemoryHeader.RequestedFeatures & k_SupportedFeatures;
+            if ((m_Features & HeaderFeatures.WakeFifo) != 0)
+            {
+                m_WakeChannel = WakeChannel.TryOpen(filePath);
+                if (m_WakeChannel == null)
+                {
+                    m_Features &= ~HeaderFeatures.WakeFifo;
+                }
+            }
+            m_SharedMemoryHeader.AcceptedFeatures = m_Features;
+            if ((m_Features & HeaderFeatures.RLDataBanks) != 0)
+            {
+                m_RLDataBanks = m_SharedMemoryHeader.RLDataBanks;
+            }
+            m_SharedMemoryHeader.RLDataBank = m_RLDataBank;
+            if ((m_Features & HeaderFeatures.SideChannelFile) != 0)
+            {
+                m_SideChannel = new SharedMemorySideChannel(filePath);
+                m_SideChannelGeneration = m_SharedMemoryHeader.SideChannelGeneration;
+            }
+            if ((m_Features & HeaderFeatures.CapacityHints) != 0)
+            {
+                m_CapacityHints = m_SharedMemoryHeader.ReadCapacityHints();
+            }
             m_ShareMemoryBody = new SharedMemoryBody(
                 m_BaseFileName.PadRight(m_BaseFileName.Length + m_CurrentFileNumber, '_'),
                 false,
                 null,
                 m_SharedMemoryHeader.SideChannelBufferSize,
-                m_SharedMemoryHeader.RLDataBufferSize);
+                m_SharedMemoryHeader.RLDataBufferSize,
+                m_RLDataBanks,
+                m_Features);
 
             SetUnityReady();
             Active = true;
@@ -47,11 +98,27 @@ namespace Unity.AI.MLAgents
 
         public byte[] ReadAndClearSideChannelData()
         {
+            if (m_SideChannel != null)
+            {
+                return m_SideChannel.Data;
+            }
             return m_ShareMemoryBody.SideChannelData;
         }
 
         public void WriteSideChannelData(byte[] data)
         {
+            if (m_SideChannel != null)
+            {
+                if (data.Length > m_SideChannel.Length - 4) // 4 is the int for the size of the data
+                {
+                    // The file grows in place, Python maps it again when the generation changes
+                    m_SideChannel.Resize(ArrayUtils.IncreaseArraySizeHeuristic(data.Length));
+                    m_SideChannelGeneration++;
+                    m_SharedMemoryHeader.SideChannelGeneration = m_SideChannelGeneration;
+                }
+                m_SideChannel.Data = data;
+                return;
+            }
             int oldCapacity = m_SharedMemoryHeader.SideChannelBufferSize;
             if (data.Length > oldCapacity - 4) // 4 is the int for the size of the data
             {
@@ -60,22 +127,28 @@ namespace Unity.AI.MLAgents
                 m_CurrentFileNumber += 1;
                 m_SharedMemoryHeader.FileNumber = m_CurrentFileNumber;
                 byte[] rlData = m_ShareMemoryBody.RlData;
-                m_ShareMemoryBody.Close();
+                var previousBody = m_ShareMemoryBody;
+                previousBody.Close();
                 m_ShareMemoryBody = new SharedMemoryBody(
                     m_BaseFileName.PadRight(m_BaseFileName.Length + m_CurrentFileNumber, '_'),
                     true,
                     null,
                     newCapacity,
-                    m_SharedMemoryHeader.RLDataBufferSize
+                    m_SharedMemoryHeader.RLDataBufferSize,
+                    m_RLDataBanks,
+                    m_Features
                 );
                 m_SharedMemoryHeader.SideChannelBufferSize = newCapacity;
                 m_ShareMemoryBody.RlData = rlData;
+                m_ShareMemoryBody.KeepSectionCounters(previousBody);
             }
             m_ShareMemoryBody.SideChannelData = data;
         }
 
         /// <summary>
-        /// Writes the data of a Policy into the shared memory file.
+        /// Writes the data of a Policy into the shared memory file. With several RL
+        /// data banks, the data is written to the bank after the one Python last
+        /// read, so the data Python holds stays valid.
         /// </summary>
         public void WritePolicy(string policyName, Policy policy)
         {
@@ -83,26 +156,31 @@ namespace Unity.AI.MLAgents
             {
                 return;
             }
-            if (m_ShareMemoryBody.ContainsPolicy(policyName))
+            ActionRepeat actionRepeat;
+            if (m_ActionRepeats.TryGetValue(policyName, out actionRepeat))
             {
-                m_ShareMemoryBody.WritePolicy(policyName, policy);
+                actionRepeat.Flush(policy);
             }
-            else
+            if (!m_ShareMemoryBody.ContainsPolicy(policyName))
             {
                 // The policy needs to register
                 int oldTotalCapacity = m_SharedMemoryHeader.RLDataBufferSize;
-                int policyMemorySize = RLDataOffsets.FromPolicy(policy, policyName, 0).EndOfDataOffset;
+                int maxAgents = PolicyCapacity(policyName, policy);
+                int policyMemorySize = RLDataOffsets.FromPolicy(policy, policyName, 0, m_Features, maxAgents).EndOfDataOffset;
                 m_CurrentFileNumber += 1;
                 m_SharedMemoryHeader.FileNumber = m_CurrentFileNumber;
                 byte[] channelData = m_ShareMemoryBody.SideChannelData;
                 byte[] rlData = m_ShareMemoryBody.RlData;
-                m_ShareMemoryBody.Close();
+                var previousBody = m_ShareMemoryBody;
+                previousBody.Close();
                 m_ShareMemoryBody = new SharedMemoryBody(
                     m_BaseFileName.PadRight(m_BaseFileName.Length + m_CurrentFileNumber, '_'),
                     true,
                     null,
                     m_SharedMemoryHeader.SideChannelBufferSize,
-                    oldTotalCapacity + policyMemorySize
+                    oldTotalCapacity + policyMemorySize,
+                    m_RLDataBanks,
+                    m_Features
                 );
                 m_SharedMemoryHeader.RLDataBufferSize = oldTotalCapacity + policyMemorySize;
                 if (channelData != null)
@@ -113,11 +191,33 @@ namespace Unity.AI.MLAgents
                 {
                     m_ShareMemoryBody.RlData = rlData;
                 }
+                m_ShareMemoryBody.KeepSectionCounters(previousBody);
+                m_ShareMemoryBody.WritePolicySpecs(policyName, policy, maxAgents);
+            }
+            if (m_RLDataBanks > 1)
+            {
+                m_RLDataBank = (m_RLDataBank + 1) % m_RLDataBanks;
+                m_ShareMemoryBody.ClearBank(m_RLDataBank);
+            }
+            m_StepCount++;
+            m_ShareMemoryBody.WritePolicy(policyName, policy, m_RLDataBank, m_StepCount);
+            m_SharedMemoryHeader.RLDataBank = m_RLDataBank;
+        }
 
-
-                m_ShareMemoryBody.WritePolicySpecs(policyName, policy);
-                m_ShareMemoryBody.WritePolicy(policyName, policy);
+        /// <summary>
+        /// The number of Agents the section of a policy has room for: the maximum
+        /// number of Agents of the policy, or the capacity Python hinted for the
+        /// behavior if it is larger and the observations match.
+        /// </summary>
+        private int PolicyCapacity(string policyName, Policy policy)
+        {
+            int maxAgents = policy.DecisionAgentIds.Length;
+            CapacityHint hint;
+            if (m_CapacityHints.TryGetValue(policyName, out hint) && hint.Matches(policy))
+            {
+                maxAgents = Math.Max(maxAgents, hint.MaxAgents);
             }
+            return maxAgents;
         }
 
         /// <summary>
@@ -132,6 +232,10 @@ namespace Unity.AI.MLAgents
 #endif
             while (m_SharedMemoryHeader.Active && m_SharedMemoryHeader.Blocked)
             {
+                if (m_WakeChannel != null && m_WakeChannel.Connected)
+                {
+                    m_WakeChannel.Wait();
+                }
 #if UNITY_EDITOR
                 if (iteration % checkTimeoutIteration == 0)
                 {
@@ -150,11 +254,19 @@ namespace Unity.AI.MLAgents
             {
                 Debug.LogError("Communication was closed.");
                 Active = false;
+                m_WakeChannel?.Dispose();
+                m_SideChannel?.Close();
                 m_SharedMemoryHeader.Delete();
                 m_ShareMemoryBody.Delete();
                 QuitUnity();
                 return;
             }
+            if (m_SideChannel != null && m_SideChannelGeneration != m_SharedMemoryHeader.SideChannelGeneration)
+            {
+                // Python grew the side channel file
+                m_SideChannelGeneration = m_SharedMemoryHeader.SideChannelGeneration;
+                m_SideChannel.Remap();
+            }
             while (m_CurrentFileNumber < m_SharedMemoryHeader.FileNumber)
             {
                 var tmpData = m_ShareMemoryBody;
@@ -164,7 +276,9 @@ namespace Unity.AI.MLAgents
                     false,
                     tmpData,
                     m_SharedMemoryHeader.SideChannelBufferSize,
-                    m_SharedMemoryHeader.RLDataBufferSize);
+                    m_SharedMemoryHeader.RLDataBufferSize,
+                    m_RLDataBanks,
+                    m_Features);
                 tmpData.Delete();
             }
         }
@@ -183,6 +297,7 @@ namespace Unity.AI.MLAgents
         {
             m_SharedMemoryHeader.MarkUnityBlocked();
             m_SharedMemoryHeader.UnblockPython();
+            m_WakeChannel?.Notify();
         }
 
         /// <summary>
@@ -190,13 +305,61 @@ namespace Unity.AI.MLAgents
         /// </summary>
         public void LoadPolicy(string policyName, Policy policy)
         {
-            m_ShareMemoryBody.ReadPolicy(policyName, policy);
+            // With several banks, the next bank is cleared before it is written
+            m_ShareMemoryBody.ReadPolicy(policyName, policy, m_RLDataBank, m_RLDataBanks == 1);
+            if ((m_Features & HeaderFeatures.ActionRepeat) != 0)
+            {
+                int ticks = m_SharedMemoryHeader.ActionRepeat;
+                ActionRepeat actionRepeat;
+                if (!m_ActionRepeats.TryGetValue(policyName, out actionRepeat))
+                {
+                    if (ticks == 1)
+                    {
+                        return;
+                    }
+                    actionRepeat = new ActionRepeat(policy);
+                    m_ActionRepeats[policyName] = actionRepeat;
+                }
+                actionRepeat.Start(policy, ticks);
+            }
+        }
+
+        /// <summary>
+        /// If Python asked to simulate more ticks with the actions of the last step of
+        /// the policy, gives these actions to the Agents that requested a decision and
+        /// keeps the data of the tick for the end of the step, see <see cref="ActionRepeat"/>.
+        /// Returns false if the data of the policy must be sent to Python.
+        /// </summary>
+        public bool RepeatActions(string policyName, Policy policy)
+        {
+            ActionRepeat actionRepeat;
+            return m_ActionRepeats.TryGetValue(policyName, out actionRepeat) && actionRepeat.TryRepeat(policy);
+        }
+
+        /// <summary>
+        /// Ends the steps of all the policies without sending their data to Python.
+        /// </summary>
+        public void ResetActionRepeats()
+        {
+            foreach (var actionRepeat in m_ActionRepeats.Values)
+            {
+                actionRepeat.Reset();
+            }
         }
 
         public void Dispose()
         {
+            foreach (var actionRepeat in m_ActionRepeats.Values)
+            {
+                actionRepeat.Dispose();
+            }
+            m_ActionRepeats.Clear();
             Active = false;
             m_SharedMemoryHeader.Close();
+            // Wake Python up so it notices the communication was closed
+            m_WakeChannel?.Notify();
+            m_WakeChannel?.Dispose();
+            m_SideChannel?.Close();
             m_ShareMemoryBody.Delete();
         }
 
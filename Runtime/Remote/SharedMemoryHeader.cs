@@ -1,5 +1,34 @@
+using System;
+using System.Collections.Generic;
+using Unity.Mathematics;
+
 namespace Unity.AI.MLAgents
 {
+    /// <summary>
+    /// Optional protocol features. Python requests them in the header and Unity
+    /// acknowledges the ones it supports, the others are ignored.
+    /// Must match HeaderFeatures in shared_memory_header.py.
+    /// </summary>
+    [Flags]
+    internal enum HeaderFeatures : int
+    {
+        None = 0,
+        // Python and Unity wake each other through named pipes next to the header
+        WakeFifo = 1,
+        // The RL data section is repeated in several banks that Unity fills in turn
+        RLDataBanks = 2,
+        // The side channel data lives in its own file that grows in place
+        SideChannelFile = 4,
+        // The header is followed by capacity hints for the behaviors
+        CapacityHints = 8,
+        // The observation specs contain the ObservationDtype of their values
+        ObservationDtypes = 16,
+        // The RL data sections contain change counters of their observations and masks
+        SectionCounters = 32,
+        // Unity simulates the number of ticks written in the header for each step
+        ActionRepeat = 64,
+    }
+
     /// <summary>
     /// Always created by Python
     /// </summary>
@@ -8,6 +37,8 @@ namespace Unity.AI.MLAgents
         private const int k_MajorVersion = 0;
         private const int k_MinorVersion = 3;
         private const int k_BugVersion = 2;
+        // The size of the header, followed by the capacity hints
+        private const int k_Size = 56;
 
         public SharedMemoryHeader(string fileName) : base(fileName, false) {}
 
@@ -87,6 +118,83 @@ namespace Unity.AI.MLAgents
             set { SetInt(24, value); }
         }
 
+        /// <summary>
+        /// The number of ticks Python asked to simulate with the actions of the last
+        /// step, only meaningful if <see cref="HeaderFeatures.ActionRepeat"/> was accepted.
+        /// </summary>
+        public int ActionRepeat
+        {
+            get { return math.max((int)GetUShort(30), 1); }
+        }
+
+        /// <summary>
+        /// The features Python requested.
+        /// </summary>
+        public HeaderFeatures RequestedFeatures
+        {
+            get { return (HeaderFeatures)GetInt(32); }
+        }
+
+        /// <summary>
+        /// The features Unity acknowledged, must be written before Unity gives
+        /// control to Python for the first time.
+        /// </summary>
+        public HeaderFeatures AcceptedFeatures
+        {
+            get { return (HeaderFeatures)GetInt(36); }
+            set { SetInt(36, (int)value); }
+        }
+
+        /// <summary>
+        /// The number of RL data banks Python requested, only meaningful if
+        /// <see cref="HeaderFeatures.RLDataBanks"/> was accepted.
+        /// </summary>
+        public int RLDataBanks
+        {
+            get { return math.max(GetInt(40), 1); }
+        }
+
+        /// <summary>
+        /// The index of the RL data bank holding the data of the last step.
+        /// </summary>
+        public int RLDataBank
+        {
+            get { return GetInt(44); }
+            set { SetInt(44, value); }
+        }
+
+        /// <summary>
+        /// Incremented by Python or Unity every time they grow the side channel file
+        /// so the other side maps it again, see <see cref="HeaderFeatures.SideChannelFile"/>.
+        /// </summary>
+        public int SideChannelGeneration
+        {
+            get { return GetInt(48); }
+            set { SetInt(48, value); }
+        }
+
+        /// <summary>
+        /// The number of bytes of the capacity hints after the header.
+        /// </summary>
+        public int CapacityHintsSize
+        {
+            get { return GetInt(52); }
+        }
+
+        /// <summary>
+        /// Reads the capacity hints Python wrote after the header, indexed by
+        /// behavior name. Only meaningful if <see cref="HeaderFeatures.CapacityHints"/>
+        /// was requested.
+        /// </summary>
+        public Dictionary<string, CapacityHint> ReadCapacityHints()
+        {
+            if (CapacityHintsSize <= 0)
+            {
+                return new Dictionary<string, CapacityHint>();
+            }
+            return CapacityHint.Read(this, k_Size);
+        }
+
         public bool CheckVersion()
         {
             int major = GetInt(0);
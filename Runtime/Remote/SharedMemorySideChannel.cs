@@ -0,0 +1,42 @@
+namespace Unity.AI.MLAgents
+{
+    /// <summary>
+    /// Holds the side channel data when <see cref="HeaderFeatures.SideChannelFile"/> is
+    /// in use. Since the side channel has its own file, it grows in place without
+    /// copying the RL data. Always created by Python.
+    /// File organization:
+    ///  - int : size of the side channel data in bytes
+    ///  - the side channel data
+    /// Must match SharedMemorySideChannel in shared_memory_side_channel.py.
+    /// </summary>
+    internal class SharedMemorySideChannel : BaseSharedMemory
+    {
+        private const string k_Suffix = ".side_channel";
+
+        /// <param name="fileName"> The name of the header file, the suffix is added</param>
+        public SharedMemorySideChannel(string fileName) : base(fileName + k_Suffix, false) {}
+
+        public byte[] Data
+        {
+            get
+            {
+                if (!CanEdit)
+                {
+                    return null;
+                }
+                int length = GetInt(0);
+                if (length == 0)
+                {
+                    return null;
+                }
+                return GetBytes(4, length);
+            }
+            set
+            {
+                int length = value.Length;
+                SetInt(0, length);
+                SetBytes(4, value);
+            }
+        }
+    }
+}
@@ -0,0 +1,174 @@
+using System;
+using System.Runtime.InteropServices;
+
+namespace Unity.AI.MLAgents
+{
+    /// <summary>
+    /// The Unity end of the pair of named pipes next to the shared memory header that
+    /// Python and Unity use to wake each other up (<see cref="HeaderFeatures.WakeFifo"/>).
+    /// The header flags remain the source of truth, the pipes only carry a one byte
+    /// notification so the waiting side can block in the kernel instead of polling the
+    /// header. Python creates the pipes, Unity only opens them.
+    /// Must match FifoWakeChannel in wake_channel.py.
+    /// </summary>
+    internal class WakeChannel : IDisposable
+    {
+        private const string k_ToUnitySuffix = ".wake_unity";
+        private const string k_ToPythonSuffix = ".wake_python";
+        // Upper bound on a single blocking wait, the caller checks the header between two waits
+        private const int k_MaxBlockMilliseconds = 1000;
+
+        private const int k_ReadOnly = 0;
+        private const int k_WriteOnly = 1;
+        private const int k_LinuxNonBlock = 0x800;
+        private const int k_MacNonBlock = 0x4;
+        private const short k_PollIn = 0x1;
+        private const int k_BrokenPipe = 32;
+
+        [StructLayout(LayoutKind.Sequential)]
+        private struct PollFd
+        {
+            public int fd;
+            public short events;
+            public short revents;
+        }
+
+        [DllImport("libc", EntryPoint = "open", SetLastError = true)]
+        private static extern int Open(string path, int flags);
+
+        [DllImport("libc", EntryPoint = "close")]
+        private static extern int Close(int fd);
+
+        [DllImport("libc", EntryPoint = "read", SetLastError = true)]
+        private static extern unsafe IntPtr Read(int fd, byte* buffer, UIntPtr count);
+
+        [DllImport("libc", EntryPoint = "write", SetLastError = true)]
+        private static extern unsafe IntPtr Write(int fd, byte* buffer, UIntPtr count);
+
+        [DllImport("libc", EntryPoint = "poll", SetLastError = true)]
+        private static extern int Poll(ref PollFd fds, uint count, int timeout);
+
+        // The pipe on which Python notifies Unity, -1 once Python disconnected
+        private int m_ListenFd = -1;
+        // The pipe on which Unity notifies Python, -1 once Python disconnected
+        private int m_NotifyFd = -1;
+
+        private WakeChannel() {}
+
+        /// <summary>
+        /// True if named pipes are available on this platform.
+        /// </summary>
+        public static bool IsSupported
+        {
+            get
+            {
+                return RuntimeInformation.IsOSPlatform(OSPlatform.Linux)
+                    || RuntimeInformation.IsOSPlatform(OSPlatform.OSX);
+            }
+        }
+
+        /// <summary>
+        /// Opens both ends of the channel Python created next to the header. Returns
+        /// null if the pipes cannot be opened, the communication then polls the header.
+        /// </summary>
+        /// <param name="headerPath"> The path of the shared memory header file</param>
+        public static WakeChannel TryOpen(string headerPath)
+        {
+            if (!IsSupported)
+            {
+                return null;
+            }
+            int nonBlock = RuntimeInformation.IsOSPlatform(OSPlatform.OSX) ? k_MacNonBlock : k_LinuxNonBlock;
+            var channel = new WakeChannel();
+            try
+            {
+                channel.m_ListenFd = Open(headerPath + k_ToUnitySuffix, k_ReadOnly | nonBlock);
+                // Python opened the receiving end of its pipe before starting Unity
+                channel.m_NotifyFd = Open(headerPath + k_ToPythonSuffix, k_WriteOnly | nonBlock);
+            }
+            catch (Exception e) when (e is DllNotFoundException || e is EntryPointNotFoundException)
+            {
+            }
+            if (channel.m_ListenFd < 0 || channel.m_NotifyFd < 0)
+            {
+                channel.Dispose();
+                return null;
+            }
+            return channel;
+        }
+
+        /// <summary>
+        /// True until Python closes its end of the channel.
+        /// </summary>
+        public bool Connected
+        {
+            get { return m_ListenFd >= 0; }
+        }
+
+        /// <summary>
+        /// Wakes Python up. Does nothing if Python disconnected or if it already has
+        /// pending notifications.
+        /// </summary>
+        public unsafe void Notify()
+        {
+            if (m_NotifyFd < 0)
+            {
+                return;
+            }
+            byte notification = 1;
+            if ((long)Write(m_NotifyFd, &notification, (UIntPtr)1) < 0
+                && Marshal.GetLastWin32Error() == k_BrokenPipe)
+            {
+                CloseNotify();
+            }
+        }
+
+        /// <summary>
+        /// Blocks until Python sent a notification or for at most one second.
+        /// </summary>
+        public void Wait()
+        {
+            if (m_ListenFd < 0)
+            {
+                return;
+            }
+            var fds = new PollFd { fd = m_ListenFd, events = k_PollIn };
+            if (Poll(ref fds, 1, k_MaxBlockMilliseconds) > 0)
+            {
+                Drain();
+            }
+        }
+
+        /// <summary>
+        /// Reads the pending notifications without blocking and closes the channel
+        /// if Python closed its sending end.
+        /// </summary>
+        private unsafe void Drain()
+        {
+            byte* buffer = stackalloc byte[4096];
+            if ((long)Read(m_ListenFd, buffer, (UIntPtr)4096) == 0)
+            {
+                Dispose();
+            }
+        }
+
+        private void CloseNotify()
+        {
+            if (m_NotifyFd >= 0)
+            {
+                Close(m_NotifyFd);
+                m_NotifyFd = -1;
+            }
+        }
+
+        public void Dispose()
+        {
+            CloseNotify();
+            if (m_ListenFd >= 0)
+            {
+                Close(m_ListenFd);
+                m_ListenFd = -1;
+            }
+        }
+    }
+}
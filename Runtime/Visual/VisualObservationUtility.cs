@@ -25,6 +25,47 @@ namespace Unity.AI.MLAgents
             return new NativeArray<float>(0, allocator, NativeArrayOptions.ClearMemory);
         }
 
+        /// <summary>
+        /// Generates a NativeArray of bytes corresponding to the camera's visual input, to be
+        /// used with an observation of type <see cref="ObservationDtype.Uint8"/>.
+        /// The Array will be of total size ( height x width x 3 )
+        /// Each pixel will correspond to three consecutive bytes in the order [red, green, blue]
+        /// </summary>
+        /// <param name="camera"> The camera used to collect the visual data</param>
+        /// <param name="width"> The width of the generated image </param>
+        /// <param name="height"> The height of the generated image </param>
+        /// <param name="allocator"> the Allocator for the Native array </param>
+        /// <returns> A native array of bytes containing the image data from the camera </returns>
+        public static NativeArray<byte> GetVisObsBytes(Camera camera, int width, int height, Allocator allocator = Allocator.Temp)
+        {
+            if (camera != null)
+            {
+                var texture = ObservationToTexture(camera, width, height);
+                return TextureToNativeByteArray(texture, allocator);
+            }
+            return new NativeArray<byte>(0, allocator, NativeArrayOptions.ClearMemory);
+        }
+
+        private static NativeArray<byte> TextureToNativeByteArray(Texture2D texture, Allocator allocator)
+        {
+            var width = texture.width;
+            var height = texture.height;
+            var arr = new NativeArray<byte>(width * height * 3, allocator, NativeArrayOptions.UninitializedMemory);
+
+            var texturePixels = texture.GetPixels32();
+            for (var h = height - 1; h >= 0; h--)
+            {
+                for (var w = 0; w < width; w++)
+                {
+                    var currentPixel = texturePixels[(height - h - 1) * width + w];
+                    arr[h * width * 3 + w * 3 + 0] = currentPixel.r;
+                    arr[h * width * 3 + w * 3 + 1] = currentPixel.g;
+                    arr[h * width * 3 + w * 3 + 2] = currentPixel.b;
+                }
+            }
+            return arr;
+        }
+
         private static NativeArray<float> TextureToNativeArray(Texture2D texture, Allocator allocator)
         {
             var width = texture.width;
@@ -91,5 +91,14 @@ namespace Unity.AI.MLAgents.Tests.Editor
             Assert.AreEqual(new int3(4, 1, 0).GetDimensions(), 2);
             Assert.AreEqual(new int3(4, 2, 0).GetDimensions(), 2);
         }
+
+        [Test]
+        public void TestGetChannels()
+        {
+            Assert.AreEqual(new int3(0, 0, 0).GetChannels(), 1);
+            Assert.AreEqual(new int3(3, 0, 0).GetChannels(), 3);
+            Assert.AreEqual(new int3(4, 2, 0).GetChannels(), 2);
+            Assert.AreEqual(new int3(84, 84, 3).GetChannels(), 3);
+        }
     }
 }
@@ -3,6 +3,7 @@ using UnityEngine;
 using System.IO;
 using Unity.AI.MLAgents;
 using Unity.Collections;
+using Unity.Entities;
 using Unity.Mathematics;
 
 namespace Unity.AI.MLAgents.Tests.Editor
@@ -52,5 +53,374 @@ namespace Unity.AI.MLAgents.Tests.Editor
             sm1.Delete();
             Assert.False(File.Exists(filePath));
         }
+
+        [Test]
+        public void TestSharedMemoryBodyBanks()
+        {
+            var directoryPath = Path.Combine(Path.GetTempPath(), "ml-agents");
+            File.Delete(Path.Combine(directoryPath, "test_banks"));
+            File.Delete(Path.Combine(directoryPath, "test_banks_"));
+
+            var policy = new Policy(3, new[] { new int3(2, 0, 0) }, 1);
+            int rlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, HeaderFeatures.None).EndOfDataOffset;
+            var body = new SharedMemoryBody("test_banks", true, null, 4, rlDataSize, 2);
+            body.WritePolicySpecs("foo", policy);
+            policy.RequestDecision(new Entity { Index = 7 }).SetReward(1f);
+            body.WritePolicy("foo", policy, 1);
+
+            // The specs are in both banks, the data only in the bank it was written to
+            var bank0 = RLDataOffsets.FromPolicy(policy, "foo", 4, HeaderFeatures.None);
+            var bank1 = bank0.Shifted(rlDataSize);
+            Assert.AreEqual("foo", body.GetString(4 + rlDataSize));
+            Assert.AreEqual(0, body.GetInt(bank0.DecisionNumberAgentsOffset));
+            Assert.AreEqual(1, body.GetInt(bank1.DecisionNumberAgentsOffset));
+            Assert.AreEqual(7, body.GetInt(bank1.DecisionAgentIdOffset));
+            var reader = new SharedMemoryBody("test_banks", false, null, 4, rlDataSize, 2);
+            Assert.True(reader.ContainsPolicy("foo"));
+            reader.Close();
+
+            body.SetFloat(bank1.ContinuousActionOffset, 0.5f);
+            body.ReadPolicy("foo", policy, 1, false);
+            Assert.AreEqual(0.5f, policy.ContinuousActuators[0]);
+            Assert.AreEqual(1, body.GetInt(bank1.DecisionNumberAgentsOffset));
+            body.ClearBank(1);
+            Assert.AreEqual(0, body.GetInt(bank1.DecisionNumberAgentsOffset));
+
+            // Each bank is copied at the start of the bank of a larger file
+            body.WritePolicy("foo", policy, 1);
+            var grown = new SharedMemoryBody("test_banks_", true, null, 4, rlDataSize + 8, 2);
+            grown.RlData = body.RlData;
+            Assert.True(grown.ContainsPolicy("foo"));
+            Assert.AreEqual("foo", grown.GetString(4 + rlDataSize + 8));
+            Assert.AreEqual(7, grown.GetInt(bank0.Shifted(rlDataSize + 8).DecisionAgentIdOffset));
+
+            body.Delete();
+            grown.Delete();
+            policy.Dispose();
+        }
+
+        [Test]
+        public void TestSharedMemoryBodyObservationDtypes()
+        {
+            var directoryPath = Path.Combine(Path.GetTempPath(), "ml-agents");
+            File.Delete(Path.Combine(directoryPath, "test_dtypes"));
+            File.Delete(Path.Combine(directoryPath, "test_dtypes_"));
+
+            var policy = new Policy(
+                3,
+                new[] { new int3(2, 0, 0), new int3(2, 2, 1) },
+                1,
+                null,
+                new[] { ObservationDtype.Float32, ObservationDtype.Uint8 });
+            var values = new NativeArray<float>(new[] { 0f, 2f }, Allocator.Temp);
+            var pixels = new NativeArray<byte>(new byte[] { 0, 51, 102, 255 }, Allocator.Temp);
+            for (int i = 0; i < 2; i++)
+            {
+                values[0] = i;
+                policy.RequestDecision(new Entity { Index = i })
+                    .SetObservationFromSlice(0, values)
+                    .SetObservationFromSlice(1, pixels);
+            }
+
+            // The dtypes follow the observation specs and the bytes are sent as they are
+            var features = HeaderFeatures.ObservationDtypes;
+            int rlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, features).EndOfDataOffset;
+            var body = new SharedMemoryBody("test_dtypes", true, null, 4, rlDataSize, 1, features);
+            body.WritePolicySpecs("foo", policy);
+            body.WritePolicy("foo", policy);
+            int obsSpecOffset = 4 + 4 + 4 + 4; // side channel, name, max agents and number of observations
+            Assert.AreEqual((int)ObservationDtype.Float32, body.GetInt(obsSpecOffset + 28));
+            Assert.AreEqual((int)ObservationDtype.Uint8, body.GetInt(obsSpecOffset + 32 + 28));
+            var offsets = RLDataOffsets.FromPolicy(policy, "foo", 4, features);
+            Assert.AreEqual(offsets.DecisionObsOffset + 4 * 3 * 2 + 3 * 4, offsets.DecisionRewardsOffset);
+            Assert.AreEqual(1f, body.GetFloat(offsets.DecisionObsOffset + 4 * 2));
+            Assert.AreEqual(new byte[] { 0, 51, 102, 255 }, body.GetBytes(offsets.DecisionObsOffset + 4 * 3 * 2 + 4, 4));
+            var reader = new SharedMemoryBody("test_dtypes", false, null, 4, rlDataSize, 1, features);
+            Assert.True(reader.ContainsPolicy("foo"));
+            reader.Close();
+
+            // Without the feature, the bytes are sent as floats in [0, 1]
+            int floatRlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, HeaderFeatures.None).EndOfDataOffset;
+            var floatBody = new SharedMemoryBody("test_dtypes_", true, null, 4, floatRlDataSize, 1);
+            floatBody.WritePolicySpecs("foo", policy);
+            floatBody.WritePolicy("foo", policy);
+            var floatOffsets = RLDataOffsets.FromPolicy(policy, "foo", 4, HeaderFeatures.None);
+            Assert.AreEqual(1f, floatBody.GetFloat(floatOffsets.DecisionObsOffset + 4 * 2));
+            Assert.AreEqual(0.2f, floatBody.GetFloat(floatOffsets.DecisionObsOffset + 4 * 3 * 2 + 4 * 4 + 4));
+
+            body.Delete();
+            floatBody.Delete();
+            values.Dispose();
+            pixels.Dispose();
+            policy.Dispose();
+        }
+
+        [Test]
+        public void TestSharedMemoryBodyConvertedObservations()
+        {
+            var directoryPath = Path.Combine(Path.GetTempPath(), "ml-agents");
+            File.Delete(Path.Combine(directoryPath, "test_converted"));
+            File.Delete(Path.Combine(directoryPath, "test_converted_"));
+
+            var dtypes = new[] { ObservationDtype.Float16, ObservationDtype.Int8, ObservationDtype.Int16 };
+            var shapes = new[] { new int3(3, 0, 0), new int3(2, 0, 0), new int3(2, 2, 0) };
+            // The quantized observations require the parameters of their channels
+            Assert.Throws<MLAgentsException>(() => new Policy(2, shapes, 1, null, dtypes));
+            var policy = new Policy(2, shapes, 1, null, dtypes, new[]
+            {
+                new ObservationQuantization(),
+                new ObservationQuantization(new[] { 0.5f, 0.25f }, new[] { 0f, -1f }),
+                new ObservationQuantization(new[] { 0.1f, 0.2f }, new[] { 0f, 0f }),
+            });
+            var half = new NativeArray<float>(new[] { 0.5f, -2f, 1000f }, Allocator.Temp);
+            var quantized = new NativeArray<float>(new[] { 1.5f, 0f }, Allocator.Temp);
+            var saturated = new NativeArray<float>(new[] { 100f, -100f }, Allocator.Temp);
+            var quantized16 = new NativeArray<float>(new[] { 0.3f, 0.4f, -0.3f, 1f }, Allocator.Temp);
+            policy.RequestDecision(new Entity { Index = 0 })
+                .SetObservationFromSlice(0, half)
+                .SetObservationFromSlice(1, quantized)
+                .SetObservationFromSlice(2, quantized16);
+            policy.RequestDecision(new Entity { Index = 1 })
+                .SetObservationFromSlice(0, half)
+                .SetObservationFromSlice(1, saturated)
+                .SetObservationFromSlice(2, quantized16);
+
+            // The specs are followed by the scales then the offsets of the quantized channels
+            var features = HeaderFeatures.ObservationDtypes;
+            int rlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, features).EndOfDataOffset;
+            var body = new SharedMemoryBody("test_converted", true, null, 4, rlDataSize, 1, features);
+            body.WritePolicySpecs("foo", policy);
+            body.WritePolicy("foo", policy);
+            int quantizationOffset = 4 + 4 + 4 + 4 + 3 * 32; // side channel, name, max agents, number and specs of the observations
+            var parameters = new[] { 0.5f, 0.25f, 0f, -1f, 0.1f, 0.2f, 0f, 0f };
+            for (int i = 0; i < parameters.Length; i++)
+            {
+                Assert.AreEqual(parameters[i], body.GetFloat(quantizationOffset + 4 * i));
+            }
+            var reader = new SharedMemoryBody("test_converted", false, null, 4, rlDataSize, 1, features);
+            Assert.True(reader.ContainsPolicy("foo"));
+            reader.Close();
+            string name;
+            var offsets = RLDataOffsets.FromSharedMemory(body, 4, features, out name);
+            Assert.AreEqual(RLDataOffsets.FromPolicy(policy, "foo", 4, features).EndOfDataOffset, offsets.EndOfDataOffset);
+
+            int obsOffset = offsets.DecisionObsOffset;
+            Assert.AreEqual(offsets.DecisionObsOffset + 2 * (2 * 3 + 1 * 2 + 2 * 4), offsets.DecisionRewardsOffset);
+            Assert.AreEqual(0.5f, math.f16tof32(body.GetUShort(obsOffset)));
+            Assert.AreEqual(-2f, math.f16tof32(body.GetUShort(obsOffset + 2)));
+            Assert.AreEqual(1000f, math.f16tof32(body.GetUShort(obsOffset + 2 * 2)));
+            obsOffset += 2 * 2 * 3;
+            // (value - offset) / scale, clamped to the range of the integers
+            Assert.AreEqual(new byte[] { 3, 4, 127, 128 }, body.GetBytes(obsOffset, 4));
+            obsOffset += 2 * 2;
+            Assert.AreEqual(3, (short)body.GetUShort(obsOffset));
+            Assert.AreEqual(2, (short)body.GetUShort(obsOffset + 2));
+            Assert.AreEqual(-3, (short)body.GetUShort(obsOffset + 2 * 2));
+            Assert.AreEqual(5, (short)body.GetUShort(obsOffset + 2 * 3));
+
+            // Without the feature, the observations are sent as floats
+            int floatRlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, HeaderFeatures.None).EndOfDataOffset;
+            var floatBody = new SharedMemoryBody("test_converted_", true, null, 4, floatRlDataSize, 1);
+            floatBody.WritePolicySpecs("foo", policy);
+            floatBody.WritePolicy("foo", policy);
+            var floatOffsets = RLDataOffsets.FromPolicy(policy, "foo", 4, HeaderFeatures.None);
+            Assert.AreEqual(1000f, floatBody.GetFloat(floatOffsets.DecisionObsOffset + 4 * 2));
+            Assert.AreEqual(1.5f, floatBody.GetFloat(floatOffsets.DecisionObsOffset + 4 * 3 * 2));
+
+            body.Delete();
+            floatBody.Delete();
+            half.Dispose();
+            quantized.Dispose();
+            saturated.Dispose();
+            quantized16.Dispose();
+            policy.Dispose();
+        }
+
+        [Test]
+        public void TestSharedMemoryBodySectionCounters()
+        {
+            var directoryPath = Path.Combine(Path.GetTempPath(), "ml-agents");
+            File.Delete(Path.Combine(directoryPath, "test_counters"));
+
+            var policy = new Policy(3, new[] { new int3(2, 0, 0), new int3(1, 0, 0) }, 0, new[] { 2 });
+            var features = HeaderFeatures.SectionCounters;
+            int rlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, features).EndOfDataOffset;
+            var body = new SharedMemoryBody("test_counters", true, null, 4, rlDataSize, 2, features);
+            body.WritePolicySpecs("foo", policy);
+            var bank0 = RLDataOffsets.FromPolicy(policy, "foo", 4, features);
+            var bank1 = bank0.Shifted(rlDataSize);
+            var reader = new SharedMemoryBody("test_counters", false, null, 4, rlDataSize, 2, features);
+            Assert.True(reader.ContainsPolicy("foo"));
+            reader.Close();
+
+            int[] WriteStep(int step, int bank, int nAgents, float firstObs)
+            {
+                policy.ResetDecisionsAndTerminationCounters();
+                for (int i = 0; i < nAgents; i++)
+                {
+                    policy.RequestDecision(new Entity { Index = i })
+                        .SetObservation(0, new float2(firstObs, i))
+                        .SetObservation(1, 1f)
+                        .SetDiscreteActionMask(0, 1);
+                }
+                body.WritePolicy("foo", policy, bank, step);
+                var offsets = bank == 0 ? bank0 : bank1;
+                return new[]
+                {
+                    body.GetInt(offsets.SectionCountersOffset),
+                    body.GetInt(offsets.SectionCountersOffset + 4),
+                    body.GetInt(offsets.SectionCountersOffset + 8)
+                };
+            }
+
+            Assert.AreEqual(new[] { 1, 1, 1 }, WriteStep(1, 0, 2, 0f));
+            // Unchanged data keeps its counter and is still copied to the new bank
+            Assert.AreEqual(new[] { 1, 1, 1 }, WriteStep(2, 1, 2, 0f));
+            Assert.AreEqual(1f, body.GetFloat(bank1.DecisionObsOffset + 4 * 3));
+            Assert.AreEqual(new[] { 3, 1, 1 }, WriteStep(3, 0, 2, 5f));
+            Assert.AreEqual(5f, body.GetFloat(bank0.DecisionObsOffset));
+            // All the data changes with the number of Agents
+            Assert.AreEqual(new[] { 4, 4, 4 }, WriteStep(4, 1, 1, 5f));
+
+            body.Delete();
+            policy.Dispose();
+        }
+
+        [Test]
+        public void TestActionRepeat()
+        {
+            var policy = new Policy(3, new[] { new int3(1, 0, 0) }, 1);
+            var actionRepeat = new ActionRepeat(policy);
+
+            void Tick(int nAgents, float reward, int terminatedAgents)
+            {
+                policy.ResetDecisionsAndTerminationCounters();
+                for (int i = 0; i < terminatedAgents; i++)
+                {
+                    policy.EndEpisode(new Entity { Index = i }).SetReward(1f).SetObservation(0, -1f);
+                }
+                for (int i = 0; i < nAgents; i++)
+                {
+                    policy.RequestDecision(new Entity { Index = i }).SetReward(reward).SetObservation(0, (float)i);
+                }
+            }
+
+            // Python decided the actions of the step for the two Agents
+            Tick(2, 0f, 0);
+            policy.ContinuousActuators[0] = 4f;
+            policy.ContinuousActuators[1] = 5f;
+            actionRepeat.Start(policy, 3);
+
+            // The Agents receive the same actions during the repeated ticks
+            Tick(2, 0.1f, 0);
+            policy.ContinuousActuators[0] = 0f;
+            Assert.True(actionRepeat.TryRepeat(policy));
+            Assert.AreEqual(4f, policy.ContinuousActuators[0]);
+            Assert.AreEqual(5f, policy.ContinuousActuators[1]);
+            Tick(2, 0.1f, 1);
+            Assert.True(actionRepeat.TryRepeat(policy));
+            Tick(2, 0.1f, 0);
+            Assert.False(actionRepeat.TryRepeat(policy));
+
+            // The rewards are summed and the terminations of all the ticks are reported
+            actionRepeat.Flush(policy);
+            Assert.AreEqual(1, policy.TerminationCounter.Count);
+            Assert.AreEqual(1.1f, policy.TerminationRewards[0], 1e-6f);
+            Assert.AreEqual(-1f, policy.TerminationObs[0]);
+            Assert.AreEqual(2, policy.DecisionCounter.Count);
+            Assert.AreEqual(0.2f, policy.DecisionRewards[0], 1e-6f);
+            Assert.AreEqual(0.3f, policy.DecisionRewards[1], 1e-6f);
+
+            // An Agent without actions ends the step
+            actionRepeat.Start(policy, 3);
+            Tick(3, 0.1f, 0);
+            Assert.False(actionRepeat.TryRepeat(policy));
+
+            actionRepeat.Dispose();
+            policy.Dispose();
+        }
+
+        [Test]
+        public void TestWakeChannelWithoutPipes()
+        {
+            // Without the named pipes of Python, Unity polls the header
+            var headerPath = Path.Combine(Path.GetTempPath(), "ml-agents", "test_no_wake");
+            Assert.IsNull(WakeChannel.TryOpen(headerPath));
+        }
+
+        [Test]
+        public void TestSharedMemorySideChannel()
+        {
+            var directoryPath = Path.Combine(Path.GetTempPath(), "ml-agents");
+            File.Delete(Path.Combine(directoryPath, "test_side_channel.side_channel"));
+            // Python creates the file
+            new BaseSharedMemory("test_side_channel.side_channel", true, 8).Close();
+            var unity = new SharedMemorySideChannel("test_side_channel");
+            var python = new SharedMemorySideChannel("test_side_channel");
+            Assert.IsNull(unity.Data);
+
+            // The file grows in place and the other side maps it again
+            var data = new byte[] { 1, 2, 3, 4, 5, 6 };
+            unity.Resize(ArrayUtils.IncreaseArraySizeHeuristic(data.Length));
+            unity.Data = data;
+            Assert.AreEqual(32, unity.Length);
+            python.Remap();
+            Assert.AreEqual(32, python.Length);
+            Assert.AreEqual(data, python.Data);
+
+            python.Close();
+            unity.Delete();
+        }
+        [Test]
+        public void TestCapacityHints()
+        {
+            var directoryPath = Path.Combine(Path.GetTempPath(), "ml-agents");
+            File.Delete(Path.Combine(directoryPath, "test_hints"));
+            File.Delete(Path.Combine(directoryPath, "test_hints_body"));
+            // Python writes the hints after the header
+            var python = new BaseSharedMemory("test_hints", true, 56 + 40);
+            python.SetInt(52, 40);
+            int offset = python.SetInt(56, 2);
+            offset = python.SetString(offset, "foo");
+            offset = python.SetInt(offset, 10);
+            offset = python.SetInt(offset, 0);
+            offset = python.SetString(offset, "bar");
+            offset = python.SetInt(offset, 20);
+            offset = python.SetInt(offset, 1);
+            offset = python.SetInt(offset, 4);
+            offset = python.SetInt(offset, 0);
+            python.SetInt(offset, 0);
+            python.Close();
+
+            var header = new SharedMemoryHeader("test_hints");
+            var hints = header.ReadCapacityHints();
+            header.Delete();
+            Assert.AreEqual(2, hints.Count);
+            Assert.AreEqual(10, hints["foo"].MaxAgents);
+            Assert.IsNull(hints["foo"].ObservationShapes);
+            Assert.AreEqual(20, hints["bar"].MaxAgents);
+
+            // The hint is ignored if the observations do not match
+            var policy = new Policy(3, new[] { new int3(2, 0, 0) }, 1);
+            Assert.True(hints["foo"].Matches(policy));
+            Assert.False(hints["bar"].Matches(policy));
+
+            // The section of the policy has room for the hinted number of Agents
+            int rlDataSize = RLDataOffsets.FromPolicy(policy, "foo", 0, HeaderFeatures.None, 10).EndOfDataOffset;
+            Assert.Greater(rlDataSize, RLDataOffsets.FromPolicy(policy, "foo", 0, HeaderFeatures.None).EndOfDataOffset);
+            var body = new SharedMemoryBody("test_hints_body", true, null, 4, rlDataSize);
+            body.WritePolicySpecs("foo", policy, 10);
+            policy.RequestDecision(new Entity { Index = 7 }).SetReward(1f);
+            body.WritePolicy("foo", policy);
+            string name;
+            var offsets = RLDataOffsets.FromSharedMemory(body, 4, HeaderFeatures.None, out name);
+            Assert.AreEqual(10, offsets.MaxAgents);
+            Assert.AreEqual(rlDataSize + 4, offsets.EndOfDataOffset);
+            Assert.AreEqual(1, body.GetInt(offsets.DecisionNumberAgentsOffset));
+            Assert.AreEqual(7, body.GetInt(offsets.DecisionAgentIdOffset));
+
+            body.Delete();
+            policy.Dispose();
+        }
     }
 }
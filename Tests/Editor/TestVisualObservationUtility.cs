@@ -20,5 +20,26 @@ namespace Unity.AI.MLAgents.Tests.Editor
             Assert.AreEqual(array.Length, width * height * 3);
             array.Dispose();
         }
+
+        [Test]
+        public void TestGetVisObsBytes()
+        {
+            int width = 80;
+            int height = 30;
+
+            var agentGo1 = new GameObject("TestAgent");
+            var cam = agentGo1.AddComponent<Camera>();
+
+            var array = VisualObservationUtility.GetVisObsBytes(cam, width, height, Allocator.Persistent);
+            var floatArray = VisualObservationUtility.GetVisObs(cam, width, height, Allocator.Persistent);
+
+            Assert.AreEqual(array.Length, width * height * 3);
+            for (int i = 0; i < array.Length; i++)
+            {
+                Assert.AreEqual(floatArray[i], array[i] / 255.0f);
+            }
+            array.Dispose();
+            floatArray.Dispose();
+        }
     }
 }
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Optional, Tuple
+
+from mlagents_envs.base_env import (
+    DecisionSteps,
+    TerminalSteps,
+    BehaviorName,
+    BehaviorMapping,
+    ActionTuple,
+)
+
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+class AsyncUnityEnvironment:
+    """
+    Wraps a UnityEnvironment so that waiting for Unity does not block the asyncio
+    event loop. Several environments can then be stepped concurrently with policy
+    inference and learning running on the same loop. If the task awaiting a step
+    is cancelled, the step is completed synchronously before the cancellation
+    propagates so the environment can still be stepped.
+    """
+
+    def __init__(
+        self,
+        env: UnityEnvironment,
+        timeout_wait: float = 60,
+        poll_interval: float = 100e-6,
+    ):
+        """
+        :param env: The UnityEnvironment to wrap
+        :float timeout_wait: Number of seconds to wait for Unity before timing out
+        :float poll_interval: Seconds between two checks of the shared memory when
+        the wake channel is not in use
+        """
+        self._env = env
+        self._timeout_wait = timeout_wait
+        self._poll_interval = poll_interval
+
+    @property
+    def env(self) -> UnityEnvironment:
+        return self._env
+
+    @property
+    def behavior_specs(self) -> BehaviorMapping:
+        return self._env.behavior_specs
+
+    async def step(self, repeat: Optional[int] = None) -> None:
+        """
+        Steps the environment without blocking the event loop.
+        :int repeat: The number of ticks Unity simulates with the current actions,
+        see UnityEnvironment.step
+        """
+        self._env.step_async(repeat=repeat)
+        await self._wait()
+
+    async def reset(self) -> None:
+        self._env.step_async(reset=True)
+        await self._wait()
+
+    async def _wait(self) -> None:
+        channel = self._env.wake_channel
+        loop = asyncio.get_running_loop()
+        try:
+            if channel is not None and channel.fileno() is not None:
+                await self._wait_for_wake_channel(loop, channel)
+            else:
+                await self._poll()
+        except asyncio.CancelledError:
+            # Unity simulates the step anyway, complete it so the next step does
+            # not fail
+            self._env.step_wait()
+            raise
+        self._env.step_wait()
+
+    async def _wait_for_wake_channel(self, loop, channel) -> None:
+        fd = channel.fileno()
+        ready = loop.create_future()
+
+        def on_notification():
+            connected = channel.drain()
+            if (not connected or self._env.step_ready()) and not ready.done():
+                ready.set_result(None)
+
+        loop.add_reader(fd, on_notification)
+        try:
+            if not self._env.step_ready():
+                await asyncio.wait_for(ready, self._timeout_wait)
+        except asyncio.TimeoutError:
+            self._env.close()
+            raise TimeoutError("The Unity Environment took too long to respond")
+        finally:
+            loop.remove_reader(fd)
+
+    async def _poll(self) -> None:
+        t0 = time.perf_counter()
+        while not self._env.step_ready():
+            if time.perf_counter() - t0 > self._timeout_wait:
+                self._env.close()
+                raise TimeoutError("The Unity Environment took too long to respond")
+            await asyncio.sleep(self._poll_interval)
+
+    def set_actions(self, behavior_name: BehaviorName, action: ActionTuple) -> None:
+        self._env.set_actions(behavior_name, action)
+
+    def get_steps(
+        self, behavior_name: BehaviorName
+    ) -> Tuple[DecisionSteps, TerminalSteps]:
+        return self._env.get_steps(behavior_name)
+
+    def close(self) -> None:
+        self._env.close()
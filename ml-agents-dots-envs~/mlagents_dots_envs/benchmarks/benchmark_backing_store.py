@@ -0,0 +1,120 @@
+"""
+Reports the time and the page faults needed to create, map and fill large shared
+memory files (such as visual observation buffers) with each backing store and
+MemoryHints.
+
+python mlagents_dots_envs/benchmarks/benchmark_backing_store.py --size-mb 256
+"""
+import argparse
+import os
+import resource
+import time
+from typing import Callable, NamedTuple, Tuple
+
+import numpy as np
+
+from mlagents_dots_envs.shared_memory.backing_store import (
+    BackingStore,
+    MemoryHints,
+    TMPFS_DIRECTORY,
+    create_file,
+    map_file,
+    tmpfs_available,
+)
+
+
+class PhaseStats(NamedTuple):
+    seconds: float
+    minor_faults: int
+    major_faults: int
+
+
+def measure(function: Callable[[], None]) -> PhaseStats:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    t0 = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - t0
+    new_usage = resource.getrusage(resource.RUSAGE_SELF)
+    return PhaseStats(
+        seconds,
+        new_usage.ru_minflt - usage.ru_minflt,
+        new_usage.ru_majflt - usage.ru_majflt,
+    )
+
+
+def create_file_with_bytearray(file_path: str, size: int) -> None:
+    """
+    How the files used to be created
+    """
+    with open(file_path, "w+b") as f:
+        f.write(bytearray(size))
+
+
+def benchmark(
+    store: BackingStore, size: int, sparse: bool
+) -> Tuple[PhaseStats, PhaseStats]:
+    file_path = store.get_file_path("benchmark_backing_store")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    state = {}
+
+    def create():
+        if sparse:
+            create_file(file_path, size)
+        else:
+            create_file_with_bytearray(file_path, size)
+        state["accessor"] = map_file(file_path, store.hints)
+
+    def fill():
+        data = np.frombuffer(state["accessor"], dtype=np.float32)
+        data[:] = 1.0
+        del data
+
+    try:
+        creation = measure(create)
+        first_write = measure(fill)
+    finally:
+        if "accessor" in state:
+            state["accessor"].close()
+        os.remove(file_path)
+    return creation, first_write
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=128)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    directories = [BackingStore().directory]
+    if tmpfs_available():
+        directories.append(TMPFS_DIRECTORY)
+    all_hints = {
+        "none": MemoryHints(),
+        "populate": MemoryHints(populate=True),
+        "huge_pages": MemoryHints(huge_pages=True),
+        "will_need": MemoryHints(will_need=True),
+    }
+    print(
+        f"{'directory':<12}{'creation':<10}{'hints':<12}"
+        f"{'create ms':>10}{'faults':>9}{'write ms':>10}{'faults':>9}"
+    )
+    for directory in directories:
+        for sparse in (False, True):
+            for hints_name, hints in all_hints.items():
+                if not sparse and hints_name != "none":
+                    continue
+                creation, first_write = benchmark(
+                    BackingStore(directory, hints), size, sparse
+                )
+                print(
+                    f"{directory:<12}{'sparse' if sparse else 'write':<10}"
+                    f"{hints_name:<12}"
+                    f"{1000 * creation.seconds:>10.1f}"
+                    f"{creation.minor_faults + creation.major_faults:>9}"
+                    f"{1000 * first_write.seconds:>10.1f}"
+                    f"{first_write.minor_faults + first_write.major_faults:>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Measures the throughput of UnityEnvironment (and VectorizedUnityEnvironment for
+several environments) against mock Unity processes, for every combination of the
+numbers of Agents, observation sizes and numbers of environments.
+
+Every step, Python reads the decision steps, sets zero actions and steps. The
+report contains the steps per second, the percentiles of the step latency and
+the CPU used by Python and by the mock Unity processes (as a fraction of one
+core, Linux only for the mock processes).
+
+python mlagents_dots_envs/benchmarks/benchmark_end_to_end.py --agents 100 10000
+--obs-sizes 8 512 --envs 1 4
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from mlagents_envs.base_env import ActionTuple
+
+from mlagents_dots_envs.mock_unity.mock_unity_process import write_launcher
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+BEHAVIOR_NAME = "Agents"
+ACTION_SIZE = 2
+
+
+class BenchmarkResult(NamedTuple):
+    steps_per_second: float
+    # Step latency percentiles in milliseconds
+    p50: float
+    p90: float
+    p99: float
+    # CPU time divided by wall time
+    python_cpu: float
+    unity_cpu: Optional[float]
+
+
+def process_cpu_time(pid: int) -> Optional[float]:
+    """
+    The CPU seconds used by a process, None if /proc is not available
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command can contain spaces, the fields start after its parenthesis
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def unity_cpu_time(pids: List[int]) -> Optional[float]:
+    times = [process_cpu_time(pid) for pid in pids]
+    if any(t is None for t in times):
+        return None
+    return sum(times)  # type: ignore
+
+
+def benchmark(
+    launcher: str,
+    n_agents: int,
+    obs_size: int,
+    n_envs: int,
+    step_time: float,
+    n_steps: int,
+    n_warmup: int,
+) -> BenchmarkResult:
+    behavior = f"{BEHAVIOR_NAME}:{n_agents}:{obs_size}:{ACTION_SIZE}"
+    args = ["--behavior", behavior, "--step-time", str(step_time)]
+    if n_envs == 1:
+        env = UnityEnvironment(launcher, additional_args=args, wait_policy="yield")
+    else:
+        env = VectorizedUnityEnvironment(
+            launcher, n_envs=n_envs, additional_args=args, wait_policy="yield"
+        )
+    pids = env.process_ids
+    try:
+        env.reset()
+        latencies = np.zeros(n_steps)
+        for step in range(-n_warmup, n_steps):
+            if step == 0:
+                t0 = time.perf_counter()
+                python_cpu = time.process_time()
+                unity_cpu = unity_cpu_time(pids)
+            start = time.perf_counter()
+            decision_steps, _ = env.get_steps(BEHAVIOR_NAME)
+            actions = np.zeros((len(decision_steps), ACTION_SIZE), np.float32)
+            env.set_actions(BEHAVIOR_NAME, ActionTuple(continuous=actions))
+            env.step()
+            if step >= 0:
+                latencies[step] = time.perf_counter() - start
+        duration = time.perf_counter() - t0
+        python_cpu = time.process_time() - python_cpu
+        end_unity_cpu = unity_cpu_time(pids)
+        if unity_cpu is not None and end_unity_cpu is not None:
+            unity_cpu = (end_unity_cpu - unity_cpu) / duration
+        else:
+            # The processes could not be measured at the start or at the end
+            unity_cpu = None
+        p50, p90, p99 = 1e3 * np.percentile(latencies, [50, 90, 99])
+        return BenchmarkResult(
+            n_steps / duration, p50, p90, p99, python_cpu / duration, unity_cpu
+        )
+    finally:
+        env.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--obs-sizes", type=int, nargs="+", default=[8, 64, 512])
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 4])
+    parser.add_argument(
+        "--step-time", type=float, default=0.0, help="Seconds simulated per step"
+    )
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'agents':>7} {'obs':>5} {'envs':>4} {'steps/s':>9} {'p50 ms':>7} "
+        f"{'p90 ms':>7} {'p99 ms':>7} {'py cpu':>6} {'unity cpu':>9}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        launcher = write_launcher(os.path.join(directory, "mock_unity"))
+        for n_agents, obs_size, n_envs in itertools.product(
+            args.agents, args.obs_sizes, args.envs
+        ):
+            result = benchmark(
+                launcher,
+                n_agents,
+                obs_size,
+                n_envs,
+                args.step_time,
+                args.steps,
+                args.warmup,
+            )
+            unity_cpu = "n/a" if result.unity_cpu is None else f"{result.unity_cpu:.2f}"
+            print(
+                f"{n_agents:7d} {obs_size:5d} {n_envs:4d} "
+                f"{result.steps_per_second:9.1f} {result.p50:7.3f} {result.p90:7.3f} "
+                f"{result.p99:7.3f} {result.python_cpu:6.2f} {unity_cpu:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
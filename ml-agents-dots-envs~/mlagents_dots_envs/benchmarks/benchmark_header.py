@@ -0,0 +1,104 @@
+"""
+Measures how many iterations per second the loop waiting for Unity can do, and
+the cost of reading the header fields needed after each step. With --baseline,
+the same measures are made with the struct.unpack_from per field reads the
+header used before its fields were cached views, for comparison.
+
+python mlagents_dots_envs/benchmarks/benchmark_header.py [--baseline]
+"""
+import argparse
+import time
+import uuid
+
+from mlagents_dots_envs.shared_memory.shared_memory_header import (
+    HeaderFeatures,
+    SharedMemoryHeader,
+)
+
+
+def spin(header: SharedMemoryHeader, duration: float) -> float:
+    """
+    Returns the number of iterations per second of the wait loop of
+    SharedMemoryCommunicator.wait_for_unity
+    """
+    iterations = 0
+    end = time.perf_counter() + duration
+    while header.blocked and header.active:
+        iterations += 1
+        if iterations % 1000 == 0 and time.perf_counter() > end:
+            break
+    return iterations / duration
+
+
+def read_fields(header: SharedMemoryHeader, iterations: int) -> float:
+    """
+    Returns the seconds needed to read the fields checked after a step
+    """
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        header.snapshot()
+    return (time.perf_counter() - t0) / iterations
+
+
+def baseline_spin(header: SharedMemoryHeader, duration: float) -> float:
+    """
+    spin with one struct.unpack_from per flag, like the header used to
+    """
+    iterations = 0
+    end = time.perf_counter() + duration
+    while header.get_bool(13)[0] and not header.get_bool(15)[0]:
+        iterations += 1
+        if iterations % 1000 == 0 and time.perf_counter() > end:
+            break
+    return iterations / duration
+
+
+def baseline_read_fields(header: SharedMemoryHeader, iterations: int) -> float:
+    """
+    read_fields with one struct.unpack_from per field read by finish_wait, like
+    the header properties used to
+    """
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        requested = HeaderFeatures(header.get_int(32)[0])
+        accepted = HeaderFeatures(header.get_int(36)[0]) & requested
+        header.get_bool(15)
+        header.get_int(48)
+        header.get_int(16)
+        header.get_int(20)
+        header.get_int(24)
+        # rl_data_banks read the accepted features again
+        requested = HeaderFeatures(header.get_int(32)[0])
+        accepted = HeaderFeatures(header.get_int(36)[0]) & requested
+        if accepted & HeaderFeatures.RL_DATA_BANKS:
+            header.get_int(40)
+        header.get_int(44)
+    return (time.perf_counter() - t0) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=1.0)
+    parser.add_argument(
+        "--baseline",
+        action="store_true",
+        help="Also time the struct.unpack_from per field reads",
+    )
+    args = parser.parse_args()
+    header = SharedMemoryHeader(str(uuid.uuid1()))
+    try:
+        header.mark_python_blocked()
+        print(f"spin loop: {spin(header, args.duration) / 1e6:.2f}M iterations/s")
+        if args.baseline:
+            baseline = baseline_spin(header, args.duration)
+            print(f"  baseline {baseline / 1e6:.2f}M iterations/s")
+        print(f"snapshot : {1e9 * read_fields(header, 100000):.0f} ns")
+        if args.baseline:
+            baseline = baseline_read_fields(header, 100000)
+            print(f"  baseline {1e9 * baseline:.0f} ns")
+    finally:
+        header.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compares the bytes Unity writes to the shared memory and the time Python needs to
+decode them to float32 for each ObservationDtype. Decoding FLOAT32 into a buffer
+is a plain copy, the cost of making the observations outlive the step.
+
+python mlagents_dots_envs/benchmarks/benchmark_observation_dtypes.py
+"""
+import argparse
+import time
+import numpy as np
+
+from mlagents_dots_envs.mock_unity.mock_unity_peer import observation_values
+from mlagents_dots_envs.shared_memory.rl_data_offsets import (
+    ObservationDtype,
+    ObservationQuantization,
+)
+from mlagents_dots_envs.shared_memory.step_views import decode_observation
+
+
+def decode_time(
+    obs: np.ndarray,
+    obs_dtype: ObservationDtype,
+    quantization: ObservationQuantization,
+    iterations: int,
+) -> float:
+    """
+    Returns the seconds needed to decode obs into a preallocated float32 buffer
+    """
+    out = np.empty(obs.shape, np.float32)
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        decode_observation(obs, obs_dtype, quantization, out)
+    return (time.perf_counter() - t0) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=20000)
+    parser.add_argument("--channels", type=int, default=256)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    shape = (args.agents, args.channels)
+    quantization = ObservationQuantization(
+        (0.01,) * args.channels, (-1.0,) * args.channels
+    )
+    for obs_dtype in ObservationDtype:
+        obs = np.ascontiguousarray(
+            observation_values(shape, 0.5, obs_dtype, quantization)
+        )
+        duration = decode_time(obs, obs_dtype, quantization, args.iterations)
+        print(
+            f"{obs_dtype.name:8}: {obs.nbytes / 1e6:6.1f} MB "
+            f"decode {1e3 * duration:6.2f} ms "
+            f"({obs.nbytes / duration / 1e9:5.2f} GB/s read)"
+        )
+
+
+if __name__ == "__main__":
+    main()
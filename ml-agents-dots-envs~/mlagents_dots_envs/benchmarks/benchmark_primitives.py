@@ -0,0 +1,238 @@
+"""
+Measures the BaseSharedMemory primitives and the composite paths built on them
+(parsing the RL data specs, reading the steps, writing the actions and the side
+channel data) and gates their regressions.
+
+run writes the time per call of every path to a JSON baseline. compare measures
+again and exits with an error when a path is slower than its baseline by more
+than the threshold. Only compare baselines created on the same machine.
+
+python mlagents_dots_envs/benchmarks/benchmark_primitives.py run --output base.json
+python mlagents_dots_envs/benchmarks/benchmark_primitives.py compare base.json
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from mlagents_envs.base_env import ActionTuple
+
+from mlagents_dots_envs.mock_unity.mock_unity_peer import (
+    MockBehavior,
+    MockUnityPeer,
+    section_size,
+    write_spec,
+)
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.rl_data_offsets import RLDataOffsets
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_header import SharedMemoryHeader
+
+BASELINE_VERSION = 2
+BEHAVIOR_NAME = "Agents"
+ACTION_SIZE = 2
+
+
+def time_per_call(function: Callable[[], object], repeat: int) -> float:
+    """
+    Returns the smallest time per call in seconds over repeat runs of at least
+    0.2 seconds each
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def _step(
+    communicator: SharedMemoryCommunicator, peer: MockUnityPeer, reset: bool = False
+) -> None:
+    # Runs the mock Unity step in this thread so that only Python is measured
+    communicator.give_unity_control(reset=reset)
+    peer.wait_for_python()
+    peer.simulate(
+        peer.read_and_clear_reset_command(), peer.read_and_clear_query_command()
+    )
+    peer.give_python_control()
+    communicator.wait_for_unity()
+
+
+def primitive_cases(
+    mem: BaseSharedMemory, header: SharedMemoryHeader, n_agents: int, obs_size: int
+) -> Dict[str, Callable[[], object]]:
+    mem.set_int(0, 42)
+    mem.set_float(4, 0.5)
+    mem.set_bool(8, True)
+    mem.set_string(16, "A" * 32)
+    mem.set_uuid(64, uuid.uuid4())
+    shape = (n_agents, obs_size)
+    data = np.ones(shape, np.float32)
+    return {
+        "get_int": lambda: mem.get_int(0),
+        "get_float": lambda: mem.get_float(4),
+        "get_bool": lambda: mem.get_bool(8),
+        "get_string": lambda: mem.get_string(16),
+        "get_uuid": lambda: mem.get_uuid(64),
+        "set_int": lambda: mem.set_int(0, 42),
+        "get_ndarray": lambda: mem.get_ndarray(128, shape, np.float32),
+        "set_ndarray": lambda: mem.set_ndarray(128, data),
+        "header_snapshot": header.snapshot,
+    }
+
+
+def composite_cases(
+    communicator: SharedMemoryCommunicator,
+    specs: BaseSharedMemory,
+    n_agents: int,
+    side_channel_size: int,
+) -> Dict[str, Callable[[], object]]:
+    actions = ActionTuple(np.zeros((n_agents, ACTION_SIZE), np.float32))
+    side_channel_data = bytearray(side_channel_size)
+
+    def rl_data_offsets_from_mem() -> None:
+        # The layouts are memoized on the spec bytes, parse them as a new behavior
+        RLDataOffsets.clear_cache()
+        RLDataOffsets.from_mem(specs, 0)
+
+    def get_decision_steps() -> None:
+        # The steps are memoized until the next step, read them as after a step
+        communicator._data_mem.clear_steps()
+        decision_steps, _ = communicator.get_steps(BEHAVIOR_NAME)
+        decision_steps.obs[0]
+        decision_steps.reward
+        decision_steps.agent_id
+
+    return {
+        "rl_data_offsets_from_mem": rl_data_offsets_from_mem,
+        "get_decision_steps": get_decision_steps,
+        "set_actions": lambda: communicator.set_actions(BEHAVIOR_NAME, actions),
+        "write_side_channel_data": lambda: communicator.write_side_channel_data(
+            side_channel_data
+        ),
+    }
+
+
+def run_benchmarks(
+    n_agents: int, obs_size: int, side_channel_size: int, repeat: int
+) -> Dict[str, float]:
+    """
+    Returns the time per call in nanoseconds of every path
+    """
+    behavior = MockBehavior(
+        BEHAVIOR_NAME, n_agents, [(obs_size,)], continuous_action_size=ACTION_SIZE
+    )
+    results: Dict[str, float] = {}
+    mem_name = str(uuid.uuid1())
+    mem = BaseSharedMemory(mem_name, True, 128 + 4 * n_agents * obs_size)
+    header = SharedMemoryHeader(mem_name + "_header")
+    specs = BaseSharedMemory(mem_name + "_specs", True, section_size(behavior, 1))
+    write_spec(specs, behavior, n_agents, 0)
+    communicator = SharedMemoryCommunicator(wait_policy="spin")
+    peer = MockUnityPeer(communicator.communicator_id, [behavior])
+    try:
+        _step(communicator, peer)
+        _step(communicator, peer, reset=True)
+        cases = primitive_cases(mem, header, n_agents, obs_size)
+        cases.update(composite_cases(communicator, specs, n_agents, side_channel_size))
+        for name, function in cases.items():
+            results[name] = 1e9 * time_per_call(function, repeat)
+    finally:
+        communicator.close()
+        peer.wait_for_python()
+        mem.delete()
+        header.delete()
+        specs.delete()
+    return results
+
+
+def compare(
+    baseline: Dict[str, float], results: Dict[str, float], threshold: float
+) -> List[Tuple[str, float]]:
+    """
+    Returns the name and slowdown ratio of the paths slower than their baseline by
+    more than threshold (0.2 means 20% slower)
+    """
+    return [
+        (name, results[name] / baseline[name])
+        for name in sorted(baseline)
+        if name in results and results[name] > baseline[name] * (1 + threshold)
+    ]
+
+
+def _print_results(results: Dict[str, float], baseline: Dict[str, float]) -> None:
+    for name, duration in results.items():
+        line = f"{name:24}: {duration:12.1f} ns"
+        if name in baseline:
+            line += f"  baseline {baseline[name]:12.1f} ns"
+            line += f"  ({duration / baseline[name]:5.2f}x)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=["run", "compare"])
+    parser.add_argument("baseline", nargs="?", help="The baseline to compare with")
+    parser.add_argument("--output", help="Where to write the results as JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Slowdown allowed by compare, 0.25 means 25%% slower",
+    )
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--obs-size", type=int, default=64)
+    parser.add_argument("--side-channel-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.command == "compare" and args.baseline is None:
+        parser.error("compare requires a baseline")
+
+    config = {
+        "agents": args.agents,
+        "obs_size": args.obs_size,
+        "side_channel_size": args.side_channel_size,
+    }
+    baseline: Dict[str, float] = {}
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline_file = json.load(f)
+        if baseline_file["version"] != BASELINE_VERSION:
+            sys.exit(f"Unsupported baseline version {baseline_file['version']}")
+        if baseline_file["config"] != config:
+            sys.exit(f"The baseline was measured with {baseline_file['config']}")
+        baseline = baseline_file["results"]
+
+    results = run_benchmarks(
+        args.agents, args.obs_size, args.side_channel_size, args.repeat
+    )
+    _print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "version": BASELINE_VERSION,
+                    "machine": platform.node(),
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "config": config,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    regressions = compare(baseline, results, args.threshold)
+    for name, ratio in regressions:
+        print(f"REGRESSION {name}: {ratio:.2f}x slower than the baseline")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Measures the throughput gained by letting Unity write the next step in another RL
+data bank while Python processes the observations of the current step.
+
+Unity is simulated by a MockUnityPeer running in a separate process, which
+follows the same bank protocol as Runtime/Remote/SharedMemoryCommunicator.cs. The
+time the runtime spends writing a step is not measured. Every step,
+Python writes the actions, then normalizes the observations into a trajectory
+buffer. With a single bank this has to happen before giving control to Unity, with
+several banks it overlaps with the simulation of the next step.
+
+python mlagents_dots_envs/benchmarks/benchmark_rl_data_banks.py --agents 10000
+"""
+import argparse
+import multiprocessing
+import time
+from typing import List
+
+import numpy as np
+from mlagents_envs.base_env import ActionTuple, DecisionSteps
+
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior, MockUnityPeer
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+)
+
+BEHAVIOR_NAME = "Agents"
+
+
+def run_peer(file_name: str, behaviors: List[MockBehavior], step_time: float):
+    MockUnityPeer(file_name, behaviors).run(step_time)
+
+
+class TrajectoryBuffer:
+    """
+    Stands in for the trainer: keeps the last normalized observations and rewards
+    """
+
+    def __init__(self, n_slots: int, n_agents: int, obs_size: int):
+        self.obs = np.zeros((n_slots, n_agents, obs_size), dtype=np.float32)
+        self.rewards = np.zeros((n_slots, n_agents), dtype=np.float32)
+        self._index = 0
+
+    def add(self, decision_steps: DecisionSteps) -> None:
+        slot = self._index % len(self.obs)
+        n_agents = len(decision_steps)
+        obs = decision_steps.obs[0]
+        np.subtract(obs, obs.mean(axis=0), out=self.obs[slot, :n_agents])
+        np.divide(
+            self.obs[slot, :n_agents], obs.std() + 1e-6, out=self.obs[slot, :n_agents]
+        )
+        self.rewards[slot, :n_agents] = decision_steps.reward
+        self._index += 1
+
+
+def benchmark(
+    n_agents: int, obs_size: int, step_time: float, n_steps: int, rl_data_banks: int
+) -> float:
+    """
+    Returns the number of steps per second
+    """
+    communicator = SharedMemoryCommunicator(
+        wait_policy="yield", rl_data_banks=rl_data_banks
+    )
+    behavior = MockBehavior(
+        BEHAVIOR_NAME, n_agents, [(obs_size,)], continuous_action_size=2
+    )
+    peer = multiprocessing.Process(
+        target=run_peer, args=(communicator.communicator_id, [behavior], step_time)
+    )
+    peer.start()
+    try:
+        communicator.give_unity_control()
+        communicator.wait_for_unity()
+        communicator.give_unity_control(reset=True)
+        communicator.wait_for_unity()
+        assert communicator.rl_data_banks == rl_data_banks
+        trajectories = TrajectoryBuffer(16, n_agents, obs_size)
+        actions = np.zeros((n_agents, 2), dtype=np.float32)
+        t0 = time.perf_counter()
+        for _ in range(n_steps):
+            decision_steps, _ = communicator.get_steps(BEHAVIOR_NAME)
+            n_decisions = len(decision_steps)
+            communicator.set_actions(
+                BEHAVIOR_NAME, ActionTuple(continuous=actions[:n_decisions])
+            )
+            if rl_data_banks > 1:
+                communicator.give_unity_control()
+                trajectories.add(decision_steps)
+            else:
+                trajectories.add(decision_steps)
+                communicator.give_unity_control()
+            communicator.wait_for_unity()
+        return n_steps / (time.perf_counter() - t0)
+    finally:
+        communicator.close()
+        peer.join(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--obs-size", type=int, default=64)
+    parser.add_argument(
+        "--step-time", type=float, default=0.002, help="Seconds simulated per step"
+    )
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--banks", type=int, default=2)
+    args = parser.parse_args()
+
+    results = {}
+    for rl_data_banks in (1, args.banks):
+        results[rl_data_banks] = benchmark(
+            args.agents, args.obs_size, args.step_time, args.steps, rl_data_banks
+        )
+        print(
+            f"{rl_data_banks} bank(s): {results[rl_data_banks]:.1f} steps/s, "
+            f"{results[rl_data_banks] * args.agents:.0f} agent steps/s"
+        )
+    print(f"Speedup: {results[args.banks] / results[1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
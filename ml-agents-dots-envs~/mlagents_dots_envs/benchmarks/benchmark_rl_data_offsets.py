@@ -0,0 +1,71 @@
+"""
+Measures the time needed to parse the specs of the RL data section, as done every
+time Unity creates a new communication file, with and without the layout cache.
+
+python mlagents_dots_envs/benchmarks/benchmark_rl_data_offsets.py --behaviors 64
+"""
+import argparse
+import time
+
+from mlagents_dots_envs.mock_unity.mock_unity_peer import (
+    MockBehavior,
+    section_size,
+    write_spec,
+)
+from mlagents_dots_envs.shared_memory.rl_data_offsets import RLDataOffsets
+from mlagents_dots_envs.shared_memory.shared_memory_body import SharedMemoryBody
+
+
+def create_body(n_behaviors: int, max_agents: int) -> SharedMemoryBody:
+    behaviors = [
+        MockBehavior(f"Behavior{i}", max_agents, [(8,), (4, 4, 2), (3,)], 2, (3, 2))
+        for i in range(n_behaviors)
+    ]
+    sizes = [section_size(behavior, max_agents) for behavior in behaviors]
+    body = SharedMemoryBody(
+        "benchmark_rl_data_offsets",
+        create_file=True,
+        side_channel_buffer_size=4,
+        rl_data_buffer_size=sum(sizes),
+    )
+    offset = body.rl_data_offset
+    for behavior, size in zip(behaviors, sizes):
+        write_spec(body, behavior, max_agents, offset)
+        offset += size
+    return body
+
+
+def measure(body: SharedMemoryBody, iterations: int, cached: bool) -> float:
+    """
+    Returns the number of seconds per parse of all the sections
+    """
+    total = 0.0
+    for _ in range(iterations):
+        if not cached:
+            RLDataOffsets.clear_cache()
+        t0 = time.perf_counter()
+        body._refresh_offsets()
+        total += time.perf_counter() - t0
+    return total / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--behaviors", type=int, default=64)
+    parser.add_argument("--max-agents", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    body = create_body(args.behaviors, args.max_agents)
+    try:
+        cold = measure(body, args.iterations, cached=False)
+        warm = measure(body, args.iterations, cached=True)
+        assert body.num_behaviors == args.behaviors
+    finally:
+        body.delete()
+    print(f"{args.behaviors} behaviors")
+    print(f"parse : {1e6 * cold:.1f} us ({1e6 * cold / args.behaviors:.2f} us each)")
+    print(f"cached: {1e6 * warm:.1f} us ({1e6 * warm / args.behaviors:.2f} us each)")
+
+
+if __name__ == "__main__":
+    main()
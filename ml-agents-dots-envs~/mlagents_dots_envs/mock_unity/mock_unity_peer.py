@@ -0,0 +1,664 @@
+import struct
+import time
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.rl_data_offsets import (
+    ObservationDtype,
+    ObservationQuantization,
+    RLDataOffsets,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_header import (
+    SharedMemoryHeader,
+    HeaderFeatures,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_side_channel import (
+    SharedMemorySideChannel,
+)
+from mlagents_dots_envs.shared_memory.wake_channel import FifoWakeChannel
+from mlagents_dots_envs.shared_memory.capacity_hints import (
+    CapacityHint,
+    read_capacity_hints,
+)
+
+
+class MockBehavior(NamedTuple):
+    """
+    Describes a behavior simulated by the MockUnityPeer
+    """
+
+    name: str
+    n_agents: int
+    observation_shapes: List[Tuple[int, ...]]
+    continuous_action_size: int = 0
+    discrete_branches: Tuple[int, ...] = ()
+    # Number of steps before all the Agents terminate, 0 means never
+    episode_length: int = 0
+    # Number of Agents spawned every step since the last reset
+    agent_growth: int = 0
+    # The ObservationDtype of each observation, all FLOAT32 if empty
+    observation_dtypes: Tuple[ObservationDtype, ...] = ()
+    # The quantization of each INT8 or INT16 observation, identity if missing
+    observation_quantization: Tuple[Optional[ObservationQuantization], ...] = ()
+    # The indices of the observations that are always 1 instead of the step count
+    static_observations: Tuple[int, ...] = ()
+
+
+def observation_dtypes(
+    behavior: MockBehavior, supported: bool
+) -> Tuple[ObservationDtype, ...]:
+    """
+    The ObservationDtypes the observations of a behavior are sent with. They are
+    all FLOAT32 when Python did not request HeaderFeatures.OBSERVATION_DTYPES.
+    """
+    if not supported or not behavior.observation_dtypes:
+        return (ObservationDtype.FLOAT32,) * len(behavior.observation_shapes)
+    return tuple(behavior.observation_dtypes)
+
+
+def observation_quantization(
+    behavior: MockBehavior, index: int
+) -> ObservationQuantization:
+    """
+    The quantization of the INT8 or INT16 observation at index
+    """
+    if index < len(behavior.observation_quantization):
+        quantization = behavior.observation_quantization[index]
+        if quantization is not None:
+            return quantization
+    shape = behavior.observation_shapes[index]
+    n_channels = shape[-1] if shape else 1
+    return ObservationQuantization((1.0,) * n_channels, (0.0,) * n_channels)
+
+
+def observation_values(
+    shape: Tuple[int, ...],
+    value: float,
+    dtype: ObservationDtype,
+    quantization: Optional[ObservationQuantization] = None,
+) -> np.ndarray:
+    """
+    An observation array of the given shape where every value is value, encoded
+    in dtype. INT8 and INT16 values are quantized to the nearest representable
+    value.
+    """
+    if not dtype.quantized:
+        return np.full(shape, value, dtype.numpy_dtype)
+    assert quantization is not None
+    info = np.iinfo(dtype.numpy_dtype)
+    quantized = np.rint(
+        (value - np.array(quantization.offset)) / np.array(quantization.scale)
+    )
+    quantized = np.clip(quantized, info.min, info.max).astype(dtype.numpy_dtype)
+    return np.broadcast_to(quantized, shape)
+
+
+def section_size(
+    behavior: MockBehavior,
+    max_agents: int,
+    with_dtypes: bool = False,
+    with_counters: bool = False,
+) -> int:
+    """
+    The number of bytes a behavior uses in the RL data section. Mirrors
+    RLDataOffsets.cs.
+    """
+    n_obs = len(behavior.observation_shapes)
+    obs_size = sum(
+        int(np.prod(s)) * dtype.numpy_dtype.itemsize
+        for s, dtype in zip(
+            behavior.observation_shapes, observation_dtypes(behavior, with_dtypes)
+        )
+    )
+    obs_spec_size = 32 if with_dtypes else 28
+    n_branches = len(behavior.discrete_branches)
+    size = 1 + len(behavior.name) + 4 + 4 + obs_spec_size * n_obs
+    for index, dtype in enumerate(observation_dtypes(behavior, with_dtypes)):
+        if dtype.quantized:
+            size += 8 * len(observation_quantization(behavior, index).scale)
+    if with_counters:
+        size += 4 * (n_obs + 1)
+    size += 4 + 4 + 4 * n_branches
+    # Decision steps
+    size += 4 + max_agents * obs_size + 8 * max_agents
+    size += max_agents * sum(behavior.discrete_branches)
+    # Termination steps
+    size += 4 + max_agents * obs_size + 9 * max_agents
+    # Actions
+    size += 4 * max_agents * (behavior.continuous_action_size + n_branches)
+    return size
+
+
+def write_spec(
+    mem: BaseSharedMemory,
+    behavior: MockBehavior,
+    max_agents: int,
+    offset: int,
+    with_dtypes: bool = False,
+) -> None:
+    """
+    Writes the specs of a behavior at the start of its section. Mirrors
+    SharedMemoryBody.cs.
+    """
+    offset = mem.set_string(offset, behavior.name)
+    offset = mem.set_int(offset, max_agents)
+    offset = mem.set_int(offset, len(behavior.observation_shapes))
+    for shape, dtype in zip(
+        behavior.observation_shapes, observation_dtypes(behavior, with_dtypes)
+    ):
+        for i in range(3):
+            offset = mem.set_int(offset, shape[i] if i < len(shape) else 0)
+        for _ in range(4):
+            offset = mem.set_int(offset, 0)
+        if with_dtypes:
+            offset = mem.set_int(offset, dtype)
+    for index, dtype in enumerate(observation_dtypes(behavior, with_dtypes)):
+        if dtype.quantized:
+            quantization = observation_quantization(behavior, index)
+            for value in quantization.scale + quantization.offset:
+                offset = mem.set_float(offset, value)
+    offset = mem.set_int(offset, behavior.continuous_action_size)
+    offset = mem.set_int(offset, len(behavior.discrete_branches))
+    for branch_size in behavior.discrete_branches:
+        offset = mem.set_int(offset, branch_size)
+
+
+class MockUnityPeer:
+    """
+    A pure Python implementation of the Unity side of the shared memory protocol.
+    It mirrors Runtime/Remote/SharedMemoryCommunicator.cs so the Python side of the
+    communication can be tested without a Unity build.
+    """
+
+    SUPPORTED_FEATURES = (
+        HeaderFeatures.WAKE_FIFO
+        | HeaderFeatures.RL_DATA_BANKS
+        | HeaderFeatures.SIDE_CHANNEL_FILE
+        | HeaderFeatures.CAPACITY_HINTS
+        | HeaderFeatures.OBSERVATION_DTYPES
+        | HeaderFeatures.SECTION_COUNTERS
+        | HeaderFeatures.ACTION_REPEAT
+    )
+
+    def __init__(
+        self,
+        file_name: str,
+        behaviors: Optional[List[MockBehavior]] = None,
+        supported_features: HeaderFeatures = SUPPORTED_FEATURES,
+        timeout_wait: float = 60,
+    ):
+        """
+        Connects to the shared memory header created by Python and gives control
+        back to Python.
+        :string file_name: The name of the header file (communicator_id on the
+        Python side)
+        :list behaviors: The behaviors to simulate. They register on the first step.
+        :param supported_features: The HeaderFeatures this peer acknowledges
+        :float timeout_wait: Number of seconds to wait for Python before timing out
+        """
+        self._base_file_name = file_name
+        self._header = BaseSharedMemory(file_name)
+        self._timeout_wait = timeout_wait
+        if not self.active or not self._check_version():
+            self._header.set_bool(15, True)
+            self._header.close()
+            raise Exception("Could not connect to Python")
+        requested, _ = self._header.get_int(32)
+        accepted = HeaderFeatures(requested) & supported_features
+        self._header.set_int(36, accepted)
+        self._wake: Optional[FifoWakeChannel] = None
+        if accepted & HeaderFeatures.WAKE_FIFO:
+            self._wake = FifoWakeChannel(self._header.file_path, python_side=False)
+            self._wake.connect()
+        self._rl_data_banks = 1
+        if accepted & HeaderFeatures.RL_DATA_BANKS:
+            self._rl_data_banks = max(self._header.get_int(40)[0], 1)
+        self._bank = 0
+        self._header.set_int(44, self._bank)
+        self._side_channel: Optional[SharedMemorySideChannel] = None
+        self._side_channel_generation = 0
+        if accepted & HeaderFeatures.SIDE_CHANNEL_FILE:
+            self._side_channel = SharedMemorySideChannel(file_name)
+            self._side_channel_generation = self._header.get_int(48)[0]
+        self._capacity_hints: Dict[str, CapacityHint] = {}
+        if accepted & HeaderFeatures.CAPACITY_HINTS:
+            hints, _ = read_capacity_hints(self._header, 56)
+            self._capacity_hints = {hint.behavior_name: hint for hint in hints}
+        self._observation_dtypes = bool(accepted & HeaderFeatures.OBSERVATION_DTYPES)
+        self._section_counters = bool(accepted & HeaderFeatures.SECTION_COUNTERS)
+        self._action_repeat = bool(accepted & HeaderFeatures.ACTION_REPEAT)
+        self._current_file_number = 1
+        self._body = self._open_body()
+        self._behaviors = behaviors or []
+        self._offsets: List[Dict[str, RLDataOffsets]] = [
+            {} for _ in range(self._rl_data_banks)
+        ]
+        # The number of Agents each registered behavior has room for
+        self._capacities: Dict[str, int] = {}
+        self._step_count = 0
+        self._episodes: Dict[str, int] = {}
+        # The number of Agents and the counter of the static data of each behavior
+        self._static_counters: Dict[str, Tuple[int, int]] = {}
+        self.received_side_channel_data = bytearray()
+        self.side_channel_data_to_send = bytearray()
+        self.actions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.give_python_control()
+
+    def _check_version(self) -> bool:
+        offset = 0
+        version = ()
+        for v in SharedMemoryHeader.VERSION:
+            value, _ = self._header.get_int(offset)
+            version += (value,)
+            offset = self._header.set_int(offset, v)
+        return version == SharedMemoryHeader.VERSION
+
+    def _open_body(self, create_size: Optional[int] = None) -> BaseSharedMemory:
+        file_name = self._base_file_name + "_" * self._current_file_number
+        if create_size is None:
+            return BaseSharedMemory(file_name)
+        return BaseSharedMemory(file_name, True, create_size)
+
+    @property
+    def active(self) -> bool:
+        if self._header.accessor is None:
+            return False
+        closed, _ = self._header.get_bool(15)
+        return not closed
+
+    @property
+    def wake_channel_connected(self) -> bool:
+        return self._wake is not None and self._wake.connected
+
+    @property
+    def _side_channel_size(self) -> int:
+        return self._header.get_int(20)[0]
+
+    @property
+    def _rl_data_size(self) -> int:
+        return self._header.get_int(24)[0]
+
+    def wait_for_python(self) -> bool:
+        """
+        Blocks until Python gives control to Unity.
+        :return: False if Python closed the communication
+        """
+        t0 = time.perf_counter()
+        while self.active and self._header.get_bool(12)[0]:
+            elapsed = time.perf_counter() - t0
+            if elapsed > self._timeout_wait:
+                raise TimeoutError("Python took too long to respond")
+            if self.wake_channel_connected:
+                self._wake.wait(self._timeout_wait - elapsed)  # type: ignore
+            else:
+                time.sleep(0)
+        if not self.active:
+            self._delete()
+            return False
+        if self._side_channel is not None:
+            generation, _ = self._header.get_int(48)
+            if generation != self._side_channel_generation:
+                # Python grew the side channel file
+                self._side_channel_generation = generation
+                self._side_channel.remap()
+        if self._current_file_number < self._header.get_int(16)[0]:
+            while self._current_file_number < self._header.get_int(16)[0]:
+                # The file is out of date
+                self._body.delete()
+                self._current_file_number += 1
+                self._body = self._open_body()
+            self._refresh_offsets()
+        return True
+
+    def read_and_clear_reset_command(self) -> bool:
+        result, _ = self._header.get_bool(14)
+        self._header.set_bool(14, False)
+        return result
+
+    def read_and_clear_query_command(self) -> bool:
+        result, _ = self._header.get_bool(28)
+        self._header.set_bool(28, False)
+        return result
+
+    def read_action_repeat(self) -> int:
+        """
+        The number of ticks Python asked to simulate, 1 without
+        HeaderFeatures.ACTION_REPEAT
+        """
+        if not self._action_repeat:
+            return 1
+        return max(struct.unpack_from("<H", self._header.accessor, 30)[0], 1)
+
+    def give_python_control(self) -> None:
+        self._header.set_bool(12, True)
+        self._header.set_bool(13, False)
+        if self._wake is not None:
+            self._wake.notify()
+
+    def _regenerate_body(
+        self, side_channel_size: int, rl_data_size: int, copy_rl_data: bool = True
+    ) -> None:
+        """
+        Moves the communication to a new, bigger file. Mirrors the file growth of
+        SharedMemoryCommunicator.cs.
+        """
+        old_side_channel_size = self._side_channel_size
+        old_rl_data_size = self._rl_data_size
+        side_channel = bytes(self._body.accessor[:old_side_channel_size])
+        banks = [
+            bytes(
+                self._body.accessor[
+                    old_side_channel_size
+                    + bank * old_rl_data_size : old_side_channel_size
+                    + (bank + 1) * old_rl_data_size
+                ]
+            )
+            for bank in range(self._rl_data_banks if copy_rl_data else 0)
+        ]
+        self._body.close()
+        self._current_file_number += 1
+        self._header.set_int(16, self._current_file_number)
+        self._body = self._open_body(
+            side_channel_size + self._rl_data_banks * rl_data_size
+        )
+        self._header.set_int(20, side_channel_size)
+        self._header.set_int(24, rl_data_size)
+        self._body.accessor[: len(side_channel)] = side_channel
+        for bank, rl_data in enumerate(banks):
+            offset = side_channel_size + bank * rl_data_size
+            self._body.accessor[offset : offset + len(rl_data)] = rl_data
+
+    def _refresh_offsets(self) -> None:
+        for offsets in self._offsets:
+            offsets.clear()
+        offset = self._side_channel_size
+        end = offset + self._rl_data_size
+        while offset < end:
+            data_offsets, offset = RLDataOffsets.from_mem(
+                self._body, offset, self._observation_dtypes, self._section_counters
+            )
+            for bank, offsets in enumerate(self._offsets):
+                offsets[data_offsets.name] = data_offsets.shifted(
+                    bank * self._rl_data_size
+                )
+
+    def _initial_capacity(self, behavior: MockBehavior) -> int:
+        hint = self._capacity_hints.get(behavior.name)
+        if hint is None:
+            return behavior.n_agents
+        if hint.observation_shapes is not None and [
+            tuple(s) for s in hint.observation_shapes
+        ] != [tuple(s) for s in behavior.observation_shapes]:
+            # The hint does not describe this behavior
+            return behavior.n_agents
+        return max(behavior.n_agents, hint.max_n_agents)
+
+    def _observations(
+        self, behavior: MockBehavior, offsets: RLDataOffsets, n_agents: int
+    ) -> List[np.ndarray]:
+        """
+        The observations of the Agents of a behavior, equal to the step count
+        except for the static ones
+        """
+        return [
+            observation_values(
+                (n_agents,) + shape,
+                1 if index in behavior.static_observations else self._step_count,
+                dtype,
+                observation_quantization(behavior, index) if dtype.quantized else None,
+            )
+            for index, (shape, dtype) in enumerate(
+                zip(behavior.observation_shapes, offsets.obs_dtypes)
+            )
+        ]
+
+    def _write_counters(
+        self, behavior: MockBehavior, offsets: RLDataOffsets, n_agents: int
+    ) -> None:
+        """
+        Writes the step at which each observation and the action mask last
+        changed. The static data only changes with the number of Agents.
+        """
+        if offsets.section_counters_offset is None:
+            return
+        last_n_agents, static_counter = self._static_counters.get(
+            behavior.name, (-1, 0)
+        )
+        if n_agents != last_n_agents:
+            static_counter = self._step_count
+            self._static_counters[behavior.name] = (n_agents, static_counter)
+        counters = [
+            static_counter
+            if index in behavior.static_observations
+            else self._step_count
+            for index in range(len(behavior.observation_shapes))
+        ]
+        self._body.set_ndarray(
+            offsets.section_counters_offset,
+            np.array(counters + [static_counter], np.int32),
+        )
+
+    def _population(self, behavior: MockBehavior) -> int:
+        return behavior.n_agents + behavior.agent_growth * self._step_count
+
+    def _register_behavior(self, behavior: MockBehavior) -> None:
+        capacity = self._initial_capacity(behavior)
+        section_offset = self._rl_data_size
+        self._regenerate_body(
+            self._side_channel_size,
+            self._rl_data_size
+            + section_size(
+                behavior, capacity, self._observation_dtypes, self._section_counters
+            ),
+        )
+        self._capacities[behavior.name] = capacity
+        for bank in range(self._rl_data_banks):
+            offset = self._side_channel_size + bank * self._rl_data_size
+            write_spec(
+                self._body,
+                behavior,
+                capacity,
+                offset + section_offset,
+                self._observation_dtypes,
+            )
+        self._refresh_offsets()
+
+    def _grow_sections(self) -> None:
+        """
+        Lays out the RL data again when the population of a behavior outgrew its
+        section. The data of the current step is written right after so it is not
+        copied.
+        """
+        grown = False
+        for behavior in self._behaviors:
+            capacity = self._capacities[behavior.name]
+            population = self._population(behavior)
+            if population > capacity:
+                self._capacities[behavior.name] = max(population, 2 * capacity)
+                grown = True
+        if not grown:
+            return
+        registered = [b for b in self._behaviors if b.name in self._capacities]
+        sizes = [
+            section_size(
+                b,
+                self._capacities[b.name],
+                self._observation_dtypes,
+                self._section_counters,
+            )
+            for b in registered
+        ]
+        self._regenerate_body(self._side_channel_size, sum(sizes), False)
+        for bank in range(self._rl_data_banks):
+            offset = self._side_channel_size + bank * self._rl_data_size
+            for behavior, size in zip(registered, sizes):
+                write_spec(
+                    self._body,
+                    behavior,
+                    self._capacities[behavior.name],
+                    offset,
+                    self._observation_dtypes,
+                )
+                offset += size
+        self._refresh_offsets()
+
+    def _read_side_channel_data(self) -> None:
+        if self._side_channel is not None:
+            self.received_side_channel_data = bytearray(self._side_channel.data)
+            return
+        length, offset = self._body.get_int(0)
+        self.received_side_channel_data = bytearray(
+            self._body.accessor[offset : offset + length]
+        )
+
+    def _write_side_channel_data(self, data: bytearray) -> None:
+        if self._side_channel is not None:
+            if len(data) > self._side_channel.capacity - 4:
+                self._side_channel.resize(2 * len(data) + 20)
+                self._side_channel_generation += 1
+                self._header.set_int(48, self._side_channel_generation)
+            self._side_channel.data = data
+            return
+        if len(data) > self._side_channel_size - 4:
+            self._regenerate_body(2 * len(data) + 20, self._rl_data_size)
+            self._refresh_offsets()
+        offset = self._body.set_int(0, len(data))
+        self._body.accessor[offset : offset + len(data)] = data
+
+    def _read_actions(self) -> None:
+        for behavior in self._behaviors:
+            offsets = self._offsets[self._bank][behavior.name]
+            n_agents, _ = self._body.get_int(offsets.decision_n_agents_offset)
+            continuous = self._body.get_ndarray(
+                offsets.continuous_action_offset,
+                (n_agents, behavior.continuous_action_size),
+                np.float32,
+            ).copy()
+            discrete = self._body.get_ndarray(
+                offsets.discrete_action_offset,
+                (n_agents, len(behavior.discrete_branches)),
+                np.int32,
+            ).copy()
+            self.actions[behavior.name] = (continuous, discrete)
+
+    def _next_bank(self) -> None:
+        """
+        Moves to the bank the next step is written to. With several banks, the
+        bank Python is reading is never written to.
+        """
+        self._bank = (self._bank + 1) % self._rl_data_banks
+        for behavior in self._behaviors:
+            offsets = self._offsets[self._bank][behavior.name]
+            self._body.set_int(offsets.decision_n_agents_offset, 0)
+            self._body.set_int(offsets.termination_n_agents_offset, 0)
+
+    def _write_behavior_data(
+        self, behavior: MockBehavior, reset: bool, ticks: int = 1
+    ) -> None:
+        """
+        Writes the data of a behavior after the ticks of a step. The Agents earn
+        0.1 per tick and terminate (at most once per step) if an episode ended
+        during one of the ticks.
+        """
+        offsets = self._offsets[self._bank][behavior.name]
+        n_agents = self._population(behavior)
+        episode = self._episodes.get(behavior.name, 0) + int(reset)
+        agent_id = np.arange(n_agents, dtype=np.int32) + n_agents * episode
+        terminate = (
+            not reset
+            and behavior.episode_length > 0
+            and any(
+                (self._step_count - tick) % behavior.episode_length == 0
+                for tick in range(ticks)
+            )
+        )
+        if terminate:
+            self._body.set_int(offsets.termination_n_agents_offset, n_agents)
+            for obs_offset, obs in zip(
+                offsets.termination_obs_offset,
+                self._observations(behavior, offsets, n_agents),
+            ):
+                self._body.set_ndarray(obs_offset, obs)
+            self._body.set_ndarray(
+                offsets.termination_reward_offset, np.ones(n_agents, np.float32)
+            )
+            self._body.set_ndarray(
+                offsets.termination_status_offset, np.zeros(n_agents, np.bool_)
+            )
+            self._body.set_ndarray(offsets.termination_agent_id_offset, agent_id)
+            episode += 1
+            agent_id = agent_id + n_agents
+        self._episodes[behavior.name] = episode
+        self._body.set_int(offsets.decision_n_agents_offset, n_agents)
+        self._write_counters(behavior, offsets, n_agents)
+        for obs_offset, obs in zip(
+            offsets.decision_obs_offset,
+            self._observations(behavior, offsets, n_agents),
+        ):
+            self._body.set_ndarray(obs_offset, obs)
+        self._body.set_ndarray(
+            offsets.decision_rewards_offset,
+            np.full(n_agents, 0.1 * ticks, np.float32),
+        )
+        self._body.set_ndarray(offsets.decision_agent_id_offset, agent_id)
+        if offsets.masks_offset is not None:
+            mask_size = n_agents * sum(behavior.discrete_branches)
+            self._body.set_ndarray(offsets.masks_offset, np.zeros(mask_size, np.bool_))
+
+    def simulate(self, reset: bool, query: bool) -> None:
+        """
+        Called every time Python gives control to Unity. Reads the side channel
+        data and the actions sent by Python and writes the data of the next step.
+        """
+        self._read_side_channel_data()
+        self._write_side_channel_data(self.side_channel_data_to_send)
+        self.side_channel_data_to_send = bytearray()
+        if query:
+            return
+        for behavior in self._behaviors:
+            if behavior.name not in self._offsets[0]:
+                self._register_behavior(behavior)
+        self._read_actions()
+        ticks = 1 if reset else self.read_action_repeat()
+        self._step_count = 0 if reset else self._step_count + ticks
+        self._grow_sections()
+        self._next_bank()
+        for behavior in self._behaviors:
+            self._write_behavior_data(behavior, reset, ticks)
+        self._header.set_int(44, self._bank)
+
+    def run(self, step_time: float = 0.0) -> None:
+        """
+        Runs the simulation until Python closes the communication.
+        :float step_time: Seconds of simulated compute per step
+        """
+        while self.wait_for_python():
+            reset = self.read_and_clear_reset_command()
+            query = self.read_and_clear_query_command()
+            if step_time > 0 and not query:
+                time.sleep(step_time)
+            self.simulate(reset, query)
+            self.give_python_control()
+
+    def close(self) -> None:
+        """
+        Closes the communication from the Unity side.
+        """
+        if self._header.accessor is not None:
+            self._header.set_bool(15, True)
+        if self._wake is not None:
+            self._wake.notify()
+            self._wake.close()
+        if self._side_channel is not None:
+            self._side_channel.close()
+        self._header.close()
+        self._body.delete()
+
+    def _delete(self) -> None:
+        if self._wake is not None:
+            self._wake.close()
+        if self._side_channel is not None:
+            self._side_channel.close()
+        self._header.delete()
+        self._body.delete()
@@ -0,0 +1,110 @@
+"""
+Runs a MockUnityPeer as a standalone process so the Python side of the shared
+memory protocol can be driven end to end without a Unity build. It accepts the
+command line of a Unity player : UnityEnvironment passes --memory-path and the
+unknown Unity arguments (-batchmode, -nographics...) are ignored.
+
+python -m mlagents_dots_envs.mock_unity.mock_unity_process --memory-path <id>
+--behavior Agents:1000:64:2 --step-time 0.001
+"""
+import argparse
+import os
+import stat
+import sys
+from typing import List, Optional, Tuple
+
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior, MockUnityPeer
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+
+DEFAULT_BEHAVIOR = "Agents:100:8:2"
+_MODULE = "mlagents_dots_envs.mock_unity.mock_unity_process"
+
+
+def _parse_shape(text: str) -> Tuple[int, ...]:
+    return tuple(int(size) for size in text.split("x"))
+
+
+def parse_behavior(text: str) -> MockBehavior:
+    """
+    Parses a behavior description of the form
+    NAME:AGENTS:OBS_SHAPES[:CONTINUOUS_ACTIONS[:EPISODE_LENGTH]] where OBS_SHAPES is
+    a comma separated list of observation shapes like 64 or 84x84x3.
+    :string text: The behavior description
+    :return: The MockBehavior it describes
+    """
+    fields = text.split(":")
+    if not 3 <= len(fields) <= 5 or not fields[0]:
+        raise ValueError(
+            f"Invalid behavior {text}, expected "
+            "NAME:AGENTS:OBS_SHAPES[:CONTINUOUS_ACTIONS[:EPISODE_LENGTH]]"
+        )
+    try:
+        shapes = [_parse_shape(shape) for shape in fields[2].split(",")]
+        numbers = [int(field) for field in [fields[1]] + fields[3:]]
+    except ValueError:
+        raise ValueError(f"Invalid behavior {text}, sizes must be integers")
+    if any(n < 0 for n in numbers) or any(min(s) <= 0 for s in shapes):
+        raise ValueError(f"Invalid behavior {text}, sizes must be positive")
+    n_agents, continuous, episode_length = (numbers + [0, 0])[:3]
+    return MockBehavior(
+        fields[0],
+        n_agents,
+        shapes,
+        continuous_action_size=continuous,
+        episode_length=episode_length,
+    )
+
+
+def write_launcher(path: str) -> str:
+    """
+    Writes an executable that starts this module with the current interpreter,
+    so it can be given as the file_name of a UnityEnvironment.
+    :string path: Where to write the launcher
+    :return: The path of the launcher
+    """
+    package_root = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    with open(path, "w") as f:
+        f.write(
+            "#!/bin/sh\n"
+            f'PYTHONPATH="{package_root}${{PYTHONPATH:+:$PYTHONPATH}}" '
+            f'exec "{sys.executable}" -m {_MODULE} "$@"\n'
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--memory-path", required=True)
+    parser.add_argument(
+        "--behavior",
+        action="append",
+        type=parse_behavior,
+        dest="behaviors",
+        help="NAME:AGENTS:OBS_SHAPES[:CONTINUOUS_ACTIONS[:EPISODE_LENGTH]], "
+        f"can be repeated. Defaults to {DEFAULT_BEHAVIOR}",
+    )
+    parser.add_argument(
+        "--step-time", type=float, default=0.0, help="Seconds simulated per step"
+    )
+    parser.add_argument("--timeout-wait", type=float, default=60)
+    parser.add_argument(
+        "--supported-features",
+        type=int,
+        default=int(MockUnityPeer.SUPPORTED_FEATURES),
+        help="The HeaderFeatures flags the peer acknowledges",
+    )
+    args, _ = parser.parse_known_args(argv)
+    peer = MockUnityPeer(
+        args.memory_path,
+        args.behaviors or [parse_behavior(DEFAULT_BEHAVIOR)],
+        supported_features=HeaderFeatures(args.supported_features),
+        timeout_wait=args.timeout_wait,
+    )
+    peer.run(args.step_time)
+
+
+if __name__ == "__main__":
+    main()
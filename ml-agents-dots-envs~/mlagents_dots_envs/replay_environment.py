@@ -0,0 +1,222 @@
+import bisect
+import uuid
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from mlagents_envs.base_env import (
+    ActionTuple,
+    BaseEnv,
+    BehaviorMapping,
+    BehaviorName,
+    BehaviorSpec,
+    DecisionSteps,
+    TerminalSteps,
+)
+from mlagents_envs.exception import (
+    UnityActionException,
+    UnityCommunicationException,
+    UnityEnvironmentException,
+)
+from mlagents_envs.side_channel.side_channel import SideChannel
+from mlagents_envs.side_channel.side_channel_manager import SideChannelManager
+
+from mlagents_dots_envs.shared_memory.backing_store import (
+    BackingStore,
+    default_backing_store,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_body import SharedMemoryBody
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+from mlagents_dots_envs.shared_memory.step_log import (
+    RecordKind,
+    StepFlags,
+    StepLogReader,
+    StepRecord,
+)
+from mlagents_dots_envs.unity_environment import validate_action
+
+
+class ReplayEnvironment(BaseEnv):
+    """
+    Serves the steps recorded by a UnityEnvironment created with a record_path,
+    without Unity. The recorded RL data is copied into a shared memory body and
+    read with the same code as the UnityEnvironment, so the trainer sees the
+    same steps at memory speed. The actions are checked and written but do not
+    change the recorded steps.
+    """
+
+    def __init__(
+        self,
+        log_path: str,
+        side_channels: Optional[List[SideChannel]] = None,
+        loop: bool = True,
+        backing_store: Optional[BackingStore] = None,
+        normalize_observations: bool = True,
+    ):
+        """
+        :string log_path: The log written with the record_path of a
+        UnityEnvironment
+        :list side_channels: Side channels receiving the recorded side channel
+        data. The messages they send are dropped.
+        :bool loop: If true, the replay starts again from the first reset at the
+        end of the log. Otherwise stepping past the end raises a
+        UnityCommunicationException.
+        :param backing_store: Where the shared memory file is created
+        :bool normalize_observations: See UnityEnvironment
+        """
+        self._reader = StepLogReader(log_path)
+        self._side_channels_manager = SideChannelManager(side_channels)
+        self._loop = loop
+        self._normalize_observations = normalize_observations
+        backing_store = backing_store or default_backing_store()
+        self._file_name = backing_store.get_file_path(str(uuid.uuid1()))
+        self._hints = backing_store.hints
+        self._body: Optional[SharedMemoryBody] = None
+        self._layout: Optional[int] = None
+        self._file_number = 0
+        self._env_specs: Dict[str, BehaviorSpec] = {}
+        self._steps = [
+            index
+            for index, record in enumerate(self._reader)
+            if record.kind == RecordKind.STEP and not record.flags & StepFlags.QUERY
+        ]
+        self._resets = [
+            position
+            for position, index in enumerate(self._steps)
+            if self._reader[index].flags & StepFlags.RESET
+        ]
+        if not self._steps:
+            self._reader.close()
+            raise UnityEnvironmentException(f"{log_path} does not contain any step")
+        # The position in self._steps of the current step
+        self._position = 0
+        self._load(0)
+
+    @property
+    def n_steps(self) -> int:
+        """
+        The number of steps in the log
+        """
+        return len(self._steps)
+
+    @property
+    def position(self) -> int:
+        """
+        The index of the current step in the log
+        """
+        return self._position
+
+    @property
+    def behavior_specs(self) -> BehaviorMapping:
+        return BehaviorMapping(self._env_specs)
+
+    def _body_for(self, record: StepRecord) -> SharedMemoryBody:
+        body = self._body
+        if body is not None and self._layout == record.layout:
+            return body
+        # Unity laid out the RL data in a new file, parse the sections again
+        if body is not None:
+            body.delete()
+        self._file_number += 1
+        body = self._body = SharedMemoryBody(
+            self._file_name + "_" * self._file_number,
+            create_file=True,
+            side_channel_buffer_size=4,
+            rl_data_buffer_size=len(record.data),
+            hints=self._hints,
+            observation_dtypes=bool(
+                record.features & HeaderFeatures.OBSERVATION_DTYPES
+            ),
+            section_counters=bool(record.features & HeaderFeatures.SECTION_COUNTERS),
+            normalize_observations=self._normalize_observations,
+        )
+        body.rl_data = record.data  # type: ignore
+        self._layout = record.layout
+        self._env_specs = body.generate_specs()
+        return body
+
+    def _load(self, position: int) -> None:
+        index = self._steps[position]
+        record = self._reader[index]
+        body = self._body_for(record)
+        offset = body.rl_data_offset
+        body.accessor[offset : offset + len(record.data)] = record.data
+        body.clear_steps()
+        record.data.release()
+        self._position = position
+        # The side channel data Python read after this step
+        for index in range(index + 1, len(self._reader)):
+            record = self._reader[index]
+            if record.kind != RecordKind.SIDE_CHANNEL:
+                break
+            self._side_channels_manager.process_side_channel_message(
+                bytearray(record.data)
+            )
+            record.data.release()
+
+    def _restart(self) -> int:
+        if not self._loop or not self._resets:
+            raise UnityCommunicationException("The end of the step log was reached.")
+        return self._resets[0]
+
+    def step(self) -> None:
+        # Drop the messages of the side channels like Unity would consume them
+        self._side_channels_manager.generate_side_channel_messages()
+        position = self._position + 1
+        self._load(position if position < len(self._steps) else self._restart())
+
+    def reset(self) -> None:
+        self._side_channels_manager.generate_side_channel_messages()
+        position = bisect.bisect_right(self._resets, self._position)
+        if position < len(self._resets):
+            self._load(self._resets[position])
+        else:
+            self._load(self._restart())
+
+    def close(self) -> None:
+        if self._body is not None:
+            self._body.delete()
+            self._body = None
+        self._reader.close()
+
+    def _assert_behavior_exists(self, behavior_name: BehaviorName) -> None:
+        if behavior_name not in self._env_specs:
+            raise UnityActionException(
+                f"The behavior {behavior_name} does not correspond to one existing "
+                f"in the environment"
+            )
+
+    def set_actions(self, behavior_name: BehaviorName, action: ActionTuple) -> None:
+        self._assert_behavior_exists(behavior_name)
+        assert self._body is not None
+        expected_n_agents = self._body.get_n_decisions_requested(behavior_name)
+        validate_action(
+            behavior_name, self._env_specs[behavior_name], expected_n_agents, action
+        )
+        self._body.set_actions(behavior_name, action)
+
+    def set_action_for_agent(
+        self, behavior_name: BehaviorName, agent_id: int, action: ActionTuple
+    ) -> None:
+        self._assert_behavior_exists(behavior_name)
+        assert self._body is not None
+        validate_action(behavior_name, self._env_specs[behavior_name], 1, action)
+        try:
+            self._body.set_actions_for_agents(
+                behavior_name, np.array([agent_id]), action
+            )
+        except KeyError as e:
+            raise UnityActionException(e.args[0]) from e
+
+    def get_steps(
+        self, behavior_name: BehaviorName
+    ) -> Tuple[DecisionSteps, TerminalSteps]:
+        self._assert_behavior_exists(behavior_name)
+        assert self._body is not None
+        return (
+            self._body.get_decision_steps(behavior_name),
+            self._body.get_terminal_steps(behavior_name),
+        )
+
+    def get_all_steps(self) -> Dict[str, Tuple[DecisionSteps, TerminalSteps]]:
+        assert self._body is not None
+        return self._body.get_all_steps()
@@ -0,0 +1,104 @@
+import mmap
+import os
+import sys
+import tempfile
+from typing import NamedTuple, Optional
+
+from mlagents_envs.logging_util import get_logger
+
+logger = get_logger(__name__)
+
+# Memory backed file system available on most Linux distributions
+TMPFS_DIRECTORY = "/dev/shm"
+
+
+class MemoryHints(NamedTuple):
+    """
+    Hints given to the kernel when mapping a shared memory file. They are ignored
+    on the platforms that do not support them.
+    """
+
+    # Fault in all the pages of the file when mapping it (MAP_POPULATE)
+    populate: bool = False
+    # Back the mapping with transparent huge pages (MADV_HUGEPAGE)
+    huge_pages: bool = False
+    # Start reading the pages ahead of their first access (MADV_WILLNEED)
+    will_need: bool = False
+
+
+class BackingStore:
+    """
+    Decides where the shared memory files are created and how they are mapped.
+    Unity receives the absolute path of the header file so it creates its files
+    in the same directory.
+    """
+
+    DIRECTORY = "ml-agents"
+
+    def __init__(
+        self, directory: Optional[str] = None, hints: MemoryHints = MemoryHints()
+    ):
+        """
+        :string directory: The directory in which the ml-agents folder containing
+        the files is created. Defaults to the temporary directory.
+        :param hints: The MemoryHints used when mapping the files
+        """
+        self.directory = directory if directory is not None else tempfile.gettempdir()
+        self.hints = hints
+
+    def get_file_path(self, file_name: str) -> str:
+        return os.path.join(self.directory, self.DIRECTORY, file_name)
+
+
+def tmpfs_available() -> bool:
+    return sys.platform.startswith("linux") and os.access(
+        TMPFS_DIRECTORY, os.W_OK | os.X_OK
+    )
+
+
+def default_backing_store(hints: MemoryHints = MemoryHints()) -> BackingStore:
+    """
+    Returns a BackingStore in /dev/shm when available so the files never hit the
+    disk, in the temporary directory otherwise.
+    """
+    if tmpfs_available():
+        return BackingStore(TMPFS_DIRECTORY, hints)
+    return BackingStore(hints=hints)
+
+
+def create_file(file_path: str, size: int) -> None:
+    """
+    Creates a file of size zero bytes without writing them. The pages are only
+    allocated when first accessed.
+    """
+    fd = os.open(file_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def map_file(file_path: str, hints: MemoryHints = MemoryHints()) -> mmap.mmap:
+    """
+    Memory-maps the whole file with read and write access.
+    """
+    kwargs = {}
+    populate = getattr(mmap, "MAP_POPULATE", None)
+    if hints.populate and populate is not None:
+        kwargs["flags"] = mmap.MAP_SHARED | populate
+    with open(file_path, "r+b") as f:
+        # size 0 means whole file
+        accessor = mmap.mmap(f.fileno(), 0, **kwargs)
+    advices = []
+    if hints.huge_pages:
+        advices.append(getattr(mmap, "MADV_HUGEPAGE", None))
+    if hints.will_need:
+        advices.append(getattr(mmap, "MADV_WILLNEED", None))
+    for advice in advices:
+        if advice is None or not hasattr(accessor, "madvise"):
+            continue
+        try:
+            accessor.madvise(advice)
+        except OSError as e:
+            logger.debug(f"madvise {advice} failed on {file_path}: {e}")
+    return accessor
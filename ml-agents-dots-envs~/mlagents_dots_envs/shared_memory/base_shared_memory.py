@@ -1,39 +1,61 @@
 from abc import ABC
 import os
-import tempfile
-import mmap
 import numpy as np
 import struct
 import uuid
 from typing import Tuple
 
+from mlagents_dots_envs.shared_memory.backing_store import (
+    BackingStore,
+    MemoryHints,
+    create_file as create_sparse_file,
+    map_file,
+)
+
 
 class BaseSharedMemory(ABC):
-    DIRECTORY = "ml-agents"
+    DIRECTORY = BackingStore.DIRECTORY
 
-    def __init__(self, file_name: str, create_file: bool = False, size: int = 0):
+    def __init__(
+        self,
+        file_name: str,
+        create_file: bool = False,
+        size: int = 0,
+        hints: MemoryHints = MemoryHints(),
+    ):
         """
         Creates a bare bone shared memory wrapper that connects or creates a shared
         memory file.
-        :string file_name: The name of the file used for shared memory
+        :string file_name: The name of the file used for shared memory, or its
+        absolute path
         :bool create_file: If true, the file will be created (any existing file with
         that name will be deleted).
         :int size: When creating the file, specifies its length in bytes
+        :param hints: The MemoryHints used to map the file
         """
-        directory = os.path.join(tempfile.gettempdir(), self.DIRECTORY)
+        file_path = self.get_file_path(file_name)
+        directory = os.path.dirname(file_path)
         if not os.path.exists(directory):
             os.makedirs(directory)
-        file_path = os.path.join(directory, file_name)
         if create_file:
             if os.path.exists(file_path):
                 os.remove(file_path)
-            data = bytearray(size)
-            with open(file_path, "w+b") as f:
-                f.write(data)
-        with open(file_path, "r+b") as f:
-            # memory-map the file, size 0 means whole file
-            self.accessor = mmap.mmap(f.fileno(), 0)
+            create_sparse_file(file_path, size)
+        self.accessor = map_file(file_path, hints)
         self._file_path = file_path
+        self._hints = hints
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    @classmethod
+    def get_file_path(cls, file_name: str) -> str:
+        """
+        Returns the path of the shared memory file with the given name. Absolute
+        paths are returned unchanged.
+        """
+        return BackingStore().get_file_path(file_name)
 
     def get_int(self, offset: int) -> Tuple[int, int]:
         """
@@ -82,7 +104,9 @@ class BaseSharedMemory(ABC):
         :param t: The dtype of the data to retrieve.
         :return: A new numpy array with the data from the shared memory
         """
-        count = np.prod(shape)
+        count = 1
+        for dim in shape:
+            count *= dim
         return np.frombuffer(
             buffer=self.accessor, dtype=t, count=count, offset=offset
         ).reshape(shape)
@@ -157,13 +181,38 @@ class BaseSharedMemory(ABC):
         bytes_data = data.tobytes()
         self.accessor[offset : offset + len(bytes_data)] = bytes_data
 
+    def resize(self, size: int) -> None:
+        """
+        Grows the file to size bytes without moving its content and maps it again.
+        """
+        self.close()
+        fd = os.open(self._file_path, os.O_RDWR)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        self.accessor = map_file(self._file_path, self._hints)
+
+    def remap(self) -> None:
+        """
+        Maps the file again after it was grown by the other side.
+        """
+        self.close()
+        self.accessor = map_file(self._file_path, self._hints)
+
     def close(self) -> None:
         """
         Closes the shared memory reader and writter. This will not delete the file but
         remove access to it.
         """
         if self.accessor is not None:
-            self.accessor.close()
+            try:
+                self.accessor.close()
+            except BufferError:
+                # Arrays returned by get_ndarray still reference the memory, it
+                # will be unmapped once they are garbage collected.
+                pass
             self.accessor = None  # type: ignore
 
     def delete(self) -> None:
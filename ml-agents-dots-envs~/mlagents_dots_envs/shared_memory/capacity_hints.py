@@ -0,0 +1,79 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+
+
+class CapacityHint(NamedTuple):
+    """
+    Declares the final size of a behavior so that Unity lays out its section of the
+    RL data once instead of growing it as Agents spawn.
+    """
+
+    behavior_name: str
+    # The maximum number of Agents requesting a decision in a single step
+    max_n_agents: int
+    # The shapes of the observations. Unity ignores the hint if they do not
+    # match the observations of the behavior. None means any shape.
+    observation_shapes: Optional[List[Tuple[int, ...]]] = None
+
+
+def capacity_hints_size(hints: List[CapacityHint]) -> int:
+    """
+    The number of bytes needed to write the hints in the shared memory
+    """
+    size = 4
+    for hint in hints:
+        n_obs = len(hint.observation_shapes or [])
+        size += 1 + len(hint.behavior_name) + 4 + 4 + 12 * n_obs
+    return size
+
+
+def write_capacity_hints(
+    mem: BaseSharedMemory, offset: int, hints: List[CapacityHint]
+) -> int:
+    """
+    Writes the capacity hints in the shared memory
+     - int : number of hints
+     for each hint :
+     - string : behavior name
+     - int : maximum number of Agents
+     - int : number of observations, 0 if the shapes are not hinted
+     for each observation :
+       - 3 int : shape
+    :return: The offset after the hints
+    """
+    offset = mem.set_int(offset, len(hints))
+    for hint in hints:
+        shapes = hint.observation_shapes or []
+        offset = mem.set_string(offset, hint.behavior_name)
+        offset = mem.set_int(offset, hint.max_n_agents)
+        offset = mem.set_int(offset, len(shapes))
+        for shape in shapes:
+            if len(shape) > 3:
+                raise ValueError(
+                    f"Observations of {hint.behavior_name} have more than 3 dimensions"
+                )
+            for i in range(3):
+                offset = mem.set_int(offset, shape[i] if i < len(shape) else 0)
+    return offset
+
+
+def read_capacity_hints(
+    mem: BaseSharedMemory, offset: int
+) -> Tuple[List[CapacityHint], int]:
+    n_hints, offset = mem.get_int(offset)
+    hints: List[CapacityHint] = []
+    for _ in range(n_hints):
+        name, offset = mem.get_string(offset)
+        max_n_agents, offset = mem.get_int(offset)
+        n_obs, offset = mem.get_int(offset)
+        shapes: List[Tuple[int, ...]] = []
+        for _ in range(n_obs):
+            shape: Tuple[int, ...] = ()
+            for _ in range(3):
+                s, offset = mem.get_int(offset)
+                if s != 0:
+                    shape += (s,)
+            shapes.append(shape)
+        hints.append(CapacityHint(name, max_n_agents, shapes if n_obs > 0 else None))
+    return hints, offset
@@ -1,6 +1,9 @@
+import struct
 import numpy as np
 
-from typing import Tuple, Optional, NamedTuple, List
+from enum import IntEnum
+from functools import lru_cache
+from typing import Dict, Tuple, Optional, NamedTuple, List
 from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
 
 from mlagents_envs.base_env import (
@@ -12,6 +15,48 @@ from mlagents_envs.base_env import (
 )
 
 
+class ObservationDtype(IntEnum):
+    """
+    The type of the values of an observation in the shared memory. Only sent by
+    Unity when it acknowledged HeaderFeatures.OBSERVATION_DTYPES, the observations
+    are FLOAT32 otherwise.
+    """
+
+    FLOAT32 = 0
+    UINT8 = 1
+    FLOAT16 = 2
+    # Affine quantization per channel, see ObservationQuantization
+    INT8 = 3
+    INT16 = 4
+
+    @property
+    def numpy_dtype(self) -> np.dtype:
+        return _NUMPY_DTYPES[self]
+
+    @property
+    def quantized(self) -> bool:
+        return self in _QUANTIZED_DTYPES
+
+
+_NUMPY_DTYPES = {
+    ObservationDtype.FLOAT32: np.dtype(np.float32),
+    ObservationDtype.UINT8: np.dtype(np.uint8),
+    ObservationDtype.FLOAT16: np.dtype(np.float16),
+    ObservationDtype.INT8: np.dtype(np.int8),
+    ObservationDtype.INT16: np.dtype(np.int16),
+}
+
+
+class ObservationQuantization(NamedTuple):
+    """
+    The parameters of an INT8 or INT16 observation. The value of channel c (the
+    last dimension of the observation) is quantized * scale[c] + offset[c].
+    """
+
+    scale: Tuple[float, ...]
+    offset: Tuple[float, ...]
+
+
 class RLDataOffsets(NamedTuple):
     """
     Contains the offsets to the data for a section of the RL data
@@ -21,6 +66,13 @@ class RLDataOffsets(NamedTuple):
     name: str
     max_n_agents: int
     behavior_spec: BehaviorSpec
+    obs_dtypes: Tuple[ObservationDtype, ...]
+    # The quantization of each observation, None if it is not quantized
+    obs_quantization: Tuple[Optional[ObservationQuantization], ...]
+
+    # offset of the counters of the decision observations and of the action mask,
+    # None without HeaderFeatures.SECTION_COUNTERS
+    section_counters_offset: Optional[int]
 
     # offsets: decision steps
     decision_n_agents_offset: int
@@ -40,123 +92,312 @@ class RLDataOffsets(NamedTuple):
     continuous_action_offset: int
     discrete_action_offset: int
 
+    def shifted(self, delta: int) -> "RLDataOffsets":
+        """
+        Returns the offsets of the same section moved by delta bytes. Used to
+        address the copies of a section in the other RL data banks.
+        """
+        if delta == 0:
+            return self
+        return self._replace(
+            section_counters_offset=None
+            if self.section_counters_offset is None
+            else self.section_counters_offset + delta,
+            decision_n_agents_offset=self.decision_n_agents_offset + delta,
+            decision_obs_offset=tuple(o + delta for o in self.decision_obs_offset),
+            decision_rewards_offset=self.decision_rewards_offset + delta,
+            decision_agent_id_offset=self.decision_agent_id_offset + delta,
+            masks_offset=None
+            if self.masks_offset is None
+            else self.masks_offset + delta,
+            termination_n_agents_offset=self.termination_n_agents_offset + delta,
+            termination_obs_offset=tuple(
+                o + delta for o in self.termination_obs_offset
+            ),
+            termination_reward_offset=self.termination_reward_offset + delta,
+            termination_status_offset=self.termination_status_offset + delta,
+            termination_agent_id_offset=self.termination_agent_id_offset + delta,
+            continuous_action_offset=self.continuous_action_offset + delta,
+            discrete_action_offset=self.discrete_action_offset + delta,
+        )
+
+    @staticmethod
+    def from_mem(
+        mem: BaseSharedMemory,
+        offset: int,
+        observation_dtypes: bool = False,
+        section_counters: bool = False,
+    ) -> Tuple["RLDataOffsets", int]:
+        """
+        Reads the specs of the section starting at offset and computes the
+        offsets of its data.
+        :bool observation_dtypes: True if the observation specs contain their
+        ObservationDtype (HeaderFeatures.OBSERVATION_DTYPES)
+        :bool section_counters: True if the section contains the change counters
+        of its data (HeaderFeatures.SECTION_COUNTERS)
+        :return: A tuple containing the offsets and the offset of the next section
+        """
+        spec_size = _spec_size(mem.accessor, offset, observation_dtypes)
+        spec_bytes = bytes(mem.accessor[offset : offset + spec_size])
+        return _section_layout(spec_bytes, offset, observation_dtypes, section_counters)
+
     @staticmethod
-    def from_mem(mem: BaseSharedMemory, offset: int) -> Tuple["RLDataOffsets", int]:
-        # Generates the offsets
-        # string : behavior name
-        # int : 4 bytes : maximum number of Agents
-
-        # int: number_observations
-        # for each observation :
-        #     3 int : shape
-        #     3 int : dimension property
-        #     1 int : observation type
-        # int: number of continuous actions
-        # int: number discrete branches
-        # for each discrete branch :
-        #     1 int : number of discrete actions in branch
-
-        # end of specs
-
-        # 4 bytes : n_agents at current step
-        # ? Bytes : the data : obs,reward,done,max_step,agent_id,masks,action
-
-        # Get the specs of the group
-        name, offset = mem.get_string(offset)
-        max_n_agents, offset = mem.get_int(offset)
-
-        n_obs, offset = mem.get_int(offset)
-        obs_specs: List[ObservationSpec] = []
-        for i in range(n_obs):
-            shape: Tuple[int, ...] = ()
-            for _ in range(3):
-                s, offset = mem.get_int(offset)
-                if s != 0:
-                    shape += (s,)
-            dim_prop: Tuple[DimensionProperty] = ()
-            for _ in range(3):
-                dp, offset = mem.get_int(offset)
-                if len(dim_prop) < len(shape):
-                    dim_prop += (DimensionProperty(dp),)
-            ot, offset = mem.get_int(offset)
-            obs_type = ObservationType(ot)
-            obs_specs.append(ObservationSpec(shape, dim_prop, obs_type, f"obs_{i}"))
-
-        n_c_action, offset = mem.get_int(offset)
-        n_d_action, offset = mem.get_int(offset)
-        d_action_branches: Tuple[int, ...] = ()
-        for _ in range(n_d_action):
-            a_size, offset = mem.get_int(offset)
-            d_action_branches += (a_size,)
-        act_specs = ActionSpec(n_c_action, d_action_branches)
-        behavior_spec = BehaviorSpec(obs_specs, act_specs)
-
-        #  Compute the offsets for decision steps
-        # n_agents
-        decision_n_agents_offset = offset
-        _, offset = mem.get_int(offset)
-        # observations
-        decision_obs_offset: Tuple[int, ...] = ()
-        for spec in obs_specs:
-            decision_obs_offset += (offset,)
-            offset += 4 * max_n_agents * np.prod(spec.shape)
-        # rewards
-        decision_rewards_offset = offset
-        offset += 4 * max_n_agents
-        # agent id
-        decision_agent_id_offset = offset
-        offset += 4 * max_n_agents
-        # mask
-        if act_specs.discrete_size == 0:
-            mask_offset = None
-        else:
-            mask_offset = offset
-            offset += max_n_agents * int(np.sum(act_specs.discrete_branches))
-
-        #  Compute the offsets for termination steps
-        # n_agents
-        termination_n_agents_offset = offset
-        _, offset = mem.get_int(offset)
-        # observations
-        termination_obs_offset: Tuple[int, ...] = ()
-        for spec in obs_specs:
-            termination_obs_offset += (offset,)
-            offset += 4 * max_n_agents * np.prod(np.prod(spec.shape))
-        # rewards
-        termination_reward_offset = offset
-        offset += 4 * max_n_agents
-        # status
-        termination_status_offset = offset
-        offset += max_n_agents
-        # agent id
-        termination_agent_id_offset = offset
-        offset += 4 * max_n_agents
-
-        #  Compute the offsets for actions
-        c_act_offset = offset
-        offset += 4 * max_n_agents * act_specs.continuous_size
-        d_act_offset = offset
-        offset += 4 * max_n_agents * len(act_specs.discrete_branches)
-
-        # Create the object
-        result = RLDataOffsets(
-            name=name,
-            max_n_agents=max_n_agents,
-            behavior_spec=behavior_spec,
-            # decision steps
-            decision_n_agents_offset=decision_n_agents_offset,
-            decision_obs_offset=decision_obs_offset,
-            decision_rewards_offset=decision_rewards_offset,
-            decision_agent_id_offset=decision_agent_id_offset,
-            masks_offset=mask_offset,
-            # termination steps
-            termination_n_agents_offset=termination_n_agents_offset,
-            termination_obs_offset=termination_obs_offset,
-            termination_reward_offset=termination_reward_offset,
-            termination_status_offset=termination_status_offset,
-            termination_agent_id_offset=termination_agent_id_offset,
-            # actions
-            continuous_action_offset=c_act_offset,
-            discrete_action_offset=d_act_offset,
+    def clear_cache() -> None:
+        """
+        Forgets the layouts parsed so far
+        """
+        _section_layout.cache_clear()
+        _parse_layout.cache_clear()
+
+
+# Generates the offsets
+# string : behavior name
+# int : 4 bytes : maximum number of Agents
+
+# int: number_observations
+# for each observation :
+#     3 int : shape
+#     3 int : dimension property
+#     1 int : observation type
+#     1 int : ObservationDtype (only with HeaderFeatures.OBSERVATION_DTYPES)
+# for each INT8 or INT16 observation, with C its last dimension :
+#     C float : scale
+#     C float : offset
+# int: number of continuous actions
+# int: number discrete branches
+# for each discrete branch :
+#     1 int : number of discrete actions in branch
+
+# end of specs
+
+# only with HeaderFeatures.SECTION_COUNTERS :
+# for each observation :
+#     1 int : change counter of the decision observation
+# 1 int : change counter of the action mask
+# 4 bytes : n_agents at current step
+# ? Bytes : the data : obs,reward,done,max_step,agent_id,masks,action
+_NAME_LENGTH = struct.Struct("<B")
+_AGENTS_AND_OBSERVATIONS = struct.Struct("<2i")
+_OBSERVATION = struct.Struct("<7i")
+_OBSERVATION_WITH_DTYPE = struct.Struct("<8i")
+_ACTIONS = struct.Struct("<2i")
+# Creating enums is slow compared to the rest of the parsing
+_DIMENSION_PROPERTIES: Dict[int, DimensionProperty] = {}
+_OBSERVATION_TYPES: Dict[int, ObservationType] = {}
+
+
+def _dimension_property(value: int) -> DimensionProperty:
+    result = _DIMENSION_PROPERTIES.get(value)
+    if result is None:
+        result = _DIMENSION_PROPERTIES[value] = DimensionProperty(value)
+    return result
+
+
+def _observation_type(value: int) -> ObservationType:
+    result = _OBSERVATION_TYPES.get(value)
+    if result is None:
+        result = _OBSERVATION_TYPES[value] = ObservationType(value)
+    return result
+
+
+def _product(shape: Tuple[int, ...]) -> int:
+    result = 1
+    for s in shape:
+        result *= s
+    return result
+
+
+def _observation_struct(observation_dtypes: bool) -> struct.Struct:
+    return _OBSERVATION_WITH_DTYPE if observation_dtypes else _OBSERVATION
+
+
+_QUANTIZED_DTYPES = {ObservationDtype.INT8, ObservationDtype.INT16}
+
+
+def _n_channels(obs_values: Tuple[int, ...]) -> int:
+    """
+    The last dimension of the shape of an observation spec
+    """
+    shape = [s for s in obs_values[:3] if s != 0]
+    return shape[-1] if shape else 1
+
+
+def _quantization_size(obs_values: Tuple[int, ...]) -> int:
+    """
+    The number of bytes of the quantization parameters of an observation spec
+    """
+    if obs_values[7] not in _QUANTIZED_DTYPES:
+        return 0
+    return 8 * _n_channels(obs_values)
+
+
+def _spec_size(buffer, offset: int, observation_dtypes: bool) -> int:
+    """
+    The number of bytes of the specs of the section starting at offset
+    """
+    observation_struct = _observation_struct(observation_dtypes)
+    size = 1 + _NAME_LENGTH.unpack_from(buffer, offset)[0]
+    _, n_obs = _AGENTS_AND_OBSERVATIONS.unpack_from(buffer, offset + size)
+    size += _AGENTS_AND_OBSERVATIONS.size
+    if observation_dtypes:
+        size += sum(
+            _quantization_size(obs_values)
+            for obs_values in observation_struct.iter_unpack(
+                buffer[offset + size : offset + size + n_obs * observation_struct.size]
+            )
         )
-        return result, offset
+    size += n_obs * observation_struct.size
+    _, n_branches = _ACTIONS.unpack_from(buffer, offset + size)
+    return size + _ACTIONS.size + 4 * n_branches
+
+
+@lru_cache(maxsize=4096)
+def _section_layout(
+    spec_bytes: bytes, offset: int, observation_dtypes: bool, section_counters: bool
+) -> Tuple[RLDataOffsets, int]:
+    """
+    The offsets of a section starting at offset. Memoized so that a new file with
+    an unchanged layout returns the same RLDataOffsets.
+    """
+    layout, section_size = _parse_layout(
+        spec_bytes, observation_dtypes, section_counters
+    )
+    return layout.shifted(offset), offset + section_size
+
+
+@lru_cache(maxsize=1024)
+def _parse_layout(
+    spec_bytes: bytes, observation_dtypes: bool, section_counters: bool
+) -> Tuple[RLDataOffsets, int]:
+    """
+    Parses the specs of a section and computes the offsets of its data relative
+    to the start of the section. Memoized on the spec bytes so that sections that
+    did not change between two files reuse the same RLDataOffsets and
+    BehaviorSpec.
+    :return: A tuple containing the relative offsets and the size of the section
+    """
+    name_length = _NAME_LENGTH.unpack_from(spec_bytes, 0)[0]
+    name = spec_bytes[1 : 1 + name_length].decode("ascii")
+    offset = 1 + name_length
+    max_n_agents, n_obs = _AGENTS_AND_OBSERVATIONS.unpack_from(spec_bytes, offset)
+    offset += _AGENTS_AND_OBSERVATIONS.size
+    observation_struct = _observation_struct(observation_dtypes)
+    obs_specs: List[ObservationSpec] = []
+    obs_dtypes: Tuple[ObservationDtype, ...] = ()
+    quantized_channels: List[int] = []
+    for i, obs_values in enumerate(
+        observation_struct.iter_unpack(
+            spec_bytes[offset : offset + n_obs * observation_struct.size]
+        )
+    ):
+        shape = tuple(s for s in obs_values[:3] if s != 0)
+        dim_prop = tuple(
+            _dimension_property(dp) for dp in obs_values[3 : 3 + len(shape)]
+        )
+        obs_type = _observation_type(obs_values[6])
+        obs_specs.append(ObservationSpec(shape, dim_prop, obs_type, f"obs_{i}"))
+        obs_dtype = ObservationDtype.FLOAT32
+        if observation_dtypes:
+            obs_dtype = ObservationDtype(obs_values[7])
+        obs_dtypes += (obs_dtype,)
+        quantized_channels.append(_n_channels(obs_values) if obs_dtype.quantized else 0)
+    offset += n_obs * observation_struct.size
+    obs_quantization: Tuple[Optional[ObservationQuantization], ...] = ()
+    for n_channels in quantized_channels:
+        if n_channels == 0:
+            obs_quantization += (None,)
+            continue
+        values = struct.unpack_from(f"<{2 * n_channels}f", spec_bytes, offset)
+        offset += 8 * n_channels
+        obs_quantization += (
+            ObservationQuantization(values[:n_channels], values[n_channels:]),
+        )
+    n_c_action, n_d_action = _ACTIONS.unpack_from(spec_bytes, offset)
+    offset += _ACTIONS.size
+    d_action_branches = struct.unpack_from(f"<{n_d_action}i", spec_bytes, offset)
+    offset += 4 * n_d_action
+    act_specs = ActionSpec(n_c_action, d_action_branches)
+    behavior_spec = BehaviorSpec(obs_specs, act_specs)
+    obs_sizes = [
+        dtype.numpy_dtype.itemsize * max_n_agents * _product(spec.shape)
+        for spec, dtype in zip(obs_specs, obs_dtypes)
+    ]
+
+    # change counters
+    section_counters_offset = None
+    if section_counters:
+        section_counters_offset = offset
+        offset += 4 * (n_obs + 1)
+
+    #  Compute the offsets for decision steps
+    # n_agents
+    decision_n_agents_offset = offset
+    offset += 4
+    # observations
+    decision_obs_offset: Tuple[int, ...] = ()
+    for obs_size in obs_sizes:
+        decision_obs_offset += (offset,)
+        offset += obs_size
+    # rewards
+    decision_rewards_offset = offset
+    offset += 4 * max_n_agents
+    # agent id
+    decision_agent_id_offset = offset
+    offset += 4 * max_n_agents
+    # mask
+    if act_specs.discrete_size == 0:
+        mask_offset = None
+    else:
+        mask_offset = offset
+        offset += max_n_agents * sum(d_action_branches)
+
+    #  Compute the offsets for termination steps
+    # n_agents
+    termination_n_agents_offset = offset
+    offset += 4
+    # observations
+    termination_obs_offset: Tuple[int, ...] = ()
+    for obs_size in obs_sizes:
+        termination_obs_offset += (offset,)
+        offset += obs_size
+    # rewards
+    termination_reward_offset = offset
+    offset += 4 * max_n_agents
+    # status
+    termination_status_offset = offset
+    offset += max_n_agents
+    # agent id
+    termination_agent_id_offset = offset
+    offset += 4 * max_n_agents
+
+    #  Compute the offsets for actions
+    c_act_offset = offset
+    offset += 4 * max_n_agents * act_specs.continuous_size
+    d_act_offset = offset
+    offset += 4 * max_n_agents * len(act_specs.discrete_branches)
+
+    # Create the object
+    result = RLDataOffsets(
+        name=name,
+        max_n_agents=max_n_agents,
+        behavior_spec=behavior_spec,
+        obs_dtypes=obs_dtypes,
+        obs_quantization=obs_quantization,
+        section_counters_offset=section_counters_offset,
+        # decision steps
+        decision_n_agents_offset=decision_n_agents_offset,
+        decision_obs_offset=decision_obs_offset,
+        decision_rewards_offset=decision_rewards_offset,
+        decision_agent_id_offset=decision_agent_id_offset,
+        masks_offset=mask_offset,
+        # termination steps
+        termination_n_agents_offset=termination_n_agents_offset,
+        termination_obs_offset=termination_obs_offset,
+        termination_reward_offset=termination_reward_offset,
+        termination_status_offset=termination_status_offset,
+        termination_agent_id_offset=termination_agent_id_offset,
+        # actions
+        continuous_action_offset=c_act_offset,
+        discrete_action_offset=d_act_offset,
+    )
+    return result, offset
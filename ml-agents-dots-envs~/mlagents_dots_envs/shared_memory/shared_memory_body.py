@@ -1,7 +1,16 @@
+import struct
 import numpy as np
 from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.backing_store import MemoryHints
 from mlagents_dots_envs.shared_memory.rl_data_offsets import RLDataOffsets
-from typing import Dict, List
+from mlagents_dots_envs.shared_memory.step_views import (
+    StepViews,
+    DecisionViews,
+    TerminalViews,
+    LazyDecisionSteps,
+    LazyTerminalSteps,
+)
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 from mlagents_envs.base_env import (
     DecisionSteps,
     TerminalSteps,
@@ -9,8 +18,89 @@ from mlagents_envs.base_env import (
     ActionTuple,
 )
 
+# Number of different agent counts for which the views of a behavior are kept
+MAX_CACHED_AGENT_COUNTS = 16
+
+StepViewsType = TypeVar("StepViewsType", bound=StepViews)
+
+
+def _agent_counts_struct(offset_dict: Dict[str, RLDataOffsets]) -> struct.Struct:
+    """
+    A Struct reading the number of decision and termination steps of every
+    behavior of a bank in one call, skipping the bytes in between. It unpacks from
+    the decision n_agents offset of the first behavior.
+    """
+    positions: List[int] = []
+    for offsets in offset_dict.values():
+        positions += [offsets.decision_n_agents_offset]
+        positions += [offsets.termination_n_agents_offset]
+    fmt = "<"
+    for previous, position in zip(positions, positions[1:]):
+        fmt += f"i{position - previous - 4}x"
+    return struct.Struct(fmt + "i" if positions else fmt)
+
+
+class ActionHandle:
+    """
+    The action buffers of a behavior with its offsets in every bank resolved once.
+    set copies actions into the buffers of the current step without validating
+    them. A handle is only valid until the layout of its SharedMemoryBody changes.
+    """
+
+    def __init__(self, body: "SharedMemoryBody", key: str):
+        self._body = body
+        self._key = key
+        self._bank_offsets = [
+            offset_dict[key] for offset_dict in body._bank_offset_dicts
+        ]
+        action_spec = self._bank_offsets[0].behavior_spec.action_spec
+        self._has_continuous = action_spec.continuous_size > 0
+        self._has_discrete = action_spec.discrete_size > 0
+
+    @property
+    def buffer(self) -> ActionTuple:
+        """
+        Writable views of the actions of the current step, see
+        SharedMemoryBody.get_action_buffer
+        """
+        offsets = self._bank_offsets[self._body.active_bank]
+        return self._body._action_buffer(self._key, offsets)
+
+    def set(self, data: ActionTuple) -> None:
+        """
+        Copies the actions into the shared memory, converting their dtypes. The
+        shapes are not checked : numpy raises a ValueError if they cannot be
+        broadcast to the buffers.
+        """
+        self.copy(data.continuous, data.discrete)
+
+    def copy(
+        self,
+        continuous: np.ndarray,
+        discrete: np.ndarray,
+        buffer: Optional[ActionTuple] = None,
+    ) -> None:
+        """
+        Copies the action arrays into buffer, the buffer of the current step if
+        None, see set.
+        """
+        if buffer is None:
+            buffer = self.buffer
+        if self._has_continuous:
+            np.copyto(buffer.continuous, continuous, casting="unsafe")
+        if self._has_discrete:
+            np.copyto(buffer.discrete, discrete, casting="unsafe")
+
 
 class SharedMemoryBody(BaseSharedMemory):
+    """
+    File organization:
+     - side channel section : int size of the data followed by the data
+     - rl_data_banks RL data sections of rl_data_buffer_size bytes each. All the
+     banks contain the same behavior sections, only the active bank holds the
+     data of the current step.
+    """
+
     def __init__(
         self,
         file_name: str,
@@ -18,37 +108,99 @@ class SharedMemoryBody(BaseSharedMemory):
         copy_from: "SharedMemoryBody" = None,
         side_channel_buffer_size: int = 0,
         rl_data_buffer_size: int = 0,
+        rl_data_banks: int = 1,
+        hints: MemoryHints = MemoryHints(),
+        observation_dtypes: bool = False,
+        normalize_observations: bool = False,
+        section_counters: bool = False,
     ):
-        self._offset_dict: Dict[str, RLDataOffsets] = {}
+        """
+        :bool observation_dtypes: True if Unity acknowledged
+        HeaderFeatures.OBSERVATION_DTYPES
+        :bool section_counters: True if Unity acknowledged
+        HeaderFeatures.SECTION_COUNTERS
+        :bool normalize_observations: If true, the observations that are not
+        float32 are converted to float32 (uint8 ones divided by 255) when accessed
+        """
+        self._observation_dtypes = observation_dtypes
+        self._section_counters = section_counters
+        self._normalize_observations = normalize_observations
+        self._bank_offset_dicts: List[Dict[str, RLDataOffsets]] = [
+            {} for _ in range(rl_data_banks)
+        ]
+        self._active_bank = 0
+        # Views of the arrays of each behavior in each bank for the decision and
+        # the terminal steps, per number of agents
+        self._bank_views: List[Tuple[Dict[str, Dict[int, StepViews]], ...]] = [
+            ({}, {}) for _ in range(rl_data_banks)
+        ]
+        # The steps returned since the last step
+        self._decision_steps: Dict[str, LazyDecisionSteps] = {}
+        self._terminal_steps: Dict[str, LazyTerminalSteps] = {}
+        self._offset_dict: Dict[str, RLDataOffsets] = self._bank_offset_dicts[0]
+        self._action_handles: Dict[str, ActionHandle] = {}
+        self._agent_counts_structs: List[Optional[struct.Struct]] = [
+            None for _ in range(rl_data_banks)
+        ]
+        self._rl_data_banks = rl_data_banks
+        size = side_channel_buffer_size + rl_data_banks * rl_data_buffer_size
         if create_file and copy_from is None:
-            size = side_channel_buffer_size + rl_data_buffer_size
-            super(SharedMemoryBody, self).__init__(file_name, True, size)
+            super(SharedMemoryBody, self).__init__(file_name, True, size, hints)
             self._side_channel_buffer_size = side_channel_buffer_size
             self._rl_data_buffer_size = rl_data_buffer_size
             return
         if create_file and copy_from is not None:
             # can only increase the size of the file
-            size = side_channel_buffer_size + rl_data_buffer_size
-            super(SharedMemoryBody, self).__init__(file_name, True, size)
+            super(SharedMemoryBody, self).__init__(file_name, True, size, hints)
             assert side_channel_buffer_size >= copy_from._side_channel_buffer_size
             assert rl_data_buffer_size >= copy_from._rl_data_buffer_size
+            assert rl_data_banks == copy_from._rl_data_banks
             self._side_channel_buffer_size = side_channel_buffer_size
             self._rl_data_buffer_size = rl_data_buffer_size
             self.side_channel_data = copy_from.side_channel_data
             self.rl_data = copy_from.rl_data
+            self.active_bank = copy_from.active_bank
         if not create_file:
-            size = side_channel_buffer_size + rl_data_buffer_size
-            super(SharedMemoryBody, self).__init__(file_name, False, size)
+            super(SharedMemoryBody, self).__init__(file_name, False, size, hints)
             self._side_channel_buffer_size = side_channel_buffer_size
             self._rl_data_buffer_size = rl_data_buffer_size
             self._refresh_offsets()
 
     def _refresh_offsets(self):
-        self._offset_dict.clear()
+        self._clear_views()
+        self._action_handles.clear()
+        self._agent_counts_structs = [None for _ in range(self._rl_data_banks)]
+        for offset_dict in self._bank_offset_dicts:
+            offset_dict.clear()
         offset = self.rl_data_offset
         while offset < self.rl_data_offset + self._rl_data_buffer_size:
-            data_offsets, offset = RLDataOffsets.from_mem(self, offset)
-            self._offset_dict[data_offsets.name] = data_offsets
+            data_offsets, offset = RLDataOffsets.from_mem(
+                self, offset, self._observation_dtypes, self._section_counters
+            )
+            for bank, offset_dict in enumerate(self._bank_offset_dicts):
+                offset_dict[data_offsets.name] = data_offsets.shifted(
+                    bank * self._rl_data_buffer_size
+                )
+
+    @property
+    def rl_data_banks(self) -> int:
+        return self._rl_data_banks
+
+    @property
+    def active_bank(self) -> int:
+        """
+        The RL data bank get_steps reads from and set_actions writes to.
+        """
+        return self._active_bank
+
+    @active_bank.setter
+    def active_bank(self, bank: int) -> None:
+        if not 0 <= bank < self._rl_data_banks:
+            raise Exception("The shared memory file is corrupted")
+        if bank != self._active_bank:
+            self.clear_steps()
+        self._active_bank = bank
+        self._offset_dict = self._bank_offset_dicts[bank]
 
     @property
     def side_channel_data(self) -> bytearray:
@@ -68,80 +220,213 @@ class SharedMemoryBody(BaseSharedMemory):
     def rl_data_offset(self):
         return self._side_channel_buffer_size
 
+    @property
+    def rl_data_buffer_size(self) -> int:
+        """
+        The size in bytes of one RL data bank
+        """
+        return self._rl_data_buffer_size
+
+    @property
+    def active_rl_data_offset(self) -> int:
+        return self.rl_data_offset + self._active_bank * self._rl_data_buffer_size
+
     @property
     def rl_data(self) -> bytearray:
+        """
+        The content of all the RL data banks
+        """
         offset = self.rl_data_offset
-        size = self._rl_data_buffer_size
+        size = self._rl_data_banks * self._rl_data_buffer_size
         return self.accessor[offset : offset + size]
 
     @rl_data.setter
     def rl_data(self, data: bytearray) -> None:
-        if len(data) > self._rl_data_buffer_size:
+        if len(data) % self._rl_data_banks != 0:
             raise Exception("The shared memory file is corrupted")
-        offset = self.rl_data_offset
-        size = self._rl_data_buffer_size
-        self.accessor[offset : offset + size] = data
+        bank_size = len(data) // self._rl_data_banks
+        if bank_size > self._rl_data_buffer_size:
+            raise Exception("The shared memory file is corrupted")
+        for bank in range(self._rl_data_banks):
+            offset = self.rl_data_offset + bank * self._rl_data_buffer_size
+            self.accessor[offset : offset + bank_size] = data[
+                bank * bank_size : (bank + 1) * bank_size
+            ]
         self._refresh_offsets()
 
     def get_decision_steps(self, key: str) -> DecisionSteps:
-        assert key in self._offset_dict
-        offsets = self._offset_dict[key]
-        n_agents, _ = self.get_int(offsets.decision_n_agents_offset)
-        obs: List[np.ndarray] = []
-        for obs_offset, obs_spec in zip(
-            offsets.decision_obs_offset, offsets.behavior_spec.observation_specs
-        ):
-            obs_shape = (n_agents,) + obs_spec.shape
-            arr = self.get_ndarray(obs_offset, obs_shape, np.float32)
-            obs.append(arr)
-        return DecisionSteps(
-            obs=obs,
-            reward=self.get_ndarray(
-                offsets.decision_rewards_offset, (n_agents), np.float32
-            ),
-            agent_id=self.get_ndarray(
-                offsets.decision_agent_id_offset, (n_agents), np.int32
-            ),
-            action_mask=self._generate_action_masks(offsets, n_agents),
-            # TODO: Communicate these values
-            group_id=np.zeros((n_agents), dtype=np.int32),
-            group_reward=np.zeros((n_agents), dtype=np.float32),
+        """
+        Returns the DecisionSteps of the behavior. Its arrays are only read when
+        accessed and the same object is returned until the next step.
+        """
+        result = self._decision_steps.get(key)
+        if result is None:
+            assert key in self._offset_dict
+            offsets = self._offset_dict[key]
+            n_agents, _ = self.get_int(offsets.decision_n_agents_offset)
+            result = self._new_decision_steps(key, offsets, n_agents)
+        return result
+
+    def _new_decision_steps(
+        self, key: str, offsets: RLDataOffsets, n_agents: int
+    ) -> LazyDecisionSteps:
+        views = self._cached_views(
+            self._decision_views, key, offsets, n_agents, DecisionViews
+        )
+        result = self._decision_steps[key] = LazyDecisionSteps(
+            views, self._normalize_observations
         )
+        return result
 
     def get_terminal_steps(self, key: str) -> TerminalSteps:
+        """
+        Returns the TerminalSteps of the behavior, see get_decision_steps.
+        """
+        result = self._terminal_steps.get(key)
+        if result is None:
+            assert key in self._offset_dict
+            offsets = self._offset_dict[key]
+            n_agents, _ = self.get_int(offsets.termination_n_agents_offset)
+            result = self._new_terminal_steps(key, offsets, n_agents)
+        return result
+
+    def _new_terminal_steps(
+        self, key: str, offsets: RLDataOffsets, n_agents: int
+    ) -> LazyTerminalSteps:
+        views = self._cached_views(
+            self._terminal_views, key, offsets, n_agents, TerminalViews
+        )
+        result = self._terminal_steps[key] = LazyTerminalSteps(
+            views, self._normalize_observations
+        )
+        return result
+
+    def get_all_steps(self) -> Dict[str, Tuple[DecisionSteps, TerminalSteps]]:
+        """
+        Returns the steps of every behavior with at least one Agent requesting a
+        decision or terminating. The numbers of Agents of all the behaviors are
+        read with a single unpack.
+        """
+        result: Dict[str, Tuple[DecisionSteps, TerminalSteps]] = {}
+        if not self._offset_dict:
+            return result
+        counts_struct = self._agent_counts_structs[self._active_bank]
+        if counts_struct is None:
+            counts_struct = _agent_counts_struct(self._offset_dict)
+            self._agent_counts_structs[self._active_bank] = counts_struct
+        first = next(iter(self._offset_dict.values()))
+        counts = counts_struct.unpack_from(
+            self.accessor, first.decision_n_agents_offset
+        )
+        decision_memo, terminal_memo = self._decision_steps, self._terminal_steps
+        for index, (key, offsets) in enumerate(self._offset_dict.items()):
+            n_decisions, n_terminations = counts[2 * index : 2 * index + 2]
+            if n_decisions == 0 and n_terminations == 0:
+                continue
+            decision_steps = decision_memo.get(key)
+            if decision_steps is None:
+                decision_steps = self._new_decision_steps(key, offsets, n_decisions)
+            terminal_steps = terminal_memo.get(key)
+            if terminal_steps is None:
+                terminal_steps = self._new_terminal_steps(
+                    key, offsets, n_terminations
+                )
+            result[key] = (decision_steps, terminal_steps)
+        return result
+
+    def clear_steps(self) -> None:
+        """
+        Forgets the steps returned so far, must be called when the data of the
+        active bank changes.
+        """
+        self._decision_steps.clear()
+        self._terminal_steps.clear()
+
+    def _cached_views(
+        self,
+        views: Dict[str, Dict[int, StepViewsType]],
+        key: str,
+        offsets: RLDataOffsets,
+        n_agents: int,
+        create: Callable[[BaseSharedMemory, RLDataOffsets, int], StepViewsType],
+    ) -> StepViewsType:
+        behavior_views = views.get(key)
+        if behavior_views is None:
+            behavior_views = views[key] = {}
+        result = behavior_views.get(n_agents)
+        if result is None:
+            if len(behavior_views) >= MAX_CACHED_AGENT_COUNTS:
+                behavior_views.clear()
+            result = behavior_views[n_agents] = create(self, offsets, n_agents)
+        return result
+
+    @property
+    def _decision_views(self) -> Dict[str, Dict[int, DecisionViews]]:
+        return self._bank_views[self._active_bank][0]  # type: ignore
+
+    @property
+    def _terminal_views(self) -> Dict[str, Dict[int, TerminalViews]]:
+        return self._bank_views[self._active_bank][1]  # type: ignore
+
+    def _clear_views(self) -> None:
+        self.clear_steps()
+        for decision_views, terminal_views in self._bank_views:
+            decision_views.clear()
+            terminal_views.clear()
+
+    def close(self) -> None:
+        # The cached views reference the memory, release them so it can be unmapped
+        self._clear_views()
+        self._action_handles.clear()
+        super(SharedMemoryBody, self).close()
+
+    def get_action_buffer(self, key: str) -> ActionTuple:
+        """
+        Returns writable views of the continuous and discrete actions of the agents
+        of the behavior requesting a decision in the shared memory. Writing to them
+        sets the actions Unity reads.
+        """
         assert key in self._offset_dict
-        offsets = self._offset_dict[key]
-        n_agents, _ = self.get_int(offsets.termination_n_agents_offset)
-        obs: List[np.ndarray] = []
-        for obs_offset, obs_spec in zip(
-            offsets.termination_obs_offset, offsets.behavior_spec.observation_specs
-        ):
-            obs_shape = (n_agents,) + obs_spec.shape
-            arr = self.get_ndarray(obs_offset, obs_shape, np.float32)
-            obs.append(arr)
-        return TerminalSteps(
-            obs=obs,
-            reward=self.get_ndarray(
-                offsets.termination_reward_offset, (n_agents), np.float32
-            ),
-            agent_id=self.get_ndarray(
-                offsets.termination_agent_id_offset, (n_agents), np.int32
-            ),
-            interrupted=self.get_ndarray(
-                offsets.termination_status_offset, (n_agents), np.bool
-            ),
-            # TODO: Communicate these values
-            group_id=np.zeros((n_agents), dtype=np.int32),
-            group_reward=np.zeros((n_agents), dtype=np.float32),
+        return self._action_buffer(key, self._offset_dict[key])
+
+    def _action_buffer(self, key: str, offsets: RLDataOffsets) -> ActionTuple:
+        n_agents, _ = self.get_int(offsets.decision_n_agents_offset)
+        views = self._cached_views(
+            self._decision_views, key, offsets, n_agents, DecisionViews
         )
+        return views.actions
+
+    def action_handle(self, key: str) -> ActionHandle:
+        """
+        Returns the ActionHandle of the behavior, created once per layout
+        """
+        handle = self._action_handles.get(key)
+        if handle is None:
+            handle = self._action_handles[key] = ActionHandle(self, key)
+        return handle
 
     def set_actions(self, key: str, data: ActionTuple) -> None:
-        assert key in self._offset_dict
-        offsets = self._offset_dict[key]
+        buffer = self.get_action_buffer(key)
+        # Converts the dtypes while copying, like astype would
+        if data.continuous is not None:
+            np.copyto(buffer.continuous, data.continuous, casting="unsafe")
+        if data.discrete is not None:
+            np.copyto(buffer.discrete, data.discrete, casting="unsafe")
+
+    def set_actions_for_agents(
+        self, key: str, agent_ids: np.ndarray, data: ActionTuple
+    ) -> None:
+        """
+        Sets the actions of some of the Agents of the behavior requesting a
+        decision, row i of data being the action of agent_ids[i].
+        Raises a KeyError if one of the Agents did not request a decision.
+        """
+        rows = self.get_decision_steps(key).agent_rows(agent_ids)  # type: ignore
+        buffer = self.get_action_buffer(key)
         if data.continuous is not None:
-            self.set_ndarray(offsets.continuous_action_offset, data.continuous)
+            buffer.continuous[rows] = data.continuous
         if data.discrete is not None:
-            self.set_ndarray(offsets.discrete_action_offset, data.discrete)
+            buffer.discrete[rows] = data.discrete
 
     def get_n_decisions_requested(self, key: str) -> int:
         assert key in self._offset_dict
@@ -159,16 +444,3 @@ class SharedMemoryBody(BaseSharedMemory):
             offsets = self._offset_dict[key]
             result[key] = offsets.behavior_spec
         return result
-
-    def _generate_action_masks(
-        self, offsets: RLDataOffsets, n_agents: int
-    ) -> np.ndarray:
-        start = offsets.masks_offset
-        if start is None:
-            return None
-        branches = offsets.behavior_spec.action_spec.discrete_branches
-        result: List[np.ndarray] = []
-        for branch_size in branches:
-            result += [self.get_ndarray(start, (n_agents, branch_size), np.bool)]
-            start += offsets.max_n_agents * branch_size
-        return result
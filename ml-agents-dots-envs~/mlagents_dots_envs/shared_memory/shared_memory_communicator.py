@@ -1,10 +1,36 @@
+import math
 import os
 import time
 import uuid
-from typing import Tuple, Dict
+import numpy as np
+from typing import Tuple, Dict, List, Union, Optional
 
-from mlagents_dots_envs.shared_memory.shared_memory_header import SharedMemoryHeader
-from mlagents_dots_envs.shared_memory.shared_memory_body import SharedMemoryBody
+from mlagents_dots_envs.shared_memory.shared_memory_header import (
+    SharedMemoryHeader,
+    HeaderFeatures,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_body import (
+    ActionHandle,
+    SharedMemoryBody,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_side_channel import (
+    SharedMemorySideChannel,
+)
+from mlagents_dots_envs.shared_memory.capacity_hints import CapacityHint
+from mlagents_dots_envs.shared_memory.step_log import StepFlags, StepLogWriter
+from mlagents_dots_envs.shared_memory.backing_store import (
+    BackingStore,
+    MemoryHints,
+    default_backing_store,
+)
+from mlagents_dots_envs.shared_memory.wait_strategy import (
+    WaitPolicy,
+    WaitStats,
+    WaitStrategy,
+    create_wait_strategy,
+    cpu_clock,
+)
+from mlagents_dots_envs.shared_memory.wake_channel import FifoWakeChannel
 
 from mlagents_envs.exception import UnityCommunicationException
 from mlagents_envs.base_env import (
@@ -15,18 +41,100 @@ from mlagents_envs.base_env import (
 )
 
 
+def grow_capacity(capacity: int, required: int, minimum: int, growth: float) -> int:
+    """
+    Returns the new capacity of a buffer that must hold required bytes. The
+    capacity grows geometrically so that resizing becomes rare.
+    """
+    new_capacity = max(capacity, minimum, 4)
+    while new_capacity < required:
+        new_capacity = math.ceil(new_capacity * growth)
+    return new_capacity
+
+
 class SharedMemoryCommunicator:
     FILE_DEFAULT = "default"
 
-    def __init__(self, use_default: bool = False, timeout_wait: int = 60):
+    def __init__(
+        self,
+        use_default: bool = False,
+        timeout_wait: int = 60,
+        wait_policy: Union[str, WaitPolicy, WaitStrategy] = WaitPolicy.SPIN,
+        wake_channel: bool = False,
+        rl_data_banks: int = 1,
+        backing_store: Optional[BackingStore] = None,
+        side_channel_file: bool = True,
+        side_channel_capacity: int = 1024,
+        side_channel_growth: float = 2.0,
+        capacity_hints: Optional[List[CapacityHint]] = None,
+        observation_dtypes: bool = True,
+        normalize_observations: bool = True,
+        section_counters: bool = True,
+        action_repeat: bool = True,
+        recorder: Optional[StepLogWriter] = None,
+    ):
+        """
+        :bool use_default: If true, uses the default file the Editor connects to
+        :int timeout_wait: Number of seconds to wait for Unity before timing out
+        :param wait_policy: What Python does while waiting for Unity
+        :bool wake_channel: If true, requests HeaderFeatures.WAKE_FIFO
+        :int rl_data_banks: If greater than 1, requests HeaderFeatures.RL_DATA_BANKS
+        :param backing_store: Where the shared memory files are created
+        :bool side_channel_file: If true, requests HeaderFeatures.SIDE_CHANNEL_FILE
+        so that growing the side channel never copies the RL data
+        :int side_channel_capacity: Minimum size in bytes of the side channel
+        :float side_channel_growth: Factor by which the side channel capacity is
+        multiplied when the data does not fit
+        :list capacity_hints: CapacityHints sent to Unity so it lays out the RL
+        data at its final size
+        :bool observation_dtypes: If true, requests HeaderFeatures.OBSERVATION_DTYPES
+        so that Unity can send observations as uint8, float16, int8 or int16
+        :bool normalize_observations: If true, the observations that are not
+        float32 are converted to float32 when accessed
+        :bool section_counters: If true, requests HeaderFeatures.SECTION_COUNTERS
+        so that unchanged observations and masks can be detected
+        :bool action_repeat: If true, requests HeaderFeatures.ACTION_REPEAT so that
+        a step can simulate several ticks with the same actions
+        :param recorder: If not None, every step received from Unity and the side
+        channel data are appended to it, see ReplayEnvironment. It is closed with
+        the communicator.
+        """
+        if side_channel_growth <= 1:
+            raise ValueError("side_channel_growth must be greater than 1")
         if use_default:
-            file_name = self.FILE_DEFAULT
+            # The Editor looks for the default file in the temporary directory
+            self._backing_store = BackingStore(
+                hints=backing_store.hints if backing_store else MemoryHints()
+            )
+            file_name = self._backing_store.get_file_path(self.FILE_DEFAULT)
         else:
-            file_name = str(uuid.uuid1())
+            self._backing_store = backing_store or default_backing_store()
+            file_name = self._backing_store.get_file_path(str(uuid.uuid1()))
             while os.path.exists(file_name):
-                file_name = str(uuid.uuid1())
+                file_name = self._backing_store.get_file_path(str(uuid.uuid1()))
         self._base_file_name = file_name
-        self._master_mem = SharedMemoryHeader(file_name=file_name)
+        features = HeaderFeatures.NONE
+        if wake_channel and FifoWakeChannel.is_supported():
+            features |= HeaderFeatures.WAKE_FIFO
+        if rl_data_banks > 1:
+            features |= HeaderFeatures.RL_DATA_BANKS
+        if side_channel_file:
+            features |= HeaderFeatures.SIDE_CHANNEL_FILE
+        if observation_dtypes:
+            features |= HeaderFeatures.OBSERVATION_DTYPES
+        if section_counters:
+            features |= HeaderFeatures.SECTION_COUNTERS
+        if action_repeat:
+            features |= HeaderFeatures.ACTION_REPEAT
+        self._master_mem = SharedMemoryHeader(
+            file_name=file_name,
+            requested_features=features,
+            rl_data_banks=rl_data_banks,
+            capacity_hints=capacity_hints,
+        )
+        self._wake: Optional[FifoWakeChannel] = None
+        if features & HeaderFeatures.WAKE_FIFO:
+            self._wake = FifoWakeChannel(self._master_mem.file_path)
         self._current_file_number = self._master_mem.file_number
         self._data_mem = SharedMemoryBody(
             file_name + "_" * self._current_file_number,
@@ -34,25 +142,93 @@ class SharedMemoryCommunicator:
             copy_from=None,
             side_channel_buffer_size=4,
             rl_data_buffer_size=0,
+            hints=self._backing_store.hints,
         )
+        self._normalize_observations = normalize_observations
+        self._side_channel_capacity = side_channel_capacity
+        self._side_channel_growth = side_channel_growth
+        self._side_channel_mem: Optional[SharedMemorySideChannel] = None
+        self._side_channel_generation = 0
+        if features & HeaderFeatures.SIDE_CHANNEL_FILE:
+            self._side_channel_mem = SharedMemorySideChannel(
+                file_name,
+                create_file=True,
+                capacity=side_channel_capacity,
+                hints=self._backing_store.hints,
+            )
+        self._reallocation_count = 0
+        self._spec_generation = 0
+        self._recorder = recorder
+        self._recorded_flags = StepFlags.NONE
         self._timeout_wait = timeout_wait
+        self._wait_strategy = create_wait_strategy(wait_policy)
+        self.last_wait_stats = WaitStats(0.0, 0.0, 0)
+        # Seconds spent loading the new communication file during the last wait,
+        # 0 if Unity did not create one
+        self.last_regeneration_time = 0.0
 
     @property
     def communicator_id(self):
+        """
+        The absolute path of the header file, passed to Unity with --memory-path
+        """
         return self._base_file_name
 
+    @property
+    def backing_store(self) -> BackingStore:
+        return self._backing_store
+
     def close(self):
+        if self._recorder is not None:
+            self._recorder.close()
         self._master_mem.close()
         self._data_mem.delete()
+        if self._side_channel_mem is not None:
+            self._side_channel_mem.delete()
+        if self._wake is not None:
+            # Wake Unity up so it notices the communication was closed
+            self._wake.notify()
+            self._wake.delete()
+            self._wake = None
+
+    @property
+    def wake_channel_connected(self) -> bool:
+        return self._wake is not None and self._wake.connected
 
     @property
     def active(self) -> bool:
         return self._master_mem.active
 
+    @property
+    def side_channel_file_in_use(self) -> bool:
+        return self._side_channel_mem is not None and bool(
+            self._master_mem.accepted_features & HeaderFeatures.SIDE_CHANNEL_FILE
+        )
+
+    @property
+    def _observation_dtypes_accepted(self) -> bool:
+        return bool(
+            self._master_mem.accepted_features & HeaderFeatures.OBSERVATION_DTYPES
+        )
+
+    @property
+    def _section_counters_accepted(self) -> bool:
+        return bool(
+            self._master_mem.accepted_features & HeaderFeatures.SECTION_COUNTERS
+        )
+
     def write_side_channel_data(self, data: bytearray) -> None:
+        if self.side_channel_file_in_use:
+            self._write_side_channel_file(data)
+            return
         capacity = self._master_mem.side_channel_size
-        if len(data) >= capacity - 4:  # need 4 bytes for an integer size
-            new_capacity = 2 * len(data) + 20
+        if len(data) + 4 > capacity:  # need 4 bytes for an integer size
+            new_capacity = grow_capacity(
+                capacity,
+                len(data) + 4,
+                self._side_channel_capacity,
+                self._side_channel_growth,
+            )
             self._current_file_number += 1
             self._master_mem.file_number = self._current_file_number
             tmp = self._data_mem
@@ -62,52 +238,237 @@ class SharedMemoryCommunicator:
                 copy_from=tmp,
                 side_channel_buffer_size=new_capacity,
                 rl_data_buffer_size=self._master_mem.rl_data_size,
+                rl_data_banks=tmp.rl_data_banks,
+                hints=self._backing_store.hints,
+                observation_dtypes=self._observation_dtypes_accepted,
+                section_counters=self._section_counters_accepted,
+                normalize_observations=self._normalize_observations,
             )
             tmp.close()
             # Unity is responsible for destroying the old file
             self._master_mem.side_channel_size = new_capacity
         self._data_mem.side_channel_data = data
 
+    def _write_side_channel_file(self, data: bytearray) -> None:
+        side_channel = self._side_channel_mem
+        assert side_channel is not None
+        if len(data) + 4 > side_channel.capacity:
+            side_channel.resize(
+                grow_capacity(
+                    side_channel.capacity,
+                    len(data) + 4,
+                    self._side_channel_capacity,
+                    self._side_channel_growth,
+                )
+            )
+            self._side_channel_generation += 1
+            self._master_mem.side_channel_generation = self._side_channel_generation
+        side_channel.data = data
+
     def read_and_clear_side_channel_data(self) -> bytearray:
-        result = self._data_mem.side_channel_data
-        self._data_mem.side_channel_data = bytearray()
+        if self.side_channel_file_in_use:
+            assert self._side_channel_mem is not None
+            result = self._side_channel_mem.data
+            self._side_channel_mem.data = bytearray()
+        else:
+            result = self._data_mem.side_channel_data
+            self._data_mem.side_channel_data = bytearray()
+        if self._recorder is not None and len(result) > 0:
+            self._recorder.record_side_channel(result)
         return result
 
-    def give_unity_control(self, reset: bool = False, query: bool = False) -> None:
+    @property
+    def action_repeat_supported(self) -> bool:
+        """
+        True if Unity acknowledged HeaderFeatures.ACTION_REPEAT. Only valid once
+        Unity gave control back to Python for the first time.
+        """
+        return bool(self._master_mem.accepted_features & HeaderFeatures.ACTION_REPEAT)
+
+    def give_unity_control(
+        self, reset: bool = False, query: bool = False, repeat: int = 1
+    ) -> None:
+        """
+        :bool reset: If true, Unity resets the environment
+        :bool query: If true, Unity only exchanges side channel data
+        :int repeat: The number of ticks Unity simulates with the current actions,
+        ignored if Unity did not acknowledge HeaderFeatures.ACTION_REPEAT
+        """
+        # Unity overwrites the data of the steps already returned
+        self._data_mem.clear_steps()
+        self._master_mem.action_repeat = repeat
         self._master_mem.mark_python_blocked()
         if query:
             self._master_mem.mark_query()
         if reset:
             self._master_mem.mark_reset()
         self._master_mem.unblock_unity()
+        if self._wake is not None:
+            self._wake.notify()
+        if self._recorder is not None:
+            self._recorded_flags = StepFlags.NONE
+            if reset:
+                self._recorded_flags |= StepFlags.RESET
+            if query:
+                self._recorded_flags |= StepFlags.QUERY
+
+    @property
+    def wait_strategy(self) -> WaitStrategy:
+        return self._wait_strategy
+
+    @wait_strategy.setter
+    def wait_strategy(self, policy: Union[str, WaitPolicy, WaitStrategy]) -> None:
+        self._wait_strategy = create_wait_strategy(policy)
+
+    @property
+    def wake_channel(self) -> Optional[FifoWakeChannel]:
+        return self._wake
+
+    @property
+    def unity_ready(self) -> bool:
+        """
+        True once Unity gave control back to Python or closed the communication.
+        """
+        return not self._master_mem.blocked or not self._master_mem.active
+
+    def abort(self) -> None:
+        """
+        Closes the communication and deletes the header when Unity stopped
+        responding.
+        """
+        self.close()
+        self._master_mem.delete()
 
     def wait_for_unity(self):
+        strategy = self._wait_strategy
+        strategy.start()
         iteration = 0
-        check_timeout_iteration = 1000
-        t0 = time.time()
+        t0 = time.perf_counter()
+        cpu0 = cpu_clock()
         while self._master_mem.blocked and self._master_mem.active:
-            if iteration % check_timeout_iteration == 0:
-                if time.time() - t0 > self._timeout_wait:
-                    self.close()
-                    self._master_mem.delete()
-                    raise TimeoutError("The Unity Environment took too long to respond")
+            elapsed = time.perf_counter() - t0
+            if elapsed > self._timeout_wait:
+                self.abort()
+                raise TimeoutError("The Unity Environment took too long to respond")
+            if self._wake is not None and self._wake.connected:
+                self._wake.wait(self._timeout_wait - elapsed)
+            else:
+                strategy.pause(elapsed)
             iteration += 1
-        if not self._master_mem.active:
+        self.last_wait_stats = WaitStats(
+            wait_time=time.perf_counter() - t0,
+            cpu_time=cpu_clock() - cpu0,
+            iterations=iteration,
+        )
+        strategy.record(self.last_wait_stats)
+        self.finish_wait()
+
+    def finish_wait(self) -> None:
+        """
+        Must be called once Unity gave control back to Python. Checks that the
+        communication is still open and loads the new communication file if Unity
+        created one.
+        """
+        header = self._master_mem.snapshot()
+        self.last_regeneration_time = 0.0
+        if self._wake is not None and not self._wake.connected:
+            if header.accepted_features & HeaderFeatures.WAKE_FIFO:
+                self._wake.connect()
+        if not header.active:
             try:
                 self._master_mem.check_version()
             finally:
                 self._master_mem.delete()
                 self._data_mem.delete()
+                if self._side_channel_mem is not None:
+                    self._side_channel_mem.delete()
+                    self._side_channel_mem = None
+                if self._wake is not None:
+                    self._wake.delete()
+                    self._wake = None
                 raise UnityCommunicationException("Communicator has stopped.")
-        while self._current_file_number < self._master_mem.file_number:
+        if self._side_channel_mem is not None:
+            if not self.side_channel_file_in_use:
+                # Unity uses the side channel section of the body
+                self._side_channel_mem.delete()
+                self._side_channel_mem = None
+            else:
+                generation = header.side_channel_generation
+                if self._side_channel_generation != generation:
+                    # Unity grew the side channel file
+                    self._side_channel_generation = generation
+                    self._side_channel_mem.remap()
+        if self._current_file_number < header.file_number:
             # the file is out of date
+            t0 = time.perf_counter()
+            self._reallocation_count += header.file_number - self._current_file_number
             self._data_mem.delete()
-            self._current_file_number += 1
+            # Unity can create several files in a single step (one per new
+            # behavior), only the most recent one matches the header
+            for file_number in range(self._current_file_number + 1, header.file_number):
+                try:
+                    os.remove(
+                        SharedMemoryBody.get_file_path(
+                            self._base_file_name + "_" * file_number
+                        )
+                    )
+                except OSError:
+                    pass
+            self._current_file_number = header.file_number
+            specs = self._data_mem.generate_specs()
             self._data_mem = SharedMemoryBody(
                 self._base_file_name + "_" * self._current_file_number,
-                side_channel_buffer_size=self._master_mem.side_channel_size,
-                rl_data_buffer_size=self._master_mem.rl_data_size,
+                side_channel_buffer_size=header.side_channel_size,
+                rl_data_buffer_size=header.rl_data_size,
+                rl_data_banks=header.rl_data_banks,
+                hints=self._backing_store.hints,
+                observation_dtypes=bool(
+                    header.accepted_features & HeaderFeatures.OBSERVATION_DTYPES
+                ),
+                section_counters=bool(
+                    header.accepted_features & HeaderFeatures.SECTION_COUNTERS
+                ),
+                normalize_observations=self._normalize_observations,
             )
+            if self._data_mem.generate_specs() != specs:
+                self._spec_generation += 1
+            self.last_regeneration_time = time.perf_counter() - t0
+        if self._data_mem.rl_data_banks > 1:
+            self._data_mem.active_bank = header.rl_data_bank
+        if self._recorder is not None:
+            self._recorder.record_step(
+                self._recorded_flags,
+                header.accepted_features,
+                self._current_file_number,
+                self._data_mem.accessor,
+                self._data_mem.active_rl_data_offset,
+                self._data_mem.rl_data_buffer_size,
+            )
+
+    @property
+    def reallocation_count(self) -> int:
+        """
+        The number of communication files Unity created because the data did not
+        fit in the previous one.
+        """
+        return self._reallocation_count
+
+    @property
+    def spec_generation(self) -> int:
+        """
+        A counter incremented every time the behaviors or their specs change. The
+        specs only change when Unity lays out the RL data in a new file.
+        """
+        return self._spec_generation
+
+    @property
+    def rl_data_banks(self) -> int:
+        """
+        The number of RL data banks in use. With more than one bank, Unity writes
+        each step in the next bank and the data returned by get_steps stays valid
+        while Unity simulates the following rl_data_banks - 1 steps.
+        """
+        return self._data_mem.rl_data_banks
 
     def get_steps(self, key: str) -> Tuple[DecisionSteps, TerminalSteps]:
         return (
@@ -115,12 +476,31 @@ class SharedMemoryCommunicator:
             self._data_mem.get_terminal_steps(key),
         )
 
+    def get_all_steps(self) -> Dict[str, Tuple[DecisionSteps, TerminalSteps]]:
+        return self._data_mem.get_all_steps()
+
     def get_n_decisions_requested(self, key: str) -> int:
         return self._data_mem.get_n_decisions_requested(key)
 
     def set_actions(self, key: str, data: ActionTuple) -> None:
         self._data_mem.set_actions(key, data)
 
+    def get_action_buffer(self, key: str) -> ActionTuple:
+        return self._data_mem.get_action_buffer(key)
+
+    def action_handle(self, key: str) -> ActionHandle:
+        """
+        Returns the ActionHandle of the behavior in the current file. It must be
+        requested again after every step since Unity can move the data to a new
+        file.
+        """
+        return self._data_mem.action_handle(key)
+
+    def set_actions_for_agents(
+        self, key: str, agent_ids: np.ndarray, data: ActionTuple
+    ) -> None:
+        self._data_mem.set_actions_for_agents(key, agent_ids, data)
+
     @property
     def num_behaviors(self) -> int:
         return self._data_mem.num_behaviors
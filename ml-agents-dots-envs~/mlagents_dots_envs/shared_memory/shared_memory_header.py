@@ -1,6 +1,81 @@
 import os
 import glob
+import sys
+from enum import IntFlag
+import struct
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
 from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.capacity_hints import (
+    CapacityHint,
+    capacity_hints_size,
+    read_capacity_hints,
+    write_capacity_hints,
+)
+
+
+class HeaderFeatures(IntFlag):
+    """
+    Optional protocol features. Python requests them in the header and Unity
+    acknowledges the ones it supports. Players that predate a feature never
+    acknowledge it so the communication falls back to the base protocol.
+    """
+
+    NONE = 0
+    # Python and Unity wake each other through named pipes next to the header
+    WAKE_FIFO = 1
+    # The RL data section is repeated in several banks that Unity fills in turn
+    RL_DATA_BANKS = 2
+    # The side channel data lives in its own file that grows in place
+    SIDE_CHANNEL_FILE = 4
+    # The header is followed by CapacityHints for the behaviors
+    CAPACITY_HINTS = 8
+    # The observation specs contain the ObservationDtype of their values
+    OBSERVATION_DTYPES = 16
+    # The RL data sections contain change counters of their observations and masks
+    SECTION_COUNTERS = 32
+    # Unity simulates the number of ticks written in the header for each step
+    ACTION_REPEAT = 64
+
+
+_RL_DATA_BANKS = int(HeaderFeatures.RL_DATA_BANKS)
+
+
+@lru_cache(maxsize=None)
+def _features(value: int) -> HeaderFeatures:
+    # Creating an IntFlag is slow compared to reading the whole header
+    return HeaderFeatures(value)
+
+
+# The largest number of ticks Unity can simulate in one step
+MAX_ACTION_REPEAT = 0xFFFF
+
+# All the fixed size fields of the header, see SharedMemoryHeader
+_HEADER_STRUCT = struct.Struct("<3i4?3i?xH6i")
+
+
+class HeaderSnapshot(NamedTuple):
+    """
+    The values of all the fields of the header at a given time. The features are
+    the plain int values of the HeaderFeatures flags.
+    """
+
+    version: Tuple[int, int, int]
+    unity_blocked: bool
+    python_blocked: bool
+    reset: bool
+    active: bool
+    file_number: int
+    side_channel_size: int
+    rl_data_size: int
+    query: bool
+    action_repeat: int
+    requested_features: int
+    accepted_features: int
+    rl_data_banks: int
+    rl_data_bank: int
+    side_channel_generation: int
+    capacity_hints_size: int
 
 
 class SharedMemoryHeader(BaseSharedMemory):
@@ -14,18 +89,38 @@ class SharedMemoryHeader(BaseSharedMemory):
      - bool : True if Simulation or Python ordered closing the communication
      - int  : The number of times the communication file changed
      - int  : Communication file "side channel" size in bytes
-     - int  : Communication file "RL section" size in bytes
+     - int  : Communication file "RL section" size in bytes (of one bank)
+     - bool : True if Python commanded a query
+     - 1 byte : padding
+     - ushort : Number of ticks Unity simulates with the same actions, written
+     by Python every step (only with HeaderFeatures.ACTION_REPEAT, 0 means 1)
+     - int  : HeaderFeatures requested by Python
+     - int  : HeaderFeatures acknowledged by Unity
+     - int  : Number of RL data banks requested by Python
+     - int  : Index of the RL data bank holding the last step (written by Unity)
+     - int  : Number of times the side channel file was grown
+     - int  : Size in bytes of the capacity hints
+     - the capacity hints (see write_capacity_hints)
     """
 
-    SIZE = 29
+    SIZE = 56
     VERSION = (0, 3, 2)
 
     def __init__(
-        self, file_name: str, side_channel_size: int = 0, rl_data_size: int = 0
+        self,
+        file_name: str,
+        side_channel_size: int = 0,
+        rl_data_size: int = 0,
+        requested_features: HeaderFeatures = HeaderFeatures.NONE,
+        rl_data_banks: int = 1,
+        capacity_hints: Optional[List[CapacityHint]] = None,
     ):
-
+        hints_size = 0
+        if capacity_hints:
+            requested_features |= HeaderFeatures.CAPACITY_HINTS
+            hints_size = capacity_hints_size(capacity_hints)
         super(SharedMemoryHeader, self).__init__(
-            file_name, create_file=True, size=self.SIZE
+            file_name, create_file=True, size=self.SIZE + hints_size
         )
         for f in glob.glob(self._file_path + "_*"):
             # Removing all the future files in case they were not correctly created
@@ -42,79 +137,198 @@ class SharedMemoryHeader(BaseSharedMemory):
         offset = self.set_int(offset, side_channel_size)
         offset = self.set_int(offset, rl_data_size)
         offset = self.set_bool(offset, False)
+        offset = 32
+        offset = self.set_int(offset, requested_features)
+        offset = self.set_int(offset, HeaderFeatures.NONE)
+        offset = self.set_int(offset, rl_data_banks)
+        offset = self.set_int(offset, 0)
+        offset = self.set_int(offset, 0)
+        offset = self.set_int(offset, hints_size)
+        if capacity_hints:
+            write_capacity_hints(self, offset, capacity_hints)
+        self._ints = None
+        self._map_views()
+
+    def _map_views(self) -> None:
+        # Cached views over the fixed part of the header so reading a field does
+        # not go through struct. The views use the native byte order while the
+        # header is little endian, like the platforms Unity runs on.
+        assert sys.byteorder == "little", "The header requires a little endian host"
+        self._bytes = memoryview(self.accessor)[: self.SIZE]
+        self._ints = self._bytes.cast("i")
+        self._shorts = self._bytes.cast("H")
+
+    def _release_views(self) -> None:
+        if self._ints is not None:
+            self._ints.release()
+            self._shorts.release()
+            self._bytes.release()
+            self._ints = None  # type: ignore
+            self._shorts = None  # type: ignore
+            self._bytes = None  # type: ignore
+
+    def snapshot(self) -> HeaderSnapshot:
+        """
+        Reads all the fields of the header at once so they are consistent with
+        each other.
+        """
+        (
+            major,
+            minor,
+            bug,
+            unity_blocked,
+            python_blocked,
+            reset,
+            closed,
+            file_number,
+            side_channel_size,
+            rl_data_size,
+            query,
+            action_repeat,
+            requested,
+            accepted,
+            rl_data_banks,
+            rl_data_bank,
+            side_channel_generation,
+            capacity_hints_size,
+        ) = _HEADER_STRUCT.unpack_from(self.accessor, 0)
+        accepted &= requested
+        if not accepted & _RL_DATA_BANKS:
+            rl_data_banks = 1
+        # Called after every step: the positional arguments are faster than the
+        # keyword arguments of the NamedTuple constructor
+        return HeaderSnapshot(
+            (major, minor, bug),
+            unity_blocked,
+            python_blocked,
+            reset,
+            not closed,
+            file_number,
+            side_channel_size,
+            rl_data_size,
+            query,
+            action_repeat or 1,
+            requested,
+            accepted,
+            rl_data_banks or 1,
+            rl_data_bank,
+            side_channel_generation,
+            capacity_hints_size,
+        )
+
+    @property
+    def requested_features(self) -> HeaderFeatures:
+        return _features(self._ints[8])
+
+    @property
+    def accepted_features(self) -> HeaderFeatures:
+        """
+        The features both requested by Python and supported by Unity. Only valid
+        once Unity gave control back to Python for the first time.
+        """
+        return _features(self._ints[9] & self._ints[8])
+
+    @property
+    def rl_data_banks(self) -> int:
+        """
+        The number of RL data banks in the communication file. Always 1 if Unity
+        did not acknowledge HeaderFeatures.RL_DATA_BANKS.
+        """
+        if not self._ints[9] & self._ints[8] & _RL_DATA_BANKS:
+            return 1
+        return max(self._ints[10], 1)
+
+    @property
+    def rl_data_bank(self) -> int:
+        return self._ints[11]
+
+    @property
+    def side_channel_generation(self) -> int:
+        """
+        Incremented by Python or Unity every time they grow the side channel file
+        so the other side maps it again.
+        """
+        return self._ints[12]
+
+    @side_channel_generation.setter
+    def side_channel_generation(self, value: int) -> None:
+        self._ints[12] = value
+
+    @property
+    def capacity_hints(self) -> List[CapacityHint]:
+        if self._ints[13] == 0:
+            return []
+        hints, _ = read_capacity_hints(self, self.SIZE)
+        return hints
 
     @property
     def active(self) -> bool:
-        offset = 15
-        closed, _ = self.get_bool(offset)
-        return not closed
+        return self._bytes is not None and not self._bytes[15]
 
     @property
     def file_number(self) -> int:
-        offset = 16
-        result, _ = self.get_int(offset)
-        return result
+        return self._ints[4]
 
     @file_number.setter
     def file_number(self, value: int) -> None:
-        offset = 16
-        self.set_int(offset, value)
+        self._ints[4] = value
 
     def close(self):
         if self.accessor is not None:
-            offset = 15
-            self.set_bool(offset, True)
+            self._bytes[15] = True
+            self._release_views()
         super(SharedMemoryHeader, self).close()
 
     def mark_python_blocked(self):
-        offset = 13
-        self.set_bool(offset, True)
+        self._bytes[13] = True
 
     @property
     def blocked(self) -> bool:
-        offset = 13
-        result, _ = self.get_bool(offset)
-        return result
+        return bool(self._bytes[13])
 
     def unblock_unity(self):
-        offset = 12
-        self.set_bool(offset, False)
+        self._bytes[12] = False
 
     def mark_reset(self):
-        offset = 14
-        self.set_bool(offset, True)
+        self._bytes[14] = True
 
     def mark_query(self):
-        offset = 28
-        self.set_bool(offset, True)
+        self._bytes[28] = True
+
+    @property
+    def action_repeat(self) -> int:
+        """
+        The number of ticks Unity simulates during the next step, only read by
+        Unity if it acknowledged HeaderFeatures.ACTION_REPEAT
+        """
+        return max(self._shorts[15], 1)
+
+    @action_repeat.setter
+    def action_repeat(self, value: int) -> None:
+        if not 1 <= value <= MAX_ACTION_REPEAT:
+            raise ValueError(
+                f"The action repeat must be between 1 and {MAX_ACTION_REPEAT}"
+            )
+        self._shorts[15] = value
 
     @property
     def side_channel_size(self) -> int:
-        offset = 20
-        result, _ = self.get_int(offset)
-        return result
+        return self._ints[5]
 
     @side_channel_size.setter
     def side_channel_size(self, value: int) -> None:
-        offset = 20
-        self.set_int(offset, value)
+        self._ints[5] = value
 
     @property
     def rl_data_size(self) -> int:
-        offset = 24
-        result, _ = self.get_int(offset)
-        return result
+        return self._ints[6]
 
     @rl_data_size.setter
     def rl_data_size(self, value: int) -> None:
-        offset = 24
-        self.set_int(offset, value)
+        self._ints[6] = value
 
     def check_version(self):
-        offset = 0
-        major, offset = self.get_int(offset)
-        minor, offset = self.get_int(offset)
-        bug, offset = self.get_int(offset)
+        major, minor, bug = self._ints[0:3]
         if (major, minor, bug) != self.VERSION:
             raise Exception(
                 "Incompatible versions of communicator between "
@@ -0,0 +1,50 @@
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.backing_store import MemoryHints
+
+
+class SharedMemorySideChannel(BaseSharedMemory):
+    """
+    Holds the side channel data when HeaderFeatures.SIDE_CHANNEL_FILE is in use.
+    Since the side channel has its own file, it can grow without copying or
+    moving the RL data.
+    File organization:
+     - int : size of the side channel data in bytes
+     - the side channel data
+    """
+
+    SUFFIX = ".side_channel"
+
+    def __init__(
+        self,
+        file_name: str,
+        create_file: bool = False,
+        capacity: int = 0,
+        hints: MemoryHints = MemoryHints(),
+    ):
+        """
+        :string file_name: The name of the header file, the suffix is added
+        :bool create_file: If true, the file will be created
+        :int capacity: When creating the file, its length in bytes
+        :param hints: The MemoryHints used to map the file
+        """
+        super(SharedMemorySideChannel, self).__init__(
+            file_name + self.SUFFIX, create_file, max(capacity, 4), hints
+        )
+
+    @property
+    def capacity(self) -> int:
+        return len(self.accessor)
+
+    @property
+    def data(self) -> bytearray:
+        offset = 0
+        len_data, offset = self.get_int(offset)
+        return self.accessor[offset : offset + len_data]
+
+    @data.setter
+    def data(self, data: bytearray) -> None:
+        if len(data) > self.capacity - 4:
+            raise Exception("The shared memory file is corrupted")
+        offset = 0
+        offset = self.set_int(offset, len(data))
+        self.accessor[offset : offset + len(data)] = data
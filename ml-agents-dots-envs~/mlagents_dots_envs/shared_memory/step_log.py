@@ -0,0 +1,184 @@
+import mmap
+import struct
+from enum import IntEnum, IntFlag
+from typing import Iterator, List, NamedTuple, Union
+
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+
+LOG_MAGIC = b"MLADSTEP"
+LOG_VERSION = 1
+
+# magic, version, reserved
+_FILE_HEADER = struct.Struct("<8sii")
+# kind, flags, accepted features, layout, size of the data
+_RECORD_HEADER = struct.Struct("<4iq")
+# The data of the records starts on multiples of 8 bytes
+_ALIGNMENT = 8
+
+
+class RecordKind(IntEnum):
+    # The RL data section Unity wrote during a step
+    STEP = 1
+    # The side channel data Python read after the previous step
+    SIDE_CHANNEL = 2
+
+
+class StepFlags(IntFlag):
+    NONE = 0
+    # The step followed a reset
+    RESET = 1
+    # The step was a query, Unity did not write any RL data
+    QUERY = 2
+
+
+class StepRecord(NamedTuple):
+    kind: RecordKind
+    flags: StepFlags
+    # The HeaderFeatures Unity acknowledged, needed to parse the RL data
+    features: HeaderFeatures
+    # Changes every time Unity laid out the RL data in a new file
+    layout: int
+    # A read only view of the log
+    data: memoryview
+
+
+class StepLogWriter:
+    """
+    Appends the steps received from Unity to a log file so they can be replayed
+    without Unity by a ReplayEnvironment.
+    File organization:
+     - 8 bytes : LOG_MAGIC
+     - int : LOG_VERSION
+     - int : reserved
+     - records, each made of :
+       - int : RecordKind
+       - int : StepFlags
+       - int : HeaderFeatures acknowledged by Unity
+       - int : layout, the number of the communication file
+       - long : size in bytes of the data
+       - the data, padded with zeros to a multiple of 8 bytes. The RL data
+       section of the active bank for STEP records, the side channel data for
+       SIDE_CHANNEL records.
+    """
+
+    def __init__(self, path: str):
+        """
+        :string path: The path of the log, overwritten if it exists
+        """
+        self._path = path
+        self._file = open(path, "wb")
+        self._file.write(_FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION, 0))
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _append(
+        self,
+        kind: RecordKind,
+        flags: StepFlags,
+        features: HeaderFeatures,
+        layout: int,
+        data: Union[bytes, bytearray, memoryview],
+    ) -> None:
+        size = len(data)
+        self._file.write(_RECORD_HEADER.pack(kind, flags, features, layout, size))
+        self._file.write(data)
+        padding = -size % _ALIGNMENT
+        if padding:
+            self._file.write(bytes(padding))
+
+    def record_step(
+        self,
+        flags: StepFlags,
+        features: HeaderFeatures,
+        layout: int,
+        accessor: Union[mmap.mmap, bytearray],
+        offset: int,
+        size: int,
+    ) -> None:
+        """
+        Appends the size bytes of the RL data section starting at offset in
+        accessor without copying them to an intermediate buffer.
+        """
+        view = memoryview(accessor)
+        try:
+            self._append(
+                RecordKind.STEP, flags, features, layout, view[offset : offset + size]
+            )
+        finally:
+            view.release()
+
+    def record_side_channel(self, data: bytearray) -> None:
+        self._append(
+            RecordKind.SIDE_CHANNEL, StepFlags.NONE, HeaderFeatures.NONE, 0, data
+        )
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class StepLogReader:
+    """
+    Memory maps a log written by StepLogWriter. The data of the records are views
+    of the log, nothing is copied.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, _ = _FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != LOG_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a step log")
+        if version != LOG_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported step log version {version}")
+        # The offsets of the record headers. A truncated last record (the writer
+        # did not close the log) is ignored.
+        self._offsets: List[int] = []
+        offset = _FILE_HEADER.size
+        while offset + _RECORD_HEADER.size <= len(self._mmap):
+            size = _RECORD_HEADER.unpack_from(self._mmap, offset)[4]
+            end = offset + _RECORD_HEADER.size + size
+            if end > len(self._mmap):
+                break
+            self._offsets.append(offset)
+            offset = end + (-size % _ALIGNMENT)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> StepRecord:
+        offset = self._offsets[index]
+        kind, flags, features, layout, size = _RECORD_HEADER.unpack_from(
+            self._mmap, offset
+        )
+        start = offset + _RECORD_HEADER.size
+        return StepRecord(
+            RecordKind(kind),
+            StepFlags(flags),
+            HeaderFeatures(features),
+            layout,
+            self._view[start : start + size],
+        )
+
+    def __iter__(self) -> Iterator[StepRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None  # type: ignore
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Some records are still referenced, the map is closed with them
+                pass
+            self._file.close()
@@ -0,0 +1,456 @@
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from mlagents_envs.base_env import DecisionSteps, TerminalSteps, ActionTuple
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.rl_data_offsets import (
+    ObservationDtype,
+    ObservationQuantization,
+    RLDataOffsets,
+)
+
+_ZEROS: Dict[type, np.ndarray] = {}
+_QUANTIZATION_ARRAYS: Dict[
+    ObservationQuantization, Tuple[np.ndarray, np.ndarray]
+] = {}
+
+
+def read_only_zeros(n: int, dtype: type) -> np.ndarray:
+    """
+    Returns a read only array of n zeros. All the arrays of a given dtype are views
+    of the same buffer.
+    """
+    zeros = _ZEROS.get(dtype)
+    if zeros is None or len(zeros) < n:
+        capacity = n if zeros is None else max(n, 2 * len(zeros))
+        zeros = np.zeros(capacity, dtype=dtype)
+        zeros.flags.writeable = False
+        _ZEROS[dtype] = zeros
+    return zeros[:n]
+
+
+class SectionCounters(NamedTuple):
+    """
+    The change counters of the decision steps of a behavior. Each counter is the
+    step at which Unity last wrote different data to the section: a consumer that
+    processed the data when the counter was k can skip it while it is still k.
+    """
+
+    obs: Tuple[int, ...]
+    action_mask: int
+
+
+def _quantization_arrays(
+    quantization: ObservationQuantization,
+) -> Tuple[np.ndarray, np.ndarray]:
+    arrays = _QUANTIZATION_ARRAYS.get(quantization)
+    if arrays is None:
+        arrays = _QUANTIZATION_ARRAYS[quantization] = (
+            np.array(quantization.scale, dtype=np.float32),
+            np.array(quantization.offset, dtype=np.float32),
+        )
+    return arrays
+
+
+def decode_observation(
+    obs: np.ndarray,
+    obs_dtype: ObservationDtype,
+    quantization: Optional[ObservationQuantization] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Converts an observation array to float32 : uint8 values are divided by 255,
+    float16 values are cast and int8 or int16 values are dequantized per channel
+    (the last dimension). Float32 observations are returned as is when out is None.
+    :param obs: The observation array in its shared memory dtype
+    :param obs_dtype: The ObservationDtype of the observation
+    :param quantization: The quantization of INT8 and INT16 observations
+    :param out: A float32 array of the same shape to write the result to. A new
+    one is allocated if None.
+    """
+    if out is None:
+        if obs_dtype == ObservationDtype.FLOAT32:
+            return obs
+        out = np.empty(obs.shape, np.float32)
+    if obs_dtype == ObservationDtype.UINT8:
+        np.multiply(obs, np.float32(1 / 255), out=out)
+    elif obs_dtype.quantized:
+        if quantization is None:
+            raise ValueError(f"The {obs_dtype.name} observation is not quantized")
+        scale, offset = _quantization_arrays(quantization)
+        np.multiply(obs, scale, out=out)
+        np.add(out, offset, out=out)
+    else:
+        np.copyto(out, obs)
+    return out
+
+
+class StepViews:
+    """
+    Views of the arrays of the decision or terminal steps of a behavior in the
+    shared memory for a given number of Agents. Each view is only created the first
+    time it is accessed.
+    """
+
+    def __init__(
+        self,
+        memory: BaseSharedMemory,
+        offsets: RLDataOffsets,
+        n_agents: int,
+        obs_offsets: List[int],
+        reward_offset: int,
+        agent_id_offset: int,
+        counters_offset: Optional[int] = None,
+    ):
+        self.memory = memory
+        self.offsets = offsets
+        self.n_agents = n_agents
+        self._obs_offsets = obs_offsets
+        self._reward_offset = reward_offset
+        self._agent_id_offset = agent_id_offset
+        self._counters_offset = counters_offset
+        self._obs: Optional[List[np.ndarray]] = None
+        self._float_obs: Optional[List[np.ndarray]] = None
+        # The counter of the observations last decoded into float_obs
+        self._decoded_counters: List[Optional[int]] = []
+        self._counters: Optional[np.ndarray] = None
+        self._reward: Optional[np.ndarray] = None
+        self._agent_id: Optional[np.ndarray] = None
+        self._group_id: Optional[np.ndarray] = None
+        self._group_reward: Optional[np.ndarray] = None
+
+    @property
+    def obs(self) -> List[np.ndarray]:
+        if self._obs is None:
+            obs: List[np.ndarray] = []
+            for obs_offset, obs_spec, obs_dtype in zip(
+                self._obs_offsets,
+                self.offsets.behavior_spec.observation_specs,
+                self.offsets.obs_dtypes,
+            ):
+                obs_shape = (self.n_agents,) + obs_spec.shape
+                obs.append(
+                    self.memory.get_ndarray(
+                        obs_offset, obs_shape, obs_dtype.numpy_dtype
+                    )
+                )
+            self._obs = obs
+        return self._obs
+
+    def decode_obs(self, index: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Converts the observation at index to float32, see decode_observation.
+        """
+        return decode_observation(
+            self.obs[index],
+            self.offsets.obs_dtypes[index],
+            self.offsets.obs_quantization[index],
+            out,
+        )
+
+    def float_obs(self) -> List[np.ndarray]:
+        """
+        Converts the observations that are not float32 to float32, see
+        decode_observation. The conversion is done every call into buffers reused
+        for all the steps with the same number of Agents.
+        """
+        if self._float_obs is None:
+            self._float_obs = [
+                o if o.dtype == np.float32 else np.empty(o.shape, np.float32)
+                for o in self.obs
+            ]
+            self._decoded_counters = [None] * len(self._float_obs)
+        counters = self.counters
+        for index, float_obs in enumerate(self._float_obs):
+            if self.offsets.obs_dtypes[index] == ObservationDtype.FLOAT32:
+                continue
+            if counters is not None:
+                # The buffer already holds this data
+                counter = int(counters[index])
+                if self._decoded_counters[index] == counter:
+                    continue
+                self._decoded_counters[index] = counter
+            self.decode_obs(index, float_obs)
+        return self._float_obs
+
+    @property
+    def counters(self) -> Optional[np.ndarray]:
+        """
+        The change counters of the observations followed by the one of the action
+        mask, None if Unity does not send them.
+        """
+        if self._counters is None and self._counters_offset is not None:
+            n_obs = len(self._obs_offsets)
+            self._counters = self.memory.get_ndarray(
+                self._counters_offset, (n_obs + 1,), np.int32
+            )
+        return self._counters
+
+    def section_counters(self) -> Optional[SectionCounters]:
+        counters = self.counters
+        if counters is None:
+            return None
+        values = counters.tolist()
+        return SectionCounters(tuple(values[:-1]), values[-1])
+
+    @property
+    def reward(self) -> np.ndarray:
+        if self._reward is None:
+            self._reward = self.memory.get_ndarray(
+                self._reward_offset, (self.n_agents,), np.float32
+            )
+        return self._reward
+
+    @property
+    def agent_id(self) -> np.ndarray:
+        if self._agent_id is None:
+            self._agent_id = self.memory.get_ndarray(
+                self._agent_id_offset, (self.n_agents,), np.int32
+            )
+        return self._agent_id
+
+    # TODO: Communicate the group values
+    @property
+    def group_id(self) -> np.ndarray:
+        if self._group_id is None:
+            self._group_id = read_only_zeros(self.n_agents, np.int32)
+        return self._group_id
+
+    @property
+    def group_reward(self) -> np.ndarray:
+        if self._group_reward is None:
+            self._group_reward = read_only_zeros(self.n_agents, np.float32)
+        return self._group_reward
+
+
+class DecisionViews(StepViews):
+    def __init__(
+        self, memory: BaseSharedMemory, offsets: RLDataOffsets, n_agents: int
+    ):
+        super(DecisionViews, self).__init__(
+            memory,
+            offsets,
+            n_agents,
+            offsets.decision_obs_offset,
+            offsets.decision_rewards_offset,
+            offsets.decision_agent_id_offset,
+            offsets.section_counters_offset,
+        )
+        self._action_mask: Optional[List[np.ndarray]] = None
+        self._actions: Optional[ActionTuple] = None
+
+    @property
+    def action_mask(self) -> Optional[List[np.ndarray]]:
+        start = self.offsets.masks_offset
+        if start is None:
+            return None
+        if self._action_mask is None:
+            branches = self.offsets.behavior_spec.action_spec.discrete_branches
+            result: List[np.ndarray] = []
+            for branch_size in branches:
+                result += [
+                    self.memory.get_ndarray(
+                        start, (self.n_agents, branch_size), np.bool_
+                    )
+                ]
+                start += self.offsets.max_n_agents * branch_size
+            self._action_mask = result
+        return self._action_mask
+
+    @property
+    def actions(self) -> ActionTuple:
+        """
+        Writable views of the actions of the Agents requesting a decision
+        """
+        if self._actions is None:
+            action_spec = self.offsets.behavior_spec.action_spec
+            self._actions = ActionTuple(
+                continuous=self.memory.get_ndarray(
+                    self.offsets.continuous_action_offset,
+                    (self.n_agents, action_spec.continuous_size),
+                    np.float32,
+                ),
+                discrete=self.memory.get_ndarray(
+                    self.offsets.discrete_action_offset,
+                    (self.n_agents, len(action_spec.discrete_branches)),
+                    np.int32,
+                ),
+            )
+        return self._actions
+
+
+class TerminalViews(StepViews):
+    def __init__(
+        self, memory: BaseSharedMemory, offsets: RLDataOffsets, n_agents: int
+    ):
+        super(TerminalViews, self).__init__(
+            memory,
+            offsets,
+            n_agents,
+            offsets.termination_obs_offset,
+            offsets.termination_reward_offset,
+            offsets.termination_agent_id_offset,
+        )
+        self._interrupted: Optional[np.ndarray] = None
+
+    @property
+    def interrupted(self) -> np.ndarray:
+        if self._interrupted is None:
+            self._interrupted = self.memory.get_ndarray(
+                self.offsets.termination_status_offset, (self.n_agents,), np.bool_
+            )
+        return self._interrupted
+
+
+# Largest ratio between the range of the agent ids and the number of Agents for
+# which a table from id to row is used
+MAX_AGENT_TABLE_DENSITY = 4
+
+
+class AgentIndex(NamedTuple):
+    """
+    Maps the agent ids of a step to their rows
+    """
+
+    # The smallest agent id
+    first_id: int
+    # The row of each id starting from first_id, -1 for the missing ones. None if
+    # the ids are too sparse.
+    table: Optional[np.ndarray]
+    # The ids in increasing order and their rows, only used without table
+    sorted_ids: Optional[np.ndarray]
+    order: Optional[np.ndarray]
+
+
+def _agent_index(agent_id: np.ndarray) -> AgentIndex:
+    n_agents = len(agent_id)
+    if n_agents == 0:
+        return AgentIndex(0, np.zeros(0, np.intp), None, None)
+    first_id = int(agent_id.min())
+    id_range = int(agent_id.max()) - first_id + 1
+    if id_range <= MAX_AGENT_TABLE_DENSITY * n_agents:
+        table = np.full(id_range, -1, np.intp)
+        table[agent_id - first_id] = np.arange(n_agents)
+        return AgentIndex(first_id, table, None, None)
+    # Sparse ids : sort them so the rows are found with a binary search
+    order = np.argsort(agent_id, kind="stable")
+    return AgentIndex(first_id, None, agent_id[order], order)
+
+
+def _step_obs(views: StepViews, float_obs: bool) -> List[np.ndarray]:
+    if float_obs:
+        return views.float_obs()
+    return views.obs
+
+
+class LazyDecisionSteps(DecisionSteps):
+    """
+    DecisionSteps reading its arrays from the shared memory only when they are
+    accessed. The number of Agents is known without reading any of them. The
+    arrays are views of the memory of the step it was created for and must be
+    accessed before the next step.
+    """
+
+    def __init__(self, views: DecisionViews, float_obs: bool = False):
+        """
+        :param views: The StepViews of the behavior for the current step
+        :bool float_obs: If true, the observations are converted to float32 the
+        first time they are accessed
+        """
+        # The fields of DecisionSteps are properties, it is not initialized
+        self._views = views
+        self._float_obs = float_obs
+        self._obs: Optional[List[np.ndarray]] = None
+        self._agent_id_to_index = None
+        self._agent_index: Optional[AgentIndex] = None
+
+    @property
+    def obs(self) -> List[np.ndarray]:
+        if self._obs is None:
+            self._obs = _step_obs(self._views, self._float_obs)
+        return self._obs
+
+    def decode_obs(self, index: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Converts the observation at index to float32, optionally into out, see
+        decode_observation.
+        """
+        return self._views.decode_obs(index, out)
+
+    def agent_rows(self, agent_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the rows of the given Agents in the arrays of the steps, using an
+        index built once per step. When the ids are dense, the index is a table
+        from id to row, otherwise it is the sorted ids.
+        Raises a KeyError if one of the Agents did not request a decision.
+        """
+        if self._agent_index is None:
+            self._agent_index = _agent_index(self.agent_id)
+        agent_ids = np.asarray(agent_ids)
+        if len(agent_ids) == 0:
+            return np.zeros(0, np.intp)
+        first_id, table, sorted_ids, order = self._agent_index
+        if table is not None:
+            positions = agent_ids - first_id
+            found = (positions >= 0) & (positions < len(table))
+            rows = np.full(len(agent_ids), -1, np.intp)
+            rows[found] = table[positions[found]]
+            found = rows >= 0
+        else:
+            positions = np.searchsorted(sorted_ids, agent_ids)
+            np.minimum(positions, len(sorted_ids) - 1, out=positions)
+            found = sorted_ids[positions] == agent_ids
+            rows = order[positions]
+        if not np.all(found):
+            missing = agent_ids[~found][0]
+            raise KeyError(
+                f"agent_id {missing} did not request a decision at the previous step"
+            )
+        return rows
+
+    @property
+    def section_counters(self) -> Optional[SectionCounters]:
+        """
+        The change counters of the observations and of the action mask, None if
+        Unity does not send them (HeaderFeatures.SECTION_COUNTERS).
+        """
+        return self._views.section_counters()
+
+    reward = property(lambda self: self._views.reward)
+    agent_id = property(lambda self: self._views.agent_id)
+    action_mask = property(lambda self: self._views.action_mask)
+    group_id = property(lambda self: self._views.group_id)
+    group_reward = property(lambda self: self._views.group_reward)
+
+    def __len__(self) -> int:
+        return self._views.n_agents
+
+
+class LazyTerminalSteps(TerminalSteps):
+    """
+    TerminalSteps reading its arrays from the shared memory only when they are
+    accessed, see LazyDecisionSteps.
+    """
+
+    def __init__(self, views: TerminalViews, float_obs: bool = False):
+        self._views = views
+        self._float_obs = float_obs
+        self._obs: Optional[List[np.ndarray]] = None
+        self._agent_id_to_index = None
+
+    @property
+    def obs(self) -> List[np.ndarray]:
+        if self._obs is None:
+            self._obs = _step_obs(self._views, self._float_obs)
+        return self._obs
+
+    def decode_obs(self, index: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        return self._views.decode_obs(index, out)
+
+    reward = property(lambda self: self._views.reward)
+    interrupted = property(lambda self: self._views.interrupted)
+    agent_id = property(lambda self: self._views.agent_id)
+    group_id = property(lambda self: self._views.group_id)
+    group_reward = property(lambda self: self._views.group_reward)
+
+    def __len__(self) -> int:
+        return self._views.n_agents
@@ -0,0 +1,170 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import NamedTuple, Union
+
+# CPU time spent by the calling thread, falls back to the process CPU time
+# on platforms that do not expose per thread clocks.
+cpu_clock = getattr(time, "thread_time", time.process_time)
+
+
+class WaitPolicy(Enum):
+    SPIN = "spin"
+    YIELD = "yield"
+    SLEEP = "sleep"
+    AUTO = "auto"
+
+
+class WaitStats(NamedTuple):
+    """
+    Measurements of a single wait on the Unity side of the communication
+    """
+
+    # Wall clock time spent waiting, in seconds
+    wait_time: float
+    # CPU time consumed by the waiting thread, in seconds
+    cpu_time: float
+    # Number of times the header was polled
+    iterations: int
+
+
+def _yield_cpu() -> None:
+    if hasattr(os, "sched_yield"):
+        os.sched_yield()
+    else:
+        time.sleep(0)
+
+
+class WaitStrategy(ABC):
+    """
+    Decides what the waiting thread does between two polls of the shared memory
+    header. The strategy is given the time elapsed since the beginning of the wait
+    so it can go from spinning to yielding to sleeping as the wait gets longer.
+    """
+
+    def start(self) -> None:
+        """
+        Called once at the beginning of every wait.
+        """
+
+    @abstractmethod
+    def pause(self, elapsed: float) -> None:
+        """
+        Called every time the header was polled and Unity was still running.
+        :float elapsed: Seconds since the beginning of the wait
+        """
+
+    def record(self, stats: WaitStats) -> None:
+        """
+        Called once at the end of every wait with the measurements of that wait.
+        """
+
+
+class SpinWaitStrategy(WaitStrategy):
+    """
+    Polls the header continuously. Lowest latency, but uses a full core while
+    Unity is running.
+    """
+
+    def pause(self, elapsed: float) -> None:
+        pass
+
+
+class YieldWaitStrategy(WaitStrategy):
+    """
+    Spins for spin_time seconds, then yields the CPU to the scheduler between
+    two polls.
+    """
+
+    def __init__(self, spin_time: float = 50e-6):
+        self.spin_time = spin_time
+
+    def pause(self, elapsed: float) -> None:
+        if elapsed >= self.spin_time:
+            _yield_cpu()
+
+
+class BackoffWaitStrategy(WaitStrategy):
+    """
+    Spins for spin_time seconds, then sleeps between two polls. The sleep
+    duration starts at min_sleep and is multiplied by factor after every sleep
+    until it reaches max_sleep.
+    """
+
+    def __init__(
+        self,
+        spin_time: float = 50e-6,
+        min_sleep: float = 10e-6,
+        max_sleep: float = 1e-3,
+        factor: float = 2.0,
+    ):
+        self.spin_time = spin_time
+        self.min_sleep = min_sleep
+        self.max_sleep = max_sleep
+        self.factor = factor
+        self._sleep = min_sleep
+
+    def start(self) -> None:
+        self._sleep = self.min_sleep
+
+    def pause(self, elapsed: float) -> None:
+        if elapsed < self.spin_time:
+            return
+        time.sleep(self._sleep)
+        self._sleep = min(self._sleep * self.factor, self.max_sleep)
+
+
+class AdaptiveWaitStrategy(WaitStrategy):
+    """
+    Keeps a moving average of how long Unity takes to respond. Sleeps through
+    the first sleep_fraction of the expected latency and then yields between
+    polls until Unity responds. Waits shorter than spin_time are spun.
+    """
+
+    def __init__(
+        self,
+        spin_time: float = 50e-6,
+        sleep_fraction: float = 0.8,
+        max_sleep: float = 1e-3,
+        smoothing: float = 0.1,
+    ):
+        self.spin_time = spin_time
+        self.sleep_fraction = sleep_fraction
+        self.max_sleep = max_sleep
+        self.smoothing = smoothing
+        self.expected_latency = 0.0
+
+    def pause(self, elapsed: float) -> None:
+        if elapsed < self.spin_time:
+            return
+        remaining = self.sleep_fraction * self.expected_latency - elapsed
+        if remaining > self.spin_time:
+            time.sleep(min(remaining, self.max_sleep))
+        else:
+            _yield_cpu()
+
+    def record(self, stats: WaitStats) -> None:
+        if self.expected_latency == 0.0:
+            self.expected_latency = stats.wait_time
+        else:
+            self.expected_latency += self.smoothing * (
+                stats.wait_time - self.expected_latency
+            )
+
+
+def create_wait_strategy(policy: Union[str, WaitPolicy, WaitStrategy]) -> WaitStrategy:
+    """
+    Returns the WaitStrategy corresponding to a policy name. WaitStrategy instances
+    are returned as is.
+    """
+    if isinstance(policy, WaitStrategy):
+        return policy
+    policy = WaitPolicy(policy)
+    if policy == WaitPolicy.SPIN:
+        return SpinWaitStrategy()
+    if policy == WaitPolicy.YIELD:
+        return YieldWaitStrategy()
+    if policy == WaitPolicy.SLEEP:
+        return BackoffWaitStrategy()
+    return AdaptiveWaitStrategy()
@@ -0,0 +1,155 @@
+import errno
+import os
+import select
+from typing import List, Optional
+
+
+class FifoWakeChannel:
+    """
+    A pair of named pipes next to the shared memory header that Python and Unity
+    use to wake each other up. The header flags remain the source of truth, the
+    pipes only carry a one byte notification so the waiting side can block in the
+    kernel instead of polling the header.
+    """
+
+    TO_UNITY_SUFFIX = ".wake_unity"
+    TO_PYTHON_SUFFIX = ".wake_python"
+    # Upper bound on a single blocking wait. The caller is expected to check the
+    # header flags and its own timeout between two waits.
+    MAX_BLOCK = 1.0
+
+    def __init__(self, header_path: str, python_side: bool = True):
+        """
+        Opens the receiving end of the channel. Python creates the pipes, Unity
+        only opens them.
+        :string header_path: The path of the shared memory header file
+        :bool python_side: True if the channel is used by Python
+        """
+        to_unity = header_path + self.TO_UNITY_SUFFIX
+        to_python = header_path + self.TO_PYTHON_SUFFIX
+        if python_side:
+            for path in (to_unity, to_python):
+                if os.path.exists(path):
+                    os.remove(path)
+                os.mkfifo(path)
+            self._listen_path, self._notify_path = to_python, to_unity
+        else:
+            self._listen_path, self._notify_path = to_unity, to_python
+        self._listen_fd: Optional[int] = os.open(
+            self._listen_path, os.O_RDONLY | os.O_NONBLOCK
+        )
+        self._notify_fd: Optional[int] = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        return hasattr(os, "mkfifo")
+
+    @property
+    def connected(self) -> bool:
+        return self._notify_fd is not None
+
+    def connect(self) -> bool:
+        """
+        Opens the sending end of the channel. This only succeeds once the other
+        side opened its receiving end.
+        :return: True if the channel is connected
+        """
+        if self._notify_fd is None and self._listen_fd is not None:
+            try:
+                self._notify_fd = os.open(
+                    self._notify_path, os.O_WRONLY | os.O_NONBLOCK
+                )
+            except OSError as e:
+                if e.errno not in (errno.ENXIO, errno.ENOENT):
+                    raise
+        return self.connected
+
+    def notify(self) -> None:
+        """
+        Wakes the other side up. Does nothing if the channel is not connected or if
+        the other side already has pending notifications.
+        """
+        if self._notify_fd is None:
+            return
+        try:
+            os.write(self._notify_fd, b"\x01")
+        except BlockingIOError:
+            pass
+        except BrokenPipeError:
+            self._close_notify()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Blocks until the other side sent a notification or until timeout.
+        :float timeout: Maximum time to block in seconds
+        :return: True if a notification was received
+        """
+        return FifoWakeChannel.wait_any([self], timeout)
+
+    @staticmethod
+    def wait_any(channels: List["FifoWakeChannel"], timeout: float) -> bool:
+        """
+        Blocks until at least one of the channels received a notification or
+        until timeout.
+        :list channels: The channels to wait on
+        :float timeout: Maximum time to block in seconds
+        :return: True if a notification was received
+        """
+        listening = {c._listen_fd: c for c in channels if c._listen_fd is not None}
+        if not listening:
+            return False
+        ready, _, _ = select.select(
+            list(listening), [], [], min(timeout, FifoWakeChannel.MAX_BLOCK)
+        )
+        received = False
+        for fd in ready:
+            received = listening[fd].drain() or received
+        return received
+
+    def fileno(self) -> Optional[int]:
+        """
+        The file descriptor that becomes readable when the other side sends a
+        notification. None once the other side disconnected.
+        """
+        return self._listen_fd
+
+    def drain(self) -> bool:
+        """
+        Reads the pending notifications without blocking.
+        :return: False if the other side disconnected
+        """
+        if self._listen_fd is None:
+            return False
+        try:
+            data = os.read(self._listen_fd, 4096)
+        except BlockingIOError:
+            return True
+        if not data:
+            # The other side closed its sending end
+            self._close_notify()
+            os.close(self._listen_fd)
+            self._listen_fd = None
+            return False
+        return True
+
+    def _close_notify(self) -> None:
+        if self._notify_fd is not None:
+            os.close(self._notify_fd)
+            self._notify_fd = None
+
+    def close(self) -> None:
+        self._close_notify()
+        if self._listen_fd is not None:
+            os.close(self._listen_fd)
+            self._listen_fd = None
+
+    def delete(self) -> None:
+        """
+        Closes the channel and removes the named pipes.
+        """
+        self.close()
+        for path in (self._listen_path, self._notify_path):
+            try:
+                os.remove(path)
+            except BaseException:
+                pass
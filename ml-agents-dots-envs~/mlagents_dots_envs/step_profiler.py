@@ -0,0 +1,295 @@
+import json
+import os
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+# Monotonic clock in integer nanoseconds, emulated with perf_counter on Python
+# versions without perf_counter_ns.
+clock_ns = getattr(
+    time, "perf_counter_ns", lambda: int(time.perf_counter() * 1_000_000_000)
+)
+
+_NS_PER_SECOND = 1_000_000_000
+PROFILE_FILE_PREFIX = "step_latency_"
+
+
+class StepPhase(Enum):
+    # From the beginning of step_async to the end of step_wait
+    STEP = "step"
+    SIDE_CHANNEL_ENCODE = "side_channel_encode"
+    WRITE_SIDE_CHANNEL_DATA = "write_side_channel_data"
+    GIVE_UNITY_CONTROL = "give_unity_control"
+    # Waiting for Unity to give control back to Python
+    UNITY_WAIT = "unity_wait"
+    # Loading the file Unity created because the RL data did not fit, only
+    # recorded on the steps where it happened
+    FILE_REGENERATION = "file_regeneration"
+    SIDE_CHANNEL_DECODE = "side_channel_decode"
+    # Per behavior
+    GET_STEPS = "get_steps"
+    SET_ACTIONS = "set_actions"
+
+
+class LatencyHistogram:
+    """
+    Counts durations in nanoseconds in log-linear buckets like an HDR histogram.
+    The durations below 2 ** significant_bits nanoseconds have their own bucket,
+    the others share a bucket with the durations having the same
+    significant_bits most significant bits. The value reported for a bucket is
+    its upper bound, at most 2 ** (1 - significant_bits) above the recorded
+    durations. Recording is a few integer operations and a list increment.
+    """
+
+    def __init__(self, significant_bits: int = 7, max_value: int = 1 << 42):
+        """
+        :int significant_bits: The number of bits of a duration that are kept
+        :int max_value: Durations above it (73 minutes by default) are counted in
+        the last bucket
+        """
+        if significant_bits < 2:
+            raise ValueError("significant_bits must be at least 2")
+        self._bits = significant_bits
+        self._sub_count = 1 << significant_bits
+        self._half = self._sub_count >> 1
+        n_shifts = max(0, max_value.bit_length() - significant_bits)
+        n_buckets = self._sub_count + n_shifts * self._half
+        self._last = n_buckets - 1
+        self._counts: List[int] = [0] * n_buckets
+        self.reset()
+
+    def reset(self) -> None:
+        for index in range(len(self._counts)):
+            self._counts[index] = 0
+        self._count = 0
+        self._total = 0
+        self._min = 0
+        self._max = 0
+
+    @property
+    def significant_bits(self) -> int:
+        return self._bits
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_count:
+            return max(value, 0)
+        shift = value.bit_length() - self._bits
+        index = self._sub_count + (shift - 1) * self._half + (value >> shift)
+        return min(index - self._half, self._last)
+
+    def _upper_bound(self, index: int) -> int:
+        if index < self._sub_count:
+            return index
+        shift, mantissa = divmod(index - self._sub_count, self._half)
+        return ((mantissa + self._half + 1) << (shift + 1)) - 1
+
+    def record(self, value: int) -> None:
+        """
+        :int value: A duration in nanoseconds
+        """
+        self._counts[self._index(value)] += 1
+        if self._count == 0 or value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+        self._count += 1
+        self._total += value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Adds the durations recorded by other, which must have the same
+        significant_bits.
+        """
+        if other._bits != self._bits:
+            raise ValueError("The histograms have different significant_bits")
+        if other._count == 0:
+            return
+        for index, count in enumerate(other._counts[: len(self._counts)]):
+            self._counts[index] += count
+        for count in other._counts[len(self._counts) :]:
+            self._counts[self._last] += count
+        if self._count == 0 or other._min < self._min:
+            self._min = other._min
+        self._max = max(self._max, other._max)
+        self._count += other._count
+        self._total += other._total
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def min(self) -> int:
+        return self._min
+
+    @property
+    def max(self) -> int:
+        return self._max
+
+    @property
+    def mean(self) -> float:
+        return self._total / self._count if self._count else 0.0
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """
+        The duration in nanoseconds that percentile percent of the recorded
+        durations do not exceed, 0 if nothing was recorded.
+        :float percentile: Between 0 and 100
+        """
+        if self._count == 0:
+            return 0
+        target = max(1, -int(-percentile * self._count // 100))
+        cumulative = 0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self._upper_bound(index), self._max)
+        return self._max
+
+    def summary(self) -> Dict[str, float]:
+        """
+        The count, and the mean, extrema and percentiles in seconds
+        """
+        return {
+            "count": self._count,
+            "mean": self.mean / _NS_PER_SECOND,
+            "min": self._min / _NS_PER_SECOND,
+            "p50": self.value_at_percentile(50) / _NS_PER_SECOND,
+            "p90": self.value_at_percentile(90) / _NS_PER_SECOND,
+            "p99": self.value_at_percentile(99) / _NS_PER_SECOND,
+            "p999": self.value_at_percentile(99.9) / _NS_PER_SECOND,
+            "max": self._max / _NS_PER_SECOND,
+        }
+
+
+class StepProfiler:
+    """
+    Records the duration of the phases of the steps of an environment in a
+    LatencyHistogram per phase, and per behavior for the get_steps and
+    set_actions phases. If a directory is given, the summary is written to
+    step_latency_<name>.json in it every flush_interval seconds.
+    """
+
+    def __init__(
+        self,
+        name: str = "env",
+        directory: Optional[str] = None,
+        flush_interval: float = 60.0,
+        significant_bits: int = 7,
+    ):
+        """
+        :string name: Identifies the environment in the summary and the file name
+        :string directory: Where the summary is written, usually the run logs
+        directory. If None, the summary is only available through summary.
+        :float flush_interval: Seconds between two writes of the summary
+        :int significant_bits: See LatencyHistogram
+        """
+        self._name = name
+        self._directory = directory
+        self._flush_interval = flush_interval
+        self._significant_bits = significant_bits
+        self._histograms: Dict[Tuple[StepPhase, Optional[str]], LatencyHistogram] = {}
+        self._mark = clock_ns()
+        self._last_flush = time.monotonic()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def path(self) -> Optional[str]:
+        if self._directory is None:
+            return None
+        return os.path.join(self._directory, f"{PROFILE_FILE_PREFIX}{self._name}.json")
+
+    @property
+    def histograms(self) -> Dict[Tuple[StepPhase, Optional[str]], LatencyHistogram]:
+        """
+        The histograms indexed by phase and behavior name, None for the phases of
+        the whole environment
+        """
+        return self._histograms
+
+    def histogram(
+        self, phase: StepPhase, behavior_name: Optional[str] = None
+    ) -> LatencyHistogram:
+        key = (phase, behavior_name)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram(self._significant_bits)
+        return histogram
+
+    def record_ns(
+        self, phase: StepPhase, duration: int, behavior_name: Optional[str] = None
+    ) -> None:
+        """
+        :int duration: The duration of the phase in nanoseconds
+        """
+        self.histogram(phase, behavior_name).record(duration)
+
+    def record(
+        self, phase: StepPhase, duration: float, behavior_name: Optional[str] = None
+    ) -> None:
+        """
+        :float duration: The duration of the phase in seconds
+        """
+        self.histogram(phase, behavior_name).record(int(duration * _NS_PER_SECOND))
+
+    def start(self) -> int:
+        """
+        Starts timing the next phase and returns the current clock_ns.
+        """
+        self._mark = now = clock_ns()
+        return now
+
+    def mark(self, phase: StepPhase, exclude: float = 0.0) -> None:
+        """
+        Records the time since the last call to start or mark as the duration of
+        phase, minus exclude seconds already recorded in another phase.
+        """
+        now = clock_ns()
+        duration = now - self._mark - int(exclude * _NS_PER_SECOND)
+        self.histogram(phase).record(duration)
+        self._mark = now
+
+    def step_done(self) -> None:
+        """
+        Called at the end of every step, writes the summary if flush_interval
+        seconds passed since the last write.
+        """
+        if self._directory is not None:
+            if time.monotonic() - self._last_flush >= self._flush_interval:
+                self.flush()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        The summaries of the histograms of the phases of the environment and of
+        the phases of every behavior, see LatencyHistogram.summary
+        """
+        phases: Dict[str, Dict[str, float]] = {}
+        behaviors: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (phase, behavior_name), histogram in self._histograms.items():
+            if behavior_name is None:
+                phases[phase.value] = histogram.summary()
+            else:
+                behavior = behaviors.setdefault(behavior_name, {})
+                behavior[phase.value] = histogram.summary()
+        return {"name": self._name, "phases": phases, "behaviors": behaviors}
+
+    def flush(self) -> None:
+        """
+        Writes the summary to the directory, if any. The file is replaced
+        atomically so it can be read while the environment runs.
+        """
+        self._last_flush = time.monotonic()
+        path = self.path
+        if path is None:
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    def reset(self) -> None:
+        for histogram in self._histograms.values():
+            histogram.reset()
@@ -0,0 +1,62 @@
+import threading
+import pytest
+from mlagents_dots_envs import unity_environment, vectorized_unity_environment
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior, MockUnityPeer
+
+BEHAVIORS = [
+    MockBehavior("ball", 4, [(3,), (2, 2)], 2, (2, 3), episode_length=3),
+    MockBehavior("block", 2, [(5,)], 1),
+]
+
+
+class MockUnityProcess:
+    """
+    Stands in for the Unity process: runs a MockUnityPeer in a thread.
+    """
+
+    def __init__(self, file_name: str, **peer_kwargs):
+        self.returncode = 0
+        self.peer = None
+        self._thread = threading.Thread(
+            target=self._run, args=(file_name,), kwargs=peer_kwargs
+        )
+        self._thread.start()
+
+    def _run(self, file_name: str, **peer_kwargs) -> None:
+        self.peer = MockUnityPeer(file_name, **peer_kwargs)
+        self.peer.run()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+
+    def kill(self):
+        pass
+
+
+@pytest.fixture
+def mock_peer_kwargs():
+    """
+    Additional arguments of the MockUnityPeers, override with parametrize.
+    """
+    return {}
+
+
+@pytest.fixture
+def mock_unity_processes(monkeypatch, mock_peer_kwargs):
+    """
+    Replaces the launch of Unity executables with MockUnityPeers simulating
+    BEHAVIORS. Returns the list of started processes.
+    """
+    processes = []
+
+    def launch(file_name, args):
+        memory_path = args[args.index("--memory-path") + 1]
+        kwargs = {"behaviors": BEHAVIORS, **mock_peer_kwargs}
+        processes.append(MockUnityProcess(memory_path, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(unity_environment, "launch_executable", launch)
+    monkeypatch.setattr(vectorized_unity_environment, "launch_executable", launch)
+    yield processes
+    for process in processes:
+        process.wait(5)
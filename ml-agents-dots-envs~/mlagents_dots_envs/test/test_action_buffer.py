@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_envs.exception import UnityActionException, UnityEnvironmentException
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+
+@pytest.mark.parametrize("rl_data_banks", [1, 2])
+def test_action_buffer(mock_unity_processes, rl_data_banks):
+    env = UnityEnvironment("mock", wait_policy="yield", rl_data_banks=rl_data_banks)
+    try:
+        env.reset()
+        for step in range(3):
+            buffer = env.get_action_buffer("ball")
+            assert buffer.continuous.shape == (4, 2)
+            assert buffer.discrete.shape == (4, 2)
+            buffer.continuous[:] = step + 0.5
+            buffer.discrete[:, 1] = step
+            env.step()
+            received_continuous, received_discrete = mock_unity_processes[
+                0
+            ].peer.actions["ball"]
+            assert np.all(received_continuous == step + 0.5)
+            assert np.all(received_discrete[:, 1] == step)
+
+        # set_actions converts the dtypes while copying into the same memory
+        continuous = np.full((4, 2), 3.0)
+        env.set_actions("ball", ActionTuple(continuous, np.ones((4, 2), np.int64)))
+        assert np.all(env.get_action_buffer("ball").continuous == 3)
+        env.step()
+        received_continuous, _ = mock_unity_processes[0].peer.actions["ball"]
+        assert np.all(received_continuous == 3)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("rl_data_banks", [1, 2])
+def test_trusted_set_actions(mock_unity_processes, rl_data_banks):
+    env = UnityEnvironment(
+        "mock", wait_policy="yield", rl_data_banks=rl_data_banks, trusted_actions=True
+    )
+    try:
+        env.reset()
+        for step in range(3):
+            env.set_actions(
+                "ball", ActionTuple(np.full((4, 2), step), np.full((4, 2), step))
+            )
+            env.step()
+            received_continuous, received_discrete = mock_unity_processes[
+                0
+            ].peer.actions["ball"]
+            assert np.all(received_continuous == step)
+            assert np.all(received_discrete == step)
+        # The checks are skipped, numpy still refuses to copy mismatched shapes
+        with pytest.raises(ValueError):
+            env.set_actions("ball", ActionTuple(np.zeros((3, 2)), np.zeros((3, 2))))
+        with pytest.raises(KeyError):
+            env.set_actions("unknown", ActionTuple(np.zeros((4, 2))))
+        with pytest.raises(UnityActionException):
+            env.set_actions("ball", ActionTuple(np.zeros((3, 2))), trusted=False)
+        # Unity reads the actions while a step is pending
+        env.step_async()
+        with pytest.raises(UnityEnvironmentException):
+            env.set_actions("ball", ActionTuple(np.zeros((4, 2)), np.zeros((4, 2))))
+        env.step_wait()
+    finally:
+        env.close()
+
+
+def test_vectorized_trusted_set_actions(mock_unity_processes):
+    env = VectorizedUnityEnvironment("mock", n_envs=2, wait_policy="yield")
+    try:
+        env.reset()
+        continuous = np.arange(4, dtype=np.float32).reshape(4, 1)
+        env.set_actions("block", ActionTuple(continuous), trusted=True)
+        env.step()
+        for i, process in enumerate(mock_unity_processes):
+            received_continuous, _ = process.peer.actions["block"]
+            assert np.array_equal(received_continuous, continuous[2 * i : 2 * i + 2])
+    finally:
+        env.close()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from mlagents_envs.exception import UnityEnvironmentException
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.shared_memory.shared_memory_header import (
+    HeaderFeatures,
+    MAX_ACTION_REPEAT,
+    SharedMemoryHeader,
+)
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+BALL = MockBehavior("ball", 4, [(3,)], 2, episode_length=5)
+
+
+def test_header_action_repeat():
+    header = SharedMemoryHeader("test_header_action_repeat")
+    try:
+        assert header.action_repeat == 1
+        header.action_repeat = 4
+        assert header.action_repeat == 4
+        assert header.snapshot().action_repeat == 4
+        # The neighbouring fields are untouched
+        assert header.snapshot().requested_features == HeaderFeatures.NONE
+        for value in (0, MAX_ACTION_REPEAT + 1):
+            with pytest.raises(ValueError):
+                header.action_repeat = value
+    finally:
+        header.close()
+        header.delete()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [BALL]}])
+def test_action_repeat(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", action_repeat=2)
+    try:
+        env.reset()
+        env.step()
+        decision_steps, terminal_steps = env.get_steps("ball")
+        assert mock_unity_processes[0].peer._step_count == 2
+        assert np.allclose(decision_steps.reward, 0.2)
+        assert len(terminal_steps) == 0
+        # The episode ends during the 5th tick, in the middle of the step
+        env.step(repeat=3)
+        decision_steps, terminal_steps = env.get_steps("ball")
+        assert mock_unity_processes[0].peer._step_count == 5
+        assert np.allclose(decision_steps.reward, 0.3)
+        assert len(terminal_steps) == 4
+        env.step(repeat=1)
+        assert mock_unity_processes[0].peer._step_count == 6
+        # Resetting always simulates a single tick
+        env.reset()
+        assert mock_unity_processes[0].peer._step_count == 0
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize(
+    "mock_peer_kwargs",
+    [{"behaviors": [BALL], "supported_features": HeaderFeatures.NONE}],
+)
+def test_action_repeat_not_supported(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        env.step(repeat=1)
+        with pytest.raises(UnityEnvironmentException):
+            env.step(repeat=2)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [BALL]}])
+def test_vectorized_action_repeat(mock_unity_processes):
+    env = VectorizedUnityEnvironment("mock", n_envs=2, wait_policy="yield")
+    try:
+        env.reset()
+        env.step(repeat=4)
+        decision_steps, _ = env.get_steps("ball")
+        assert np.allclose(decision_steps.reward, 0.4)
+        for process in mock_unity_processes:
+            assert process.peer._step_count == 4
+    finally:
+        env.close()
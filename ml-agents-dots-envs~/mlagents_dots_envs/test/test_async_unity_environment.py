@@ -0,0 +1,94 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_envs.exception import UnityEnvironmentException
+from mlagents_dots_envs.async_unity_environment import AsyncUnityEnvironment
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockUnityPeer
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+def test_step_async(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.step_async(reset=True)
+        with pytest.raises(UnityEnvironmentException):
+            env.get_steps("ball")
+        with pytest.raises(UnityEnvironmentException):
+            env.step_async()
+        while not env.step_ready():
+            pass
+        env.step_wait()
+        decision_steps, _ = env.get_steps("ball")
+        assert len(decision_steps) == 4
+        with pytest.raises(UnityEnvironmentException):
+            env.step_wait()
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("wake_channel", [False, True])
+def test_async_unity_environment(mock_unity_processes, wake_channel):
+    envs = [
+        AsyncUnityEnvironment(UnityEnvironment("mock", wake_channel=wake_channel))
+        for _ in range(2)
+    ]
+
+    async def run(env: AsyncUnityEnvironment):
+        await env.reset()
+        for _ in range(5):
+            decision_steps, _ = env.get_steps("block")
+            env.set_actions(
+                "block",
+                ActionTuple(continuous=np.ones((len(decision_steps), 1), np.float32)),
+            )
+            await env.step()
+        return len(env.get_steps("block")[0])
+
+    async def run_all():
+        return await asyncio.gather(*[run(env) for env in envs])
+
+    try:
+        assert asyncio.run(run_all()) == [2, 2]
+        for process in mock_unity_processes:
+            continuous, _ = process.peer.actions["block"]
+            assert np.array_equal(continuous, np.ones((2, 1), np.float32))
+    finally:
+        for env in envs:
+            env.close()
+
+
+@pytest.mark.parametrize("wake_channel", [False, True])
+def test_async_step_cancelled_and_repeated(
+    mock_unity_processes, monkeypatch, wake_channel
+):
+    simulate = MockUnityPeer.simulate
+
+    def slow_simulate(peer, reset, query):
+        # The step is still running when the task is cancelled
+        time.sleep(0.01)
+        simulate(peer, reset, query)
+
+    monkeypatch.setattr(MockUnityPeer, "simulate", slow_simulate)
+    env = AsyncUnityEnvironment(
+        UnityEnvironment("mock", wake_channel=wake_channel, wait_policy="yield")
+    )
+
+    async def run():
+        await env.reset()
+        task = asyncio.ensure_future(env.step())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The cancelled step was completed
+        await env.step(repeat=2)
+        return env.get_steps("block")[0]
+
+    try:
+        decision_steps = asyncio.run(run())
+        assert mock_unity_processes[0].peer._step_count == 3
+        assert np.allclose(decision_steps.reward, 0.2)
+    finally:
+        env.close()
@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import pytest
+from mlagents_dots_envs.shared_memory.backing_store import (
+    BackingStore,
+    MemoryHints,
+    create_file,
+    map_file,
+)
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+)
+
+
+def test_sparse_creation(tmp_path):
+    file_path = str(tmp_path / "sparse")
+    size = 64 * 1024 * 1024
+    create_file(file_path, size)
+    stat = os.stat(file_path)
+    assert stat.st_size == size
+    # No page was written
+    assert stat.st_blocks * 512 < size // 16
+
+
+@pytest.mark.parametrize(
+    "hints",
+    [MemoryHints(), MemoryHints(populate=True, huge_pages=True, will_need=True)],
+)
+def test_map_file(tmp_path, hints):
+    file_path = str(tmp_path / "mapped")
+    create_file(file_path, 4 * 1024 * 1024)
+    accessor = map_file(file_path, hints)
+    data = np.frombuffer(accessor, dtype=np.float32)
+    assert len(data) == 1024 * 1024
+    assert np.all(data == 0)
+    data[:] = 1
+    del data
+    accessor.close()
+    memory = BaseSharedMemory(file_path)
+    assert np.all(memory.get_ndarray(0, (16,), np.float32) == 1)
+    memory.delete()
+    assert not os.path.exists(file_path)
+
+
+def test_communicator_backing_store(tmp_path):
+    store = BackingStore(str(tmp_path), MemoryHints(will_need=True))
+    communicator = SharedMemoryCommunicator(backing_store=store)
+    directory = os.path.join(str(tmp_path), BackingStore.DIRECTORY)
+    assert os.path.dirname(communicator.communicator_id) == directory
+    assert os.path.exists(communicator.communicator_id)
+    assert os.path.exists(communicator.communicator_id + "_")
+    communicator.abort()
+    assert os.listdir(directory) == []
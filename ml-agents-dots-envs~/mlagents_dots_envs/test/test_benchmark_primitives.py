@@ -0,0 +1,11 @@
+from mlagents_dots_envs.benchmarks.benchmark_primitives import compare
+
+
+def test_compare():
+    baseline = {"fast": 100.0, "slow": 100.0, "removed": 100.0}
+    results = {"fast": 124.0, "slow": 150.0, "added": 1000.0}
+    # Only the paths present in both and slower than the threshold are reported
+    assert compare(baseline, results, 0.25) == [("slow", 1.5)]
+    assert compare(baseline, results, 0.2) == [("fast", 1.24), ("slow", 1.5)]
+    assert compare(baseline, results, 0.5) == []
+    assert compare({}, results, 0.25) == []
@@ -0,0 +1,56 @@
+import pytest
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.shared_memory.capacity_hints import CapacityHint
+from mlagents_dots_envs.shared_memory.shared_memory_header import (
+    SharedMemoryHeader,
+    HeaderFeatures,
+)
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+RAMP = [MockBehavior("ramp", 2, [(3,), (4, 4, 2)], 2, agent_growth=3)]
+
+
+def test_capacity_hints_in_header():
+    hints = [
+        CapacityHint("a", 1000),
+        CapacityHint("behavior_b", 50, [(3,), (84, 84, 3)]),
+    ]
+    header = SharedMemoryHeader("test_capacity_hints", capacity_hints=hints)
+    try:
+        assert header.requested_features & HeaderFeatures.CAPACITY_HINTS
+        assert header.capacity_hints == hints
+    finally:
+        header.delete()
+    header = SharedMemoryHeader("test_capacity_hints")
+    try:
+        assert header.capacity_hints == []
+    finally:
+        header.delete()
+
+
+@pytest.mark.parametrize(
+    "mock_peer_kwargs,capacity_hints,expect_reallocations",
+    [
+        ({"behaviors": RAMP}, None, True),
+        ({"behaviors": RAMP}, [CapacityHint("ramp", 100)], False),
+        ({"behaviors": RAMP}, [CapacityHint("ramp", 100, [(3,), (4, 4, 2)])], False),
+        # The observations do not match the behavior, Unity ignores the hint
+        ({"behaviors": RAMP}, [CapacityHint("ramp", 100, [(3,)])], True),
+    ],
+)
+def test_capacity_hints(mock_unity_processes, capacity_hints, expect_reallocations):
+    env = UnityEnvironment(
+        "mock", wait_policy="yield", capacity_hints=capacity_hints
+    )
+    try:
+        env.reset()
+        registration_count = env.reallocation_count
+        assert registration_count >= 1
+        for step in range(1, 20):
+            env.step()
+            decision_steps, _ = env.get_steps("ramp")
+            assert len(decision_steps) == 2 + 3 * step
+            assert decision_steps.obs[1].shape == (2 + 3 * step, 4, 4, 2)
+        assert (env.reallocation_count > registration_count) == expect_reallocations
+    finally:
+        env.close()
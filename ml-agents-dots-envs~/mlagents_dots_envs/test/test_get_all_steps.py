@@ -0,0 +1,45 @@
+import pytest
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+WITH_IDLE = [
+    MockBehavior("ball", 4, [(3,), (2, 2)], 2, (2, 3), episode_length=3),
+    MockBehavior("idle", 0, [(2,)], 1),
+    MockBehavior("block", 2, [(5,)], 1),
+]
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": WITH_IDLE}])
+@pytest.mark.parametrize("rl_data_banks", [1, 2])
+def test_get_all_steps(mock_unity_processes, rl_data_banks):
+    env = UnityEnvironment("mock", wait_policy="yield", rl_data_banks=rl_data_banks)
+    try:
+        env.reset()
+        assert set(env.behavior_specs) == {"ball", "block", "idle"}
+        for step in range(1, 5):
+            all_steps = env.get_all_steps()
+            # The behaviors without Agents are skipped
+            assert set(all_steps) == {"ball", "block"}
+            decision_steps, terminal_steps = all_steps["ball"]
+            assert len(decision_steps) == 4
+            assert len(terminal_steps) == (4 if step == 4 else 0)
+            assert len(all_steps["block"][0]) == 2
+            # The steps are the ones get_steps returns
+            assert env.get_steps("ball")[0] is decision_steps
+            assert env.get_steps("block")[1] is all_steps["block"][1]
+            env.step()
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": WITH_IDLE}])
+def test_vectorized_get_all_steps(mock_unity_processes):
+    env = VectorizedUnityEnvironment("mock", n_envs=2, wait_policy="yield")
+    try:
+        env.reset()
+        all_steps = env.get_all_steps()
+        assert set(all_steps) == {"ball", "block"}
+        assert len(all_steps["ball"][0]) == 8
+    finally:
+        env.close()
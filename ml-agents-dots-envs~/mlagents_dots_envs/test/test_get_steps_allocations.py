@@ -0,0 +1,68 @@
+import gc
+import tracemalloc
+from typing import Callable, List
+import numpy as np
+from mlagents_envs.base_env import ActionTuple
+from mlagents_dots_envs.shared_memory import shared_memory_body
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+def _traced_step_loop(
+    env: UnityEnvironment, steps: int, get_steps: Callable[[str], None]
+) -> List[tracemalloc.StatisticDiff]:
+    """
+    Returns the difference of the memory allocated by the SharedMemoryBody before
+    and after steps steps once all the views were created.
+    """
+    actions = ActionTuple(np.zeros((4, 2), np.float32), np.zeros((4, 2), np.int32))
+    tracemalloc.start(25)
+    try:
+        # The episodes last 3 steps, create the views of every number of agents
+        for i in range(6 + steps):
+            if i == 6:
+                gc.collect()
+                before = tracemalloc.take_snapshot()
+            for name in env.behavior_specs:
+                get_steps(name)
+            env.set_actions("ball", actions)
+            env.step()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    body_filter = tracemalloc.Filter(True, shared_memory_body.__file__, all_frames=True)
+    return after.filter_traces([body_filter]).compare_to(
+        before.filter_traces([body_filter]), "filename"
+    )
+
+
+def test_get_steps_does_not_allocate(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        diff = _traced_step_loop(env, 30, env.get_steps)
+        assert sum(stat.size_diff for stat in diff) <= 0
+
+        decision_steps, _ = env.get_steps("ball")
+        # The arrays are cached views of the shared memory
+        assert decision_steps.obs[0] is env.get_steps("ball")[0].obs[0]
+        assert not decision_steps.group_id.flags.writeable
+        assert np.all(decision_steps.group_reward == 0)
+    finally:
+        env.close()
+
+
+def test_get_steps_only_allocates_steps(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        kept = []
+        diff = _traced_step_loop(
+            env, 30, lambda name: kept.append(env.get_steps(name))
+        )
+        # Only the DecisionSteps and TerminalSteps objects are new, no array is
+        # created
+        blocks_per_call = sum(stat.count_diff for stat in diff) / len(kept)
+        assert blocks_per_call <= 4
+    finally:
+        env.close()
@@ -0,0 +1,31 @@
+import numpy as np
+from mlagents_envs.base_env import ActionTuple
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+def test_lazy_steps(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        decision_steps, terminal_steps = env.get_steps("ball")
+        assert len(decision_steps) == 4
+        assert len(terminal_steps) == 0
+        views = decision_steps._views
+        # Counting the Agents does not read any array
+        assert views._obs is None and views._agent_id is None
+        assert decision_steps.reward.shape == (4,)
+        assert views._obs is None
+        # The steps are memoized until the next step
+        assert env.get_steps("ball")[0] is decision_steps
+
+        actions = ActionTuple(np.zeros((4, 2), np.float32), np.zeros((4, 2), np.int32))
+        env.set_actions("ball", actions)
+        env.step()
+        new_decision_steps, _ = env.get_steps("ball")
+        assert new_decision_steps is not decision_steps
+        assert np.all(new_decision_steps.obs[0] == 1)
+        assert list(new_decision_steps) == list(new_decision_steps.agent_id)
+        agent_id = new_decision_steps.agent_id[0]
+        assert new_decision_steps[agent_id].obs[1].shape == (2, 2)
+    finally:
+        env.close()
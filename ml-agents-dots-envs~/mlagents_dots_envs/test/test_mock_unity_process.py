@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.mock_unity.mock_unity_process import (
+    parse_behavior,
+    write_launcher,
+)
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+
+def test_parse_behavior():
+    assert parse_behavior("ball:10:8") == MockBehavior("ball", 10, [(8,)])
+    assert parse_behavior("cam:3:84x84x3,5:2:20") == MockBehavior(
+        "cam", 3, [(84, 84, 3), (5,)], 2, episode_length=20
+    )
+    for text in ("ball:10", ":1:8", "ball:ten:8", "ball:1:8x0", "ball:1:8:-1"):
+        with pytest.raises(ValueError):
+            parse_behavior(text)
+
+
+def test_mock_unity_process(tmp_path):
+    launcher = write_launcher(str(tmp_path / "mock_unity"))
+    env = UnityEnvironment(
+        launcher,
+        additional_args=["--behavior", "cube:5:3,2x2:2:2", "-batchmode"],
+        wait_policy="yield",
+    )
+    try:
+        env.reset()
+        assert list(env.behavior_specs) == ["cube"]
+        assert len(env.process_ids) == 1
+        for _ in range(2):
+            env.set_actions("cube", ActionTuple(np.zeros((5, 2), np.float32)))
+            env.step()
+        decision_steps, terminal_steps = env.get_steps("cube")
+        assert len(decision_steps) == 5 and len(terminal_steps) == 5
+        assert decision_steps.obs[1].shape == (5, 2, 2)
+    finally:
+        env.close()
+
+
+def test_vectorized_process_ids(tmp_path):
+    launcher = write_launcher(str(tmp_path / "mock_unity"))
+    env = VectorizedUnityEnvironment(
+        launcher,
+        n_envs=2,
+        additional_args=["--behavior", "cube:1:3"],
+        wait_policy="yield",
+    )
+    try:
+        assert len(set(env.process_ids)) == 2
+    finally:
+        env.close()
+    assert env.process_ids == []
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.shared_memory.rl_data_offsets import (
+    ObservationDtype,
+    ObservationQuantization,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+CAMERA = MockBehavior(
+    "camera",
+    3,
+    [(4, 4, 3), (2,)],
+    1,
+    episode_length=2,
+    observation_dtypes=(ObservationDtype.UINT8, ObservationDtype.FLOAT16),
+)
+
+QUANTIZED = MockBehavior(
+    "quantized",
+    2,
+    [(3,), (2, 2)],
+    1,
+    observation_dtypes=(ObservationDtype.INT8, ObservationDtype.INT16),
+    observation_quantization=(
+        ObservationQuantization((0.5, 0.25, 1.0), (0.0, -1.0, 2.0)),
+        ObservationQuantization((0.1, 0.2), (0.0, 0.0)),
+    ),
+)
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [CAMERA]}])
+def test_observation_dtypes(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", normalize_observations=False)
+    try:
+        env.reset()
+        for step in range(1, 4):
+            env.step()
+            decision_steps, terminal_steps = env.get_steps("camera")
+            assert decision_steps.obs[0].dtype == np.uint8
+            assert decision_steps.obs[1].dtype == np.float16
+            assert np.all(decision_steps.obs[0] == step)
+            assert np.all(decision_steps.obs[1] == step)
+            if step % 2 == 0:
+                assert terminal_steps.obs[0].dtype == np.uint8
+                assert np.all(terminal_steps.obs[0] == step)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [CAMERA]}])
+def test_normalize_observations(mock_unity_processes):
+    # The observations are converted to float32 by default
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        for step in range(1, 3):
+            env.step()
+            decision_steps, _ = env.get_steps("camera")
+            assert [o.dtype for o in decision_steps.obs] == [np.float32] * 2
+            assert np.allclose(decision_steps.obs[0], step / 255)
+            assert np.all(decision_steps.obs[1] == step)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [QUANTIZED]}])
+def test_quantized_observations(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", normalize_observations=False)
+    try:
+        env.reset()
+        out = np.empty((2, 3), np.float32)
+        for step in range(1, 3):
+            env.step()
+            decision_steps, _ = env.get_steps("quantized")
+            assert decision_steps.obs[0].dtype == np.int8
+            assert decision_steps.obs[1].dtype == np.int16
+            # Per channel : (step - offset) / scale
+            assert np.all(decision_steps.obs[0] == [2 * step, 4 * step + 4, step - 2])
+            assert np.all(decision_steps.obs[1] == [10 * step, 5 * step])
+            assert decision_steps.decode_obs(0, out) is out
+            assert np.all(out == step)
+            assert np.allclose(decision_steps.decode_obs(1), step)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [QUANTIZED, CAMERA]}])
+def test_normalize_quantized_observations(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", normalize_observations=True)
+    try:
+        env.reset()
+        env.step()
+        decision_steps, _ = env.get_steps("quantized")
+        assert [o.dtype for o in decision_steps.obs] == [np.float32] * 2
+        assert np.all(decision_steps.obs[0] == 1)
+        assert np.allclose(decision_steps.obs[1], 1)
+        decision_steps, _ = env.get_steps("camera")
+        assert np.allclose(decision_steps.obs[0], 1 / 255)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize(
+    "mock_peer_kwargs",
+    [{"behaviors": [CAMERA], "supported_features": HeaderFeatures.NONE}],
+)
+def test_observation_dtypes_not_supported(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        env.step()
+        decision_steps, _ = env.get_steps("camera")
+        assert [o.dtype for o in decision_steps.obs] == [np.float32] * 2
+        assert np.all(decision_steps.obs[0] == 1)
+    finally:
+        env.close()
@@ -0,0 +1,123 @@
+import struct
+import uuid
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_envs.exception import UnityCommunicationException
+from mlagents_envs.side_channel.raw_bytes_channel import RawBytesChannel
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.replay_environment import ReplayEnvironment
+from mlagents_dots_envs.shared_memory.step_log import (
+    RecordKind,
+    StepFlags,
+    StepLogReader,
+)
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+BEHAVIORS = [
+    MockBehavior("ball", 4, [(3,), (2, 2)], 2, (2, 3), episode_length=3),
+    MockBehavior("ramp", 2, [(3,)], 1, agent_growth=3),
+]
+CHANNEL_ID = uuid.UUID("a5d3e4a1-7c0f-4b6e-9d0e-3b1f2c4d5e6f")
+
+
+def _snapshot(env):
+    result = []
+    for name in ("ball", "ramp"):
+        decision_steps, terminal_steps = env.get_steps(name)
+        result.append(
+            (
+                [np.array(obs) for obs in decision_steps.obs],
+                np.array(decision_steps.reward),
+                np.array(decision_steps.agent_id),
+                np.array(terminal_steps.agent_id),
+            )
+        )
+    return result
+
+
+def _assert_same(expected, actual):
+    for behavior, behavior2 in zip(expected, actual):
+        obs, obs2 = behavior[0], behavior2[0]
+        assert len(obs) == len(obs2)
+        assert all(np.array_equal(o, o2) for o, o2 in zip(obs, obs2))
+        for array, array2 in zip(behavior[1:], behavior2[1:]):
+            assert np.array_equal(array, array2)
+
+
+def _record(path, peer_process):
+    env = UnityEnvironment("mock", wait_policy="yield", record_path=path)
+    recorded = []
+    try:
+        env.reset()
+        recorded.append(_snapshot(env))
+        for step in range(5):
+            n_agents = len(env.get_steps("ramp")[0])
+            env.set_actions("ramp", ActionTuple(np.zeros((n_agents, 1))))
+            if step == 2:
+                message = b"hello"
+                peer_process.peer.side_channel_data_to_send = bytearray(
+                    CHANNEL_ID.bytes_le + struct.pack("<i", len(message)) + message
+                )
+            env.step()
+            recorded.append(_snapshot(env))
+        # The growing population of ramp moved the data to new files
+        assert env.reallocation_count > 0
+        specs = dict(env.behavior_specs)
+    finally:
+        env.close()
+    return recorded, specs
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": BEHAVIORS}])
+def test_replay_environment(mock_unity_processes, tmp_path):
+    path = str(tmp_path / "steps.log")
+    recorded, specs = _record(path, _FirstProcess(mock_unity_processes))
+
+    reader = StepLogReader(path)
+    try:
+        steps = [record for record in reader if record.kind == RecordKind.STEP]
+        # The connection, the reset and the 5 steps
+        assert len(steps) == 7
+        assert [bool(r.flags & StepFlags.RESET) for r in steps] == [0, 1] + [0] * 5
+        del steps
+    finally:
+        reader.close()
+
+    channel = RawBytesChannel(CHANNEL_ID)
+    env = ReplayEnvironment(path, side_channels=[channel])
+    try:
+        env.reset()
+        assert dict(env.behavior_specs) == specs
+        for step, expected in enumerate(recorded):
+            if step > 0:
+                n_agents = len(env.get_steps("ramp")[0])
+                env.set_actions("ramp", ActionTuple(np.zeros((n_agents, 1))))
+                env.step()
+            _assert_same(expected, _snapshot(env))
+            messages = channel.get_and_clear_received_messages()
+            assert messages == ([b"hello"] if step == 3 else [])
+        # The replay starts again from the reset
+        env.step()
+        _assert_same(recorded[0], _snapshot(env))
+    finally:
+        env.close()
+
+    env = ReplayEnvironment(path, loop=False)
+    try:
+        for _ in range(env.n_steps - 1):
+            env.step()
+        with pytest.raises(UnityCommunicationException):
+            env.step()
+    finally:
+        env.close()
+
+
+class _FirstProcess:
+    # The mock process is only started when the environment is created
+    def __init__(self, processes):
+        self._processes = processes
+
+    @property
+    def peer(self):
+        return self._processes[0].peer
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_envs.exception import UnityEnvironmentException
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+@pytest.mark.parametrize("rl_data_banks", [2, 3])
+def test_rl_data_banks(mock_unity_processes, rl_data_banks):
+    env = UnityEnvironment("mock", wait_policy="yield", rl_data_banks=rl_data_banks)
+    try:
+        env.reset()
+        assert env._communicator.rl_data_banks == rl_data_banks
+        decision_steps, _ = env.get_steps("ball")
+        assert np.all(decision_steps.obs[0] == 0)
+
+        continuous = np.ones((4, 2), dtype=np.float32)
+        env.set_actions("ball", ActionTuple(continuous, np.ones((4, 2), np.int32)))
+        env.step_async()
+        # The previous step is still readable while Unity simulates
+        pending_steps, _ = env.get_steps("ball")
+        assert len(pending_steps) == 4
+        with pytest.raises(UnityEnvironmentException):
+            env.set_actions("ball", ActionTuple(continuous))
+        env.step_wait()
+        received_continuous, _ = mock_unity_processes[0].peer.actions["ball"]
+        assert np.array_equal(received_continuous, continuous)
+
+        decision_steps, _ = env.get_steps("ball")
+        assert np.all(decision_steps.obs[0] == 1)
+        # Unity wrote the new step in another bank
+        assert np.all(pending_steps.obs[0] == 0)
+
+        for step in range(2, 7):
+            env.step()
+            decision_steps, terminal_steps = env.get_steps("ball")
+            assert np.all(decision_steps.obs[0] == step)
+            assert len(terminal_steps) == (4 if step % 3 == 0 else 0)
+            if len(terminal_steps) > 0:
+                assert np.all(terminal_steps.obs[1] == step)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize(
+    "mock_peer_kwargs", [{"supported_features": HeaderFeatures.NONE}]
+)
+def test_rl_data_banks_not_supported(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", rl_data_banks=2)
+    try:
+        env.reset()
+        assert env._communicator.rl_data_banks == 1
+        env.step_async()
+        with pytest.raises(UnityEnvironmentException):
+            env.get_steps("ball")
+        env.step_wait()
+        decision_steps, _ = env.get_steps("ball")
+        assert np.all(decision_steps.obs[0] == 1)
+    finally:
+        env.close()
@@ -0,0 +1,90 @@
+from mlagents_envs.base_env import DimensionProperty, ObservationType
+from mlagents_dots_envs.mock_unity.mock_unity_peer import (
+    MockBehavior,
+    section_size,
+    write_spec,
+)
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.rl_data_offsets import (
+    ObservationDtype,
+    ObservationQuantization,
+    RLDataOffsets,
+)
+
+
+def test_rl_data_offsets():
+    behavior = MockBehavior("ball", 10, [(3,), (4, 4, 2)], 2, (2, 3))
+    size = section_size(behavior, 10)
+    mem = BaseSharedMemory("test_rl_data_offsets", True, 2 * size + 7)
+    try:
+        write_spec(mem, behavior, 10, 7)
+        write_spec(mem, behavior, 10, 7 + size)
+        RLDataOffsets.clear_cache()
+        offsets, end = RLDataOffsets.from_mem(mem, 7)
+        assert end == 7 + size
+        assert offsets.name == "ball"
+        assert offsets.max_n_agents == 10
+        spec = offsets.behavior_spec
+        assert [o.shape for o in spec.observation_specs] == [(3,), (4, 4, 2)]
+        assert spec.observation_specs[1].dimension_property == (
+            DimensionProperty.UNSPECIFIED,
+        ) * 3
+        assert spec.observation_specs[0].observation_type == ObservationType.DEFAULT
+        assert spec.action_spec.continuous_size == 2
+        assert spec.action_spec.discrete_branches == (2, 3)
+        assert offsets.decision_obs_offset[1] - offsets.decision_obs_offset[0] == 120
+        assert offsets.masks_offset == offsets.decision_agent_id_offset + 40
+        assert offsets.discrete_action_offset == end - 4 * 10 * 2
+
+        # The layout is cached: the same section at the same offset is the same
+        # object and identical sections share their BehaviorSpec
+        assert RLDataOffsets.from_mem(mem, 7)[0] is offsets
+        second, second_end = RLDataOffsets.from_mem(mem, end)
+        assert second_end == end + size
+        assert second.behavior_spec is spec
+        assert second == offsets.shifted(size)
+    finally:
+        mem.delete()
+
+
+def test_rl_data_offsets_observation_dtypes():
+    behavior = MockBehavior(
+        "camera",
+        10,
+        [(3,), (4, 4, 2)],
+        observation_dtypes=(ObservationDtype.FLOAT16, ObservationDtype.UINT8),
+    )
+    size = section_size(behavior, 10, with_dtypes=True)
+    mem = BaseSharedMemory("test_rl_data_offsets", True, size)
+    try:
+        write_spec(mem, behavior, 10, 0, with_dtypes=True)
+        offsets, end = RLDataOffsets.from_mem(mem, 0, observation_dtypes=True)
+        assert end == size
+        assert offsets.obs_dtypes == behavior.observation_dtypes
+        assert offsets.decision_obs_offset[1] - offsets.decision_obs_offset[0] == 60
+        assert offsets.decision_rewards_offset - offsets.decision_obs_offset[1] == 320
+    finally:
+        mem.delete()
+
+
+def test_rl_data_offsets_quantization():
+    quantization = ObservationQuantization((0.5, 2.0), (-1.0, 1.0))
+    behavior = MockBehavior(
+        "quantized",
+        10,
+        [(3,), (4, 2)],
+        1,
+        observation_dtypes=(ObservationDtype.FLOAT32, ObservationDtype.INT16),
+        observation_quantization=(None, quantization),
+    )
+    size = section_size(behavior, 10, with_dtypes=True)
+    mem = BaseSharedMemory("test_rl_data_offsets", True, size)
+    try:
+        write_spec(mem, behavior, 10, 0, with_dtypes=True)
+        offsets, end = RLDataOffsets.from_mem(mem, 0, observation_dtypes=True)
+        assert end == size
+        assert offsets.obs_quantization == (None, quantization)
+        assert offsets.behavior_spec.action_spec.continuous_size == 1
+        assert offsets.decision_rewards_offset - offsets.decision_obs_offset[1] == 160
+    finally:
+        mem.delete()
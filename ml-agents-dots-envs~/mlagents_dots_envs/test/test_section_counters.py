@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.shared_memory.rl_data_offsets import ObservationDtype
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+GOAL = MockBehavior(
+    "goal",
+    3,
+    [(4, 4, 3), (2,)],
+    0,
+    (2,),
+    observation_dtypes=(ObservationDtype.UINT8, ObservationDtype.FLOAT16),
+    static_observations=(0,),
+)
+RAMP = MockBehavior("ramp", 2, [(3,)], 1, agent_growth=3)
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [GOAL]}])
+def test_section_counters(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", normalize_observations=False)
+    try:
+        env.reset()
+        decision_steps, _ = env.get_steps("goal")
+        first = decision_steps.section_counters
+        for step in range(1, 4):
+            env.step()
+            decision_steps, _ = env.get_steps("goal")
+            counters = decision_steps.section_counters
+            # Only the second observation changes every step
+            assert counters.obs == (first.obs[0], step)
+            assert counters.action_mask == first.action_mask
+            assert np.all(decision_steps.obs[0] == 1)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [GOAL]}])
+def test_unchanged_observations_are_not_decoded(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield", normalize_observations=True)
+    try:
+        env.reset()
+        decision_steps, _ = env.get_steps("goal")
+        assert np.allclose(decision_steps.obs[0], 1 / 255)
+        # Overwrite the buffers : the static observation is not decoded again
+        decision_steps.obs[0][:] = -1
+        decision_steps.obs[1][:] = -1
+        env.step()
+        decision_steps, _ = env.get_steps("goal")
+        assert np.all(decision_steps.obs[0] == -1)
+        assert np.all(decision_steps.obs[1] == 1)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize(
+    "mock_peer_kwargs",
+    [{"behaviors": [GOAL], "supported_features": HeaderFeatures.NONE}],
+)
+def test_section_counters_not_supported(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        decision_steps, _ = env.get_steps("goal")
+        assert decision_steps.section_counters is None
+        assert len(decision_steps) == 3
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("mock_peer_kwargs", [{"behaviors": [RAMP]}])
+def test_spec_generation(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        specs = env._env_specs
+        assert list(specs) == ["ramp"]
+        for _ in range(4):
+            env.step()
+        # The growing population moved the data to new files with the same specs
+        assert env.reallocation_count > 1
+        assert env._env_specs is specs
+    finally:
+        env.close()
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_envs.exception import UnityActionException
+from mlagents_dots_envs.shared_memory.step_views import LazyDecisionSteps
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+
+@pytest.mark.parametrize("last_id", [9, 900])
+def test_agent_rows(last_id):
+    # Dense ids use a table from id to row, sparse ones a binary search
+    views = SimpleNamespace(agent_id=np.array([5, 2, last_id, 7], np.int32))
+    steps = LazyDecisionSteps(views)  # type: ignore
+    assert list(steps.agent_rows(np.array([last_id, 5, 7]))) == [2, 0, 3]
+    assert len(steps.agent_rows(np.array([], np.int64))) == 0
+    for missing in ([4], [1000], [1, 2]):
+        with pytest.raises(KeyError):
+            steps.agent_rows(np.array(missing))
+
+
+def test_set_actions_for_agents(mock_unity_processes):
+    env = UnityEnvironment("mock", wait_policy="yield")
+    try:
+        env.reset()
+        agent_id = env.get_steps("ball")[0].agent_id
+        env.set_actions("ball", ActionTuple(np.zeros((4, 2)), np.zeros((4, 2))))
+        env.set_actions_for_agents(
+            "ball",
+            agent_id[[3, 1]],
+            ActionTuple(np.array([[3, 3], [1, 1]]), np.array([[1, 2], [0, 1]])),
+        )
+        env.set_action_for_agent(
+            "ball", agent_id[0], ActionTuple(np.array([[0.5, 0.5]]), np.ones((1, 2)))
+        )
+        env.step()
+        continuous, discrete = mock_unity_processes[0].peer.actions["ball"]
+        assert np.array_equal(continuous[:, 0], [0.5, 1, 0, 3])
+        assert np.array_equal(discrete, [[1, 1], [0, 1], [0, 0], [1, 2]])
+
+        with pytest.raises(UnityActionException):
+            env.set_action_for_agent(
+                "ball", 1000, ActionTuple(np.zeros((1, 2)), np.zeros((1, 2)))
+            )
+        with pytest.raises(UnityActionException):
+            env.set_actions_for_agents(
+                "ball", agent_id[:2], ActionTuple(np.zeros((1, 2)), np.zeros((1, 2)))
+            )
+    finally:
+        env.close()
+
+
+def test_vectorized_set_actions_for_agents(mock_unity_processes):
+    env = VectorizedUnityEnvironment("mock", n_envs=2, wait_policy="yield")
+    try:
+        env.reset()
+        agent_id = env.get_steps("block")[0].agent_id
+        env.set_actions_for_agents(
+            "block", agent_id[::-1], ActionTuple(np.arange(4.0).reshape(4, 1))
+        )
+        env.step()
+        for i, process in enumerate(mock_unity_processes):
+            continuous, _ = process.peer.actions["block"]
+            assert np.array_equal(continuous[:, 0], [3 - 2 * i, 2 - 2 * i])
+        with pytest.raises(UnityActionException):
+            env.set_action_for_agent("block", 1000, ActionTuple(np.zeros((1, 1))))
+    finally:
+        env.close()
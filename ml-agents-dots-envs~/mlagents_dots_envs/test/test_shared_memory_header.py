@@ -0,0 +1,42 @@
+from mlagents_dots_envs.shared_memory.shared_memory_header import (
+    HeaderFeatures,
+    SharedMemoryHeader,
+)
+
+
+def test_snapshot_matches_properties():
+    header = SharedMemoryHeader(
+        "test_shared_memory_header",
+        side_channel_size=12,
+        rl_data_size=34,
+        requested_features=HeaderFeatures.RL_DATA_BANKS,
+        rl_data_banks=2,
+    )
+    try:
+        # Unity acknowledges the banks and publishes the bank of the last step
+        header.set_int(36, HeaderFeatures.RL_DATA_BANKS | HeaderFeatures.WAKE_FIFO)
+        header.set_int(44, 1)
+        header.file_number = 3
+        header.side_channel_generation = 5
+        header.mark_python_blocked()
+        header.mark_query()
+        snapshot = header.snapshot()
+        assert snapshot.version == SharedMemoryHeader.VERSION
+        assert snapshot.python_blocked and header.blocked
+        assert snapshot.query and not snapshot.reset
+        assert snapshot.active and header.active
+        assert snapshot.file_number == header.file_number == 3
+        assert snapshot.side_channel_size == header.side_channel_size == 12
+        assert snapshot.rl_data_size == header.rl_data_size == 34
+        assert snapshot.accepted_features == header.accepted_features
+        assert snapshot.accepted_features == HeaderFeatures.RL_DATA_BANKS
+        assert snapshot.rl_data_banks == header.rl_data_banks == 2
+        assert snapshot.rl_data_bank == header.rl_data_bank == 1
+        assert snapshot.side_channel_generation == 5
+        assert header.get_int(16)[0] == 3
+        assert header.get_bool(28)[0]
+        header.check_version()
+        header.close()
+        assert not header.active
+    finally:
+        header.delete()
@@ -0,0 +1,73 @@
+import os
+import threading
+import numpy as np
+import pytest
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior, MockUnityPeer
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+    grow_capacity,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+from mlagents_dots_envs.shared_memory.shared_memory_side_channel import (
+    SharedMemorySideChannel,
+)
+
+BEHAVIORS = [MockBehavior("visual", 8, [(32, 32, 3)], 2)]
+
+
+def test_grow_capacity():
+    assert grow_capacity(0, 10, 1024, 2.0) == 1024
+    assert grow_capacity(1024, 1025, 1024, 2.0) == 2048
+    assert grow_capacity(1024, 5000, 1024, 2.0) == 8192
+    assert grow_capacity(100, 130, 0, 1.5) == 150
+
+
+@pytest.mark.parametrize(
+    "features",
+    [
+        MockUnityPeer.SUPPORTED_FEATURES,
+        MockUnityPeer.SUPPORTED_FEATURES & ~HeaderFeatures.SIDE_CHANNEL_FILE,
+    ],
+)
+def test_side_channel_growth(features):
+    communicator = SharedMemoryCommunicator(
+        wait_policy="yield", side_channel_capacity=64
+    )
+    side_channel_path = communicator.communicator_id + SharedMemorySideChannel.SUFFIX
+    communicator.give_unity_control()
+    peer = MockUnityPeer(
+        communicator.communicator_id, BEHAVIORS, supported_features=features
+    )
+    thread = threading.Thread(target=peer.run)
+    thread.start()
+    try:
+        communicator.wait_for_unity()
+        in_use = bool(features & HeaderFeatures.SIDE_CHANNEL_FILE)
+        assert communicator.side_channel_file_in_use == in_use
+        assert os.path.exists(side_channel_path) == in_use
+        communicator.write_side_channel_data(bytearray())
+        communicator.give_unity_control(reset=True)
+        communicator.wait_for_unity()
+        file_number = communicator._current_file_number
+        decision_steps, _ = communicator.get_steps("visual")
+
+        for size in (10, 1000, 100000):
+            data = bytearray(os.urandom(size))
+            peer.side_channel_data_to_send = bytearray(os.urandom(size // 2 + 1))
+            expected = bytes(peer.side_channel_data_to_send)
+            communicator.write_side_channel_data(data)
+            communicator.give_unity_control()
+            communicator.wait_for_unity()
+            assert peer.received_side_channel_data == data
+            assert communicator.read_and_clear_side_channel_data() == expected
+        if in_use:
+            # The RL data was never copied to a new file
+            assert communicator._current_file_number == file_number
+            assert communicator._master_mem.side_channel_generation > 0
+            assert np.all(decision_steps.obs[0] == 3)
+        else:
+            assert communicator._current_file_number > file_number
+    finally:
+        communicator.close()
+        thread.join(timeout=5)
+    assert not os.path.exists(side_channel_path)
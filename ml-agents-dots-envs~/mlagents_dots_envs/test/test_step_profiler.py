@@ -0,0 +1,83 @@
+import json
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockBehavior
+from mlagents_dots_envs.step_profiler import LatencyHistogram, StepPhase, StepProfiler
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(significant_bits=7)
+    assert histogram.value_at_percentile(99) == 0
+    values = np.random.RandomState(0).randint(0, 10_000_000, size=1000)
+    for value in values:
+        histogram.record(int(value))
+    assert histogram.count == 1000
+    assert histogram.min == values.min()
+    assert histogram.max == values.max()
+    assert histogram.mean == pytest.approx(values.mean())
+    ordered = np.sort(values)
+    for percentile in (1, 50, 90, 99, 100):
+        expected = ordered[int(np.ceil(percentile * len(values) / 100)) - 1]
+        value = histogram.value_at_percentile(percentile)
+        # At most 2 ** -6 above the exact percentile
+        assert expected <= value <= expected * (1 + 2 ** -6)
+    # The small values are exact
+    small = LatencyHistogram(significant_bits=7)
+    for value in range(128):
+        small.record(value)
+    assert small.value_at_percentile(50) == 63
+    histogram.merge(small)
+    assert histogram.count == 1128
+    assert histogram.min == 0
+    with pytest.raises(ValueError):
+        histogram.merge(LatencyHistogram(significant_bits=5))
+    histogram.reset()
+    assert histogram.count == 0
+    assert histogram.value_at_percentile(50) == 0
+
+
+@pytest.mark.parametrize(
+    "mock_peer_kwargs",
+    [{"behaviors": [MockBehavior("ramp", 2, [(3,)], 1, agent_growth=3)]}],
+)
+def test_step_profiler(mock_unity_processes, tmp_path):
+    profiler = StepProfiler("worker_0", directory=str(tmp_path), flush_interval=0)
+    env = UnityEnvironment("mock", wait_policy="yield", step_profiler=profiler)
+    try:
+        assert env.step_profiler is profiler
+        env.reset()
+        for _ in range(5):
+            decision_steps, _ = env.get_steps("ramp")
+            env.set_actions("ramp", ActionTuple(np.zeros((len(decision_steps), 1))))
+            env.step()
+        reallocation_count = env.reallocation_count
+    finally:
+        env.close()
+
+    # The reset and the 5 steps
+    for phase in (
+        StepPhase.STEP,
+        StepPhase.SIDE_CHANNEL_ENCODE,
+        StepPhase.WRITE_SIDE_CHANNEL_DATA,
+        StepPhase.GIVE_UNITY_CONTROL,
+        StepPhase.UNITY_WAIT,
+        StepPhase.SIDE_CHANNEL_DECODE,
+    ):
+        assert profiler.histogram(phase).count == 6
+    assert profiler.histogram(StepPhase.FILE_REGENERATION).count > 0
+    assert profiler.histogram(StepPhase.FILE_REGENERATION).count <= reallocation_count
+    assert profiler.histogram(StepPhase.GET_STEPS, "ramp").count == 5
+    assert profiler.histogram(StepPhase.SET_ACTIONS, "ramp").count == 5
+    step = profiler.histogram(StepPhase.STEP)
+    assert step.value_at_percentile(50) <= step.max
+    assert step.max >= profiler.histogram(StepPhase.UNITY_WAIT).max
+
+    with open(profiler.path) as f:
+        summary = json.load(f)
+    assert summary == json.loads(json.dumps(profiler.summary()))
+    assert summary["name"] == "worker_0"
+    assert summary["phases"]["step"]["count"] == 6
+    assert summary["behaviors"]["ramp"]["set_actions"]["count"] == 5
+    assert list(tmp_path.iterdir()) == [tmp_path / "step_latency_worker_0.json"]
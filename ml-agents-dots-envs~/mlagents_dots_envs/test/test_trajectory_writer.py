@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_dots_envs.trajectory_writer import TrajectoryReader, TrajectoryWriter
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_trajectory_writer(mock_unity_processes, tmp_path, compression):
+    # Small chunks so the steps are split between chunks
+    writer = TrajectoryWriter(
+        str(tmp_path), chunk_size=5, max_pending_chunks=2, compression=compression
+    )
+    env = UnityEnvironment("mock", wait_policy="yield", trajectory_writer=writer)
+    try:
+        env.reset()
+        for step in range(7):
+            continuous = np.full((4, 2), step, np.float32)
+            discrete = np.full((4, 2), step % 2, np.int32)
+            env.set_actions("ball", ActionTuple(continuous, discrete))
+            env.step()
+    finally:
+        env.close()
+
+    reader = TrajectoryReader(str(tmp_path))
+    assert reader.behavior_names == ["ball", "block"]
+    chunks = list(reader.chunks("ball"))
+    assert len(chunks) == 8
+    assert isinstance(chunks[0]["reward"], np.memmap) == (compression is None)
+    columns = reader.columns("ball")
+    # 4 Agents request a decision every step, 4 terminate every 3 steps
+    assert len(columns["agent_id"]) == 8 * 4 + 2 * 4
+    assert columns["obs_1"].shape[1:] == (2, 2)
+
+    episodes = reader.episodes("ball")
+    assert len(episodes) == 3 * 4
+    done = [episode for episode in episodes if episode.done]
+    assert len(done) == 2 * 4
+    for episode in done:
+        # 3 decisions and the termination
+        assert len(episode.reward) == 4
+        assert not episode.interrupted
+        first = 0 if episode.continuous_actions[0, 0] == 0 else 3
+        assert np.array_equal(
+            episode.continuous_actions[:, 0], [first, first + 1, first + 2, 0]
+        )
+        assert np.array_equal(
+            episode.discrete_actions[:3, 0], np.arange(first, first + 3) % 2
+        )
+    # The last episode was cut by the end of the recording, without action for
+    # its last decision
+    last = [episode for episode in episodes if not episode.done]
+    assert all(len(episode.reward) == 2 for episode in last)
+    assert all(np.array_equal(e.continuous_actions[:, 0], [6, 0]) for e in last)
+
+
+def test_trajectory_writer_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        TrajectoryWriter(str(tmp_path), compression="lzma")
+    with pytest.raises(ValueError):
+        TrajectoryWriter(str(tmp_path), chunk_size=0)
+    with pytest.raises(ValueError):
+        TrajectoryWriter(str(tmp_path), chunk_bytes=0)
+
+
+def test_trajectory_writer_chunk_bytes(mock_unity_processes, tmp_path):
+    # Smaller than a row, every chunk holds a single row
+    writer = TrajectoryWriter(str(tmp_path), chunk_bytes=1)
+    env = UnityEnvironment("mock", wait_policy="yield", trajectory_writer=writer)
+    try:
+        env.reset()
+        env.step()
+    finally:
+        env.close()
+    reader = TrajectoryReader(str(tmp_path))
+    assert len(list(reader.chunks("ball"))) == len(reader.columns("ball")["step"])
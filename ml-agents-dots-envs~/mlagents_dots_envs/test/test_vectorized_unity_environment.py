@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from mlagents_envs.base_env import ActionTuple
+from mlagents_dots_envs.vectorized_unity_environment import VectorizedUnityEnvironment
+
+
+@pytest.mark.parametrize("wake_channel", [False, True])
+def test_vectorized_environment(mock_unity_processes, wake_channel):
+    env = VectorizedUnityEnvironment(
+        "mock", n_envs=3, wait_policy="yield", wake_channel=wake_channel
+    )
+    try:
+        env.reset()
+        assert set(env.behavior_specs) == {"ball", "block"}
+        decision_steps, terminal_steps = env.get_steps("ball")
+        assert len(decision_steps) == 12
+        assert len(terminal_steps) == 0
+        assert decision_steps.obs[1].shape == (12, 2, 2)
+        assert [m.shape for m in decision_steps.action_mask] == [(12, 2), (12, 3)]
+        assert len(np.unique(decision_steps.agent_id)) == 12
+        assert set(decision_steps.agent_id % 3) == {0, 1, 2}
+
+        continuous = np.arange(24, dtype=np.float32).reshape(12, 2)
+        discrete = np.arange(24, dtype=np.int32).reshape(12, 2)
+        env.set_actions("ball", ActionTuple(continuous, discrete))
+        env.step()
+        for i, process in enumerate(mock_unity_processes):
+            received_continuous, received_discrete = process.peer.actions["ball"]
+            assert np.array_equal(received_continuous, continuous[4 * i : 4 * i + 4])
+            assert np.array_equal(received_discrete, discrete[4 * i : 4 * i + 4])
+
+        env.step()
+        env.step()
+        decision_steps, terminal_steps = env.get_steps("ball")
+        assert len(terminal_steps) == 12
+        assert len(decision_steps) == 12
+        assert not set(decision_steps.agent_id) & set(terminal_steps.agent_id)
+    finally:
+        env.close()
+
+
+def test_vectorized_environment_close_after_failed_init(mock_unity_processes):
+    env = VectorizedUnityEnvironment.__new__(VectorizedUnityEnvironment)
+    with pytest.raises(ValueError):
+        env.__init__("mock", n_envs=2, wait_policy="bogus")
+    # The close registered with atexit runs on a partially initialized object
+    env.close()
+    env = VectorizedUnityEnvironment("mock", n_envs=2, wait_policy="yield")
+    env.close()
+    assert env._communicators == [] and env._procs == []
+    env.close()
+
+
+def test_single_environment_steps_own_their_data(mock_unity_processes):
+    env = VectorizedUnityEnvironment("mock", n_envs=1, wait_policy="yield")
+    try:
+        env.reset()
+        decision_steps, _ = env.get_steps("ball")
+        all_steps = env.get_all_steps()
+        obs = decision_steps.obs[0].copy()
+        env.step()
+        # Unity overwrote the shared memory, the previous steps are unchanged
+        assert not np.array_equal(env.get_steps("ball")[0].obs[0], obs)
+        assert np.array_equal(decision_steps.obs[0], obs)
+        assert np.array_equal(all_steps["ball"][0].obs[0], obs)
+    finally:
+        env.close()
@@ -0,0 +1,87 @@
+import inspect
+import threading
+import time
+import pytest
+from mlagents_dots_envs.shared_memory.base_shared_memory import BaseSharedMemory
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+)
+from mlagents_dots_envs.shared_memory.wait_strategy import (
+    AdaptiveWaitStrategy,
+    BackoffWaitStrategy,
+    SpinWaitStrategy,
+    WaitStats,
+    YieldWaitStrategy,
+    create_wait_strategy,
+)
+from mlagents_dots_envs.unity_environment import UnityEnvironment
+
+
+def _unblock_python_later(file_name: str, delay: float) -> threading.Thread:
+    def unblock():
+        time.sleep(delay)
+        header = BaseSharedMemory(file_name)
+        header.set_bool(13, False)
+        header.close()
+
+    thread = threading.Thread(target=unblock)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("policy", ["spin", "yield", "sleep", "auto"])
+def test_wait_for_unity(policy):
+    communicator = SharedMemoryCommunicator(wait_policy=policy)
+    try:
+        communicator.give_unity_control()
+        thread = _unblock_python_later(communicator.communicator_id, 0.02)
+        communicator.wait_for_unity()
+        thread.join()
+        stats = communicator.last_wait_stats
+        assert stats.wait_time >= 0.02
+        assert stats.iterations > 0
+        assert stats.cpu_time >= 0
+    finally:
+        communicator.close()
+        communicator._master_mem.delete()
+
+
+def test_create_wait_strategy():
+    assert isinstance(create_wait_strategy("spin"), SpinWaitStrategy)
+    assert isinstance(create_wait_strategy("yield"), YieldWaitStrategy)
+    assert isinstance(create_wait_strategy("sleep"), BackoffWaitStrategy)
+    assert isinstance(create_wait_strategy("auto"), AdaptiveWaitStrategy)
+    strategy = SpinWaitStrategy()
+    assert create_wait_strategy(strategy) is strategy
+    with pytest.raises(ValueError):
+        create_wait_strategy("unknown")
+
+
+def test_adaptive_wait_strategy_tracks_latency():
+    strategy = AdaptiveWaitStrategy(smoothing=0.5)
+    strategy.record(WaitStats(0.01, 0.0, 1))
+    assert strategy.expected_latency == pytest.approx(0.01)
+    strategy.record(WaitStats(0.03, 0.0, 1))
+    assert strategy.expected_latency == pytest.approx(0.02)
+
+
+def test_wait_policy_is_keyword_only():
+    # The positional parameters of UnityEnvironment keep their original order
+    parameters = inspect.signature(UnityEnvironment).parameters
+    positional = [
+        name
+        for name, parameter in parameters.items()
+        if parameter.kind == inspect.Parameter.POSITIONAL_OR_KEYWORD
+    ]
+    assert positional == [
+        "file_name",
+        "side_channels",
+        "additional_args",
+        "timeout_wait",
+        "worker_id",
+        "seed",
+        "no_graphics",
+        "base_port",
+        "log_folder",
+    ]
+    assert parameters["wait_policy"].kind == inspect.Parameter.KEYWORD_ONLY
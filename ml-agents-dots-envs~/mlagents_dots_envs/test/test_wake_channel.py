@@ -0,0 +1,52 @@
+import threading
+import pytest
+from mlagents_dots_envs.mock_unity.mock_unity_peer import MockUnityPeer
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+)
+from mlagents_dots_envs.shared_memory.shared_memory_header import HeaderFeatures
+from mlagents_dots_envs.shared_memory.wake_channel import FifoWakeChannel
+
+
+pytestmark = pytest.mark.skipif(
+    not FifoWakeChannel.is_supported(), reason="Named pipes are not supported"
+)
+
+
+def _start_peer(communicator: SharedMemoryCommunicator, features: HeaderFeatures):
+    peer = MockUnityPeer(communicator.communicator_id, supported_features=features)
+    thread = threading.Thread(target=peer.run)
+    thread.start()
+    return peer, thread
+
+
+@pytest.mark.parametrize(
+    "features", [MockUnityPeer.SUPPORTED_FEATURES, HeaderFeatures.NONE]
+)
+def test_wake_channel_negotiation(features):
+    communicator = SharedMemoryCommunicator(wait_policy="sleep", wake_channel=True)
+    communicator.give_unity_control()
+    peer, thread = _start_peer(communicator, features)
+    communicator.wait_for_unity()
+    expect_connected = bool(features & HeaderFeatures.WAKE_FIFO)
+    assert communicator.wake_channel_connected == expect_connected
+    assert peer.wake_channel_connected == expect_connected
+    for i in range(20):
+        communicator.give_unity_control(reset=i % 5 == 0)
+        communicator.wait_for_unity()
+        assert communicator.active
+    communicator.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_wake_channel_not_requested():
+    communicator = SharedMemoryCommunicator()
+    communicator.give_unity_control()
+    peer, thread = _start_peer(communicator, MockUnityPeer.SUPPORTED_FEATURES)
+    communicator.wait_for_unity()
+    assert not communicator.wake_channel_connected
+    assert not peer.wake_channel_connected
+    communicator.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
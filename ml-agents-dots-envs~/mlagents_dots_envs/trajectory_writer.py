@@ -0,0 +1,446 @@
+import io
+import os
+import queue
+import threading
+import zlib
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote, unquote
+
+import numpy as np
+from mlagents_envs.base_env import (
+    ActionTuple,
+    BehaviorName,
+    BehaviorSpec,
+    DecisionSteps,
+    TerminalSteps,
+)
+
+ZLIB_COMPRESSION = "zlib"
+_ZLIB_SUFFIX = ".zlib"
+_TMP_SUFFIX = ".tmp"
+
+
+class Episode(NamedTuple):
+    """
+    The rows of a single Agent from its first decision to its termination. The
+    actions of a row are the ones sent in response to its observations, zero for
+    the termination row.
+    """
+
+    agent_id: int
+    obs: List[np.ndarray]
+    reward: np.ndarray
+    continuous_actions: np.ndarray
+    discrete_actions: np.ndarray
+    # False if the recording stopped before the Agent terminated
+    done: bool
+    interrupted: bool
+
+
+def _schema(
+    spec: BehaviorSpec, decision_steps: DecisionSteps
+) -> Dict[str, Tuple[Tuple[int, ...], np.dtype]]:
+    # The shape of a row and the dtype of every column of a behavior
+    schema = {
+        "step": ((), np.dtype(np.int64)),
+        "agent_id": ((), np.dtype(np.int32)),
+        "done": ((), np.dtype(np.bool_)),
+        "interrupted": ((), np.dtype(np.bool_)),
+        "reward": ((), np.dtype(np.float32)),
+    }
+    for index, obs in enumerate(decision_steps.obs):
+        schema[f"obs_{index}"] = (obs.shape[1:], obs.dtype)
+    action_spec = spec.action_spec
+    schema["continuous_actions"] = ((action_spec.continuous_size,), np.float32)
+    schema["discrete_actions"] = ((len(action_spec.discrete_branches),), np.int32)
+    return schema
+
+
+def _row_bytes(schema: Dict[str, Tuple[Tuple[int, ...], np.dtype]]) -> int:
+    # The number of bytes of a row in the columns of a chunk
+    return sum(
+        int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        for shape, dtype in schema.values()
+    )
+
+
+class _Chunk:
+    """
+    Preallocated columns of a behavior, recycled once written
+    """
+
+    def __init__(self, schema: Dict[str, Tuple[Tuple[int, ...], np.dtype]], size: int):
+        self.columns = {
+            name: np.zeros((size,) + shape, dtype)
+            for name, (shape, dtype) in schema.items()
+        }
+        self.size = size
+        self.n_rows = 0
+        self.index = 0
+
+
+class _BehaviorState:
+    def __init__(
+        self,
+        name: str,
+        schema: Dict[str, Tuple[Tuple[int, ...], np.dtype]],
+        chunk_size: int,
+    ):
+        self.name = name
+        self.schema = schema
+        # The number of rows of the chunks of the behavior
+        self.chunk_size = chunk_size
+        self.chunk: Optional[_Chunk] = None
+        # Full chunks kept until the actions of their last rows are known
+        self.full: List[_Chunk] = []
+        # Chunks written by the background thread that can be filled again
+        self.free: "queue.Queue[_Chunk]" = queue.Queue()
+        self.n_chunks = 0
+        # The chunk, first row, number of rows and first agent of the decision
+        # steps of the last step, waiting for their actions
+        self.decision_rows: List[Tuple[_Chunk, int, int, int]] = []
+
+
+class TrajectoryWriter:
+    """
+    Streams the steps of a UnityEnvironment to a directory with one column file
+    per field, chunk and behavior. The arrays of the steps are copied straight
+    from the shared memory into preallocated chunks and full chunks are written
+    by a background thread. When the thread falls behind, at most
+    max_pending_chunks chunks wait for it and adding steps blocks.
+    Chunks hold about chunk_bytes bytes, so the memory used is bounded by about
+    (max_pending_chunks + 2 * number of behaviors) * chunk_bytes, plus the chunks
+    filled by a single step larger than a chunk.
+    Directory organization:
+     - one directory per behavior (its name quoted for the file system)
+     - one directory per chunk, named after its index, with a .npy file per
+     column : step, agent_id, done, interrupted, reward, obs_<i>,
+     continuous_actions and discrete_actions. Compressed columns end with .zlib.
+    Every row is an Agent requesting a decision (done is False) or terminating.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        chunk_size: Optional[int] = None,
+        max_pending_chunks: int = 8,
+        compression: Optional[str] = None,
+        compression_level: int = 1,
+        chunk_bytes: int = 64 * 2 ** 20,
+    ):
+        """
+        :string directory: Where the chunks are written, created if needed
+        :int chunk_size: The number of rows of a chunk. If None, the chunks of a
+        behavior have as many rows as fit in chunk_bytes
+        :int max_pending_chunks: The number of full chunks that can wait for the
+        background thread
+        :string compression: None to write memory mappable .npy files or "zlib"
+        :int compression_level: The zlib compression level
+        :int chunk_bytes: The size in bytes of a chunk when chunk_size is None. A
+        chunk always holds at least one row.
+        """
+        if compression not in (None, ZLIB_COMPRESSION):
+            raise ValueError(f"Unsupported compression {compression}")
+        if chunk_size is not None and chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if chunk_bytes <= 0:
+            raise ValueError("chunk_bytes must be positive")
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._chunk_bytes = chunk_bytes
+        self._compression = compression
+        self._compression_level = compression_level
+        self._behaviors: Dict[str, _BehaviorState] = {}
+        self._step = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._queue: "queue.Queue[Optional[Tuple[_BehaviorState, _Chunk]]]" = (
+            queue.Queue(maxsize=max_pending_chunks)
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def add_steps(
+        self,
+        steps: Mapping[BehaviorName, Tuple[DecisionSteps, TerminalSteps]],
+        specs: Mapping[BehaviorName, BehaviorSpec],
+    ) -> None:
+        """
+        Appends the steps of a step of the environment. The actions of the
+        decision steps are added by the next call to add_actions.
+        """
+        self._check_error()
+        for state in self._behaviors.values():
+            # The actions never came, the environment was reset
+            state.decision_rows = []
+            self._submit_full(state)
+        for name, (decision_steps, terminal_steps) in steps.items():
+            state = self._behaviors.get(name)
+            if state is None:
+                schema = _schema(specs[name], decision_steps)
+                chunk_size = self._chunk_size or max(
+                    1, self._chunk_bytes // _row_bytes(schema)
+                )
+                state = self._behaviors[name] = _BehaviorState(
+                    name, schema, chunk_size
+                )
+            if len(terminal_steps) > 0:
+                self._append(state, terminal_steps, True)
+            if len(decision_steps) > 0:
+                state.decision_rows = self._append(state, decision_steps, False)
+        self._step += 1
+
+    def add_actions(self, get_action_buffer: Callable[[str], ActionTuple]) -> None:
+        """
+        Copies the actions sent in response to the last steps added.
+        :param get_action_buffer: Returns the actions Unity reads for a behavior,
+        like UnityEnvironment.get_action_buffer
+        """
+        self._check_error()
+        for state in self._behaviors.values():
+            if state.decision_rows:
+                actions = get_action_buffer(state.name)
+                for chunk, start, count, first in state.decision_rows:
+                    rows = slice(start, start + count)
+                    agents = slice(first, first + count)
+                    columns = chunk.columns
+                    if actions.continuous is not None:
+                        columns["continuous_actions"][rows] = actions.continuous[agents]
+                    if actions.discrete is not None:
+                        columns["discrete_actions"][rows] = actions.discrete[agents]
+                state.decision_rows = []
+            self._submit_full(state)
+
+    def _take_chunk(self, state: _BehaviorState) -> _Chunk:
+        try:
+            chunk = state.free.get_nowait()
+        except queue.Empty:
+            chunk = _Chunk(state.schema, state.chunk_size)
+        chunk.n_rows = 0
+        chunk.index = state.n_chunks
+        state.n_chunks += 1
+        return chunk
+
+    def _append(
+        self,
+        state: _BehaviorState,
+        steps: Union[DecisionSteps, TerminalSteps],
+        done: bool,
+    ) -> List[Tuple[_Chunk, int, int, int]]:
+        n_agents = len(steps)
+        obs = steps.obs
+        reward = steps.reward
+        agent_id = steps.agent_id
+        interrupted = steps.interrupted if done else None  # type: ignore
+        result = []
+        first = 0
+        while first < n_agents:
+            if state.chunk is None:
+                state.chunk = self._take_chunk(state)
+            chunk = state.chunk
+            start = chunk.n_rows
+            count = min(n_agents - first, chunk.size - start)
+            rows = slice(start, start + count)
+            agents = slice(first, first + count)
+            columns = chunk.columns
+            columns["step"][rows] = self._step
+            columns["agent_id"][rows] = agent_id[agents]
+            columns["done"][rows] = done
+            if interrupted is not None:
+                columns["interrupted"][rows] = interrupted[agents]
+            else:
+                columns["interrupted"][rows] = False
+            columns["reward"][rows] = reward[agents]
+            for index, values in enumerate(obs):
+                columns[f"obs_{index}"][rows] = values[agents]
+            columns["continuous_actions"][rows] = 0
+            columns["discrete_actions"][rows] = 0
+            result.append((chunk, start, count, first))
+            chunk.n_rows += count
+            first += count
+            if chunk.n_rows == chunk.size:
+                state.full.append(chunk)
+                state.chunk = None
+        return result
+
+    def _submit(self, state: _BehaviorState, chunk: _Chunk) -> None:
+        # Blocks while max_pending_chunks chunks wait for the thread
+        self._queue.put((state, chunk))
+
+    def _submit_full(self, state: _BehaviorState) -> None:
+        for chunk in state.full:
+            self._submit(state, chunk)
+        state.full = []
+
+    def flush(self) -> None:
+        """
+        Writes all the rows added so far, including the partial chunks, and waits
+        for them to be on disk. The actions of the last decision steps are lost if
+        add_actions was not called.
+        """
+        self._check_error()
+        for state in self._behaviors.values():
+            state.decision_rows = []
+            self._submit_full(state)
+            if state.chunk is not None and state.chunk.n_rows > 0:
+                self._submit(state, state.chunk)
+                state.chunk = None
+        self._queue.join()
+        self._check_error()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._error is None:
+                self.flush()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+        self._check_error()
+
+    def _check_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                state, chunk = item
+                if self._error is None:
+                    self._write_chunk(state.name, chunk)
+                state.free.put(chunk)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write_chunk(self, name: str, chunk: _Chunk) -> None:
+        behavior_directory = os.path.join(self._directory, quote(name, safe=""))
+        chunk_directory = os.path.join(behavior_directory, f"{chunk.index:08d}")
+        # Readers ignore the chunks until they are complete
+        tmp_directory = chunk_directory + _TMP_SUFFIX
+        os.makedirs(tmp_directory, exist_ok=True)
+        for column, values in chunk.columns.items():
+            path = os.path.join(tmp_directory, column + ".npy")
+            if self._compression is None:
+                np.save(path, values[: chunk.n_rows])
+            else:
+                buffer = io.BytesIO()
+                np.lib.format.write_array(buffer, values[: chunk.n_rows])
+                with open(path + _ZLIB_SUFFIX, "wb") as f:
+                    f.write(
+                        zlib.compress(buffer.getbuffer(), self._compression_level)
+                    )
+        os.rename(tmp_directory, chunk_directory)
+
+
+class TrajectoryReader:
+    """
+    Reads the directory of a TrajectoryWriter. The uncompressed columns are memory
+    mapped.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+    @property
+    def behavior_names(self) -> List[str]:
+        return sorted(
+            unquote(name)
+            for name in os.listdir(self._directory)
+            if os.path.isdir(os.path.join(self._directory, name))
+        )
+
+    def chunks(self, behavior_name: str) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        The columns of each chunk of the behavior, in the order they were written
+        """
+        behavior_directory = os.path.join(
+            self._directory, quote(behavior_name, safe="")
+        )
+        for name in sorted(os.listdir(behavior_directory)):
+            if name.endswith(_TMP_SUFFIX):
+                continue
+            chunk_directory = os.path.join(behavior_directory, name)
+            columns: Dict[str, np.ndarray] = {}
+            for file_name in os.listdir(chunk_directory):
+                path = os.path.join(chunk_directory, file_name)
+                if file_name.endswith(_ZLIB_SUFFIX):
+                    with open(path, "rb") as f:
+                        data = zlib.decompress(f.read())
+                    column = file_name[: -len(".npy" + _ZLIB_SUFFIX)]
+                    columns[column] = np.load(io.BytesIO(data))
+                else:
+                    columns[file_name[: -len(".npy")]] = np.load(path, mmap_mode="r")
+            yield columns
+
+    def columns(self, behavior_name: str) -> Dict[str, np.ndarray]:
+        """
+        The columns of all the chunks of the behavior, concatenated
+        """
+        chunks = list(self.chunks(behavior_name))
+        if not chunks:
+            return {}
+        return {
+            name: np.concatenate([chunk[name] for chunk in chunks])
+            for name in chunks[0]
+        }
+
+    def episodes(self, behavior_name: str) -> List[Episode]:
+        """
+        Groups the rows of the behavior by agent_id and splits them after each
+        termination. The episodes are sorted by agent_id then by step.
+        """
+        columns = self.columns(behavior_name)
+        if not columns or len(columns["agent_id"]) == 0:
+            return []
+        agent_id = columns["agent_id"]
+        done = columns["done"]
+        # An Agent can terminate and request a decision in the same step, its
+        # termination ends the previous episode
+        order = np.lexsort((~done, columns["step"], agent_id))
+        sorted_id = agent_id[order]
+        sorted_done = done[order]
+        starts = np.flatnonzero(
+            np.concatenate(
+                ([True], (sorted_id[1:] != sorted_id[:-1]) | sorted_done[:-1])
+            )
+        )
+        ends = np.append(starts[1:], len(order))
+        n_obs = sum(1 for name in columns if name.startswith("obs_"))
+        result = []
+        for start, end in zip(starts, ends):
+            rows = order[start:end]
+            last = rows[-1]
+            result.append(
+                Episode(
+                    agent_id=int(agent_id[last]),
+                    obs=[columns[f"obs_{index}"][rows] for index in range(n_obs)],
+                    reward=columns["reward"][rows],
+                    continuous_actions=columns["continuous_actions"][rows],
+                    discrete_actions=columns["discrete_actions"][rows],
+                    done=bool(done[last]),
+                    interrupted=bool(columns["interrupted"][last]),
+                )
+            )
+        return result
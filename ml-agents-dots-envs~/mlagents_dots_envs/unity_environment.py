@@ -1,7 +1,7 @@
 import atexit
-import numpy as np
 import subprocess
-from typing import List, Optional, Tuple
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
 
 from mlagents_envs.side_channel.side_channel import SideChannel
 
@@ -11,14 +11,30 @@ from mlagents_envs.base_env import (
     TerminalSteps,
     BehaviorName,
     BehaviorMapping,
+    BehaviorSpec,
     ActionTuple,
 )
-from mlagents_envs.timers import timed
-from mlagents_envs.exception import UnityCommunicationException, UnityActionException
+from mlagents_envs.timers import timed, set_gauge
+from mlagents_envs.exception import (
+    UnityCommunicationException,
+    UnityActionException,
+    UnityEnvironmentException,
+)
 
 from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
     SharedMemoryCommunicator,
 )
+from mlagents_dots_envs.shared_memory.backing_store import BackingStore
+from mlagents_dots_envs.shared_memory.capacity_hints import CapacityHint
+from mlagents_dots_envs.shared_memory.step_log import StepLogWriter
+from mlagents_dots_envs.shared_memory.wait_strategy import (
+    WaitPolicy,
+    WaitStats,
+    WaitStrategy,
+)
+from mlagents_dots_envs.shared_memory.wake_channel import FifoWakeChannel
+from mlagents_dots_envs.step_profiler import StepPhase, StepProfiler, clock_ns
+from mlagents_dots_envs.trajectory_writer import TrajectoryWriter
 
 from mlagents_envs.side_channel.side_channel_manager import SideChannelManager
 from mlagents_envs.env_utils import launch_executable
@@ -30,6 +46,66 @@ from mlagents_envs.communicator_objects.capabilities_pb2 import UnityRLCapabilit
 logger = get_logger(__name__)
 
 
+def shutdown_process(proc: subprocess.Popen) -> None:
+    """
+    Waits a bit for a Unity process to shutdown, but kills it if it takes too long.
+    """
+    try:
+        proc.wait(timeout=5)
+        signal_name = None  # returncode_to_signal_name(proc.returncode)
+        signal_name = f" ({signal_name})" if signal_name else ""
+        return_info = (
+            f"Environment shut down with return"
+            f"code{proc.returncode}{signal_name}."
+        )
+        logger.info(return_info)
+    except subprocess.TimeoutExpired:
+        logger.info("Environment timed out shutting down. Killing...")
+        proc.kill()
+
+
+def validate_action(
+    behavior_name: BehaviorName,
+    spec: BehaviorSpec,
+    expected_n_agents: int,
+    action: ActionTuple,
+) -> None:
+    """
+    Raises a UnityActionException if the action does not match the behavior spec
+    and the number of Agents requesting a decision. The action arrays are
+    converted to the dtypes used in the shared memory when they are copied.
+    """
+    if expected_n_agents == 0 and any(
+        a is not None and len(a) != 0 for a in (action.continuous, action.discrete)
+    ):
+        raise UnityActionException(
+            f"The behavior {behavior_name} does not need an input this step"
+        )
+
+    # continuous
+    if action.continuous is not None:
+        expected_cont_shape = (expected_n_agents, spec.action_spec.continuous_size)
+        if action.continuous.shape != expected_cont_shape:
+            raise UnityActionException(
+                f"The behavior {behavior_name} needs a continuous input of "
+                f"dimension {expected_cont_shape} but received input of "
+                f"dimension {action.continuous.shape}"
+            )
+
+    # discrete
+    if action.discrete is not None:
+        expected_disc_shape = (
+            expected_n_agents,
+            len(spec.action_spec.discrete_branches),
+        )
+        if action.discrete.shape != expected_disc_shape:
+            raise UnityActionException(
+                f"The behavior {behavior_name} needs a discrete input of "
+                f"dimension {expected_disc_shape} but received input of "
+                f"dimension {action.discrete.shape}"
+            )
+
+
 class UnityEnvironment(BaseEnv):
     API_VERSION = "API-14"  # TODO : REMOVE
     DEFAULT_EDITOR_PORT = 5004  # TODO : REMOVE
@@ -46,6 +122,18 @@ class UnityEnvironment(BaseEnv):
         no_graphics: Optional[bool] = None,  # TODO : REMOVE
         base_port: Optional[int] = None,  # TODO : REMOVE
         log_folder: Optional[str] = None,  # TODO : REMOVE
+        *,
+        wait_policy: Union[str, WaitPolicy, WaitStrategy] = WaitPolicy.SPIN,
+        wake_channel: bool = False,
+        rl_data_banks: int = 1,
+        backing_store: Optional[BackingStore] = None,
+        capacity_hints: Optional[List[CapacityHint]] = None,
+        normalize_observations: bool = True,
+        trusted_actions: bool = False,
+        action_repeat: int = 1,
+        record_path: Optional[str] = None,
+        trajectory_writer: Optional[TrajectoryWriter] = None,
+        step_profiler: Optional[StepProfiler] = None,
     ):
         """
         Starts a new unity environment and establishes a connection with it.
@@ -54,6 +142,40 @@ class UnityEnvironment(BaseEnv):
         connect to the Editor.
         :list args: Addition Unity command line arguments
         :list side_channels: Additional side channel for not-rl communication with Unity
+        :int timeout_wait: Number of seconds to wait for Unity before timing out
+        :param wait_policy: What Python does while waiting for Unity : "spin",
+        "yield", "sleep", "auto" or a custom WaitStrategy
+        :bool wake_channel: If true and supported by the Unity player, Python and
+        Unity wake each other through named pipes instead of polling the header
+        :int rl_data_banks: If greater than 1 and supported by the Unity player,
+        Unity writes each step in a different bank of the shared memory. The data
+        returned by get_steps then stays valid while Unity simulates the next
+        rl_data_banks - 1 steps and can be read between step_async and step_wait.
+        :param backing_store: Where the shared memory files are created and how
+        they are mapped. Defaults to /dev/shm when available.
+        :list capacity_hints: The maximum number of Agents (and optionally the
+        observation shapes) of some behaviors. If supported by the Unity player,
+        their RL data is laid out once at its final size instead of being
+        reallocated as the population grows.
+        :bool normalize_observations: Unity can send observations as uint8 (camera
+        pixels), float16 or quantized int8 and int16. If true (the default),
+        get_steps converts them to float32 the first time they are accessed,
+        dividing the uint8 ones by 255 and dequantizing the int ones, like the
+        players that only send float32. Otherwise they are returned in their
+        shared memory dtype and the steps decode_obs method converts them.
+        :bool trusted_actions: If true, set_actions copies the actions without
+        checking the behavior name nor the shapes of the actions, see set_actions
+        :int action_repeat: The number of simulation ticks of a step when step is
+        called without repeat. Requires a Unity player supporting
+        HeaderFeatures.ACTION_REPEAT when greater than 1.
+        :string record_path: If not None, the steps received from Unity and the
+        side channel data are appended to a log at this path that a
+        ReplayEnvironment can serve without Unity.
+        :param trajectory_writer: If not None, the steps and the actions sent in
+        response are streamed to it. It is closed with the environment.
+        :param step_profiler: If not None, the duration of the phases of every
+        step and of get_steps and set_actions are recorded in its histograms. It
+        is flushed when the environment is closed.
         """
         self.academy_capabilities = UnityRLCapabilitiesProto()  # TODO : REMOVE
         self.academy_capabilities.baseRLCapabilities = True
@@ -75,7 +197,17 @@ class UnityEnvironment(BaseEnv):
         if editor_connect:
             assert args == []
         self._side_channels_manager = SideChannelManager(side_channels)
-        self._communicator = SharedMemoryCommunicator(editor_connect, timeout_wait)
+        self._communicator = SharedMemoryCommunicator(
+            editor_connect,
+            timeout_wait,
+            wait_policy,
+            wake_channel,
+            rl_data_banks,
+            backing_store,
+            capacity_hints=capacity_hints,
+            normalize_observations=normalize_observations,
+            recorder=StepLogWriter(record_path) if record_path else None,
+        )
 
         # The process that is started. If None, no process was started
         self._proc1 = None
@@ -89,6 +221,13 @@ class UnityEnvironment(BaseEnv):
                 "Start training by pressing the Play button in the Unity Editor."
             )
         self._env_specs = self._communicator.generate_specs()
+        self._spec_generation = self._communicator.spec_generation
+        self._trusted_actions = trusted_actions
+        self._action_repeat = action_repeat
+        self._trajectory_writer = trajectory_writer
+        self._step_profiler = step_profiler
+        self._step_start = 0
+        self._step_pending = False
         self._communicator.give_unity_control()
         self._communicator.wait_for_unity()
 
@@ -96,17 +235,53 @@ class UnityEnvironment(BaseEnv):
     def behavior_specs(self) -> BehaviorMapping:
         return BehaviorMapping(self._env_specs)
 
+    @property
+    def last_wait_stats(self) -> WaitStats:
+        """
+        The time and CPU spent waiting for Unity during the last step
+        """
+        return self._communicator.last_wait_stats
+
+    @property
+    def reallocation_count(self) -> int:
+        """
+        The number of times Unity had to move the shared memory to a bigger file
+        """
+        return self._communicator.reallocation_count
+
+    @property
+    def process_ids(self) -> List[int]:
+        """
+        The process id of the Unity executable, empty when connected to the Editor
+        """
+        return [] if self._proc1 is None else [self._proc1.pid]
+
+    @property
+    def step_profiler(self) -> Optional[StepProfiler]:
+        """
+        The profiler recording the latency of the steps, None if not profiled
+        """
+        return self._step_profiler
+
     def reset(self) -> None:
         self._step(reset=True)
 
     @timed
-    def step(self) -> None:
-        self._step(reset=False)
+    def step(self, repeat: Optional[int] = None) -> None:
+        """
+        Simulates the environment until the next decision.
+        :int repeat: The number of ticks Unity simulates with the current actions.
+        The rewards are accumulated over the ticks and the Agents terminating
+        during any of them are in the terminal steps. Defaults to the
+        action_repeat of the environment.
+        """
+        self._step(reset=False, repeat=repeat)
 
     def query(self) -> None:
         """
         This will only send side channel data and get a response if any
         """
+        self._assert_no_pending_step()
         channel_data = self._side_channels_manager.generate_side_channel_messages()
         self._communicator.write_side_channel_data(channel_data)
         self._communicator.give_unity_control(query=True)
@@ -115,20 +290,113 @@ class UnityEnvironment(BaseEnv):
             self._communicator.read_and_clear_side_channel_data()
         )
 
-    def _step(self, reset: bool = False) -> None:
+    def _step(self, reset: bool = False, repeat: Optional[int] = None) -> None:
+        self.step_async(reset, repeat)
+        self.step_wait()
+
+    def step_async(self, reset: bool = False, repeat: Optional[int] = None) -> None:
+        """
+        Sends the side channel data and gives control to Unity without waiting for
+        the simulation to complete. Must be followed by a call to step_wait.
+        :bool reset: If true, Unity will reset the environment
+        :int repeat: The number of ticks to simulate, see step
+        """
+        if self._step_pending:
+            raise UnityEnvironmentException("The previous step was not completed.")
         if not self._communicator.active:
             raise UnityCommunicationException("Communicator has stopped.")
+        if reset:
+            repeat = 1
+        elif repeat is None:
+            repeat = self._action_repeat
+        if repeat != 1 and not self._communicator.action_repeat_supported:
+            raise UnityEnvironmentException(
+                "The Unity environment does not support action repeat."
+            )
+        profiler = self._step_profiler
+        if profiler is not None:
+            self._step_start = profiler.start()
+        if self._trajectory_writer is not None and not reset:
+            self._trajectory_writer.add_actions(self._communicator.get_action_buffer)
+            if profiler is not None:
+                profiler.start()
         channel_data = self._side_channels_manager.generate_side_channel_messages()
+        if profiler is not None:
+            profiler.mark(StepPhase.SIDE_CHANNEL_ENCODE)
         self._communicator.write_side_channel_data(channel_data)
-        self._communicator.give_unity_control(reset)
+        if profiler is not None:
+            profiler.mark(StepPhase.WRITE_SIDE_CHANNEL_DATA)
+        self._communicator.give_unity_control(reset, repeat=repeat)
+        if profiler is not None:
+            profiler.mark(StepPhase.GIVE_UNITY_CONTROL)
+        self._step_pending = True
+
+    def step_ready(self) -> bool:
+        """
+        Returns True once the simulation started by step_async is complete and
+        step_wait will not block.
+        """
+        return self._communicator.unity_ready
+
+    def step_wait(self) -> None:
+        """
+        Waits for the simulation started by step_async to complete and processes
+        the data sent by Unity.
+        """
+        if not self._step_pending:
+            raise UnityEnvironmentException("step_async must be called first.")
+        self._step_pending = False
+        profiler = self._step_profiler
+        if profiler is not None:
+            profiler.start()
         self._communicator.wait_for_unity()
+        if profiler is not None:
+            regeneration_time = self._communicator.last_regeneration_time
+            profiler.mark(StepPhase.UNITY_WAIT, exclude=regeneration_time)
+            if regeneration_time > 0:
+                profiler.record(StepPhase.FILE_REGENERATION, regeneration_time)
+        wait_stats = self._communicator.last_wait_stats
+        set_gauge("UnityEnvironment.wait_time", wait_stats.wait_time)
+        set_gauge("UnityEnvironment.wait_cpu_time", wait_stats.cpu_time)
+        set_gauge(
+            "UnityEnvironment.reallocation_count",
+            self._communicator.reallocation_count,
+        )
         if not self._communicator.active:
             raise UnityCommunicationException("Communicator has stopped.")
         self._side_channels_manager.process_side_channel_message(
             self._communicator.read_and_clear_side_channel_data()
         )
-        if len(self._env_specs) != self._communicator.num_behaviors:
+        if profiler is not None:
+            profiler.mark(StepPhase.SIDE_CHANNEL_DECODE)
+        if self._spec_generation != self._communicator.spec_generation:
+            self._spec_generation = self._communicator.spec_generation
             self._env_specs = self._communicator.generate_specs()
+        if self._trajectory_writer is not None:
+            self._trajectory_writer.add_steps(
+                self._communicator.get_all_steps(), self._env_specs
+            )
+        if profiler is not None:
+            profiler.record_ns(StepPhase.STEP, clock_ns() - self._step_start)
+            profiler.step_done()
+
+    @property
+    def wake_channel(self) -> Optional[FifoWakeChannel]:
+        """
+        The channel Unity uses to signal the end of a step, None if the wake
+        channel is not in use.
+        """
+        channel = self._communicator.wake_channel
+        if channel is None or not channel.connected:
+            return None
+        return channel
+
+    def _assert_no_pending_step(self) -> None:
+        if self._step_pending:
+            raise UnityEnvironmentException(
+                "The data cannot be accessed while Unity is running, call step_wait "
+                "first."
+            )
 
     def _assert_behavior_exists(self, behavior_name: BehaviorName) -> None:
         if behavior_name not in self._env_specs:
@@ -137,73 +405,121 @@ class UnityEnvironment(BaseEnv):
                 f"in the environment"
             )
 
-    def set_actions(self, behavior_name: BehaviorName, action: ActionTuple) -> None:
-        self._assert_behavior_exists(behavior_name)
-        expected_n_agents = self._communicator.get_n_decisions_requested(behavior_name)
-        if expected_n_agents == 0 and len(action) != 0:
-            raise UnityActionException(
-                f"The behavior {behavior_name} does not need an input this step"
+    def set_actions(
+        self,
+        behavior_name: BehaviorName,
+        action: ActionTuple,
+        trusted: Optional[bool] = None,
+    ) -> None:
+        """
+        Sets the actions of the Agents of the behavior that requested a decision.
+        :param trusted: If true, the actions are copied without any check, which
+        must only be done with actions shaped like the arrays of get_action_buffer.
+        A mismatched shape raises a ValueError instead of a UnityActionException
+        and an unknown behavior a KeyError. Defaults to the trusted_actions of the
+        environment.
+        """
+        profiler = self._step_profiler
+        if profiler is not None:
+            start = clock_ns()
+        # Even trusted actions must not be written while Unity reads the memory
+        self._assert_no_pending_step()
+        if self._trusted_actions if trusted is None else trusted:
+            self._communicator.action_handle(behavior_name).set(action)
+        else:
+            self._assert_behavior_exists(behavior_name)
+            expected_n_agents = self._communicator.get_n_decisions_requested(
+                behavior_name
             )
-        spec = self._env_specs[behavior_name]
-
-        # continuous
-        if action.continuous is not None:
-            expected_cont_shape = (expected_n_agents, spec.action_spec.continuous_size)
-            if action.continuous.shape != expected_cont_shape:
-                raise UnityActionException(
-                    f"The behavior {behavior_name} needs a continuous input of "
-                    f"dimension {expected_cont_shape} but received input of "
-                    f"dimension {action.continuous.shape}"
-                )
-            if action.continuous.dtype != np.float32:
-                action.continuous = action.continuous.astype(np.float32)
-
-        # discrete
-        if action.discrete is not None:
-            expected_disc_shape = (
-                expected_n_agents,
-                len(spec.action_spec.discrete_branches),
+            validate_action(
+                behavior_name, self._env_specs[behavior_name], expected_n_agents, action
             )
-            if action.discrete.shape != expected_disc_shape:
-                raise UnityActionException(
-                    f"The behavior {behavior_name} needs a discrete input of "
-                    f"dimension {expected_disc_shape} but received input of "
-                    f"dimension {action.discrete.shape}"
-                )
-            if action.discrete.dtype != np.int32:
-                action.discrete = action.discrete.astype(np.int32)
+            self._communicator.set_actions(behavior_name, action)
+        if profiler is not None:
+            profiler.record_ns(StepPhase.SET_ACTIONS, clock_ns() - start, behavior_name)
 
-        self._communicator.set_actions(behavior_name, action)
+    def get_action_buffer(self, behavior_name: BehaviorName) -> ActionTuple:
+        """
+        Returns writable views of the shared memory Unity reads the actions of the
+        behavior from, for the Agents that requested a decision. Writing the
+        actions into them replaces the call to set_actions without any copy. The
+        arrays are only valid until the next call to step.
+        """
+        self._assert_no_pending_step()
+        self._assert_behavior_exists(behavior_name)
+        return self._communicator.get_action_buffer(behavior_name)
 
     def set_action_for_agent(
         self, behavior_name: BehaviorName, agent_id: int, action: ActionTuple
     ) -> None:
-        raise NotImplementedError("Method not implemented.")
+        """
+        Sets the action of a single Agent. The action arrays have a single row.
+        """
+        self.set_actions_for_agents(behavior_name, np.array([agent_id]), action)
+
+    def set_actions_for_agents(
+        self, behavior_name: BehaviorName, agent_ids: np.ndarray, action: ActionTuple
+    ) -> None:
+        """
+        Sets the actions of some of the Agents that requested a decision, row i of
+        the action arrays being the action of agent_ids[i]. The other Agents keep
+        their actions.
+        :param agent_ids: The ids of the Agents
+        :param action: The actions of the Agents, in the order of agent_ids
+        """
+        self._assert_no_pending_step()
+        self._assert_behavior_exists(behavior_name)
+        agent_ids = np.asarray(agent_ids)
+        validate_action(
+            behavior_name, self._env_specs[behavior_name], len(agent_ids), action
+        )
+        try:
+            self._communicator.set_actions_for_agents(behavior_name, agent_ids, action)
+        except KeyError as e:
+            raise UnityActionException(e.args[0]) from e
 
     def get_steps(
         self, behavior_name: BehaviorName
     ) -> Tuple[DecisionSteps, TerminalSteps]:
+        """
+        Returns the steps of the last completed step. When several RL data banks
+        are in use, they can be read while Unity simulates the next step.
+        """
+        if self._communicator.rl_data_banks == 1:
+            self._assert_no_pending_step()
         self._assert_behavior_exists(behavior_name)
-        return self._communicator.get_steps(behavior_name)
+        profiler = self._step_profiler
+        if profiler is None:
+            return self._communicator.get_steps(behavior_name)
+        start = clock_ns()
+        steps = self._communicator.get_steps(behavior_name)
+        profiler.record_ns(StepPhase.GET_STEPS, clock_ns() - start, behavior_name)
+        return steps
+
+    def get_all_steps(
+        self,
+    ) -> Dict[BehaviorName, Tuple[DecisionSteps, TerminalSteps]]:
+        """
+        Returns the steps of every behavior that has at least one Agent requesting
+        a decision or terminating. The behaviors without any Agent this step are
+        not in the result.
+        """
+        if self._communicator.rl_data_banks == 1:
+            self._assert_no_pending_step()
+        return self._communicator.get_all_steps()
 
     def close(self):
         """
         Sends a shutdown signal to the unity environment, and closes the communication.
         """
+        if self._trajectory_writer is not None:
+            writer, self._trajectory_writer = self._trajectory_writer, None
+            writer.close()
+        if self._step_profiler is not None:
+            profiler, self._step_profiler = self._step_profiler, None
+            profiler.flush()
         self._communicator.close()
         if self._proc1 is not None:
-            # Wait a bit for the process to shutdown, but kill it if it takes too long
-            try:
-                self._proc1.wait(timeout=5)
-                signal_name = None  # returncode_to_signal_name(self.proc1.returncode)
-                signal_name = f" ({signal_name})" if signal_name else ""
-                return_info = (
-                    f"Environment shut down with return"
-                    f"code{self._proc1.returncode}{signal_name}."
-                )
-                logger.info(return_info)
-            except subprocess.TimeoutExpired:
-                logger.info("Environment timed out shutting down. Killing...")
-                self._proc1.kill()
+            shutdown_process(self._proc1)
             # Set to None so we don't try to close multiple times.
             self._proc1 = None
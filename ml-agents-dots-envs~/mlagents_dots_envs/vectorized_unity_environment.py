@@ -0,0 +1,455 @@
+import atexit
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+
+from mlagents_envs.side_channel.side_channel import SideChannel
+from mlagents_envs.side_channel.side_channel_manager import SideChannelManager
+from mlagents_envs.base_env import (
+    BaseEnv,
+    DecisionSteps,
+    TerminalSteps,
+    BehaviorName,
+    BehaviorMapping,
+    BehaviorSpec,
+    ActionTuple,
+)
+from mlagents_envs.timers import timed, set_gauge
+from mlagents_envs.exception import (
+    UnityCommunicationException,
+    UnityActionException,
+    UnityEnvironmentException,
+)
+from mlagents_envs.env_utils import launch_executable
+from mlagents_envs.logging_util import get_logger
+
+from mlagents_dots_envs.shared_memory.shared_memory_communicator import (
+    SharedMemoryCommunicator,
+)
+from mlagents_dots_envs.shared_memory.backing_store import BackingStore
+from mlagents_dots_envs.shared_memory.capacity_hints import CapacityHint
+from mlagents_dots_envs.shared_memory.wait_strategy import (
+    WaitPolicy,
+    WaitStats,
+    WaitStrategy,
+    create_wait_strategy,
+    cpu_clock,
+)
+from mlagents_dots_envs.shared_memory.wake_channel import FifoWakeChannel
+from mlagents_dots_envs.unity_environment import shutdown_process, validate_action
+
+logger = get_logger(__name__)
+
+
+class VectorizedUnityEnvironment(BaseEnv):
+    """
+    Steps several Unity environments from a single process. All the environments
+    are released at the same time and a single loop waits for all of them. The
+    steps of every environment are concatenated per behavior. The agent ids are
+    namespaced so that agent_id * n_envs + env_index is unique across
+    environments. Unlike the steps of UnityEnvironment, the steps returned by
+    get_steps own their data, even with a single environment, and stay valid
+    after the next step.
+    """
+
+    def __init__(
+        self,
+        file_name: Optional[str] = None,
+        n_envs: int = 1,
+        side_channels: Optional[List[SideChannel]] = None,
+        additional_args: Optional[List[str]] = None,
+        timeout_wait: int = 60,
+        wait_policy: Union[str, WaitPolicy, WaitStrategy] = WaitPolicy.SPIN,
+        wake_channel: bool = False,
+        no_graphics: Optional[bool] = None,
+        backing_store: Optional[BackingStore] = None,
+        capacity_hints: Optional[List[CapacityHint]] = None,
+        normalize_observations: bool = True,
+        trusted_actions: bool = False,
+        action_repeat: int = 1,
+    ):
+        """
+        Starts n_envs Unity environments and establishes a connection with them.
+
+        :string file_name: Name of Unity environment binary. If None, will try to
+        connect to the Editor.
+        :int n_envs: The number of Unity environments to start
+        :list side_channels: Additional side channel for not-rl communication with
+        Unity. Messages are sent to every environment.
+        :list additional_args: Addition Unity command line arguments
+        :int timeout_wait: Number of seconds to wait for Unity before timing out
+        :param wait_policy: What Python does while waiting for Unity : "spin",
+        "yield", "sleep", "auto" or a custom WaitStrategy
+        :bool wake_channel: If true and supported by the Unity players, Python and
+        Unity wake each other through named pipes instead of polling the headers
+        :param backing_store: Where the shared memory files are created and how
+        they are mapped. Defaults to /dev/shm when available.
+        :list capacity_hints: The maximum number of Agents per environment (and
+        optionally the observation shapes) of some behaviors, see UnityEnvironment
+        :bool normalize_observations: If true, the uint8 and float16 observations
+        are converted to float32, see UnityEnvironment
+        :bool trusted_actions: If true, set_actions does not validate the actions,
+        see UnityEnvironment
+        :int action_repeat: The number of simulation ticks of a step when step is
+        called without repeat, see UnityEnvironment
+        """
+        args = additional_args or []
+        editor_connect = file_name is None
+        if editor_connect and n_envs != 1:
+            raise UnityEnvironmentException(
+                "Only one environment can be connected to the Editor."
+            )
+        if no_graphics and not editor_connect:
+            args += ["-nographics", "-batchmode"]
+        # Filled as the environments start so close only releases what exists
+        self._communicators: List[SharedMemoryCommunicator] = []
+        self._procs: List = []
+        atexit.register(self.close)
+        self._n_envs = n_envs
+        self._trusted_actions = trusted_actions
+        self._action_repeat = action_repeat
+        self._timeout_wait = timeout_wait
+        self._wait_strategy = create_wait_strategy(wait_policy)
+        self.last_wait_stats = WaitStats(0.0, 0.0, 0)
+        self._side_channels_manager = SideChannelManager(side_channels)
+        for _ in range(n_envs):
+            self._communicators.append(
+                SharedMemoryCommunicator(
+                    editor_connect,
+                    timeout_wait,
+                    self._wait_strategy,
+                    wake_channel,
+                    backing_store=backing_store,
+                    capacity_hints=capacity_hints,
+                    normalize_observations=normalize_observations,
+                )
+            )
+        if not editor_connect:
+            for communicator in self._communicators:
+                self._procs.append(
+                    launch_executable(
+                        file_name,
+                        args + ["--memory-path", str(communicator.communicator_id)],
+                    )
+                )
+        else:
+            logger.info(
+                "Start training by pressing the Play button in the Unity Editor."
+            )
+        for communicator in self._communicators:
+            communicator.give_unity_control()
+        self._wait_for_all()
+        self._refresh_specs()
+
+    @property
+    def n_envs(self) -> int:
+        return self._n_envs
+
+    @property
+    def process_ids(self) -> List[int]:
+        """
+        The process ids of the Unity executables, empty when connected to the Editor
+        """
+        return [proc.pid for proc in self._procs]
+
+    @property
+    def reallocation_count(self) -> int:
+        """
+        The number of times the Unity environments had to move the shared memory
+        to a bigger file
+        """
+        return sum(c.reallocation_count for c in self._communicators)
+
+    @property
+    def behavior_specs(self) -> BehaviorMapping:
+        return BehaviorMapping(self._env_specs)
+
+    def _refresh_specs(self) -> None:
+        self._env_specs: Dict[str, BehaviorSpec] = {}
+        self._spec_generations = [c.spec_generation for c in self._communicators]
+        self._behavior_envs: Dict[str, List[int]] = {}
+        for env_index, communicator in enumerate(self._communicators):
+            for name, spec in communicator.generate_specs().items():
+                self._env_specs[name] = spec
+                self._behavior_envs.setdefault(name, []).append(env_index)
+
+    def _wait_for_all(self) -> None:
+        strategy = self._wait_strategy
+        strategy.start()
+        iteration = 0
+        t0 = time.perf_counter()
+        cpu0 = cpu_clock()
+        pending = self._communicators
+        while True:
+            pending = [c for c in pending if not c.unity_ready]
+            if not pending:
+                break
+            elapsed = time.perf_counter() - t0
+            if elapsed > self._timeout_wait:
+                for communicator in self._communicators:
+                    communicator.abort()
+                raise TimeoutError("The Unity Environment took too long to respond")
+            channels = [c.wake_channel for c in pending]
+            if all(ch is not None and ch.connected for ch in channels):
+                FifoWakeChannel.wait_any(
+                    channels, self._timeout_wait - elapsed  # type: ignore
+                )
+            else:
+                strategy.pause(elapsed)
+            iteration += 1
+        self.last_wait_stats = WaitStats(
+            wait_time=time.perf_counter() - t0,
+            cpu_time=cpu_clock() - cpu0,
+            iterations=iteration,
+        )
+        strategy.record(self.last_wait_stats)
+        for communicator in self._communicators:
+            communicator.finish_wait()
+
+    def reset(self) -> None:
+        self._step(reset=True)
+
+    @timed
+    def step(self, repeat: Optional[int] = None) -> None:
+        """
+        Simulates all the environments until the next decision.
+        :int repeat: The number of ticks simulated with the current actions, see
+        UnityEnvironment.step
+        """
+        if repeat is None:
+            repeat = self._action_repeat
+        self._step(reset=False, repeat=repeat)
+
+    def query(self) -> None:
+        """
+        This will only send side channel data and get a response if any
+        """
+        channel_data = self._side_channels_manager.generate_side_channel_messages()
+        for communicator in self._communicators:
+            communicator.write_side_channel_data(channel_data)
+            communicator.give_unity_control(query=True)
+        self._wait_for_all()
+        for communicator in self._communicators:
+            self._side_channels_manager.process_side_channel_message(
+                communicator.read_and_clear_side_channel_data()
+            )
+
+    def _step(self, reset: bool = False, repeat: int = 1) -> None:
+        if not all(c.active for c in self._communicators):
+            raise UnityCommunicationException("Communicator has stopped.")
+        if reset:
+            repeat = 1
+        if repeat != 1 and not all(
+            c.action_repeat_supported for c in self._communicators
+        ):
+            raise UnityEnvironmentException(
+                "The Unity environments do not support action repeat."
+            )
+        channel_data = self._side_channels_manager.generate_side_channel_messages()
+        for communicator in self._communicators:
+            communicator.write_side_channel_data(channel_data)
+            communicator.give_unity_control(reset, repeat=repeat)
+        self._wait_for_all()
+        set_gauge(
+            "VectorizedUnityEnvironment.wait_time", self.last_wait_stats.wait_time
+        )
+        set_gauge(
+            "VectorizedUnityEnvironment.wait_cpu_time", self.last_wait_stats.cpu_time
+        )
+        set_gauge(
+            "VectorizedUnityEnvironment.reallocation_count", self.reallocation_count
+        )
+        if not all(c.active for c in self._communicators):
+            raise UnityCommunicationException("Communicator has stopped.")
+        for communicator in self._communicators:
+            self._side_channels_manager.process_side_channel_message(
+                communicator.read_and_clear_side_channel_data()
+            )
+        if self._spec_generations != [c.spec_generation for c in self._communicators]:
+            self._refresh_specs()
+
+    def _assert_behavior_exists(self, behavior_name: BehaviorName) -> None:
+        if behavior_name not in self._env_specs:
+            raise UnityActionException(
+                f"The behavior {behavior_name} does not correspond to one existing "
+                f"in the environment"
+            )
+
+    def set_actions(
+        self,
+        behavior_name: BehaviorName,
+        action: ActionTuple,
+        trusted: Optional[bool] = None,
+    ) -> None:
+        """
+        Sets the actions of the Agents of the behavior that requested a decision,
+        in the order of get_steps.
+        :param trusted: If true, the actions are not validated, see
+        UnityEnvironment.set_actions
+        """
+        if self._trusted_actions if trusted is None else trusted:
+            self._set_actions_trusted(behavior_name, action)
+            return
+        self._assert_behavior_exists(behavior_name)
+        env_indices = self._behavior_envs[behavior_name]
+        n_agents = [
+            self._communicators[i].get_n_decisions_requested(behavior_name)
+            for i in env_indices
+        ]
+        validate_action(
+            behavior_name, self._env_specs[behavior_name], sum(n_agents), action
+        )
+        start = 0
+        for env_index, n in zip(env_indices, n_agents):
+            if n == 0:
+                continue
+            env_action = ActionTuple()
+            if action.continuous is not None:
+                env_action.add_continuous(action.continuous[start : start + n])
+            if action.discrete is not None:
+                env_action.add_discrete(action.discrete[start : start + n])
+            self._communicators[env_index].set_actions(behavior_name, env_action)
+            start += n
+
+    def _set_actions_trusted(
+        self, behavior_name: BehaviorName, action: ActionTuple
+    ) -> None:
+        start = 0
+        for env_index in self._behavior_envs[behavior_name]:
+            handle = self._communicators[env_index].action_handle(behavior_name)
+            buffer = handle.buffer
+            n = len(buffer.continuous)
+            if n == 0:
+                continue
+            handle.copy(
+                action.continuous[start : start + n],
+                action.discrete[start : start + n],
+                buffer,
+            )
+            start += n
+
+    def set_action_for_agent(
+        self, behavior_name: BehaviorName, agent_id: int, action: ActionTuple
+    ) -> None:
+        self.set_actions_for_agents(behavior_name, np.array([agent_id]), action)
+
+    def set_actions_for_agents(
+        self, behavior_name: BehaviorName, agent_ids: np.ndarray, action: ActionTuple
+    ) -> None:
+        """
+        Sets the actions of some of the Agents that requested a decision, see
+        UnityEnvironment.set_actions_for_agents. The agent ids are the namespaced
+        ones returned by get_steps.
+        """
+        self._assert_behavior_exists(behavior_name)
+        agent_ids = np.asarray(agent_ids)
+        validate_action(
+            behavior_name, self._env_specs[behavior_name], len(agent_ids), action
+        )
+        env_of_agent = agent_ids % self._n_envs
+        env_indices = self._behavior_envs[behavior_name]
+        if not np.all(np.isin(env_of_agent, env_indices)):
+            raise UnityActionException(
+                f"Some of the agent ids are not Agents of the behavior {behavior_name}"
+            )
+        for env_index in env_indices:
+            selected = env_of_agent == env_index
+            if not np.any(selected):
+                continue
+            env_action = ActionTuple()
+            if action.continuous is not None:
+                env_action.add_continuous(action.continuous[selected])
+            if action.discrete is not None:
+                env_action.add_discrete(action.discrete[selected])
+            try:
+                self._communicators[env_index].set_actions_for_agents(
+                    behavior_name, agent_ids[selected] // self._n_envs, env_action
+                )
+            except KeyError as e:
+                raise UnityActionException(e.args[0]) from e
+
+    def get_steps(
+        self, behavior_name: BehaviorName
+    ) -> Tuple[DecisionSteps, TerminalSteps]:
+        self._assert_behavior_exists(behavior_name)
+        env_indices = self._behavior_envs[behavior_name]
+        all_steps = [
+            self._communicators[i].get_steps(behavior_name) for i in env_indices
+        ]
+        decision_steps = [d for d, _ in all_steps]
+        terminal_steps = [t for _, t in all_steps]
+        decision_ids = self._namespace_agent_ids(env_indices, decision_steps)
+        terminal_ids = self._namespace_agent_ids(env_indices, terminal_steps)
+        if decision_steps[0].action_mask is None:
+            action_mask = None
+        else:
+            action_mask = [
+                np.concatenate([d.action_mask[branch] for d in decision_steps])
+                for branch in range(len(decision_steps[0].action_mask))
+            ]
+        return (
+            DecisionSteps(
+                obs=self._concatenate_obs(decision_steps),
+                reward=np.concatenate([d.reward for d in decision_steps]),
+                agent_id=decision_ids,
+                action_mask=action_mask,
+                group_id=np.concatenate([d.group_id for d in decision_steps]),
+                group_reward=np.concatenate([d.group_reward for d in decision_steps]),
+            ),
+            TerminalSteps(
+                obs=self._concatenate_obs(terminal_steps),
+                reward=np.concatenate([t.reward for t in terminal_steps]),
+                interrupted=np.concatenate([t.interrupted for t in terminal_steps]),
+                agent_id=terminal_ids,
+                group_id=np.concatenate([t.group_id for t in terminal_steps]),
+                group_reward=np.concatenate([t.group_reward for t in terminal_steps]),
+            ),
+        )
+
+    def get_all_steps(
+        self,
+    ) -> Dict[BehaviorName, Tuple[DecisionSteps, TerminalSteps]]:
+        """
+        Returns the steps of every behavior that has at least one Agent requesting
+        a decision or terminating in one of the environments, see
+        UnityEnvironment.get_all_steps.
+        """
+        active = set()
+        for communicator in self._communicators:
+            active.update(communicator.get_all_steps())
+        return {
+            name: self.get_steps(name) for name in self._env_specs if name in active
+        }
+
+    def _namespace_agent_ids(
+        self,
+        env_indices: List[int],
+        steps: List[Union[DecisionSteps, TerminalSteps]],
+    ) -> np.ndarray:
+        return np.concatenate(
+            [
+                s.agent_id.astype(np.int64) * self._n_envs + env_index
+                for env_index, s in zip(env_indices, steps)
+            ]
+        )
+
+    @staticmethod
+    def _concatenate_obs(
+        steps: List[Union[DecisionSteps, TerminalSteps]]
+    ) -> List[np.ndarray]:
+        return [
+            np.concatenate([s.obs[i] for s in steps]) for i in range(len(steps[0].obs))
+        ]
+
+    def close(self):
+        """
+        Sends a shutdown signal to the unity environments, and closes the
+        communication.
+        """
+        for communicator in self._communicators:
+            communicator.close()
+        for proc in self._procs:
+            shutdown_process(proc)
+        # Set to empty so we don't try to close multiple times.
+        self._communicators = []
+        self._procs = []
@@ -6,7 +6,7 @@ import os
 import numpy as np
 import json
 
-from typing import Callable, Optional, List
+from typing import Callable, Optional, List, Tuple
 
 import mlagents.trainers
 import mlagents_envs
@@ -16,8 +16,16 @@ from mlagents.trainers.trainer import TrainerFactory
 from mlagents.trainers.directory_utils import validate_existing_directories
 from mlagents.trainers.stats import StatsReporter
 from mlagents.trainers.cli_utils import parser
+from mlagents_dots_envs.replay_environment import ReplayEnvironment
+from mlagents_dots_envs.step_profiler import StepProfiler
 from mlagents_dots_envs.unity_environment import UnityEnvironment
 from mlagents.trainers.settings import RunOptions
+from mlagents_dots_learn.dots_settings import (
+    DotsSettings,
+    VECTORIZED_ENV_MANAGER,
+    add_dots_arguments,
+)
+from mlagents_dots_learn.vectorized_env_manager import create_vectorized_env_manager
 
 from mlagents.trainers.training_status import GlobalTrainingStatus
 from mlagents_envs.base_env import BaseEnv
@@ -35,6 +43,8 @@ logger = logging_util.get_logger(__name__)
 
 TRAINING_STATUS_FILE_NAME = "training_status.json"
 
+add_dots_arguments(parser)
+
 
 def get_version_string() -> str:
     return f""" Version information:
@@ -44,17 +54,22 @@ def get_version_string() -> str:
   PyTorch: {torch_utils.torch.__version__}"""
 
 
-def parse_command_line(argv: Optional[List[str]] = None) -> RunOptions:
+def parse_command_line(
+    argv: Optional[List[str]] = None
+) -> Tuple[RunOptions, DotsSettings]:
     args = parser.parse_args(argv)
-    return RunOptions.from_argparse(args)
+    return RunOptions.from_argparse(args), DotsSettings.from_argparse(args)
 
 
-def run_training(run_seed: int, options: RunOptions) -> None:
+def run_training(
+    run_seed: int, options: RunOptions, dots_settings: DotsSettings = DotsSettings()
+) -> None:
     """
     Launches training session.
     :param options: parsed command line arguments
     :param run_seed: Random seed used for training.
     :param run_options: Command line arguments for training.
+    :param dots_settings: Settings of the DOTS environments.
     """
     with hierarchical_timer("run_training.setup"):
         torch_utils.set_torch_config(options.torch_settings)
@@ -93,9 +108,15 @@ def run_training(run_seed: int, options: RunOptions) -> None:
             port,
             env_settings.env_args,
             os.path.abspath(run_logs_dir),  # Unity environment requires absolute path
+            dots_settings,
         )
 
-        env_manager = SubprocessEnvManager(env_factory, options, env_settings.num_envs)
+        if dots_settings.env_manager == VECTORIZED_ENV_MANAGER:
+            env_manager = create_vectorized_env_manager(options, dots_settings)
+        else:
+            env_manager = SubprocessEnvManager(
+                env_factory, options, env_settings.num_envs
+            )
         env_parameter_manager = EnvironmentParameterManager(
             options.environment_parameters, run_seed, restore=checkpoint_settings.resume
         )
@@ -167,10 +188,27 @@ def create_environment_factory(
     start_port: Optional[int],
     env_args: Optional[List[str]],
     log_folder: str,
+    dots_settings: DotsSettings = DotsSettings(),
 ) -> Callable[[int, List[SideChannel]], BaseEnv]:
     def create_unity_environment(
         worker_id: int, side_channels: List[SideChannel]
     ) -> BaseEnv:
+        if dots_settings.replay_steps is not None:
+            return ReplayEnvironment(
+                f"{dots_settings.replay_steps}_{worker_id}",
+                side_channels=side_channels,
+                normalize_observations=True,
+            )
+        record_path = None
+        if dots_settings.record_steps is not None:
+            record_path = f"{dots_settings.record_steps}_{worker_id}"
+        step_profiler = None
+        if dots_settings.step_profile_interval is not None:
+            step_profiler = StepProfiler(
+                f"worker_{worker_id}",
+                directory=log_folder,
+                flush_interval=dots_settings.step_profile_interval,
+            )
         # Make sure that each environment gets a different seed
         env_seed = seed + worker_id
         return UnityEnvironment(
@@ -182,12 +220,19 @@ def create_environment_factory(
             additional_args=env_args,
             side_channels=side_channels,
             log_folder=log_folder,
+            wait_policy=dots_settings.wait_policy,
+            wake_channel=dots_settings.wake_channel,
+            action_repeat=dots_settings.action_repeat,
+            record_path=record_path,
+            step_profiler=step_profiler,
+            # The trainers expect float32 observations, uint8 pixels in [0, 1]
+            normalize_observations=True,
         )
 
     return create_unity_environment
 
 
-def run_cli(options: RunOptions) -> None:
+def run_cli(options: RunOptions, dots_settings: DotsSettings = DotsSettings()) -> None:
     try:
         print(
             """
@@ -245,11 +290,11 @@ def run_cli(options: RunOptions) -> None:
     if options.env_settings.seed == -1:
         run_seed = np.random.randint(0, 10000)
         logger.debug(f"run_seed set to {run_seed}")
-    run_training(run_seed, options)
+    run_training(run_seed, options, dots_settings)
 
 
 def main():
-    run_cli(parse_command_line())
+    run_cli(*parse_command_line())
 
 
 # For python debugger to directly run this script
@@ -0,0 +1,97 @@
+import argparse
+from typing import NamedTuple, Optional
+
+from mlagents_dots_envs.shared_memory.wait_strategy import WaitPolicy
+
+SUBPROCESS_ENV_MANAGER = "subprocess"
+VECTORIZED_ENV_MANAGER = "vectorized"
+
+
+class DotsSettings(NamedTuple):
+    """
+    Settings specific to the DOTS shared memory environments.
+    """
+
+    env_manager: str = SUBPROCESS_ENV_MANAGER
+    wait_policy: str = WaitPolicy.SPIN.value
+    wake_channel: bool = False
+    action_repeat: int = 1
+    record_steps: Optional[str] = None
+    replay_steps: Optional[str] = None
+    step_profile_interval: Optional[float] = None
+
+    @staticmethod
+    def from_argparse(args: argparse.Namespace) -> "DotsSettings":
+        return DotsSettings(
+            env_manager=args.dots_env_manager,
+            wait_policy=args.dots_wait_policy,
+            wake_channel=args.dots_wake_channel,
+            action_repeat=args.dots_action_repeat,
+            record_steps=args.dots_record_steps,
+            replay_steps=args.dots_replay_steps,
+            step_profile_interval=args.dots_step_profile_interval,
+        )
+
+
+def add_dots_arguments(argparser: argparse.ArgumentParser) -> None:
+    """
+    Adds the DOTS specific command line arguments to the mlagents-learn parser.
+    """
+    dots_conf = argparser.add_argument_group(title="DOTS Environment Configuration")
+    dots_conf.add_argument(
+        "--env-manager",
+        default=SUBPROCESS_ENV_MANAGER,
+        choices=[SUBPROCESS_ENV_MANAGER, VECTORIZED_ENV_MANAGER],
+        dest="dots_env_manager",
+        help="How the environments are stepped. subprocess runs each environment "
+        "in its own process, vectorized steps all the environments from the trainer "
+        "process.",
+    )
+    dots_conf.add_argument(
+        "--wait-policy",
+        default=WaitPolicy.SPIN.value,
+        choices=[p.value for p in WaitPolicy],
+        dest="dots_wait_policy",
+        help="What Python does while waiting for Unity.",
+    )
+    dots_conf.add_argument(
+        "--wake-channel",
+        default=False,
+        action="store_true",
+        dest="dots_wake_channel",
+        help="Wake Python and Unity through named pipes instead of polling the "
+        "shared memory when the Unity player supports it.",
+    )
+    dots_conf.add_argument(
+        "--action-repeat",
+        default=1,
+        type=int,
+        dest="dots_action_repeat",
+        help="The number of simulation ticks Unity runs with the same actions at "
+        "every step, the rewards of the ticks are accumulated. Requires a Unity "
+        "player that supports action repeat.",
+    )
+    dots_conf.add_argument(
+        "--record-steps",
+        default=None,
+        dest="dots_record_steps",
+        help="Records the steps of each environment to <path>_<worker id> so the "
+        "training can be replayed without Unity with --replay-steps.",
+    )
+    dots_conf.add_argument(
+        "--replay-steps",
+        default=None,
+        dest="dots_replay_steps",
+        help="Replays the steps recorded with --record-steps <path> instead of "
+        "launching Unity, to measure the throughput of the trainers alone. The "
+        "actions do not change the replayed steps.",
+    )
+    dots_conf.add_argument(
+        "--step-profile-interval",
+        default=None,
+        type=float,
+        dest="dots_step_profile_interval",
+        help="Records the latency of the phases of the steps of each environment "
+        "and writes their percentiles to step_latency_worker_<worker id>.json in "
+        "the run logs directory every <interval> seconds.",
+    )
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from mlagents.trainers.settings import RunOptions
+from mlagents_envs.exception import UnityEnvironmentException
+from mlagents_dots_envs.mock_unity.mock_unity_process import write_launcher
+from mlagents_dots_learn.dots_settings import DotsSettings, VECTORIZED_ENV_MANAGER
+from mlagents_dots_learn.vectorized_env_manager import create_vectorized_env_manager
+
+
+def _run_options(launcher: str, num_envs: int) -> RunOptions:
+    options = RunOptions()
+    options.env_settings.env_path = launcher
+    options.env_settings.env_args = ["--behavior", "ball:4:3,2x2:2:3"]
+    options.env_settings.num_envs = num_envs
+    return options
+
+
+@pytest.mark.parametrize("num_envs", [1, 2])
+def test_vectorized_env_manager(tmp_path, num_envs):
+    launcher = write_launcher(str(tmp_path / "mock_unity"))
+    manager = create_vectorized_env_manager(
+        _run_options(launcher, num_envs),
+        DotsSettings(env_manager=VECTORIZED_ENV_MANAGER, wait_policy="yield"),
+    )
+    try:
+        (step_info,) = manager._reset_env()
+        decision_steps, _ = step_info.current_all_step_result["ball"]
+        assert len(decision_steps) == 4 * num_envs
+        obs = [o.copy() for o in decision_steps.obs]
+        for _ in range(2):
+            (next_step_info,) = manager._step()
+            assert next_step_info.environment_stats == {}
+        # The trainers keep the observations of the previous steps
+        assert all(np.array_equal(o, c) for o, c in zip(decision_steps.obs, obs))
+        next_decision_steps, _ = next_step_info.current_all_step_result["ball"]
+        assert not np.array_equal(next_decision_steps.obs[0], obs[0])
+    finally:
+        manager.close()
+
+
+def test_vectorized_env_manager_rejects_recording(tmp_path):
+    with pytest.raises(UnityEnvironmentException):
+        create_vectorized_env_manager(
+            _run_options("mock", 1),
+            DotsSettings(env_manager=VECTORIZED_ENV_MANAGER, record_steps="steps"),
+        )
@@ -0,0 +1,89 @@
+from typing import Dict, List
+
+from mlagents.trainers.env_manager import EnvironmentStep
+from mlagents.trainers.settings import RunOptions
+from mlagents.trainers.simple_env_manager import SimpleEnvManager
+from mlagents_envs.side_channel.engine_configuration_channel import (
+    EngineConfigurationChannel,
+    EngineConfig,
+)
+from mlagents_envs.side_channel.environment_parameters_channel import (
+    EnvironmentParametersChannel,
+)
+from mlagents_envs.side_channel.stats_side_channel import StatsSideChannel
+from mlagents_envs.exception import UnityEnvironmentException
+
+from mlagents_dots_envs.vectorized_unity_environment import (
+    VectorizedUnityEnvironment,
+)
+from mlagents_dots_learn.dots_settings import DotsSettings
+
+
+class VectorizedEnvManager(SimpleEnvManager):
+    """
+    Steps a VectorizedUnityEnvironment from the trainer process. Unlike the
+    SubprocessEnvManager, there is no process per environment and the step data
+    is never pickled.
+    """
+
+    def __init__(
+        self,
+        env: VectorizedUnityEnvironment,
+        env_params: EnvironmentParametersChannel,
+        stats_channel: StatsSideChannel,
+    ):
+        super().__init__(env, env_params)
+        self._stats_channel = stats_channel
+
+    def _step(self) -> List[EnvironmentStep]:
+        return [self._add_stats(step_info) for step_info in super()._step()]
+
+    def _reset_env(self, config: Dict = None) -> List[EnvironmentStep]:
+        step_infos = super()._reset_env(config)
+        return [self._add_stats(step_info) for step_info in step_infos]
+
+    def _add_stats(self, step_info: EnvironmentStep) -> EnvironmentStep:
+        return step_info._replace(
+            environment_stats=self._stats_channel.get_and_reset_stats()
+        )
+
+
+def create_vectorized_env_manager(
+    options: RunOptions, dots_settings: DotsSettings
+) -> VectorizedEnvManager:
+    if dots_settings.record_steps or dots_settings.replay_steps:
+        raise UnityEnvironmentException(
+            "Recording and replaying steps require the subprocess env manager."
+        )
+    if dots_settings.step_profile_interval is not None:
+        raise UnityEnvironmentException(
+            "Profiling the steps requires the subprocess env manager."
+        )
+    env_settings = options.env_settings
+    engine_settings = options.engine_settings
+    env_parameters = EnvironmentParametersChannel()
+    engine_configuration_channel = EngineConfigurationChannel()
+    engine_configuration_channel.set_configuration(
+        EngineConfig(
+            width=engine_settings.width,
+            height=engine_settings.height,
+            quality_level=engine_settings.quality_level,
+            time_scale=engine_settings.time_scale,
+            target_frame_rate=engine_settings.target_frame_rate,
+            capture_frame_rate=engine_settings.capture_frame_rate,
+        )
+    )
+    stats_channel = StatsSideChannel()
+    env = VectorizedUnityEnvironment(
+        file_name=env_settings.env_path,
+        n_envs=env_settings.num_envs,
+        side_channels=[env_parameters, engine_configuration_channel, stats_channel],
+        additional_args=env_settings.env_args,
+        wait_policy=dots_settings.wait_policy,
+        wake_channel=dots_settings.wake_channel,
+        action_repeat=dots_settings.action_repeat,
+        # The trainers expect float32 observations, uint8 pixels in [0, 1]
+        normalize_observations=True,
+        no_graphics=engine_settings.no_graphics,
+    )
+    return VectorizedEnvManager(env, env_parameters, stats_channel)